@@ -4,13 +4,17 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import itertools
 import os
-import time
 from typing import TYPE_CHECKING, ClassVar, Dict, List
 
 import torch
 
 from habitat import logger
+from habitat_baselines.common.checkpoint_manifest import (
+    CheckpointWatcher,
+    eval_checkpoint_indices,
+)
 from habitat_baselines.common.tensorboard_utils import (
     TensorboardWriter,
     get_writer,
@@ -22,10 +26,7 @@ from habitat_baselines.rl.ddppo.ddp_utils import (
     load_resume_state,
     save_resume_state,
 )
-from habitat_baselines.utils.common import (
-    get_checkpoint_id,
-    poll_checkpoint_folder,
-)
+from habitat_baselines.utils.common import get_checkpoint_id
 
 if TYPE_CHECKING:
     from omegaconf import DictConfig
@@ -84,8 +85,14 @@ class BaseTrainer:
                 resume_state["config"]
             )
             prev_ckpt_ind = resume_state["prev_ckpt_ind"]
+            # The resume states of the previous versions evaluated all the
+            # checkpoints in order.
+            num_evaluated_ckpts = resume_state.get(
+                "num_evaluated_ckpts", prev_ckpt_ind + 1
+            )
         else:
             prev_ckpt_ind = -1
+            num_evaluated_ckpts = 0
 
         self.device = (
             torch.device("cuda", self.config.habitat_baselines.torch_gpu_id)
@@ -132,39 +139,47 @@ class BaseTrainer:
                     checkpoint_index=ckpt_idx,
                 )
             else:
-                # evaluate multiple checkpoints in order
-                while True:
-                    current_ckpt = None
-                    while current_ckpt is None:
-                        current_ckpt = poll_checkpoint_folder(
-                            self.config.habitat_baselines.eval_ckpt_path_dir,
-                            prev_ckpt_ind,
+                # evaluate multiple checkpoints, as they are written
+                eval_config = self.config.habitat_baselines.eval
+                ckpt_inds = eval_checkpoint_indices(
+                    self.config.habitat_baselines.num_checkpoints,
+                    eval_config.ckpt_stride,
+                    list(eval_config.ckpt_indices),
+                )
+                # Skip the checkpoints evaluated before a preemption.
+                ckpt_inds = itertools.islice(
+                    ckpt_inds, num_evaluated_ckpts, None
+                )
+                watcher = CheckpointWatcher(
+                    self.config.habitat_baselines.eval_ckpt_path_dir,
+                    poll_interval=eval_config.ckpt_poll_interval,
+                )
+                try:
+                    for ckpt_ind in ckpt_inds:
+                        current_ckpt = watcher.wait_for_checkpoint(ckpt_ind)
+                        logger.info(f"=======current_ckpt: {current_ckpt}=======")  # type: ignore
+                        prev_ckpt_ind = ckpt_ind
+                        self._eval_checkpoint(
+                            checkpoint_path=current_ckpt,
+                            writer=writer,
+                            checkpoint_index=prev_ckpt_ind,
                         )
-                        time.sleep(2)  # sleep for 2 secs before polling again
-                    logger.info(f"=======current_ckpt: {current_ckpt}=======")  # type: ignore
-                    prev_ckpt_ind += 1
-                    self._eval_checkpoint(
-                        checkpoint_path=current_ckpt,
-                        writer=writer,
-                        checkpoint_index=prev_ckpt_ind,
-                    )
-
-                    # We save a resume state during evaluation so that
-                    # we can resume evaluating incase the job gets
-                    # preempted.
-                    save_resume_state(
-                        {
-                            "config": self.config,
-                            "prev_ckpt_ind": prev_ckpt_ind,
-                        },
-                        self.config,
-                        filename_key="eval",
-                    )
-
-                    if (
-                        prev_ckpt_ind + 1
-                    ) == self.config.habitat_baselines.num_checkpoints:
-                        break
+                        num_evaluated_ckpts += 1
+
+                        # We save a resume state during evaluation so that
+                        # we can resume evaluating incase the job gets
+                        # preempted.
+                        save_resume_state(
+                            {
+                                "config": self.config,
+                                "prev_ckpt_ind": prev_ckpt_ind,
+                                "num_evaluated_ckpts": num_evaluated_ckpts,
+                            },
+                            self.config,
+                            filename_key="eval",
+                        )
+                finally:
+                    watcher.close()
 
     def _eval_checkpoint(
         self,
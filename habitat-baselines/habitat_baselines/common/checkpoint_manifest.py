@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Index of the checkpoints of a checkpoint folder.
+
+The trainer appends one JSON line to the manifest of the checkpoint folder
+(:ref:`MANIFEST_NAME`) once a checkpoint is completely written (see
+:ref:`append_to_manifest`). :ref:`CheckpointWatcher` reads the new lines of
+the manifest to find the checkpoints to evaluate, instead of listing and
+sorting the whole folder, and never returns a checkpoint before it is
+written. It waits for the manifest to change with inotify on Linux, and
+checks it again every ``poll_interval`` seconds anyway, as the events of
+files written by other nodes of a network filesystem are not reported.
+
+Checkpoint folders without a manifest (written by a previous version of the
+trainer) are read with :ref:`poll_checkpoint_folder`. When training resumes
+in such a folder, the manifest is created with the checkpoints already in
+it, and the checkpoints missing from a manifest that already lists later
+ones are found by their file name.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import os.path as osp
+import select
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from habitat import logger
+from habitat_baselines.utils.common import (
+    get_checkpoint_id,
+    poll_checkpoint_folder,
+)
+
+# Hidden, so that it isn't listed by `poll_checkpoint_folder`.
+MANIFEST_NAME = ".checkpoints.jsonl"
+
+_IN_CREATE = 0x00000100
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+
+def _list_checkpoints(checkpoint_folder: str) -> Dict[int, str]:
+    r"""The checkpoint files of :p:`checkpoint_folder` (named
+    ``ckpt.<index>.pth``), by index.
+    """
+    checkpoints = {}
+    with os.scandir(checkpoint_folder) as entries:
+        for entry in entries:
+            if (
+                entry.name.startswith(".")
+                or "latest" in entry.name
+                or not entry.is_file()
+            ):
+                continue
+            ckpt_ind = get_checkpoint_id(entry.name)
+            if ckpt_ind is not None:
+                checkpoints[ckpt_ind] = entry.path
+    return checkpoints
+
+
+def _manifest_line(
+    checkpoint_folder: str, ckpt_ind: int, path: str, **info: Any
+) -> bytes:
+    entry = {
+        "index": ckpt_ind,
+        "path": osp.relpath(path, checkpoint_folder),
+        "time": time.time(),
+        **info,
+    }
+    return (json.dumps(entry) + "\n").encode()
+
+
+def append_to_manifest(
+    checkpoint_folder: str, ckpt_ind: int, path: str, **info: Any
+) -> None:
+    r"""Adds the checkpoint :p:`path` to the manifest of
+    :p:`checkpoint_folder`, as the checkpoint :p:`ckpt_ind`. Must be called
+    once the file is completely written. The manifest is created with the
+    checkpoints already in the folder, e.g. when resuming a training started
+    by a previous version of the trainer.
+
+    :param info: Added to the entry, e.g. the number of training steps.
+    """
+    line = _manifest_line(checkpoint_folder, ckpt_ind, path, **info)
+    manifest_path = osp.join(checkpoint_folder, MANIFEST_NAME)
+    try:
+        fd = os.open(
+            manifest_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644
+        )
+    except FileExistsError:
+        fd = os.open(manifest_path, os.O_WRONLY | os.O_APPEND)
+    else:
+        existing = _list_checkpoints(checkpoint_folder)
+        existing.pop(ckpt_ind, None)
+        line = b"".join(
+            [
+                _manifest_line(checkpoint_folder, i, existing[i])
+                for i in sorted(existing)
+            ]
+            + [line]
+        )
+    # A single write in append mode, so that the readers see either the whole
+    # lines or nothing of them.
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def eval_checkpoint_indices(
+    num_checkpoints: int, stride: int = 1, indices: Optional[List[int]] = None
+) -> Iterator[int]:
+    r"""The indices of the checkpoints to evaluate, in order: :p:`indices`
+    if not empty, else every :p:`stride`-th checkpoint among the
+    :p:`num_checkpoints` ones (without an end if :p:`num_checkpoints` is
+    not positive).
+    """
+    if indices:
+        yield from indices
+        return
+    assert stride > 0, "The checkpoint stride must be positive"
+    ckpt_ind = 0
+    while num_checkpoints <= 0 or ckpt_ind < num_checkpoints:
+        yield ckpt_ind
+        ckpt_ind += stride
+
+
+class _Inotify:
+    r"""Minimal inotify binding, to wait for files to be written in a
+    directory. Raises :py:`OSError` if inotify is not available.
+    """
+
+    def __init__(self, directory: str) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not supported")
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if (
+            libc.inotify_add_watch(
+                self._fd,
+                os.fsencode(directory),
+                _IN_CREATE | _IN_CLOSE_WRITE | _IN_MOVED_TO,
+            )
+            < 0
+        ):
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed on {directory}")
+
+    def wait(self, timeout: float) -> None:
+        r"""Waits for at least one event, or :p:`timeout` seconds."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if readable:
+            # Drop the events, the caller checks the files itself.
+            try:
+                while os.read(self._fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class CheckpointWatcher:
+    r"""Finds the checkpoints of a checkpoint folder as they are written.
+
+    :param checkpoint_folder: The folder the trainer saves the checkpoints to.
+    :param poll_interval: The maximum time, in seconds, between two reads
+        of the manifest while waiting for a checkpoint.
+    """
+
+    def __init__(
+        self, checkpoint_folder: str, poll_interval: float = 2.0
+    ) -> None:
+        assert osp.isdir(
+            checkpoint_folder
+        ), f"invalid checkpoint folder path {checkpoint_folder}"
+        self._checkpoint_folder = checkpoint_folder
+        self._manifest_path = osp.join(checkpoint_folder, MANIFEST_NAME)
+        self._poll_interval = poll_interval
+        # The entries of the manifest read so far, by checkpoint index.
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._offset = 0
+        self._inotify: Optional[_Inotify]
+        try:
+            self._inotify = _Inotify(checkpoint_folder)
+        except OSError as e:
+            logger.info(
+                f"Polling {checkpoint_folder} for the checkpoints, "
+                f"inotify is not available: {e}"
+            )
+            self._inotify = None
+
+    @property
+    def has_manifest(self) -> bool:
+        return osp.isfile(self._manifest_path)
+
+    def _read_manifest(self) -> None:
+        try:
+            with open(self._manifest_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < self._offset:
+                    # The manifest was written again from scratch.
+                    self._entries.clear()
+                    self._offset = 0
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Leave an incomplete last line for the next read.
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if len(line.strip()) == 0:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping invalid manifest line: {line!r}")
+                continue
+            # A later entry for the same index (e.g. written by a resumed
+            # training) replaces the earlier one.
+            self._entries[int(entry["index"])] = entry
+        self._offset += end
+
+    def get_entry(self, ckpt_ind: int) -> Optional[Dict[str, Any]]:
+        r"""The manifest entry of the checkpoint :p:`ckpt_ind`, None if it
+        isn't written yet.
+        """
+        if ckpt_ind not in self._entries:
+            self._read_manifest()
+        return self._entries.get(ckpt_ind)
+
+    def get_checkpoint(self, ckpt_ind: int) -> Optional[str]:
+        r"""The path of the checkpoint :p:`ckpt_ind`, None if it isn't
+        written yet.
+        """
+        if not self.has_manifest:
+            return poll_checkpoint_folder(
+                self._checkpoint_folder, ckpt_ind - 1
+            )
+        entry = self.get_entry(ckpt_ind)
+        if entry is not None:
+            return osp.join(self._checkpoint_folder, entry["path"])
+        if len(self._entries) > 0 and ckpt_ind < max(self._entries):
+            # The checkpoint will never be added to the manifest, it was
+            # written before it (e.g. by a previous version of the trainer).
+            return _list_checkpoints(self._checkpoint_folder).get(ckpt_ind)
+        return None
+
+    def wait_for_checkpoint(
+        self, ckpt_ind: int, timeout: Optional[float] = None
+    ) -> Optional[str]:
+        r"""Waits until the checkpoint :p:`ckpt_ind` is written and returns
+        its path. Returns None if it isn't written after :p:`timeout`
+        seconds.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            path = self.get_checkpoint(ckpt_ind)
+            if path is not None:
+                return path
+            wait_time = self._poll_interval
+            if deadline is not None:
+                wait_time = min(wait_time, deadline - time.time())
+                if wait_time <= 0:
+                    return None
+            if self._inotify is not None:
+                self._inotify.wait(wait_time)
+            else:
+                time.sleep(wait_time)
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
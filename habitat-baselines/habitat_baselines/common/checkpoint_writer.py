@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Writing of the checkpoints and resume states off the training loop.
+
+:ref:`AsyncCheckpointWriter.save` copies the tensors of a state to CPU memory
+(pinned for the CUDA tensors) and returns, the state is serialized and
+written by a background thread. Every file is written to a hidden temporary
+file in the same directory, then renamed, so readers (the evaluation polling
+the checkpoint folder, a resumed job) never see partial files. The
+``latest.pth`` copy of a checkpoint is a hard link to it (or a symbolic link
+if the filesystem doesn't support hard links) instead of a second
+serialization.
+
+:ref:`flush_checkpoint_writes` waits until all the files saved with the
+shared writer (:ref:`get_checkpoint_writer`) are written. It must be called
+before the process exits, :ref:`requeue_job` does it.
+"""
+
+import copy
+import os
+import os.path as osp
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+import torch
+
+from habitat import logger
+
+
+def snapshot_state(state: Any) -> Any:
+    r"""Copies :p:`state` so that training can keep updating it while the
+    copy is written. The tensors (nested in dicts, lists, tuples, deques and
+    sets) are copied to CPU memory, the CUDA tensors to pinned memory
+    asynchronously, with one synchronization at the end. Tensors shared
+    between several entries stay shared. The other objects (e.g. the deques
+    of the window episode stats, which the trainer keeps appending to) are
+    deep copied.
+    """
+    memo: Dict[int, torch.Tensor] = {}
+    deepcopy_memo: Dict[int, Any] = {}
+    has_cuda = False
+
+    def _copy(obj):
+        nonlocal has_cuda
+        if isinstance(obj, torch.Tensor):
+            if id(obj) not in memo:
+                if obj.is_cuda:
+                    has_cuda = True
+                    copy = torch.empty_like(obj, device="cpu", pin_memory=True)
+                    copy.copy_(obj.detach(), non_blocking=True)
+                else:
+                    copy = obj.detach().clone()
+                memo[id(obj)] = copy
+            return memo[id(obj)]
+        if isinstance(obj, dict):
+            return type(obj)((k, _copy(v)) for k, v in obj.items())
+        if isinstance(obj, list):
+            return [_copy(v) for v in obj]
+        if isinstance(obj, tuple):
+            if hasattr(obj, "_fields"):
+                return type(obj)(*[_copy(v) for v in obj])
+            return tuple(_copy(v) for v in obj)
+        if isinstance(obj, deque):
+            return deque([_copy(v) for v in obj], maxlen=obj.maxlen)
+        if isinstance(obj, (set, frozenset)):
+            return type(obj)(_copy(v) for v in obj)
+        return copy.deepcopy(obj, deepcopy_memo)
+
+    snapshot = _copy(state)
+    if has_cuda:
+        torch.cuda.synchronize()
+    return snapshot
+
+
+def _tmp_path(path: str) -> str:
+    # Hidden, so that it isn't picked up by the globs of the checkpoint
+    # folder.
+    return osp.join(
+        osp.dirname(path), f".{osp.basename(path)}.{os.getpid()}.tmp"
+    )
+
+
+def link_latest(path: str, latest_path: str) -> None:
+    r"""Atomically makes :p:`latest_path` point to the file :p:`path`, with a
+    hard link or, if not supported, a relative symbolic link.
+    """
+    tmp_path = _tmp_path(latest_path)
+    if osp.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(path, tmp_path)
+    except OSError:
+        os.symlink(
+            osp.relpath(path, osp.dirname(osp.abspath(latest_path))),
+            tmp_path,
+        )
+    os.replace(tmp_path, latest_path)
+
+
+def write_checkpoint(
+    state: Any, path: str, latest_path: Optional[str] = None
+) -> None:
+    r"""Saves :p:`state` to :p:`path` with :py:`torch.save`, atomically, and
+    links :p:`latest_path` to it if given.
+    """
+    tmp_path = _tmp_path(path)
+    try:
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if osp.exists(tmp_path):
+            os.remove(tmp_path)
+    if latest_path is not None:
+        link_latest(path, latest_path)
+
+
+class AsyncCheckpointWriter:
+    r"""Writes checkpoints with :ref:`write_checkpoint` in a background
+    thread, in the order they are saved.
+
+    :param max_pending: The maximum number of states copied but not written
+        yet. :ref:`save` blocks until the oldest one is written beyond that,
+        to bound the memory of the copies.
+    """
+
+    def __init__(self, max_pending: int = 2) -> None:
+        self._max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="checkpoint_writer"
+        )
+        self._pending: Deque[Future] = deque()
+        self._lock = threading.Lock()
+
+    def save(
+        self,
+        state: Any,
+        path: str,
+        latest_path: Optional[str] = None,
+        on_saved: Optional[Callable[[], None]] = None,
+    ) -> None:
+        r"""Copies :p:`state` (see :ref:`snapshot_state`) and writes it to
+        :p:`path` in the background.
+
+        :param on_saved: Called by the background thread once the file is
+            written.
+        """
+        snapshot = snapshot_state(state)
+        with self._lock:
+            self._raise_finished()
+            while len(self._pending) >= self._max_pending:
+                self._pending.popleft().result()
+            self._pending.append(
+                self._executor.submit(
+                    self._write, snapshot, path, latest_path, on_saved
+                )
+            )
+
+    @staticmethod
+    def _write(state, path, latest_path, on_saved) -> None:
+        write_checkpoint(state, path, latest_path)
+        if on_saved is not None:
+            on_saved()
+
+    def _raise_finished(self) -> None:
+        # Raises the errors of the writes already done.
+        while len(self._pending) > 0 and self._pending[0].done():
+            self._pending.popleft().result()
+
+    def flush(self) -> None:
+        r"""Waits until all the saved states are written. Raises the error of
+        the first failed write, if any.
+        """
+        with self._lock:
+            while len(self._pending) > 0:
+                self._pending.popleft().result()
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown()
+
+
+_writer: Optional[AsyncCheckpointWriter] = None
+
+
+def get_checkpoint_writer() -> AsyncCheckpointWriter:
+    r"""The writer shared by the trainer and the resume state saving of the
+    process.
+    """
+    global _writer
+    if _writer is None:
+        _writer = AsyncCheckpointWriter()
+    return _writer
+
+
+def flush_checkpoint_writes() -> None:
+    r"""Waits until the files saved with the shared writer are written."""
+    if _writer is None:
+        return
+    try:
+        _writer.flush()
+    except Exception:
+        logger.exception("Failed to write a checkpoint")
+        raise
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Vectorized computation of discounted returns and GAE.
+
+Both the discounted return and the generalized advantage estimate are
+instances of the reverse linear recurrence
+
+.. code:: py
+
+    y[t] = x[t] + c[t] * y[t + 1]
+
+with a per-step discount :py:`c`. Instead of unrolling this recurrence one
+step at a time, :ref:`discounted_reverse_scan` splits the time axis in chunks
+and solves every chunk with a single batched contraction against the matrix
+of cumulative discounts :py:`W[t, k] = c[t] * ... * c[k - 1]`. Only the
+value at the start of each chunk is carried over to the previous chunk, so
+the number of sequential steps is :py:`T / chunk_size` instead of :py:`T`.
+"""
+
+from typing import Optional
+
+import torch
+
+#: The names accepted by the :py:`returns_engine` option of the rollout
+#: storages. :py:`"loop"` is the step by step reference implementation.
+RETURNS_ENGINES = ("loop", "scan")
+
+#: Size of the chunks used by :ref:`discounted_reverse_scan`. Every chunk
+#: materializes a :py:`chunk_size x chunk_size` matrix per batch element.
+DEFAULT_SCAN_CHUNK_SIZE = 32
+
+
+def check_returns_engine(returns_engine: str) -> str:
+    if returns_engine not in RETURNS_ENGINES:
+        raise ValueError(
+            f"Unknown returns engine '{returns_engine}', "
+            f"expected one of {RETURNS_ENGINES}"
+        )
+    return returns_engine
+
+
+def discounted_reverse_scan(
+    x: torch.Tensor,
+    discounts: torch.Tensor,
+    bootstrap: Optional[torch.Tensor] = None,
+    chunk_size: int = DEFAULT_SCAN_CHUNK_SIZE,
+) -> torch.Tensor:
+    r"""Solves :py:`y[t] = x[t] + discounts[t] * y[t + 1]` for all :py:`t`.
+
+    :param x: Tensor of shape :py:`[T, *batch]`.
+    :param discounts: The per-step discounts, same shape as :p:`x`.
+    :param bootstrap: The value of :py:`y[T]`, of shape :py:`[*batch]`. Zero
+        if :py:`None`.
+    :param chunk_size: The number of steps solved at once.
+    :return: :py:`y[0:T]`, same shape as :p:`x`.
+    """
+    assert x.shape == discounts.shape, (x.shape, discounts.shape)
+    num_steps = x.size(0)
+    y = torch.empty_like(x)
+    if num_steps == 0:
+        return y
+
+    carry = (
+        torch.zeros_like(x[0])
+        if bootstrap is None
+        else bootstrap.to(dtype=x.dtype).expand_as(x[0])
+    )
+
+    trailing_dims = (1,) * (x.dim() - 1)
+    end = num_steps
+    while end > 0:
+        start = max(0, end - chunk_size)
+        length = end - start
+        x_chunk = x[start:end]
+        c_chunk = discounts[start:end]
+
+        # shifted[k] = c[k - 1], so that the cumulative product along k of
+        # a row that is 1 up to (and including) the diagonal gives
+        # W[t, k] = c[t] * ... * c[k - 1].
+        shifted = torch.cat(
+            [torch.ones_like(c_chunk[:1]), c_chunk[:-1]], dim=0
+        )
+        above_diag = torch.ones(
+            length, length, dtype=torch.bool, device=x.device
+        ).triu_(1)
+        weights = torch.where(
+            above_diag.view(length, length, *trailing_dims),
+            shifted.unsqueeze(0),
+            torch.ones((), dtype=x.dtype, device=x.device),
+        ).cumprod(dim=1)
+        weights = weights * above_diag.logical_or(
+            torch.eye(length, dtype=torch.bool, device=x.device)
+        ).view(length, length, *trailing_dims)
+
+        y_chunk = (weights * x_chunk.unsqueeze(0)).sum(dim=1)
+        y_chunk += weights[:, -1] * c_chunk[-1] * carry
+        y[start:end] = y_chunk
+
+        carry = y_chunk[0]
+        end = start
+
+    return y
+
+
+def compute_returns_scan(
+    rewards: torch.Tensor,
+    value_preds: torch.Tensor,
+    masks: torch.Tensor,
+    next_value: torch.Tensor,
+    use_gae: bool,
+    gamma: float,
+    tau: float,
+    chunk_size: int = DEFAULT_SCAN_CHUNK_SIZE,
+) -> torch.Tensor:
+    r"""Vectorized equivalent of the loop in
+    :ref:`RolloutStorage.compute_returns`.
+
+    :param rewards: The rewards of steps :py:`[0, T)`.
+    :param value_preds: The value predictions of steps :py:`[0, T)`.
+    :param masks: The masks of steps :py:`[1, T]`, i.e. whether step
+        :py:`t + 1` continues the episode of step :py:`t`.
+    :param next_value: The value prediction of step :py:`T`.
+    :return: The returns of steps :py:`[0, T)`.
+    """
+    masks = masks.to(dtype=rewards.dtype)
+    if use_gae:
+        next_values = torch.cat(
+            [value_preds[1:], next_value.unsqueeze(0)], dim=0
+        )
+        deltas = rewards + gamma * next_values * masks - value_preds
+        advantages = discounted_reverse_scan(
+            deltas, (gamma * tau) * masks, chunk_size=chunk_size
+        )
+        return advantages + value_preds
+    else:
+        return discounted_reverse_scan(
+            rewards, gamma * masks, bootstrap=next_value, chunk_size=chunk_size
+        )
@@ -19,6 +19,7 @@ class VectorEnvFactory(ABC):
         workers_ignore_signals: bool = False,
         enforce_scenes_greater_eq_environments: bool = False,
         is_first_rank: bool = True,
+        share_scenes: bool = False,
     ) -> VectorEnv:
         """
         Setup a vectorized environment.
@@ -29,6 +30,8 @@ class VectorEnvFactory(ABC):
         :param enforce_scenes_greater_eq_environments: Make sure that there are more (or equal)
             scenes than environments. This is needed for correct evaluation.
         :param is_first_rank: If these environments are being constructed on the rank0 GPU.
+        :param share_scenes: Give all the scenes to every environment instead of splitting them,
+            so that any episode can be scheduled on any environment.
 
         :return: VectorEnv object created according to specification.
         """
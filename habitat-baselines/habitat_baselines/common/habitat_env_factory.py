@@ -22,6 +22,7 @@ class HabitatVectorEnvFactory(VectorEnvFactory):
         workers_ignore_signals: bool = False,
         enforce_scenes_greater_eq_environments: bool = False,
         is_first_rank: bool = True,
+        share_scenes: bool = False,
     ) -> VectorEnv:
         r"""Create VectorEnv object with specified config and env class type.
         To allow better performance, dataset are split into small ones for
@@ -46,7 +47,10 @@ class HabitatVectorEnvFactory(VectorEnvFactory):
         random.shuffle(scenes)
 
         scene_splits: List[List[str]] = [[] for _ in range(num_environments)]
-        if len(scenes) < num_environments:
+        if share_scenes:
+            for split in scene_splits:
+                split.extend(scenes)
+        elif len(scenes) < num_environments:
             msg = f"There are less scenes ({len(scenes)}) than environments ({num_environments}). "
             if enforce_scenes_greater_eq_environments:
                 logger.warn(
@@ -112,6 +116,7 @@ class HabitatVectorEnvFactory(VectorEnvFactory):
             make_env_fn=make_gym_from_config,
             env_fn_args=tuple((c,) for c in configs),
             workers_ignore_signals=workers_ignore_signals,
+            use_shared_memory_observations=config.habitat_baselines.use_shared_memory_observations,
         )
 
         if config.habitat.simulator.renderer.enable_batch_renderer:
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Batching of the observations of several environments.
+
+:ref:`ObservationBatcher` does the same as
+:ref:`habitat_baselines.utils.common.batch_obs` but compiles the layout of
+the observations (their keys, shapes and dtypes) once instead of flattening
+every observation dict on every call. The observations of each environment
+are written directly into one of a ring of pinned staging slots, and each
+sensor is then moved to the device with a single asynchronous copy. A slot is
+only reused once the copies out of it have completed, so the caller never
+has to synchronize the device. On the CPU, the observations are written into
+new tensors, which are returned as is.
+"""
+
+import numbers
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+
+import attr
+import numpy as np
+import torch
+from gym import spaces
+
+from habitat.utils import profiling_wrapper
+from habitat_baselines.common.tensor_dict import DictTree, TensorDict
+from habitat_baselines.utils.common import inference_mode
+
+ObservationKey = Tuple[str, ...]
+# The keys and shapes of an observation dict, as returned by _layout_key.
+LayoutKey = Tuple[Tuple[str, Any], ...]
+
+
+def _make_getter(key: ObservationKey) -> Callable[[DictTree], Any]:
+    if len(key) == 1:
+        (k,) = key
+        return lambda obs: obs[k]
+
+    def _get(obs):
+        for k in key:
+            obs = obs[k]
+        return obs
+
+    return _get
+
+
+def _flatten_observation(
+    observation: DictTree, prefix: ObservationKey = ()
+) -> List[Tuple[ObservationKey, Any]]:
+    leaves = []
+    for k, v in observation.items():
+        if isinstance(v, dict):
+            leaves.extend(_flatten_observation(v, (*prefix, k)))
+        else:
+            leaves.append(((*prefix, k), v))
+    return leaves
+
+
+def _layout_key(observation: DictTree) -> LayoutKey:
+    return tuple(
+        (
+            k,
+            _layout_key(v)
+            if isinstance(v, dict)
+            else getattr(v, "shape", None),
+        )
+        for k, v in observation.items()
+    )
+
+
+def _value_shape(value: Any) -> Tuple[int, ...]:
+    if isinstance(value, torch.Tensor):
+        return tuple(value.size())
+    return tuple(np.shape(value))
+
+
+def _flatten_space(
+    space: spaces.Dict, prefix: ObservationKey = ()
+) -> List[Tuple[ObservationKey, spaces.Space]]:
+    leaves = []
+    for k, v in space.spaces.items():
+        if isinstance(v, spaces.Dict):
+            leaves.extend(_flatten_space(v, (*prefix, k)))
+        else:
+            leaves.append(((*prefix, k), v))
+    return leaves
+
+
+@attr.s(auto_attribs=True, slots=True)
+class _SensorLayout:
+    key: ObservationKey
+    get: Callable[[DictTree], Any]
+    shape: Tuple[int, ...]
+    dtype: torch.dtype
+    # Sensors that are already on an accelerator are batched on it instead
+    # of going through the staging slots.
+    device: Optional[torch.device] = None
+
+    @property
+    def numel(self) -> int:
+        return int(np.prod(self.shape))
+
+
+def _sensor_layout(key: ObservationKey, value: Any) -> _SensorLayout:
+    if isinstance(value, torch.Tensor):
+        return _SensorLayout(
+            key,
+            _make_getter(key),
+            tuple(value.size()),
+            value.dtype,
+            device=value.device if value.device.type != "cpu" else None,
+        )
+
+    value = np.asarray(value)
+    return _SensorLayout(
+        key,
+        _make_getter(key),
+        value.shape,
+        torch.from_numpy(np.empty((), dtype=value.dtype)).dtype,
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class _StagingSlot:
+    capacity: int
+    # One staging tensor per sensor (None for sensors not staged) and a numpy
+    # view on it, which is much faster to index into.
+    tensors: List[Optional[torch.Tensor]]
+    arrays: List[Optional[np.ndarray]]
+    # Recorded after the copies out of the slot were issued.
+    copies_done: Optional[torch.cuda.Event] = None
+
+
+class ObservationBatcher:
+    r"""Transposes lists of observation dicts into a :ref:`TensorDict` of
+    batched observations on :p:`device`.
+
+    :param device: The device of the batched observations. If :py:`None`,
+        the observations stay on the CPU.
+    :param observation_space: If set, the layout is compiled from this space.
+        Otherwise, it is compiled from the first batch of observations. The
+        layout is recompiled if the keys or shapes of the observations change.
+    :param num_slots: Number of staging slots used when :p:`device` is not
+        the CPU. On the CPU, every call returns new tensors.
+    """
+
+    def __init__(
+        self,
+        device: Optional[torch.device] = None,
+        observation_space: Optional[spaces.Dict] = None,
+        num_slots: int = 2,
+    ) -> None:
+        assert num_slots > 0
+        self.device = torch.device(device) if device is not None else None
+        self.num_slots = num_slots
+
+        self._layout: Optional[List[_SensorLayout]] = None
+        self._layout_key: Optional[LayoutKey] = None
+        self._keys: List[ObservationKey] = []
+        self._key_set: Set[ObservationKey] = set()
+        self._upload_order: List[int] = []
+        self._slots: List[Optional[_StagingSlot]] = [None] * num_slots
+        self._next_slot = 0
+
+        if observation_space is not None:
+            self._compile(
+                [
+                    _SensorLayout(
+                        key,
+                        _make_getter(key),
+                        tuple(space.shape),
+                        torch.from_numpy(
+                            np.empty((), dtype=space.dtype)
+                        ).dtype,
+                    )
+                    for key, space in _flatten_space(observation_space)
+                ]
+            )
+
+    @property
+    def _pin_memory(self) -> bool:
+        return self.device is not None and self.device.type == "cuda"
+
+    @property
+    def _reuses_slots(self) -> bool:
+        # On the CPU, the staged tensors are the batched observations, so
+        # they can't be overwritten by the next calls.
+        return self.device is not None and self.device.type != "cpu"
+
+    def _compile(self, layout: List[_SensorLayout]) -> None:
+        self._layout = layout
+        self._keys = [sensor.key for sensor in layout]
+        self._key_set = set(self._keys)
+        # Start moving the largest sensors first.
+        self._upload_order = sorted(
+            range(len(layout)), key=lambda i: layout[i].numel, reverse=True
+        )
+        self._slots = [None] * self.num_slots
+
+    def _compile_from_observation(self, observation: DictTree) -> None:
+        self._compile(
+            [
+                _sensor_layout(key, value)
+                for key, value in _flatten_observation(observation)
+            ]
+        )
+
+    def _matches_layout(self, observation: DictTree) -> bool:
+        if self._layout is None:
+            return False
+        shapes = {
+            key: _value_shape(value)
+            for key, value in _flatten_observation(observation)
+        }
+        return shapes.keys() == self._key_set and all(
+            shapes[sensor.key] == sensor.shape for sensor in self._layout
+        )
+
+    def _allocate_slot(self, capacity: int) -> _StagingSlot:
+        tensors: List[Optional[torch.Tensor]] = []
+        arrays: List[Optional[np.ndarray]] = []
+        for sensor in self._layout:
+            if sensor.device is not None:
+                tensors.append(None)
+                arrays.append(None)
+                continue
+            t = torch.empty((capacity, *sensor.shape), dtype=sensor.dtype)
+            if self._pin_memory:
+                t = t.pin_memory()
+            tensors.append(t)
+            arrays.append(
+                t.numpy() if sensor.dtype != torch.bfloat16 else None
+            )
+        return _StagingSlot(capacity, tensors, arrays)
+
+    def _acquire_slot(self, num_obs: int) -> _StagingSlot:
+        if not self._reuses_slots:
+            return self._allocate_slot(num_obs)
+        slot_idx = self._next_slot
+        self._next_slot = (self._next_slot + 1) % self.num_slots
+        slot = self._slots[slot_idx]
+        if slot is not None and slot.copies_done is not None:
+            # Don't overwrite data that is still being copied to the device.
+            slot.copies_done.synchronize()
+            slot.copies_done = None
+        if slot is None or slot.capacity < num_obs:
+            slot = self._allocate_slot(num_obs)
+            self._slots[slot_idx] = slot
+        return slot
+
+    def _batch_on_device(
+        self, sensor: _SensorLayout, observations: Sequence[DictTree]
+    ) -> torch.Tensor:
+        batched = torch.empty(
+            (len(observations), *sensor.shape),
+            dtype=sensor.dtype,
+            device=sensor.device,
+        )
+        for i, obs in enumerate(observations):
+            batched[i].copy_(sensor.get(obs), non_blocking=True)
+        return batched
+
+    def _stage(
+        self,
+        sensor: _SensorLayout,
+        tensor: torch.Tensor,
+        array: Optional[np.ndarray],
+        observations: Sequence[DictTree],
+    ) -> None:
+        for i, obs in enumerate(observations):
+            value = sensor.get(obs)
+            if isinstance(value, torch.Tensor):
+                if value.device.type == "cpu" and array is not None:
+                    array[i] = value.numpy()
+                else:
+                    tensor[i].copy_(value)
+            elif array is not None:
+                # Plain numbers and numpy arrays are assigned with numpy,
+                # which is much faster than indexing a tensor.
+                array[i] = (
+                    value
+                    if isinstance(value, (np.ndarray, numbers.Number))
+                    else np.asarray(value)
+                )
+            else:
+                tensor[i] = torch.as_tensor(value)
+
+    def _to_device(self, batched: torch.Tensor) -> torch.Tensor:
+        if self.device is not None:
+            batched = batched.to(self.device, non_blocking=True)
+        return batched
+
+    @inference_mode()
+    @profiling_wrapper.RangeContext("ObservationBatcher.batch")
+    def batch(self, observations: Sequence[DictTree]) -> TensorDict:
+        r"""Batches the observation dicts of :p:`observations`, which must
+        all have the same keys and shapes.
+        """
+        assert len(observations) > 0
+        # Only flatten the observation when its keys or shapes changed.
+        layout_key = _layout_key(observations[0])
+        if layout_key != self._layout_key:
+            if not self._matches_layout(observations[0]):
+                self._compile_from_observation(observations[0])
+            self._layout_key = layout_key
+
+        num_obs = len(observations)
+        slot = self._acquire_slot(num_obs)
+        batched_tensors: List[Optional[torch.Tensor]] = [None] * len(
+            self._layout
+        )
+        for idx in self._upload_order:
+            sensor = self._layout[idx]
+            if sensor.device is not None:
+                batched = self._batch_on_device(sensor, observations)
+            else:
+                tensor = slot.tensors[idx][:num_obs]
+                array = slot.arrays[idx]
+                self._stage(
+                    sensor,
+                    tensor,
+                    array[:num_obs] if array is not None else None,
+                    observations,
+                )
+                batched = tensor
+            # The copy of this sensor overlaps with the staging of the next.
+            batched_tensors[idx] = self._to_device(batched)
+
+        if self._pin_memory:
+            slot.copies_done = torch.cuda.Event()
+            slot.copies_done.record(torch.cuda.current_stream(self.device))
+
+        return TensorDict.from_flattened(self._keys, batched_tensors)
+
+    __call__ = batch
@@ -11,6 +11,10 @@ import numpy as np
 import torch
 
 from habitat_baselines.common.baseline_registry import baseline_registry
+from habitat_baselines.common.discounted_returns import (
+    check_returns_engine,
+    compute_returns_scan,
+)
 from habitat_baselines.common.storage import Storage
 from habitat_baselines.common.tensor_dict import DictTree, TensorDict
 from habitat_baselines.rl.models.rnn_state_encoder import (
@@ -33,6 +37,7 @@ class RolloutStorage(Storage):
         action_space,
         actor_critic,
         is_double_buffered: bool = False,
+        returns_engine: str = "loop",
     ):
         action_shape, discrete_actions = get_action_space_info(action_space)
 
@@ -86,6 +91,7 @@ class RolloutStorage(Storage):
         )
 
         self.is_double_buffered = is_double_buffered
+        self.returns_engine = check_returns_engine(returns_engine)
         self._nbuffers = 2 if is_double_buffered else 1
         self._num_envs = num_envs
 
@@ -173,6 +179,10 @@ class RolloutStorage(Storage):
 
     @g_timer.avg_time("rollout_storage.compute_returns", level=1)
     def compute_returns(self, next_value, use_gae, gamma, tau):
+        if self.returns_engine == "scan":
+            self._compute_returns_scan(next_value, use_gae, gamma, tau)
+            return
+
         if use_gae:
             assert isinstance(self.buffers["value_preds"], torch.Tensor)
             self.buffers["value_preds"][
@@ -204,6 +214,25 @@ class RolloutStorage(Storage):
                     + self.buffers["rewards"][step]
                 )
 
+    def _compute_returns_scan(self, next_value, use_gae, gamma, tau):
+        num_steps = self.current_rollout_step_idx
+        assert isinstance(self.buffers["value_preds"], torch.Tensor)
+        assert isinstance(self.buffers["returns"], torch.Tensor)
+        if use_gae:
+            self.buffers["value_preds"][num_steps] = next_value
+        else:
+            self.buffers["returns"][num_steps] = next_value
+
+        self.buffers["returns"][0:num_steps] = compute_returns_scan(
+            rewards=self.buffers["rewards"][0:num_steps],  # type: ignore
+            value_preds=self.buffers["value_preds"][0:num_steps],
+            masks=self.buffers["masks"][1 : num_steps + 1],  # type: ignore
+            next_value=next_value,
+            use_gae=use_gae,
+            gamma=gamma,
+            tau=tau,
+        )
+
     def data_generator(
         self,
         advantages: Optional[torch.Tensor],
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Rendering and encoding of the episode videos in background processes.
+
+The main process only records, at every step, the visual observations of the
+environments (moved to the CPU with one copy per sensor for all the
+environments, see :ref:`batch_to_video_observations`) and the part of their
+infos drawn on the frames (see :ref:`make_video_frame`). When an episode
+ends, its frames are handed to :ref:`VideoSink`, which draws the frames
+(:ref:`observations_to_image`, :ref:`overlay_frame`), encodes them and
+uploads them to tensorboard in a pool of worker processes. The memory of the
+frames recorded with :ref:`VideoSink.record_frame` and of the videos handed
+to the workers but not written yet is bounded: once it exceeds the limit,
+the sink blocks until enough videos are written.
+"""
+
+import multiprocessing
+import numbers
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import torch
+
+from habitat.utils.visualizations.utils import (
+    observations_to_image,
+    overlay_frame,
+)
+from habitat_baselines.common.tensor_dict import TensorDict
+from habitat_baselines.common.tensorboard_utils import TensorboardWriter
+from habitat_baselines.utils.common import generate_video
+
+
+class VideoFrame(NamedTuple):
+    r"""The data to draw one frame of a video.
+
+    :property observation: The visual observations of the environment.
+    :property info: The scalar and string values of the info of the
+        environment, drawn on the frame (collisions and, if :p:`overlay`, the
+        values as text).
+    :property overlay: Whether to write the values of :p:`info` on the frame.
+    :property blank: Whether to draw black images instead of the
+        observations.
+    :property top_down_map: The top down map drawn next to the observations,
+        in the format of the info of the :ref:`TopDownMap` measure.
+    """
+
+    observation: Dict[str, np.ndarray]
+    info: Dict[str, Any]
+    overlay: bool = True
+    blank: bool = False
+    top_down_map: Optional[Dict[str, Any]] = None
+
+
+def _scalar_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    scalars = {}
+    for k, v in info.items():
+        if isinstance(v, dict):
+            v = _scalar_info(v)
+            if len(v) == 0:
+                continue
+        elif isinstance(v, np.ndarray) and v.ndim == 0:
+            v = v.item()
+        elif not isinstance(v, (str, numbers.Number, np.generic)):
+            continue
+        scalars[k] = v
+    return scalars
+
+
+def _render_height(observation: Dict[str, np.ndarray]) -> int:
+    # The height of the image of the observations drawn by
+    # `observations_to_image`, or an upper bound of it when the images have
+    # different sizes and are tiled.
+    shapes = {v.shape[:2] for v in observation.values() if v.ndim > 1}
+    if len(shapes) == 1:
+        return next(iter(shapes))[0]
+    return sum(h for h, _ in shapes)
+
+
+def _downsample_top_down_map(
+    top_down_map: Dict[str, Any], height: int
+) -> Dict[str, Any]:
+    # `colorize_draw_agent_and_fit_to_height` resizes the smallest side of the
+    # map to the height of the frame, so the map is subsampled down to that
+    # size before being kept until the end of the episode.
+    stride = max(min(top_down_map["map"].shape[:2]) // max(height, 1), 1)
+    fog_of_war_mask = top_down_map["fog_of_war_mask"]
+    if fog_of_war_mask is not None:
+        fog_of_war_mask = np.ascontiguousarray(
+            fog_of_war_mask[::stride, ::stride]
+        )
+    return {
+        "map": np.ascontiguousarray(top_down_map["map"][::stride, ::stride]),
+        "fog_of_war_mask": fog_of_war_mask,
+        "agent_map_coord": [
+            tuple(c // stride for c in coord)
+            for coord in top_down_map["agent_map_coord"]
+        ],
+        "agent_angle": list(top_down_map["agent_angle"]),
+    }
+
+
+def make_video_frame(
+    observation: Dict[str, np.ndarray],
+    info: Dict[str, Any],
+    overlay: bool = True,
+    blank: bool = False,
+) -> VideoFrame:
+    r"""Keeps the parts of a step needed to draw its frame: the scalar and
+    string values of :p:`info` and its top down map, subsampled to the size
+    it is drawn at. The other values of the info, which can be large arrays,
+    are dropped.
+    """
+    top_down_map = info.get("top_down_map")
+    if top_down_map is not None:
+        top_down_map = _downsample_top_down_map(
+            top_down_map, _render_height(observation)
+        )
+    return VideoFrame(
+        observation,
+        _scalar_info(info),
+        overlay=overlay,
+        blank=blank,
+        top_down_map=top_down_map,
+    )
+
+
+def batch_to_video_observations(
+    batch: TensorDict,
+) -> List[Dict[str, np.ndarray]]:
+    r"""Splits the visual observations of a batch into the uint8 images of
+    each environment, as :ref:`observations_to_image` converts them, with a
+    single copy to the CPU per sensor.
+    """
+    images = {}
+    for k, v in batch.items():
+        if not isinstance(v, torch.Tensor) or v.dim() <= 2:
+            continue
+        if v.dtype != torch.uint8:
+            v = (v * 255.0).to(torch.uint8)
+        images[k] = v.cpu().numpy()
+    num_envs = len(next(iter(images.values()))) if len(images) > 0 else 0
+    return [{k: v[i] for k, v in images.items()} for i in range(num_envs)]
+
+
+def render_video_frames(frames: List[VideoFrame]) -> List[np.ndarray]:
+    images = []
+    for frame in frames:
+        observation = frame.observation
+        if frame.blank:
+            observation = {k: np.zeros_like(v) for k, v in observation.items()}
+        info = frame.info
+        if frame.top_down_map is not None:
+            info = {**info, "top_down_map": frame.top_down_map}
+        image = observations_to_image(observation, info)
+        if frame.overlay:
+            image = overlay_frame(image, frame.info)
+        images.append(image)
+    return images
+
+
+def _nbytes(obj: Any) -> int:
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(v) for v in obj)
+    return 0
+
+
+# The tensorboard writer of a worker process, created at its first video.
+_worker_tb_writer: Optional[TensorboardWriter] = None
+
+
+def _get_worker_tb_writer(tb_log_dir: str) -> TensorboardWriter:
+    global _worker_tb_writer
+    if _worker_tb_writer is None:
+        _worker_tb_writer = TensorboardWriter(tb_log_dir)
+    return _worker_tb_writer
+
+
+def _write_video(
+    frames: List[VideoFrame],
+    video_option: List[str],
+    tb_log_dir: Optional[str],
+    **kwargs: Any,
+) -> Optional[List[np.ndarray]]:
+    r"""Draws and writes a video.
+
+    :return: The images of the video if it still has to be uploaded to the
+        writer of the main process, None otherwise.
+    """
+    images = render_video_frames(frames)
+    upload_in_main = "tensorboard" in video_option and tb_log_dir is None
+    if upload_in_main:
+        video_option = [o for o in video_option if o != "tensorboard"]
+    tb_writer = None
+    if "tensorboard" in video_option:
+        tb_writer = _get_worker_tb_writer(tb_log_dir)
+    generate_video(
+        video_option=video_option,
+        images=images,
+        tb_writer=tb_writer,
+        **kwargs,
+    )
+    if tb_writer is not None:
+        tb_writer.flush()
+    return images if upload_in_main else None
+
+
+class VideoSink:
+    r"""Writes the videos of the episodes (see :ref:`generate_video`) in
+    :p:`num_workers` background processes. With :py:`num_workers=0`, the
+    videos are written synchronously by :ref:`submit`.
+
+    The videos uploaded to a :ref:`TensorboardWriter` are written to its log
+    directory by the worker processes, the ones uploaded to any other writer
+    are drawn by the workers and uploaded by the main process in
+    :ref:`poll`.
+
+    :param max_inflight_mb: The maximum memory, in MB, of the frames
+        recorded with :ref:`record_frame` and not submitted yet, and of the
+        frames of the videos submitted but not written yet. It is only
+        enforced by waiting for the videos being written, so it is exceeded
+        when the recorded frames alone take more.
+    """
+
+    def __init__(
+        self,
+        video_option: List[str],
+        video_dir: Optional[str],
+        tb_writer: Any,
+        fps: int = 10,
+        keys_to_include_in_name: Optional[List[str]] = None,
+        num_workers: int = 2,
+        max_inflight_mb: float = 1024,
+    ) -> None:
+        self._video_option = list(video_option)
+        self._video_dir = video_dir
+        self._tb_writer = tb_writer
+        self._fps = fps
+        self._keys_to_include_in_name = (
+            list(keys_to_include_in_name)
+            if keys_to_include_in_name is not None
+            else None
+        )
+        self._max_inflight_bytes = int(max_inflight_mb * 1024 * 1024)
+
+        self._tb_log_dir: Optional[str] = None
+        if (
+            isinstance(tb_writer, TensorboardWriter)
+            and tb_writer.writer is not None
+            and num_workers > 0
+        ):
+            self._tb_log_dir = tb_writer.writer.get_logdir()
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if num_workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        self._inflight: Dict[Future, Tuple[int, Any, int]] = {}
+        self._inflight_bytes = 0
+        self._recorded_bytes = 0
+
+    def record_frame(
+        self,
+        observation: Dict[str, np.ndarray],
+        info: Dict[str, Any],
+        overlay: bool = True,
+        blank: bool = False,
+    ) -> VideoFrame:
+        r"""Makes the frame of a step with :ref:`make_video_frame` and counts
+        it in the memory of the sink until it is passed to :ref:`submit` or
+        :ref:`discard`. Blocks while the recorded frames and the videos being
+        written take more than the maximum in-flight memory.
+        """
+        frame = make_video_frame(observation, info, overlay, blank)
+        nbytes = _nbytes(frame)
+        self._wait_for_memory(nbytes)
+        self._recorded_bytes += nbytes
+        return frame
+
+    def discard(self, frames: List[VideoFrame]) -> None:
+        r"""Stops counting recorded frames that will not be submitted."""
+        self._recorded_bytes = max(self._recorded_bytes - _nbytes(frames), 0)
+
+    def submit(
+        self,
+        frames: List[VideoFrame],
+        episode_id: Any,
+        checkpoint_idx: int,
+        metrics: Dict[str, float],
+    ) -> None:
+        r"""Writes the video of the frames :p:`frames`, in the background if
+        the sink has workers. Blocks while the recorded frames and the videos
+        being written take more than the maximum in-flight memory.
+        """
+        kwargs = dict(
+            frames=frames,
+            video_option=self._video_option,
+            tb_log_dir=self._tb_log_dir,
+            video_dir=self._video_dir,
+            episode_id=episode_id,
+            checkpoint_idx=checkpoint_idx,
+            metrics=metrics,
+            fps=self._fps,
+            keys_to_include_in_name=self._keys_to_include_in_name,
+        )
+        nbytes = _nbytes(frames)
+        self._recorded_bytes = max(self._recorded_bytes - nbytes, 0)
+        if self._executor is None:
+            images = _write_video(**kwargs)
+            self._upload(images, episode_id, checkpoint_idx)
+            return
+
+        self._wait_for_memory(nbytes)
+        future = self._executor.submit(_write_video, **kwargs)
+        self._inflight[future] = (nbytes, episode_id, checkpoint_idx)
+        self._inflight_bytes += nbytes
+
+    def poll(self) -> None:
+        r"""Handles the videos that have been written, without blocking."""
+        for future in [f for f in self._inflight if f.done()]:
+            self._finish(future)
+
+    def flush(self) -> None:
+        r"""Waits until all the submitted videos are written."""
+        while len(self._inflight) > 0:
+            self._wait(return_when=FIRST_COMPLETED)
+
+    def close(self) -> None:
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "VideoSink":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif self._executor is not None:
+            # Don't wait for the videos of a failed evaluation.
+            for future in self._inflight:
+                future.cancel()
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _wait_for_memory(self, nbytes: int) -> None:
+        self.poll()
+        while (
+            len(self._inflight) > 0
+            and self._recorded_bytes + self._inflight_bytes + nbytes
+            > self._max_inflight_bytes
+        ):
+            self._wait(return_when=FIRST_COMPLETED)
+
+    def _wait(self, return_when: str) -> None:
+        done, _ = wait(list(self._inflight), return_when=return_when)
+        for future in done:
+            self._finish(future)
+
+    def _finish(self, future: Future) -> None:
+        nbytes, episode_id, checkpoint_idx = self._inflight.pop(future)
+        self._inflight_bytes -= nbytes
+        # Raises the exception of the worker if the video failed.
+        self._upload(future.result(), episode_id, checkpoint_idx)
+
+    def _upload(
+        self,
+        images: Optional[List[np.ndarray]],
+        episode_id: Any,
+        checkpoint_idx: int,
+    ) -> None:
+        if images is None:
+            return
+        self._tb_writer.add_video_from_np_images(
+            f"episode{episode_id}", checkpoint_idx, images, fps=self._fps
+        )
@@ -44,10 +44,39 @@ class EvalConfig(HabitatBaselinesBaseConfig):
     # The number of time to run each episode through evaluation.
     # Only works when evaluating on all episodes.
     evals_per_ep: int = 1
+    # Dispatch the evaluation episodes from a central queue to whichever
+    # environment finishes its episode first instead of giving each
+    # environment a fixed subset of the scenes. Every environment then loads
+    # all the scenes.
+    work_stealing: bool = False
+    # Keep the environments alive between the checkpoints of a continuous
+    # evaluation instead of building them again for each checkpoint. They are
+    # only rebuilt if the part of the config they depend on changes.
+    reuse_envs: bool = False
+    # When evaluating a checkpoint folder, evaluate every ckpt_stride-th
+    # checkpoint only.
+    ckpt_stride: int = 1
+    # When evaluating a checkpoint folder, evaluate the checkpoints with these
+    # indices, in this order, instead of all of them. Each one is evaluated
+    # once the trainer has written it.
+    ckpt_indices: List[int] = field(default_factory=list)
+    # Maximum time, in seconds, between two checks of the checkpoint folder
+    # while waiting for the next checkpoint. The wait ends as soon as the
+    # checkpoint is written if the filesystem reports it with inotify.
+    ckpt_poll_interval: float = 2.0
     video_option: List[str] = field(
         # available options are "disk" and "tensorboard"
         default_factory=list
     )
+    # Number of background processes drawing and encoding the videos. With 0,
+    # the videos are written by the evaluation loop at the end of each
+    # episode.
+    video_num_workers: int = 2
+    # Maximum memory, in MB, of the frames recorded for the episodes in
+    # progress and of the videos waiting to be written by the background
+    # processes. The evaluation blocks beyond it until videos are written, so
+    # the frames of the episodes in progress alone can exceed it.
+    video_max_inflight_mb: float = 1024.0
     extra_sim_sensors: Dict[str, SimulatorSensorConfig] = field(
         default_factory=dict
     )
@@ -269,6 +298,10 @@ class HierarchicalPolicyConfig(HabitatBaselinesBaseConfig):
         default_factory=dict
     )
     use_skills: Dict[str, str] = field(default_factory=dict)
+    # Run the skills of the different environments on separate CUDA streams,
+    # so that their small networks run concurrently on the GPU. The skills
+    # always run one after the other on CPU.
+    use_skill_streams: bool = False
 
 
 @dataclass
@@ -311,6 +344,17 @@ class PPOConfig(HabitatBaselinesBaseConfig):
     # policy inference time during rollout generation
     # Not that this does not change the memory requirements
     use_double_buffered_sampler: bool = False
+    # Consume the environment step results in the order the environments
+    # finish instead of in a fixed order. With the double buffered sampler,
+    # the buffer whose environments are done first is processed first, which
+    # overlaps its policy inference with the simulation of the other buffer.
+    use_pipelined_sampler: bool = False
+    # How the rollout storage computes the returns and GAE. "loop" iterates
+    # over the steps of the rollout one at a time, "scan" computes them with
+    # a vectorized chunked reverse scan, which is faster for long rollouts
+    # and many environments. Both give the same results up to floating point
+    # rounding.
+    returns_engine: str = "loop"
 
 
 @dataclass
@@ -470,6 +514,10 @@ class HabitatBaselinesConfig(HabitatBaselinesBaseConfig):
     verbose: bool = True
     # Creates the vectorized environment.
     vector_env_factory: VectorEnvFactoryConfig = VectorEnvFactoryConfig()
+    # If True, the environment workers write their image-like observations
+    # into preallocated shared memory and only a small header is sent through
+    # the pipe instead of the pickled observations.
+    use_shared_memory_observations: bool = False
     evaluator: EvaluatorConfig = EvaluatorConfig()
     eval_keys_to_include_in_name: List[str] = field(default_factory=list)
     # For our use case, the CPU side things are mainly memory copies
@@ -495,6 +543,10 @@ class HabitatBaselinesConfig(HabitatBaselinesBaseConfig):
     # Function signature: fn(save_file_path: str) -> None
     # If not specified, there is no callback.
     on_save_ckpt_callback: Optional[HydraCallbackConfig] = None
+    # Write the checkpoints and the resume states in a background thread
+    # after copying them to CPU memory, instead of on the training loop. The
+    # callback is then called by that thread once the checkpoint is written.
+    async_checkpoint_writes: bool = True
 
 
 @dataclass
@@ -30,6 +30,11 @@ from omegaconf import DictConfig
 from torch import distributed as distrib
 
 from habitat import logger
+from habitat_baselines.common.checkpoint_writer import (
+    flush_checkpoint_writes,
+    get_checkpoint_writer,
+    write_checkpoint,
+)
 
 T = TypeVar("T")
 
@@ -184,6 +189,7 @@ def save_resume_state(
     state: Any,
     filename_or_config: Union[DictConfig, str],
     filename_key: str = "",
+    async_write: bool = False,
 ):
     r"""Saves the resume job state to the specified filename.
         This is useful when working with preemptable job partitions.
@@ -191,13 +197,27 @@ def save_resume_state(
     :param state: The state to save
     :param filename_or_config: The filename of the saved state or the config to construct it.
     :param filename_key: If generating the filename from the config, append this to the name.
+    :param async_write: If true, the state is written in the background (see
+        :ref:`AsyncCheckpointWriter`), call :ref:`flush_checkpoints` to wait
+        for it. The file is replaced atomically in both cases.
     """
     if isinstance(filename_or_config, DictConfig):
         filename = resume_state_filename(filename_or_config, filename_key)
     else:
         filename = filename_or_config
 
-    torch.save(state, filename)
+    if async_write:
+        get_checkpoint_writer().save(state, filename)
+    else:
+        write_checkpoint(state, filename)
+
+
+def flush_checkpoints() -> None:
+    r"""Flush barrier of the checkpoints and resume states written in the
+    background: waits until they are all written to disk. Called before
+    exiting or requeueing on preemption.
+    """
+    flush_checkpoint_writes()
 
 
 def load_resume_state(
@@ -226,6 +246,10 @@ def load_resume_state(
 
 def requeue_job():
     r"""Requeues the job by calling ``scontrol requeue ${SLURM_JOBID}``"""
+    # The resume state saved before exiting must be complete before the job
+    # is requeued.
+    flush_checkpoints()
+
     if not is_slurm_batch_job():
         return
 
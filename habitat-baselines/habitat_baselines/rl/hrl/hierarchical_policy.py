@@ -3,7 +3,6 @@
 # LICENSE file in the root directory of this source tree.
 
 import os.path as osp
-from collections import defaultdict
 from typing import Any, Dict, List, Optional, Tuple
 
 import gym.spaces as spaces
@@ -20,6 +19,12 @@ from habitat.tasks.rearrange.multi_task.pddl_sensors import PddlSuccess
 from habitat_baselines.common.baseline_registry import baseline_registry
 from habitat_baselines.rl.hrl.hl import *  # noqa: F403,F401.
 from habitat_baselines.rl.hrl.hl import HighLevelPolicy
+from habitat_baselines.rl.hrl.skill_executor import (
+    BatchIndex,
+    SkillStreams,
+    gather_batch,
+    group_batch_by_skill,
+)
 from habitat_baselines.rl.hrl.skills import *  # noqa: F403,F401.
 from habitat_baselines.rl.hrl.skills import NoopSkillPolicy, SkillPolicy
 from habitat_baselines.rl.hrl.utils import find_action_range
@@ -115,6 +120,15 @@ class HierarchicalPolicy(nn.Module, Policy):
                     first_idx = skill_i
                 else:
                     self._skill_redirects[skill_i] = first_idx
+        # Maps (skill idx -> idx of the skill running it) as an array, to
+        # apply `self._skill_redirects` to a whole batch at once.
+        self._skill_redirect_ids = np.arange(max(self._skills) + 1)
+        for skill_i, redirect_i in self._skill_redirects.items():
+            self._skill_redirect_ids[skill_i] = redirect_i
+
+        self._skill_streams: Optional[SkillStreams] = None
+        if config.hierarchical_policy.use_skill_streams:
+            self._skill_streams = SkillStreams()
 
         self._recurrent_hidden_size = (
             full_config.habitat_baselines.rl.ppo.hidden_size
@@ -253,28 +267,45 @@ class HierarchicalPolicy(nn.Module, Policy):
         If an entry in `sel_dat` is `None`, then it is including in all groups.
         """
 
-        skill_to_batch: Dict[int, List[int]] = defaultdict(list)
-        if should_adds is None:
-            should_adds = [True for _ in range(len(skill_ids))]
-        for i, (cur_skill, should_add) in enumerate(
-            zip(skill_ids, should_adds)
-        ):
-            if not should_add:
-                continue
+        batch_idxs, groups = group_batch_by_skill(
+            skill_ids, should_adds, self._skill_redirect_ids
+        )
+        if len(groups) == 0:
+            return {}
+
+        # Gather the data of all the skills at once, sorted by skill. The data
+        # of each skill is then a slice of it.
+        index = BatchIndex(batch_idxs)
+        sorted_dat = {}
+        for dat_k, dat in sel_dat.items():
+            if dat_k == "observations":
+                # Reduce the slicing required by only extracting what the
+                # skills will actually need.
+                dat = dat.slice_keys(
+                    {
+                        obs_k
+                        for skill_id, _ in groups
+                        for obs_k in self._skills[skill_id].required_obs_keys
+                    }
+                )
+            sorted_dat[dat_k] = gather_batch(dat, index)
 
-            if cur_skill in self._skill_redirects:
-                cur_skill = self._skill_redirects[cur_skill]
-            skill_to_batch[cur_skill].append(i)
         grouped_skills = {}
-        for k, v in skill_to_batch.items():
+        for skill_id, batch_slice in groups:
             skill_dat = {}
-            for dat_k, dat in sel_dat.items():
+            for dat_k, dat in sorted_dat.items():
+                if dat is None:
+                    skill_dat[dat_k] = None
+                    continue
                 if dat_k == "observations":
-                    # Reduce the slicing required by only extracting what the
-                    # skills will actually need.
-                    dat = dat.slice_keys(*self._skills[k].required_obs_keys)
-                skill_dat[dat_k] = dat[v]
-            grouped_skills[k] = (v, skill_dat)
+                    dat = dat.slice_keys(
+                        *self._skills[skill_id].required_obs_keys
+                    )
+                skill_dat[dat_k] = dat[batch_slice]
+            grouped_skills[skill_id] = (
+                batch_idxs[batch_slice].tolist(),
+                skill_dat,
+            )
         return grouped_skills
 
     def act(
@@ -333,19 +364,7 @@ class HierarchicalPolicy(nn.Module, Policy):
                 "masks": masks,
             },
         )
-        for skill_id, (batch_ids, batch_dat) in grouped_skills.items():
-            action_data = self._skills[skill_id].act(
-                observations=batch_dat["observations"],
-                rnn_hidden_states=batch_dat["rnn_hidden_states"],
-                prev_actions=batch_dat["prev_actions"],
-                masks=batch_dat["masks"],
-                cur_batch_idx=batch_ids,
-            )
-            actions[batch_ids] += action_data.actions
-
-            if self._has_ll_hidden_state:
-                # Update the LL hidden state.
-                ll_rnn_hidden_states[batch_ids] = action_data.rnn_hidden_states
+        self._act_skills(grouped_skills, actions, ll_rnn_hidden_states)
 
         # Skills should not be responsible for terminating the overall episode.
         actions[:, self._stop_action_idx] = 0.0
@@ -391,6 +410,74 @@ class HierarchicalPolicy(nn.Module, Policy):
             rnn_hidden_states=rnn_hidden_states,
         )
 
+    def _act_skills(
+        self,
+        grouped_skills: Dict[int, Tuple[List[int], Dict[str, Any]]],
+        actions: torch.Tensor,
+        ll_rnn_hidden_states: torch.Tensor,
+    ) -> None:
+        """
+        Computes the actions of the running skills, and writes them to
+        `actions` and their next hidden states to `ll_rnn_hidden_states` in
+        place.
+        """
+
+        if len(grouped_skills) == 0:
+            return
+
+        def skill_act(skill_id, batch_ids, batch_dat):
+            return lambda: self._skills[skill_id].act(
+                observations=batch_dat["observations"],
+                rnn_hidden_states=batch_dat["rnn_hidden_states"],
+                prev_actions=batch_dat["prev_actions"],
+                masks=batch_dat["masks"],
+                cur_batch_idx=batch_ids,
+            )
+
+        act_fns = [
+            skill_act(skill_id, batch_ids, batch_dat)
+            for skill_id, (batch_ids, batch_dat) in grouped_skills.items()
+        ]
+        if self._skill_streams is not None:
+            all_action_data = self._skill_streams.run(
+                act_fns,
+                actions.device,
+                lambda action_data: (
+                    action_data.actions,
+                    action_data.rnn_hidden_states,
+                ),
+            )
+        else:
+            all_action_data = [act_fn() for act_fn in act_fns]
+
+        # Write the outputs of all the skills at once.
+        batch_ids = BatchIndex(
+            np.concatenate(
+                [batch_ids for batch_ids, _ in grouped_skills.values()]
+            )
+        )
+        actions.index_add_(
+            0,
+            batch_ids.on(actions.device),
+            torch.cat(
+                [action_data.actions for action_data in all_action_data]
+            ).to(actions.dtype),
+        )
+        if self._has_ll_hidden_state:
+            # Update the LL hidden state.
+            ll_rnn_hidden_states[
+                batch_ids.on(ll_rnn_hidden_states.device)
+            ] = torch.cat(
+                [
+                    action_data.rnn_hidden_states.expand(
+                        len(skill_batch_ids), *ll_rnn_hidden_states.shape[1:]
+                    )
+                    for action_data, (skill_batch_ids, _) in zip(
+                        all_action_data, grouped_skills.values()
+                    )
+                ]
+            )
+
     @property
     def _has_hl_hidden_state(self) -> bool:
         return self._high_level_policy.num_recurrent_layers != 0
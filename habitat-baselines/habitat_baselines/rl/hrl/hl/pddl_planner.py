@@ -0,0 +1,284 @@
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import random
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import torch
+
+from habitat.tasks.rearrange.multi_task.pddl_action import PddlAction
+from habitat.tasks.rearrange.multi_task.pddl_logical_expr import (
+    LogicalExpr,
+    LogicalExprType,
+)
+from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
+
+# Evaluates a logical expression on a predicate state.
+_StateTest = Callable[[int], bool]
+
+
+@dataclass
+class PlanGraph:
+    """
+    The shortest plans from a start state to the states satisfying a goal.
+
+    :property goal_states: The states satisfying the goal at the smallest
+        number of actions from `start_state`.
+    :property parents: Maps each state on a shortest plan (except the start
+        state) to the `(previous state, action index)` pairs leading to it
+        from the previous depth.
+    """
+
+    start_state: int
+    goal_states: List[int]
+    parents: Dict[int, List[Tuple[int, int]]]
+
+    def sample_plan(self) -> List[int]:
+        """
+        Samples one of the shortest plans, as a list of action indices.
+        """
+
+        state = random.choice(self.goal_states)
+        plan = []
+        while state != self.start_state:
+            state, action_idx = random.choice(self.parents[state])
+            plan.append(action_idx)
+        return plan[::-1]
+
+
+class BitsetPlanner:
+    """
+    Breadth-first search of the shortest sequences of PDDL actions that take
+    a predicate state to a goal, for `PlannerHighLevelPolicy`.
+
+    A predicate state is an integer with one bit per possible predicate (by
+    `compact_str`), so that states are hashed and copied as integers. The
+    preconditions and the goals are compiled to tests on these integers (a
+    single mask test for conjunctions of predicates), and the effects of each
+    action to a pair of masks of the predicates it removes and adds. The
+    search results are kept in a least recently used cache keyed by the start
+    state and the goal, so that replanning from a state seen before, in any
+    environment or episode, is a lookup.
+
+    :param predicates: The predicates of the predicate vectors, in order.
+    :param actions: The actions to plan with.
+    :param max_search_depth: The plans have at most `max_search_depth + 1`
+        actions.
+    :param cache_size: The number of search results kept. 0 disables the
+        cache.
+    """
+
+    def __init__(
+        self,
+        predicates: List[Predicate],
+        actions: List[PddlAction],
+        max_search_depth: int,
+        cache_size: int = 1024,
+    ):
+        self._actions = actions
+        self._max_search_depth = max_search_depth
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[int, str], Optional[PlanGraph]]" = (
+            OrderedDict()
+        )
+
+        # The predicates of the bits. The effects of the actions can add
+        # predicates that are not in `predicates`.
+        self._bit_preds: List[Predicate] = []
+        self._pred_bits: Dict[str, int] = {}
+        self._input_bits = [self._get_bit(pred) for pred in predicates]
+        for action in actions:
+            for pred in action.post_cond:
+                self._get_bit(pred)
+
+        self._preconds = [
+            self._compile_expr(action.precond) for action in actions
+        ]
+        self._effects = [self._compile_effects(action) for action in actions]
+        self._goal_tests: Dict[str, _StateTest] = {}
+
+    def _get_bit(self, pred: Predicate) -> int:
+        key = pred.compact_str
+        if key not in self._pred_bits:
+            self._pred_bits[key] = len(self._bit_preds)
+            self._bit_preds.append(pred)
+        return self._pred_bits[key]
+
+    def _preds_mask(self, should_include: Callable[[Predicate], bool]) -> int:
+        mask = 0
+        for bit, pred in enumerate(self._bit_preds):
+            if should_include(pred):
+                mask |= 1 << bit
+        return mask
+
+    def _compile_expr(self, expr: Union[LogicalExpr, Predicate]) -> _StateTest:
+        """
+        Compiles the `is_true_from_predicates` test of `expr`.
+        """
+
+        if isinstance(expr, Predicate):
+            if expr.compact_str not in self._pred_bits:
+                # Never part of a state.
+                return lambda state: False
+            pred_mask = 1 << self._pred_bits[expr.compact_str]
+            return lambda state: (state & pred_mask) != 0
+
+        expr_type = expr.expr_type
+        is_and = expr_type in (LogicalExprType.AND, LogicalExprType.NAND)
+        is_negated = expr_type in (LogicalExprType.NAND, LogicalExprType.NOR)
+        if all(
+            isinstance(sub_expr, Predicate)
+            and sub_expr.compact_str in self._pred_bits
+            for sub_expr in expr.sub_exprs
+        ):
+            # A conjunction or disjunction of predicates is a mask test.
+            mask = 0
+            for sub_expr in expr.sub_exprs:
+                mask |= 1 << self._pred_bits[sub_expr.compact_str]
+            if is_and:
+                return lambda state: ((state & mask) == mask) != is_negated
+            return lambda state: ((state & mask) != 0) != is_negated
+
+        sub_tests = [self._compile_expr(e) for e in expr.sub_exprs]
+        if is_and:
+            return lambda state: all(t(state) for t in sub_tests) != is_negated
+        return lambda state: any(t(state) for t in sub_tests) != is_negated
+
+    def _compile_effects(self, action: PddlAction) -> Tuple[int, int]:
+        """
+        Returns the masks of the predicates removed and added by `action`.
+        """
+
+        remove_mask = 0
+        if "nav" in action.name:
+            # Remove the at precondition, since we are walking somewhere else
+            robot_to_nav = action.param_values[-1]
+            remove_mask = self._preds_mask(
+                lambda pred: pred.name == "robot_at"
+                and pred._arg_values[-1] == robot_to_nav
+            )
+
+        add_mask = 0
+        for p in action.post_cond:
+            # Unfortunately holding and not_holding are negations. The PDDL
+            # system does not currently support negations, so we have to
+            # manually handle this case.
+            p_remove_mask = 0
+            if p.name == "holding":
+                p_remove_mask = self._preds_mask(
+                    lambda other_p: other_p.name == "not_holding"
+                    and other_p._arg_values[0] == p._arg_values[1]
+                )
+            elif p.name == "not_holding":
+                p_remove_mask = self._preds_mask(
+                    lambda other_p: other_p.name == "holding"
+                    and p._arg_values[0] == other_p._arg_values[1]
+                )
+            # The post conditions apply in order, a later one can remove a
+            # predicate added by an earlier one.
+            p_add_mask = 1 << self._pred_bits[p.compact_str]
+            remove_mask |= p_remove_mask
+            add_mask = (add_mask & ~p_remove_mask) | p_add_mask
+        return remove_mask, add_mask
+
+    def encode_state(self, pred_vals: torch.Tensor) -> int:
+        """
+        :param pred_vals: Shape (num_preds,), 1.0 for the true predicates.
+        """
+
+        state = 0
+        true_idxs = torch.nonzero(torch.as_tensor(pred_vals) == 1.0)
+        for pred_idx in true_idxs.view(-1).tolist():
+            state |= 1 << self._input_bits[pred_idx]
+        return state
+
+    def _get_goal_test(self, goal: LogicalExpr) -> _StateTest:
+        key = goal.compact_str
+        if key not in self._goal_tests:
+            self._goal_tests[key] = self._compile_expr(goal)
+        return self._goal_tests[key]
+
+    def _search(
+        self, start_state: int, goal: LogicalExpr
+    ) -> Optional[PlanGraph]:
+        is_goal = self._get_goal_test(goal)
+        depths = {start_state: 0}
+        parents: Dict[int, List[Tuple[int, int]]] = {}
+        goal_states: List[int] = []
+        # The start state itself is not tested against the goal, the plans
+        # have at least one action.
+        frontier = [start_state]
+        depth = 0
+        while len(frontier) > 0 and depth <= self._max_search_depth:
+            next_frontier = []
+            for state in frontier:
+                for action_idx, precond in enumerate(self._preconds):
+                    if not precond(state):
+                        continue
+                    remove_mask, add_mask = self._effects[action_idx]
+                    next_state = (state & ~remove_mask) | add_mask
+                    next_depth = depths.get(next_state)
+                    if next_depth is None:
+                        depths[next_state] = depth + 1
+                        parents[next_state] = [(state, action_idx)]
+                        if is_goal(next_state):
+                            goal_states.append(next_state)
+                        else:
+                            next_frontier.append(next_state)
+                    elif next_depth == depth + 1:
+                        parents[next_state].append((state, action_idx))
+            if len(goal_states) > 0:
+                break
+            frontier = next_frontier
+            depth += 1
+
+        if len(goal_states) == 0:
+            return None
+        # Only keep the states on the shortest plans.
+        kept_parents = {}
+        to_visit = list(goal_states)
+        while len(to_visit) > 0:
+            state = to_visit.pop()
+            if state == start_state or state in kept_parents:
+                continue
+            kept_parents[state] = parents[state]
+            to_visit.extend(prev_state for prev_state, _ in parents[state])
+        return PlanGraph(start_state, goal_states, kept_parents)
+
+    def get_plan_graph(
+        self, start_state: int, goal: LogicalExpr
+    ) -> Optional[PlanGraph]:
+        """
+        The shortest plans from `start_state` to `goal`, None if there is no
+        plan within the search depth.
+        """
+
+        key = (start_state, goal.compact_str)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        plan_graph = self._search(start_state, goal)
+        if self._cache_size > 0:
+            self._cache[key] = plan_graph
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return plan_graph
+
+    def get_plan(
+        self, pred_vals: torch.Tensor, goal: LogicalExpr
+    ) -> List[PddlAction]:
+        """
+        Samples one of the shortest plans from the state of `pred_vals` to
+        `goal`.
+        """
+
+        plan_graph = self.get_plan_graph(self.encode_state(pred_vals), goal)
+        if plan_graph is None:
+            raise ValueError(
+                f"No plan of at most {self._max_search_depth + 1} actions to "
+                f"{goal.compact_str}"
+            )
+        return [self._actions[i] for i in plan_graph.sample_plan()]
@@ -2,9 +2,6 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import random
-from collections import deque
-from dataclasses import dataclass
 from typing import List
 
 import gym.spaces as spaces
@@ -12,24 +9,11 @@ import torch
 
 from habitat.tasks.rearrange.multi_task.pddl_action import PddlAction
 from habitat.tasks.rearrange.multi_task.pddl_logical_expr import LogicalExpr
-from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
 from habitat_baselines.rl.hrl.hl.high_level_policy import HighLevelPolicy
+from habitat_baselines.rl.hrl.hl.pddl_planner import BitsetPlanner
 from habitat_baselines.rl.ppo.policy import PolicyActionData
 
 
-@dataclass
-class PlanNode:
-    """
-    Represents the info in the search problem to plan a path of high-level
-    actions to the goal.
-    """
-
-    cur_pred_state: List[Predicate]
-    parent: "PlanNode"
-    depth: int
-    action: PddlAction
-
-
 class PlannerHighLevelPolicy(HighLevelPolicy):
     """
     High-level policy that will plan a sequence of objects to rearrange
@@ -47,6 +31,14 @@ class PlannerHighLevelPolicy(HighLevelPolicy):
         self._n_actions = len(self._all_actions)
         self._max_search_depth = self._config.max_search_depth
         self._reactive_planner = self._config.is_reactive
+        self._planner = BitsetPlanner(
+            self._predicates_list,
+            self._all_actions,
+            self._max_search_depth,
+            # Number of (start state, goal) plans kept across the envs and
+            # the episodes.
+            cache_size=self._config.get("plan_cache_size", 1024),
+        )
 
         self._next_sol_idxs = torch.zeros(self._num_envs, dtype=torch.int32)
         self._plans: List[List[PddlAction]] = [
@@ -114,127 +106,16 @@ class PlannerHighLevelPolicy(HighLevelPolicy):
             rnn_hidden_states.device
         )
 
-    def _get_solution_nodes(
-        self, pred_vals, pddl_goal: LogicalExpr
-    ) -> List[PlanNode]:
-        """
-        Based on the truth values in `pred_vals`, plan a sequence of
-        PddlActions (returned in a list of `PlanNodes`) that describe how to
-        get from the current state to the specified `pddl_goal`.
-        """
-        assert pddl_goal is not None, "Pddl goal must be set for planning."
-
-        # The true predicates at the current state
-        start_true_preds = [
-            pred
-            for is_valid, pred in zip(pred_vals, self._predicates_list)
-            if (is_valid == 1.0)
-        ]
-
-        def _is_pred_at(pred, robot_type):
-            return (
-                pred.name == "robot_at" and pred._arg_values[-1] == robot_type
-            )
-
-        def _get_pred_hash(preds):
-            return ",".join(sorted([p.compact_str for p in preds]))
-
-        stack = deque([PlanNode(start_true_preds, None, 0, None)])
-        visited = {_get_pred_hash(start_true_preds)}
-        sol_nodes = []
-        shuffled_actions = list(self._all_actions)
-        random.shuffle(shuffled_actions)
-        while len(stack) != 0:
-            cur_node = stack.popleft()
-
-            if cur_node.depth > self._max_search_depth:
-                break
-
-            for action in shuffled_actions:
-                if not action.is_precond_satisfied_from_predicates(
-                    cur_node.cur_pred_state
-                ):
-                    continue
-
-                # Use set so we filter out duplicate predicates.
-                pred_set = list(cur_node.cur_pred_state)
-                if "nav" in action.name:
-                    # Remove the at precondition, since we are walking somewhere else
-                    robot_to_nav = action._param_values[-1]
-                    pred_set = [
-                        pred
-                        for pred in pred_set
-                        if not _is_pred_at(pred, robot_to_nav)
-                    ]
-
-                for p in action.post_cond:
-                    # Unfortunately holding and not_holding are negations. The
-                    # PDDL system does not currently support negations, so we
-                    # have to manually handle this case.
-                    if p.name == "holding":
-                        pred_set = [
-                            other_p
-                            for other_p in pred_set
-                            if not (
-                                other_p.name == "not_holding"
-                                and other_p._arg_values[0] == p._arg_values[1]
-                            )
-                        ]
-                    if p.name == "not_holding":
-                        pred_set = [
-                            other_p
-                            for other_p in pred_set
-                            if not (
-                                other_p.name == "holding"
-                                and p._arg_values[0] == other_p._arg_values[1]
-                            )
-                        ]
-                    if p not in pred_set:
-                        pred_set.append(p)
-
-                pred_hash = _get_pred_hash(pred_set)
-
-                if pred_hash not in visited:
-                    visited.add(pred_hash)
-                    add_node = PlanNode(
-                        pred_set, cur_node, cur_node.depth + 1, action
-                    )
-                    if pddl_goal.is_true_from_predicates(pred_set):
-                        # Found a goal, we can stop searching.
-                        sol_nodes.append(add_node)
-                    else:
-                        stack.append(add_node)
-        return sol_nodes
-
-    def _extract_paths(self, sol_nodes):
-        paths = []
-        for sol_node in sol_nodes:
-            cur_node = sol_node
-            path = []
-            while cur_node.parent is not None:
-                path.append(cur_node)
-                cur_node = cur_node.parent
-            paths.append(path[::-1])
-        return paths
-
     def _get_plan(self, pred_vals, pddl_goal: LogicalExpr) -> List[PddlAction]:
         """
+        Plans one of the shortest sequences of PddlActions that get from the
+        current state to the specified `pddl_goal`.
+
         :param pred_vals: Shape (num_prds,). NOT batched.
         """
+        assert pddl_goal is not None, "Pddl goal must be set for planning."
         assert len(pred_vals) == len(self._predicates_list)
-        sol_nodes = self._get_solution_nodes(pred_vals, pddl_goal)
-
-        # Extract the sequence of actions that lead to the goal.
-        paths = self._extract_paths(sol_nodes)
-
-        all_ac_seqs = []
-        for path in paths:
-            all_ac_seqs.append([node.action for node in path])
-        # Sort by the length of the action sequence
-        full_plans = sorted(all_ac_seqs, key=len)
-        # Each full plan will be a permutation of the other full plans.
-        plans = full_plans[0]
-        return plans
+        return self._planner.get_plan(pred_vals, pddl_goal)
 
     def _replan(self, pred_vals, gen_plan_idx: int):
         if self._select_random_goal:
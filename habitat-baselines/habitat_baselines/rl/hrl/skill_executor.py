@@ -0,0 +1,144 @@
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Batching of the environments of `HierarchicalPolicy` per running skill.
+
+The environments are sorted by skill once per step
+(`group_batch_by_skill`), and the inputs of all the skills are gathered in
+that order with a single index per tensor (`gather_batch`). The inputs of
+each skill are then a contiguous slice of the gathered tensors, and the
+outputs of all the skills, concatenated in the same order, are written back
+with a single index per tensor. `SkillStreams` runs the skills of a step on
+separate CUDA streams, so that their small networks run concurrently on the
+GPU.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+
+def group_batch_by_skill(
+    skill_ids: np.ndarray,
+    should_adds: Optional[np.ndarray] = None,
+    skill_redirects: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, List[Tuple[int, slice]]]:
+    """
+    Sorts the batch by skill.
+
+    :param skill_ids: The skill of each environment of the batch.
+    :param should_adds: If given, only the environments where it is True are
+        grouped.
+    :param skill_redirects: If given, maps each skill ID to the ID of the
+        skill that runs it.
+    :returns: A tuple containing the following in order
+    - The indices of the grouped environments, sorted by skill (and by
+      environment index within a skill).
+    - For each skill in the batch, in increasing skill order, the skill ID
+      and the slice of its environments in the sorted indices.
+    """
+
+    skill_ids = np.asarray(skill_ids)
+    batch_idxs = np.arange(len(skill_ids))
+    if should_adds is not None:
+        batch_idxs = batch_idxs[np.asarray(should_adds, dtype=bool)]
+    batch_skill_ids = skill_ids[batch_idxs]
+    if skill_redirects is not None:
+        batch_skill_ids = skill_redirects[batch_skill_ids]
+    order = np.argsort(batch_skill_ids, kind="stable")
+    batch_idxs = batch_idxs[order]
+    group_ids, group_starts, group_counts = np.unique(
+        batch_skill_ids[order], return_index=True, return_counts=True
+    )
+    groups = [
+        (skill_id, slice(start, start + count))
+        for skill_id, start, count in zip(
+            group_ids.tolist(), group_starts.tolist(), group_counts.tolist()
+        )
+    ]
+    return batch_idxs, groups
+
+
+class BatchIndex:
+    """
+    The indices of a subset of the batch, copied at most once to each device
+    they are used on.
+    """
+
+    def __init__(self, index: np.ndarray):
+        self._index = torch.from_numpy(
+            np.ascontiguousarray(index, dtype=np.int64)
+        )
+        self._per_device: Dict[torch.device, torch.Tensor] = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def on(self, device: torch.device) -> torch.Tensor:
+        if device.type == "cpu":
+            return self._index
+        if device not in self._per_device:
+            self._per_device[device] = self._index.to(
+                device, non_blocking=True
+            )
+        return self._per_device[device]
+
+
+def gather_batch(dat: Any, index: BatchIndex) -> Any:
+    """
+    Selects the environments of `index` in a tensor or a `TensorDict`.
+    """
+
+    if dat is None:
+        return None
+    if isinstance(dat, torch.Tensor):
+        return dat[index.on(dat.device)]
+    return dat.map(lambda t: t[index.on(t.device)])
+
+
+class SkillStreams:
+    """
+    Runs functions (the skills of a step) each on its own CUDA stream. The
+    streams wait for the work already queued on the current stream before
+    starting, and the current stream waits for all of them at the end.
+    Without CUDA, the functions run one after the other.
+    """
+
+    def __init__(self) -> None:
+        self._streams: Dict[torch.device, List[torch.cuda.Stream]] = {}
+
+    def run(
+        self,
+        fns: Sequence[Callable[[], Any]],
+        device: torch.device,
+        get_outputs: Callable[[Any], Sequence[Optional[torch.Tensor]]],
+    ) -> List[Any]:
+        """
+        :param get_outputs: Returns the tensors of the result of a function
+            that are used after it. Their memory is kept until the current
+            stream is done with them.
+        :returns: The results of the functions, in order.
+        """
+
+        if device.type != "cuda" or len(fns) < 2:
+            return [fn() for fn in fns]
+
+        streams = self._streams.setdefault(device, [])
+        while len(streams) < len(fns):
+            streams.append(torch.cuda.Stream(device=device))
+        cur_stream = torch.cuda.current_stream(device)
+        results = []
+        for stream, fn in zip(streams, fns):
+            stream.wait_stream(cur_stream)
+            with torch.cuda.stream(stream):
+                result = fn()
+            for t in get_outputs(result):
+                if t is not None and t.is_cuda:
+                    t.record_stream(cur_stream)
+            results.append(result)
+        for stream in streams[: len(fns)]:
+            cur_stream.wait_stream(stream)
+        return results
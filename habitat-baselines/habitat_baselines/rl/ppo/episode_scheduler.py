@@ -0,0 +1,104 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from habitat import VectorEnv
+
+# (scene_id, episode_id)
+EpisodeKey = Tuple[str, str]
+
+
+class WorkStealingEpisodeScheduler:
+    """
+    Dispatches evaluation episodes from a central queue to the environments as
+    they finish their episodes, so that all the environments stay busy until
+    the queue is empty. The environments must all have all the episodes (see
+    the `share_scenes` argument of `VectorEnvFactory.construct_envs`).
+
+    Each environment always has the episode it will start at its next reset
+    scheduled (see `habitat.Env.schedule_next_episode`), since the vector
+    environments reset as soon as an episode ends. That episode is preferably
+    taken from the scene the environment is running, so that it doesn't have
+    to load a new scene.
+    """
+
+    def __init__(
+        self, episode_keys: Sequence[EpisodeKey], evals_per_ep: int = 1
+    ) -> None:
+        # Scene id -> episodes left to dispatch in that scene. Each episode
+        # is dispatched `evals_per_ep` times.
+        self._queues: Dict[str, Deque[EpisodeKey]] = {}
+        for _ in range(evals_per_ep):
+            for key in episode_keys:
+                self._queues.setdefault(key[0], deque()).append(key)
+        self._num_left = evals_per_ep * len(episode_keys)
+        # The episode scheduled on each (non paused) environment.
+        self._scheduled: List[Optional[EpisodeKey]] = []
+
+    def __len__(self) -> int:
+        """
+        Number of episodes not dispatched to an environment yet.
+        """
+        return self._num_left
+
+    def _pop(self, scene_id: Optional[str]) -> Optional[EpisodeKey]:
+        if self._num_left == 0:
+            return None
+        if scene_id not in self._queues:
+            # Switch to the scene with the most episodes left, which is the
+            # least likely to run out soon.
+            scene_id = max(self._queues, key=lambda s: len(self._queues[s]))
+        queue = self._queues[scene_id]
+        key = queue.popleft()
+        if len(queue) == 0:
+            del self._queues[scene_id]
+        self._num_left -= 1
+        return key
+
+    def _schedule(
+        self, envs: VectorEnv, env_idx: int, scene_id: Optional[str]
+    ) -> None:
+        key = self._pop(scene_id)
+        self._scheduled[env_idx] = key
+        if key is not None:
+            envs.call_at(
+                env_idx,
+                "schedule_next_episode",
+                {"scene_id": key[0], "episode_id": key[1]},
+            )
+
+    def schedule_first_episodes(self, envs: VectorEnv) -> List[int]:
+        """
+        Schedules the first episode of every environment. Must be called
+        before resetting `envs`.
+
+        :return: The indices of the environments without any episode to run,
+            which must be paused.
+        """
+        self._scheduled = [None] * envs.num_envs
+        for env_idx in range(envs.num_envs):
+            self._schedule(envs, env_idx, None)
+        return [i for i, key in enumerate(self._scheduled) if key is None]
+
+    def on_episodes_started(
+        self, envs: VectorEnv, env_indices: Sequence[int]
+    ) -> List[int]:
+        """
+        Schedules the next episode of the environments `env_indices`, which
+        have just been reset and started their scheduled episode.
+
+        :return: The indices of the environments that reset without having a
+            scheduled episode, which must be paused.
+        """
+        envs_to_pause = []
+        for env_idx in env_indices:
+            started = self._scheduled[env_idx]
+            if started is None:
+                envs_to_pause.append(env_idx)
+            else:
+                self._schedule(envs, env_idx, started[0])
+        return envs_to_pause
+
+    def on_envs_paused(self, envs_to_pause: Sequence[int]) -> None:
+        for env_idx in sorted(envs_to_pause, reverse=True):
+            assert self._scheduled[env_idx] is None
+            self._scheduled.pop(env_idx)
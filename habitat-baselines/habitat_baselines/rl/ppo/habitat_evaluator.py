@@ -1,6 +1,6 @@
 import os
 from collections import defaultdict
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import torch
@@ -9,17 +9,20 @@ import tqdm
 from habitat import logger
 from habitat.tasks.rearrange.rearrange_sensors import GfxReplayMeasure
 from habitat.tasks.rearrange.utils import write_gfx_replay
-from habitat.utils.visualizations.utils import (
-    observations_to_image,
-    overlay_frame,
-)
 from habitat_baselines.common.obs_transformers import (
     apply_obs_transforms_batch,
 )
+from habitat_baselines.common.observation_batcher import ObservationBatcher
+from habitat_baselines.common.video_sink import (
+    VideoFrame,
+    VideoSink,
+    batch_to_video_observations,
+)
+from habitat_baselines.rl.ppo.episode_scheduler import (
+    WorkStealingEpisodeScheduler,
+)
 from habitat_baselines.rl.ppo.evaluator import Evaluator, pause_envs
 from habitat_baselines.utils.common import (
-    batch_obs,
-    generate_video,
     get_action_space_info,
     inference_mode,
     is_continuous_action_space,
@@ -45,9 +48,38 @@ class HabitatEvaluator(Evaluator):
         env_spec,
         rank0_keys,
     ):
+        obs_batcher = ObservationBatcher(device=device)
+        number_of_eval_episodes = config.habitat_baselines.test_episode_count
+        evals_per_ep = config.habitat_baselines.eval.evals_per_ep
+        scheduler = None
+        if config.habitat_baselines.eval.work_stealing:
+            # Every environment has all the episodes, they are dispatched to
+            # the environments by the scheduler.
+            episode_keys = envs.call_at(0, "episode_keys")
+            if number_of_eval_episodes != -1:
+                episode_keys = episode_keys[:number_of_eval_episodes]
+            number_of_eval_episodes = len(episode_keys)
+            scheduler = WorkStealingEpisodeScheduler(
+                episode_keys, evals_per_ep
+            )
+            envs_to_pause = scheduler.schedule_first_episodes(envs)
+            for i in reversed(envs_to_pause):
+                envs.pause_at(i)
+            scheduler.on_envs_paused(envs_to_pause)
+
         observations = envs.reset()
+        if scheduler is not None:
+            # The reset started the first scheduled episodes, schedule the
+            # episodes the environments start when these end.
+            envs_to_pause = scheduler.on_episodes_started(
+                envs, list(range(envs.num_envs))
+            )
+            for i in reversed(envs_to_pause):
+                envs.pause_at(i)
+                observations.pop(i)
+            scheduler.on_envs_paused(envs_to_pause)
         observations = envs.post_step(observations)
-        batch = batch_obs(observations, device=device)
+        batch = obs_batcher(observations)
         batch = apply_obs_transforms_batch(batch, obs_transforms)  # type: ignore
 
         action_shape, discrete_actions = get_action_space_info(
@@ -58,7 +90,7 @@ class HabitatEvaluator(Evaluator):
 
         test_recurrent_hidden_states = torch.zeros(
             (
-                config.habitat_baselines.num_environments,
+                envs.num_envs,
                 *agent.actor_critic.hidden_state_shape,
             ),
             device=device,
@@ -68,13 +100,13 @@ class HabitatEvaluator(Evaluator):
         action_space_lens = agent.actor_critic.policy_action_space_shape_lens
 
         prev_actions = torch.zeros(
-            config.habitat_baselines.num_environments,
+            envs.num_envs,
             *action_shape,
             device=device,
             dtype=torch.long if discrete_actions else torch.float,
         )
         not_done_masks = torch.zeros(
-            config.habitat_baselines.num_environments,
+            envs.num_envs,
             *agent.masks_shape,
             device=device,
             dtype=torch.bool,
@@ -85,231 +117,264 @@ class HabitatEvaluator(Evaluator):
         ep_eval_count: Dict[Any, int] = defaultdict(lambda: 0)
 
         if len(config.habitat_baselines.eval.video_option) > 0:
+            # The frames are drawn and encoded in background processes.
+            video_sink: Optional[VideoSink] = VideoSink(
+                video_option=config.habitat_baselines.eval.video_option,
+                video_dir=config.habitat_baselines.video_dir,
+                tb_writer=writer,
+                fps=config.habitat_baselines.video_fps,
+                keys_to_include_in_name=config.habitat_baselines.eval_keys_to_include_in_name,
+                num_workers=config.habitat_baselines.eval.video_num_workers,
+                max_inflight_mb=config.habitat_baselines.eval.video_max_inflight_mb,
+            )
             # Add the first frame of the episode to the video.
-            rgb_frames: List[List[np.ndarray]] = [
-                [
-                    observations_to_image(
-                        {k: v[env_idx] for k, v in batch.items()}, {}
-                    )
-                ]
-                for env_idx in range(config.habitat_baselines.num_environments)
+            rgb_frames: List[List[VideoFrame]] = [
+                [video_sink.record_frame(obs, {}, overlay=False)]
+                for obs in batch_to_video_observations(batch)
             ]
         else:
             rgb_frames = None
+            video_sink = None
 
         if len(config.habitat_baselines.eval.video_option) > 0:
             os.makedirs(config.habitat_baselines.video_dir, exist_ok=True)
 
-        number_of_eval_episodes = config.habitat_baselines.test_episode_count
-        evals_per_ep = config.habitat_baselines.eval.evals_per_ep
-        if number_of_eval_episodes == -1:
-            number_of_eval_episodes = sum(envs.number_of_episodes)
-        else:
-            total_num_eps = sum(envs.number_of_episodes)
-            # if total_num_eps is negative, it means the number of evaluation episodes is unknown
-            if total_num_eps < number_of_eval_episodes and total_num_eps > 1:
-                logger.warn(
-                    f"Config specified {number_of_eval_episodes} eval episodes"
-                    ", dataset only has {total_num_eps}."
-                )
-                logger.warn(f"Evaluating with {total_num_eps} instead.")
-                number_of_eval_episodes = total_num_eps
-            else:
-                assert evals_per_ep == 1
-        assert (
-            number_of_eval_episodes > 0
-        ), "You must specify a number of evaluation episodes with test_episode_count"
-
-        pbar = tqdm.tqdm(total=number_of_eval_episodes * evals_per_ep)
-        agent.eval()
-        while (
-            len(stats_episodes) < (number_of_eval_episodes * evals_per_ep)
-            and envs.num_envs > 0
-        ):
-            current_episodes_info = envs.current_episodes()
-
-            space_lengths = {}
-            n_agents = len(config.habitat.simulator.agents)
-            if n_agents > 1:
-                space_lengths = {
-                    "index_len_recurrent_hidden_states": hidden_state_lens,
-                    "index_len_prev_actions": action_space_lens,
-                }
-            with inference_mode():
-                action_data = agent.actor_critic.act(
-                    batch,
-                    test_recurrent_hidden_states,
-                    prev_actions,
-                    not_done_masks,
-                    deterministic=False,
-                    **space_lengths,
-                )
-                if action_data.should_inserts is None:
-                    test_recurrent_hidden_states = (
-                        action_data.rnn_hidden_states
-                    )
-                    prev_actions.copy_(action_data.actions)  # type: ignore
+        # Close the video sink even if the evaluation fails, so that its
+        # worker processes exit and the submitted videos are written.
+        try:
+            if scheduler is None:
+                if number_of_eval_episodes == -1:
+                    number_of_eval_episodes = sum(envs.number_of_episodes)
                 else:
-                    agent.actor_critic.update_hidden_state(
-                        test_recurrent_hidden_states, prev_actions, action_data
-                    )
-
-            # NB: Move actions to CPU.  If CUDA tensors are
-            # sent in to env.step(), that will create CUDA contexts
-            # in the subprocesses.
-            if is_continuous_action_space(env_spec.action_space):
-                # Clipping actions to the specified limits
-                step_data = [
-                    np.clip(
-                        a.numpy(),
-                        env_spec.action_space.low,
-                        env_spec.action_space.high,
-                    )
-                    for a in action_data.env_actions.cpu()
-                ]
-            else:
-                step_data = [a.item() for a in action_data.env_actions.cpu()]
-
-            outputs = envs.step(step_data)
-
-            observations, rewards_l, dones, infos = [
-                list(x) for x in zip(*outputs)
-            ]
-            # Note that `policy_infos` represents the information about the
-            # action BEFORE `observations` (the action used to transition to
-            # `observations`).
-            policy_infos = agent.actor_critic.get_extra(
-                action_data, infos, dones
-            )
-            for i in range(len(policy_infos)):
-                infos[i].update(policy_infos[i])
-
-            observations = envs.post_step(observations)
-            batch = batch_obs(  # type: ignore
-                observations,
-                device=device,
-            )
-            batch = apply_obs_transforms_batch(batch, obs_transforms)  # type: ignore
-
-            not_done_masks = torch.tensor(
-                [[not done] for done in dones],
-                dtype=torch.bool,
-                device="cpu",
-            ).repeat(1, *agent.masks_shape)
-
-            rewards = torch.tensor(
-                rewards_l, dtype=torch.float, device="cpu"
-            ).unsqueeze(1)
-            current_episode_reward += rewards
-            next_episodes_info = envs.current_episodes()
-            envs_to_pause = []
-            n_envs = envs.num_envs
-            for i in range(n_envs):
-                if (
-                    ep_eval_count[
-                        (
-                            next_episodes_info[i].scene_id,
-                            next_episodes_info[i].episode_id,
+                    total_num_eps = sum(envs.number_of_episodes)
+                    # if total_num_eps is negative, it means the number of evaluation episodes is unknown
+                    if (
+                        total_num_eps < number_of_eval_episodes
+                        and total_num_eps > 1
+                    ):
+                        logger.warn(
+                            f"Config specified {number_of_eval_episodes} eval episodes"
+                            ", dataset only has {total_num_eps}."
                         )
-                    ]
-                    == evals_per_ep
-                ):
-                    envs_to_pause.append(i)
-
-                # Exclude the keys from `_rank0_keys` from displaying in the video
-                disp_info = {
-                    k: v for k, v in infos[i].items() if k not in rank0_keys
-                }
-
-                if len(config.habitat_baselines.eval.video_option) > 0:
-                    # TODO move normalization / channel changing out of the policy and undo it here
-                    frame = observations_to_image(
-                        {k: v[i] for k, v in batch.items()}, disp_info
-                    )
-                    if not not_done_masks[i].any().item():
-                        # The last frame corresponds to the first frame of the next episode
-                        # but the info is correct. So we use a black frame
-                        final_frame = observations_to_image(
-                            {k: v[i] * 0.0 for k, v in batch.items()},
-                            disp_info,
+                        logger.warn(
+                            f"Evaluating with {total_num_eps} instead."
                         )
-                        final_frame = overlay_frame(final_frame, disp_info)
-                        rgb_frames[i].append(final_frame)
-                        # The starting frame of the next episode will be the final element..
-                        rgb_frames[i].append(frame)
+                        number_of_eval_episodes = total_num_eps
                     else:
-                        frame = overlay_frame(frame, disp_info)
-                        rgb_frames[i].append(frame)
-
-                # episode ended
-                if not not_done_masks[i].any().item():
-                    pbar.update()
-                    episode_stats = {
-                        "reward": current_episode_reward[i].item()
+                        assert evals_per_ep == 1
+            assert (
+                number_of_eval_episodes > 0
+            ), "You must specify a number of evaluation episodes with test_episode_count"
+
+            pbar = tqdm.tqdm(total=number_of_eval_episodes * evals_per_ep)
+            agent.eval()
+            while (
+                len(stats_episodes) < (number_of_eval_episodes * evals_per_ep)
+                and envs.num_envs > 0
+            ):
+                current_episodes_info = envs.current_episodes()
+
+                space_lengths = {}
+                n_agents = len(config.habitat.simulator.agents)
+                if n_agents > 1:
+                    space_lengths = {
+                        "index_len_recurrent_hidden_states": hidden_state_lens,
+                        "index_len_prev_actions": action_space_lens,
                     }
-                    episode_stats.update(extract_scalars_from_info(infos[i]))
-                    current_episode_reward[i] = 0
-                    k = (
-                        current_episodes_info[i].scene_id,
-                        current_episodes_info[i].episode_id,
+                with inference_mode():
+                    action_data = agent.actor_critic.act(
+                        batch,
+                        test_recurrent_hidden_states,
+                        prev_actions,
+                        not_done_masks,
+                        deterministic=False,
+                        **space_lengths,
                     )
-                    ep_eval_count[k] += 1
-                    # use scene_id + episode_id as unique id for storing stats
-                    stats_episodes[(k, ep_eval_count[k])] = episode_stats
-
-                    if len(config.habitat_baselines.eval.video_option) > 0:
-                        generate_video(
-                            video_option=config.habitat_baselines.eval.video_option,
-                            video_dir=config.habitat_baselines.video_dir,
-                            # Since the final frame is the start frame of the next episode.
-                            images=rgb_frames[i][:-1],
-                            episode_id=f"{current_episodes_info[i].episode_id}_{ep_eval_count[k]}",
-                            checkpoint_idx=checkpoint_index,
-                            metrics=extract_scalars_from_info(disp_info),
-                            fps=config.habitat_baselines.video_fps,
-                            tb_writer=writer,
-                            keys_to_include_in_name=config.habitat_baselines.eval_keys_to_include_in_name,
+                    if action_data.should_inserts is None:
+                        test_recurrent_hidden_states = (
+                            action_data.rnn_hidden_states
+                        )
+                        prev_actions.copy_(action_data.actions)  # type: ignore
+                    else:
+                        agent.actor_critic.update_hidden_state(
+                            test_recurrent_hidden_states,
+                            prev_actions,
+                            action_data,
                         )
 
-                        # Since the starting frame of the next episode is the final frame.
-                        rgb_frames[i] = rgb_frames[i][-1:]
-
-                    gfx_str = infos[i].get(GfxReplayMeasure.cls_uuid, "")
-                    if gfx_str != "":
-                        write_gfx_replay(
-                            gfx_str,
-                            config.habitat.task,
-                            current_episodes_info[i].episode_id,
+                # NB: Move actions to CPU.  If CUDA tensors are
+                # sent in to env.step(), that will create CUDA contexts
+                # in the subprocesses.
+                if is_continuous_action_space(env_spec.action_space):
+                    # Clipping actions to the specified limits
+                    step_data = [
+                        np.clip(
+                            a.numpy(),
+                            env_spec.action_space.low,
+                            env_spec.action_space.high,
                         )
+                        for a in action_data.env_actions.cpu()
+                    ]
+                else:
+                    step_data = [
+                        a.item() for a in action_data.env_actions.cpu()
+                    ]
 
-            not_done_masks = not_done_masks.to(device=device)
-            (
-                envs,
-                test_recurrent_hidden_states,
-                not_done_masks,
-                current_episode_reward,
-                prev_actions,
-                batch,
-                rgb_frames,
-            ) = pause_envs(
-                envs_to_pause,
-                envs,
-                test_recurrent_hidden_states,
-                not_done_masks,
-                current_episode_reward,
-                prev_actions,
-                batch,
-                rgb_frames,
-            )
+                outputs = envs.step(step_data)
 
-            # We pause the statefull parameters in the policy.
-            # We only do this if there are envs to pause to reduce the overhead.
-            # In addition, HRL policy requires the solution_actions to be non-empty, and
-            # empty list of envs_to_pause will raise an error.
-            if any(envs_to_pause):
-                agent.actor_critic.on_envs_pause(envs_to_pause)
+                observations, rewards_l, dones, infos = [
+                    list(x) for x in zip(*outputs)
+                ]
+                # Note that `policy_infos` represents the information about the
+                # action BEFORE `observations` (the action used to transition to
+                # `observations`).
+                policy_infos = agent.actor_critic.get_extra(
+                    action_data, infos, dones
+                )
+                for i in range(len(policy_infos)):
+                    infos[i].update(policy_infos[i])
+
+                observations = envs.post_step(observations)
+                batch = obs_batcher(observations)
+                batch = apply_obs_transforms_batch(batch, obs_transforms)  # type: ignore
+
+                not_done_masks = torch.tensor(
+                    [[not done] for done in dones],
+                    dtype=torch.bool,
+                    device="cpu",
+                ).repeat(1, *agent.masks_shape)
+
+                rewards = torch.tensor(
+                    rewards_l, dtype=torch.float, device="cpu"
+                ).unsqueeze(1)
+                current_episode_reward += rewards
+                next_episodes_info = envs.current_episodes()
+                if scheduler is None:
+                    envs_to_pause = []
+                else:
+                    envs_to_pause = scheduler.on_episodes_started(
+                        envs, [i for i, done in enumerate(dones) if done]
+                    )
+                if video_sink is not None:
+                    video_obs = batch_to_video_observations(batch)
+                n_envs = envs.num_envs
+                for i in range(n_envs):
+                    if scheduler is None and (
+                        ep_eval_count[
+                            (
+                                next_episodes_info[i].scene_id,
+                                next_episodes_info[i].episode_id,
+                            )
+                        ]
+                        == evals_per_ep
+                    ):
+                        envs_to_pause.append(i)
+
+                    # Exclude the keys from `_rank0_keys` from displaying in the video
+                    disp_info = {
+                        k: v
+                        for k, v in infos[i].items()
+                        if k not in rank0_keys
+                    }
 
-        pbar.close()
+                    if video_sink is not None:
+                        # TODO move normalization / channel changing out of the policy and undo it here
+                        if not not_done_masks[i].any().item():
+                            # The last frame corresponds to the first frame of the next episode
+                            # but the info is correct. So we use a black frame
+                            rgb_frames[i].append(
+                                video_sink.record_frame(
+                                    video_obs[i], disp_info, blank=True
+                                )
+                            )
+                            # The starting frame of the next episode will be the final element..
+                            rgb_frames[i].append(
+                                video_sink.record_frame(
+                                    video_obs[i], disp_info, overlay=False
+                                )
+                            )
+                        else:
+                            rgb_frames[i].append(
+                                video_sink.record_frame(
+                                    video_obs[i], disp_info
+                                )
+                            )
+
+                    # episode ended
+                    if not not_done_masks[i].any().item():
+                        pbar.update()
+                        episode_stats = {
+                            "reward": current_episode_reward[i].item()
+                        }
+                        episode_stats.update(
+                            extract_scalars_from_info(infos[i])
+                        )
+                        current_episode_reward[i] = 0
+                        k = (
+                            current_episodes_info[i].scene_id,
+                            current_episodes_info[i].episode_id,
+                        )
+                        ep_eval_count[k] += 1
+                        # use scene_id + episode_id as unique id for storing stats
+                        stats_episodes[(k, ep_eval_count[k])] = episode_stats
+
+                        if video_sink is not None:
+                            video_sink.submit(
+                                # Since the final frame is the start frame of the next episode.
+                                frames=rgb_frames[i][:-1],
+                                episode_id=f"{current_episodes_info[i].episode_id}_{ep_eval_count[k]}",
+                                checkpoint_idx=checkpoint_index,
+                                metrics=extract_scalars_from_info(disp_info),
+                            )
+
+                            # Since the starting frame of the next episode is the final frame.
+                            rgb_frames[i] = rgb_frames[i][-1:]
+
+                        gfx_str = infos[i].get(GfxReplayMeasure.cls_uuid, "")
+                        if gfx_str != "":
+                            write_gfx_replay(
+                                gfx_str,
+                                config.habitat.task,
+                                current_episodes_info[i].episode_id,
+                            )
+
+                not_done_masks = not_done_masks.to(device=device)
+                if video_sink is not None:
+                    # The frames of the paused environments are dropped.
+                    for i in envs_to_pause:
+                        video_sink.discard(rgb_frames[i])
+                (
+                    envs,
+                    test_recurrent_hidden_states,
+                    not_done_masks,
+                    current_episode_reward,
+                    prev_actions,
+                    batch,
+                    rgb_frames,
+                ) = pause_envs(
+                    envs_to_pause,
+                    envs,
+                    test_recurrent_hidden_states,
+                    not_done_masks,
+                    current_episode_reward,
+                    prev_actions,
+                    batch,
+                    rgb_frames,
+                )
+                if scheduler is not None:
+                    scheduler.on_envs_paused(envs_to_pause)
+
+                # We pause the statefull parameters in the policy.
+                # We only do this if there are envs to pause to reduce the overhead.
+                # In addition, HRL policy requires the solution_actions to be non-empty, and
+                # empty list of envs_to_pause will raise an error.
+                if any(envs_to_pause):
+                    agent.actor_critic.on_envs_pause(envs_to_pause)
+
+            pbar.close()
+        finally:
+            if video_sink is not None:
+                video_sink.close()
         assert (
             len(ep_eval_count) >= number_of_eval_episodes
         ), f"Expected {number_of_eval_episodes} episodes, got {len(ep_eval_count)}."
@@ -5,11 +5,12 @@
 # LICENSE file in the root directory of this source tree.
 
 import contextlib
+import functools
 import os
 import random
 import time
 from collections import defaultdict, deque
-from typing import TYPE_CHECKING, Dict, List, Optional, Set
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
 
 import hydra
 import numpy as np
@@ -24,12 +25,18 @@ from habitat.utils import profiling_wrapper
 from habitat_baselines.common import VectorEnvFactory
 from habitat_baselines.common.base_trainer import BaseRLTrainer
 from habitat_baselines.common.baseline_registry import baseline_registry
+from habitat_baselines.common.checkpoint_manifest import append_to_manifest
+from habitat_baselines.common.checkpoint_writer import (
+    get_checkpoint_writer,
+    write_checkpoint,
+)
 from habitat_baselines.common.env_spec import EnvironmentSpec
 from habitat_baselines.common.obs_transformers import (
     apply_obs_transforms_batch,
     apply_obs_transforms_obs_space,
     get_active_obs_transforms,
 )
+from habitat_baselines.common.observation_batcher import ObservationBatcher
 from habitat_baselines.common.tensorboard_utils import (
     TensorboardWriter,
     get_writer,
@@ -37,6 +44,7 @@ from habitat_baselines.common.tensorboard_utils import (
 from habitat_baselines.rl.ddppo.algo import DDPPO  # noqa: F401.
 from habitat_baselines.rl.ddppo.ddp_utils import (
     EXIT,
+    flush_checkpoints,
     get_distrib_size,
     init_distrib_slurm,
     is_slurm_batch_job,
@@ -56,7 +64,7 @@ from habitat_baselines.rl.ppo.single_agent_access_mgr import (  # noqa: F401.
     SingleAgentAccessMgr,
 )
 from habitat_baselines.utils.common import (
-    batch_obs,
+    get_checkpoint_id,
     inference_mode,
     is_continuous_action_space,
 )
@@ -89,6 +97,9 @@ class PPOTrainer(BaseRLTrainer):
         self._is_static_encoder = False
         self._encoder = None
         self._env_spec = None
+        # The env-relevant config of the environments kept alive between
+        # evaluated checkpoints (see `eval.reuse_envs`).
+        self._eval_envs_config: Optional[Dict[str, Any]] = None
 
         # Distributed if the world size would be
         # greater than 1
@@ -144,17 +155,16 @@ class PPOTrainer(BaseRLTrainer):
             config,
             workers_ignore_signals=is_slurm_batch_job(),
             enforce_scenes_greater_eq_environments=is_eval,
+            share_scenes=(
+                is_eval and config.habitat_baselines.eval.work_stealing
+            ),
             is_first_rank=(
                 not torch.distributed.is_initialized()
                 or torch.distributed.get_rank() == 0
             ),
         )
 
-        self._env_spec = EnvironmentSpec(
-            observation_space=self.envs.observation_spaces[0],
-            action_space=self.envs.action_spaces[0],
-            orig_action_space=self.envs.orig_action_spaces[0],
-        )
+        self._init_env_spec()
 
         # The measure keys that should only be logged on rank0 and nowhere
         # else. They will be excluded from all other workers and only reported
@@ -169,6 +179,60 @@ class PPOTrainer(BaseRLTrainer):
         # `self.window_episode_stats`.
         self._single_proc_infos: Dict[str, List[float]] = {}
 
+    def _init_env_spec(self):
+        self._env_spec = EnvironmentSpec(
+            observation_space=self.envs.observation_spaces[0],
+            action_space=self.envs.action_spaces[0],
+            orig_action_space=self.envs.orig_action_spaces[0],
+        )
+
+    @staticmethod
+    def _get_eval_envs_config(config: "DictConfig") -> Dict[str, Any]:
+        # The part of the config the evaluation environments depend on.
+        hb_config = config.habitat_baselines
+        return {
+            "habitat": OmegaConf.to_container(config.habitat, resolve=True),
+            "num_environments": hb_config.num_environments,
+            "vector_env_factory": OmegaConf.to_container(
+                hb_config.vector_env_factory, resolve=True
+            ),
+            "work_stealing": hb_config.eval.work_stealing,
+        }
+
+    def _init_eval_envs(self, config: "DictConfig") -> None:
+        r"""Builds the evaluation environments or, with `eval.reuse_envs`,
+        reuses those of the previous checkpoint if their config didn't
+        change, restarting their episodes.
+        """
+        if not config.habitat_baselines.eval.reuse_envs:
+            self._init_envs(config, is_eval=True)
+            return
+
+        envs_config = self._get_eval_envs_config(config)
+        if self.envs is not None and self._eval_envs_config == envs_config:
+            logger.info("Reusing the environments of the last checkpoint")
+            self.envs.resume_all()
+            self.envs.call(["reset_episode_iterator"] * self.envs.num_envs)
+            self._init_env_spec()
+            return
+
+        self._close_eval_envs()
+        self._init_envs(config, is_eval=True)
+        self._eval_envs_config = envs_config
+
+    def _close_eval_envs(self) -> None:
+        if self.envs is not None:
+            self.envs.close()
+            self.envs = None
+        self._eval_envs_config = None
+
+    def eval(self) -> None:
+        try:
+            super().eval()
+        finally:
+            # The environments kept alive between checkpoints.
+            self._close_eval_envs()
+
     def _init_train(self, resume_state=None):
         if resume_state is None:
             resume_state = load_resume_state(self.config)
@@ -245,6 +309,7 @@ class PPOTrainer(BaseRLTrainer):
         self._init_envs()
 
         self.device = get_device(self.config)
+        self._obs_batcher = ObservationBatcher(device=self.device)
 
         if rank0_only() and not os.path.isdir(
             self.config.habitat_baselines.checkpoint_folder
@@ -265,7 +330,7 @@ class PPOTrainer(BaseRLTrainer):
 
         observations = self.envs.reset()
         observations = self.envs.post_step(observations)
-        batch = batch_obs(observations, device=self.device)
+        batch = self._obs_batcher(observations)
         batch = apply_obs_transforms_batch(batch, self.obs_transforms)  # type: ignore
 
         if self._is_static_encoder:
@@ -314,13 +379,37 @@ class PPOTrainer(BaseRLTrainer):
         save_file_path = os.path.join(
             self.config.habitat_baselines.checkpoint_folder, file_name
         )
-        torch.save(checkpoint, save_file_path)
-        torch.save(
-            checkpoint,
-            os.path.join(
-                self.config.habitat_baselines.checkpoint_folder, "latest.pth"
-            ),
+        # latest.pth is a link to the last checkpoint.
+        latest_path = os.path.join(
+            self.config.habitat_baselines.checkpoint_folder, "latest.pth"
         )
+        on_saved = functools.partial(
+            self._on_checkpoint_saved,
+            save_file_path,
+            None if extra_state is None else extra_state.get("step"),
+        )
+
+        if self._async_checkpoint_writes:
+            get_checkpoint_writer().save(
+                checkpoint, save_file_path, latest_path, on_saved=on_saved
+            )
+        else:
+            write_checkpoint(checkpoint, save_file_path, latest_path)
+            on_saved()
+
+    def _on_checkpoint_saved(
+        self, save_file_path: str, step: Optional[int]
+    ) -> None:
+        # Called once the checkpoint is written, from the checkpoint writer
+        # thread with asynchronous writes.
+        ckpt_ind = get_checkpoint_id(save_file_path)
+        if ckpt_ind is not None:
+            append_to_manifest(
+                self.config.habitat_baselines.checkpoint_folder,
+                ckpt_ind,
+                save_file_path,
+                step=step,
+            )
         if self.config.habitat_baselines.on_save_ckpt_callback is not None:
             hydra.utils.call(
                 self.config.habitat_baselines.on_save_ckpt_callback,
@@ -372,20 +461,21 @@ class PPOTrainer(BaseRLTrainer):
         profiling_wrapper.range_pop()  # compute actions
 
         with g_timer.avg_time("trainer.obs_insert"):
-            for index_env, act in zip(
-                range(env_slice.start, env_slice.stop),
-                action_data.env_actions.cpu().unbind(0),
-            ):
-                if is_continuous_action_space(self._env_spec.action_space):
-                    # Clipping actions to the specified limits
-                    act = np.clip(
-                        act.numpy(),
-                        self._env_spec.action_space.low,
-                        self._env_spec.action_space.high,
-                    )
-                else:
-                    act = act.item()
-                self.envs.async_step_at(index_env, act)
+            # Convert the actions of all the environments at once.
+            env_actions = action_data.env_actions.cpu().numpy()
+            if is_continuous_action_space(self._env_spec.action_space):
+                # Clipping actions to the specified limits
+                env_actions = np.clip(
+                    env_actions,
+                    self._env_spec.action_space.low,
+                    self._env_spec.action_space.high,
+                )
+                acts = list(env_actions)
+            else:
+                acts = env_actions.reshape(len(env_actions)).tolist()
+            self.envs.async_step(
+                acts, index_envs=range(env_slice.start, env_slice.stop)
+            )
 
         with g_timer.avg_time("trainer.obs_insert"):
             self._agent.rollouts.insert(
@@ -406,10 +496,7 @@ class PPOTrainer(BaseRLTrainer):
         )
 
         with g_timer.avg_time("trainer.step_env"):
-            outputs = [
-                self.envs.wait_step_at(index_env)
-                for index_env in range(env_slice.start, env_slice.stop)
-            ]
+            outputs = self._wait_step_results(env_slice)
 
             observations, rewards_l, dones, infos = [
                 list(x) for x in zip(*outputs)
@@ -417,7 +504,7 @@ class PPOTrainer(BaseRLTrainer):
 
         with g_timer.avg_time("trainer.update_stats"):
             observations = self.envs.post_step(observations)
-            batch = batch_obs(observations, device=self.device)
+            batch = self._obs_batcher(observations)
             batch = apply_obs_transforms_batch(batch, self.obs_transforms)  # type: ignore
 
             rewards = torch.tensor(
@@ -481,6 +568,122 @@ class PPOTrainer(BaseRLTrainer):
 
         return env_slice.stop - env_slice.start
 
+    def _wait_step_results(self, env_slice: slice) -> List[Any]:
+        """
+        Waits for the step results of the environments of `env_slice`. With
+        the pipelined sampler, the results are read in the order the
+        environments finish instead of the order of the environments.
+        """
+        index_envs = list(range(env_slice.start, env_slice.stop))
+        if not self._ppo_cfg.use_pipelined_sampler:
+            return [
+                self.envs.wait_step_at(index_env) for index_env in index_envs
+            ]
+
+        outputs: List[Any] = [None] * len(index_envs)
+        while len(index_envs) > 0:
+            ready = self.envs.wait_any_step(index_envs)
+            for index_env in ready:
+                outputs[index_env - env_slice.start] = self.envs.wait_step_at(
+                    index_env
+                )
+            index_envs = [i for i in index_envs if i not in ready]
+        return outputs
+
+    def _wait_ready_buffer(self, buffer_indices: List[int]) -> int:
+        """
+        Waits until all the environments of one of `buffer_indices` are done
+        stepping and returns that buffer, preferring the first ones.
+        """
+        num_envs = self.envs.num_envs
+        nbuffers = self._agent.nbuffers
+        with g_timer.avg_time("trainer.step_env"):
+            while True:
+                not_ready = []
+                for buffer_index in buffer_indices:
+                    buffer_not_ready = [
+                        index_env
+                        for index_env in range(
+                            int(buffer_index * num_envs / nbuffers),
+                            int((buffer_index + 1) * num_envs / nbuffers),
+                        )
+                        if not self.envs.poll_step_at(index_env)
+                    ]
+                    if len(buffer_not_ready) == 0:
+                        return buffer_index
+                    not_ready.extend(buffer_not_ready)
+                self.envs.wait_any_step(not_ready)
+
+    def _collect_rollout(self) -> int:
+        """
+        Collects the rollout of all the buffers in lockstep. Returns the
+        number of steps collected.
+        """
+        count_steps_delta = 0
+        for buffer_index in range(self._agent.nbuffers):
+            self._compute_actions_and_step_envs(buffer_index)
+
+        for step in range(self._ppo_cfg.num_steps):
+            is_last_step = (
+                self.should_end_early(step + 1)
+                or (step + 1) == self._ppo_cfg.num_steps
+            )
+
+            for buffer_index in range(self._agent.nbuffers):
+                count_steps_delta += self._collect_environment_result(
+                    buffer_index
+                )
+
+                if (buffer_index + 1) == self._agent.nbuffers:
+                    profiling_wrapper.range_pop()  # _collect_rollout_step
+
+                if not is_last_step:
+                    if (buffer_index + 1) == self._agent.nbuffers:
+                        profiling_wrapper.range_push("_collect_rollout_step")
+
+                    self._compute_actions_and_step_envs(buffer_index)
+
+            if is_last_step:
+                break
+        return count_steps_delta
+
+    def _collect_rollout_pipelined(self) -> int:
+        """
+        Collects the rollout consuming the buffers in the order their
+        environments finish stepping, so that the policy inference of a
+        buffer overlaps with the simulation of the other buffers. Every
+        buffer collects the same number of steps. Returns the number of steps
+        collected.
+        """
+        nbuffers = self._agent.nbuffers
+        for buffer_index in range(nbuffers):
+            self._compute_actions_and_step_envs(buffer_index)
+
+        count_steps_delta = 0
+        num_buffer_steps = [0] * nbuffers
+        last_step = self._ppo_cfg.num_steps
+        checked_step = 0
+        pending = list(range(nbuffers))
+        while len(pending) > 0:
+            buffer_index = self._wait_ready_buffer(pending)
+            count_steps_delta += self._collect_environment_result(buffer_index)
+            num_buffer_steps[buffer_index] += 1
+            step = num_buffer_steps[buffer_index]
+            # The first buffer to reach a step decides if it is the last one
+            # for all the buffers.
+            if step > checked_step:
+                checked_step = step
+                if self.should_end_early(step):
+                    last_step = step
+
+            if step >= last_step:
+                pending.remove(buffer_index)
+            else:
+                self._compute_actions_and_step_envs(buffer_index)
+
+        profiling_wrapper.range_pop()  # _collect_rollout_step
+        return count_steps_delta
+
     @profiling_wrapper.RangeContext("_collect_rollout_step")
     def _collect_rollout_step(self):
         self._compute_actions_and_step_envs()
@@ -723,6 +926,7 @@ class PPOTrainer(BaseRLTrainer):
                             requeue_stats=requeue_stats,
                         ),
                         self.config,
+                        async_write=self._async_checkpoint_writes,
                     )
 
                 if EXIT.is_set():
@@ -735,40 +939,14 @@ class PPOTrainer(BaseRLTrainer):
                     return
 
                 self._agent.eval()
-                count_steps_delta = 0
                 profiling_wrapper.range_push("rollouts loop")
 
                 profiling_wrapper.range_push("_collect_rollout_step")
                 with g_timer.avg_time("trainer.rollout_collect"):
-                    for buffer_index in range(self._agent.nbuffers):
-                        self._compute_actions_and_step_envs(buffer_index)
-
-                    for step in range(self._ppo_cfg.num_steps):
-                        is_last_step = (
-                            self.should_end_early(step + 1)
-                            or (step + 1) == self._ppo_cfg.num_steps
-                        )
-
-                        for buffer_index in range(self._agent.nbuffers):
-                            count_steps_delta += (
-                                self._collect_environment_result(buffer_index)
-                            )
-
-                            if (buffer_index + 1) == self._agent.nbuffers:
-                                profiling_wrapper.range_pop()  # _collect_rollout_step
-
-                            if not is_last_step:
-                                if (buffer_index + 1) == self._agent.nbuffers:
-                                    profiling_wrapper.range_push(
-                                        "_collect_rollout_step"
-                                    )
-
-                                self._compute_actions_and_step_envs(
-                                    buffer_index
-                                )
-
-                        if is_last_step:
-                            break
+                    if self._ppo_cfg.use_pipelined_sampler:
+                        count_steps_delta = self._collect_rollout_pipelined()
+                    else:
+                        count_steps_delta = self._collect_rollout()
 
                 profiling_wrapper.range_pop()  # rollouts loop
 
@@ -799,6 +977,11 @@ class PPOTrainer(BaseRLTrainer):
                 profiling_wrapper.range_pop()  # train update
 
             self.envs.close()
+            flush_checkpoints()
+
+    @property
+    def _async_checkpoint_writes(self) -> bool:
+        return self.config.habitat_baselines.async_checkpoint_writes
 
     def _eval_checkpoint(
         self,
@@ -871,7 +1054,7 @@ class PPOTrainer(BaseRLTrainer):
         if config.habitat_baselines.verbose:
             logger.info(f"env config: {OmegaConf.to_yaml(config)}")
 
-        self._init_envs(config, is_eval=True)
+        self._init_eval_envs(config)
 
         self._agent = self._create_agent(None)
         if (
@@ -899,7 +1082,8 @@ class PPOTrainer(BaseRLTrainer):
             self._rank0_keys,
         )
 
-        self.envs.close()
+        if not config.habitat_baselines.eval.reuse_envs:
+            self.envs.close()
 
 
 def get_device(config: "DictConfig") -> torch.device:
@@ -136,6 +136,7 @@ class SingleAgentAccessMgr(AgentAccessMgr):
             action_space=policy_action_space,
             actor_critic=actor_critic,
             is_double_buffered=ppo_cfg.use_double_buffered_sampler,
+            returns_engine=ppo_cfg.returns_engine,
         )
         rollouts.to(device)
         return rollouts
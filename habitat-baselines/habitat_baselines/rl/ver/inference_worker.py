@@ -21,6 +21,7 @@ from habitat_baselines.common.obs_transformers import (
     apply_obs_transforms_batch,
     get_active_obs_transforms,
 )
+from habitat_baselines.common.observation_batcher import ObservationBatcher
 from habitat_baselines.common.tensor_dict import (
     NDArrayDict,
     TensorDict,
@@ -43,7 +44,7 @@ from habitat_baselines.rl.ver.worker_common import (
     WorkerBase,
     WorkerQueues,
 )
-from habitat_baselines.utils.common import batch_obs, inference_mode
+from habitat_baselines.utils.common import inference_mode
 from habitat_baselines.utils.timing import Timing
 
 if TYPE_CHECKING:
@@ -79,6 +80,7 @@ class InferenceWorkerProcess(ProcessBase):
     _static_encoder: bool = attr.ib(init=False, default=False)
     transfer_buffers: NDArrayDict = attr.ib(default=None, init=False)
     incoming_transfer_buffers: NDArrayDict = attr.ib(default=None, init=False)
+    _obs_batcher: ObservationBatcher = attr.ib(default=None, init=False)
 
     def __attrs_post_init__(self):
         if self.device.type == "cuda":
@@ -97,6 +99,7 @@ class InferenceWorkerProcess(ProcessBase):
                 self._static_encoder = True
                 self.visual_encoder = self.actor_critic.net.visual_encoder
 
+        self._obs_batcher = ObservationBatcher(device=self.device)
         self.transfer_buffers = self._torch_transfer_buffers.numpy()
         self.incoming_transfer_buffers = self.transfer_buffers.slice_keys(
             set(self.transfer_buffers.keys()) - {"actions"}
@@ -302,7 +305,7 @@ class InferenceWorkerProcess(ProcessBase):
                 for env_idx in self.new_reqs
             ]
 
-            to_batch = batch_obs(to_batch, device=self.device)
+            to_batch = self._obs_batcher(to_batch)
             obs = to_batch.pop("observations")
 
             environment_ids = to_batch["environment_ids"].view(-1)
@@ -9,6 +9,7 @@ from typing import Any, Dict, Iterator, List, Optional, Tuple
 import numpy as np
 import torch
 
+from habitat_baselines.common.discounted_returns import discounted_reverse_scan
 from habitat_baselines.common.rollout_storage import RolloutStorage
 from habitat_baselines.common.tensor_dict import DictTree, TensorDict
 from habitat_baselines.rl.models.rnn_state_encoder import (
@@ -144,6 +145,7 @@ class VERRolloutStorage(RolloutStorage):
         actor_critic,
         variable_experience: bool,
         is_double_buffered: bool = False,
+        returns_engine: str = "loop",
     ):
         super().__init__(
             numsteps,
@@ -152,6 +154,7 @@ class VERRolloutStorage(RolloutStorage):
             action_space,
             actor_critic,
             is_double_buffered,
+            returns_engine,
         )
         self.use_is_coeffs = variable_experience
 
@@ -504,6 +507,47 @@ class VERRolloutStorage(RolloutStorage):
         returns = returns_t.view(-1, 1).numpy()
         returns[:] = returns[self.select_inds]
 
+        if self.returns_engine == "scan":
+            self._compute_returns_scan(
+                rewards, values, is_not_stale, returns, gamma, tau
+            )
+        else:
+            self._compute_returns_loop(
+                rewards, values, is_not_stale, returns, gamma, tau
+            )
+
+        returns[:] = returns[_np_invert_permutation(self.select_inds)]
+
+        if not self.variable_experience:
+            assert torch.all(torch.isfinite(returns_t[:-1])), dict(
+                returns=returns_t.squeeze(),
+                dones=self.dones_cpu,
+                episode_ids=self.episode_ids_cpu.reshape(-1, self._num_envs),
+                environment_ids=self.environment_ids_cpu.reshape(
+                    -1, self._num_envs
+                ),
+                step_ids=self.step_ids_cpu.reshape(-1, self._num_envs),
+                is_not_stale=is_not_stale[
+                    _np_invert_permutation(self.select_inds)
+                ].reshape(-1, self._num_envs),
+            )
+        else:
+            assert torch.isfinite(returns_t).long().sum() == (
+                self.num_steps * self._num_envs
+            ), returns_t.squeeze().numpy()[self.select_inds]
+
+        self.buffers["returns"].copy_(returns_t, non_blocking=True)
+        self.current_rollout_step_idxs[0] = self.num_steps
+
+    def _compute_returns_loop(
+        self,
+        rewards: np.ndarray,
+        values: np.ndarray,
+        is_not_stale: np.ndarray,
+        returns: np.ndarray,
+        gamma: float,
+        tau: float,
+    ) -> None:
         gae = np.zeros((self.num_seqs_at_step[0], 1))
         last_values = gae.copy()
         ptr = returns.size
@@ -544,28 +588,66 @@ class VERRolloutStorage(RolloutStorage):
 
         assert ptr == 0
 
-        returns[:] = returns[_np_invert_permutation(self.select_inds)]
-
-        if not self.variable_experience:
-            assert torch.all(torch.isfinite(returns_t[:-1])), dict(
-                returns=returns_t.squeeze(),
-                dones=self.dones_cpu,
-                episode_ids=self.episode_ids_cpu.reshape(-1, self._num_envs),
-                environment_ids=self.environment_ids_cpu.reshape(
-                    -1, self._num_envs
-                ),
-                step_ids=self.step_ids_cpu.reshape(-1, self._num_envs),
-                is_not_stale=is_not_stale[
-                    _np_invert_permutation(self.select_inds)
-                ].reshape(-1, self._num_envs),
-            )
-        else:
-            assert torch.isfinite(returns_t).long().sum() == (
-                self.num_steps * self._num_envs
-            ), returns_t.squeeze().numpy()[self.select_inds]
-
-        self.buffers["returns"].copy_(returns_t, non_blocking=True)
-        self.current_rollout_step_idxs[0] = self.num_steps
+    def _compute_returns_scan(
+        self,
+        rewards: np.ndarray,
+        values: np.ndarray,
+        is_not_stale: np.ndarray,
+        returns: np.ndarray,
+        gamma: float,
+        tau: float,
+    ) -> None:
+        r"""Vectorized equivalent of :ref:`_compute_returns_loop`.
+
+        The steps are ordered by :py:`select_inds`, i.e. all the sequences at
+        their first step, then all the sequences that have a second step,
+        etc. Sequences are sorted by decreasing length, so scattering the
+        steps in row-major order into the :py:`True` entries of a
+        :py:`[max_length, num_seqs]` mask gives a padded time-major matrix
+        on which GAE is a single reverse scan.
+        """
+        max_length = len(self.num_seqs_at_step)
+        num_seqs = int(self.num_seqs_at_step[0])
+        valid = (
+            np.arange(num_seqs)[np.newaxis, :]
+            < self.num_seqs_at_step[:, np.newaxis]
+        )
+        assert int(valid.sum()) == returns.shape[0]
+
+        def _pad(arr: np.ndarray) -> np.ndarray:
+            padded = np.zeros((max_length, num_seqs), dtype=np.float64)
+            padded[valid] = arr[:, 0]
+            return padded
+
+        padded_values = _pad(values)
+        next_values = np.zeros_like(padded_values)
+        next_values[:-1] = padded_values[1:]
+        deltas = _pad(rewards) + gamma * next_values - padded_values
+
+        # The last step from each worker is only there to bootstrap the
+        # value of the previous step, it gets a zero advantage and a nan
+        # return.
+        is_last_step_for_env = np.zeros_like(valid)
+        last_seqs = np.nonzero(self.last_sequence_in_batch_mask)[0]
+        is_last_step_for_env[
+            self.sequence_lengths[last_seqs] - 1, last_seqs
+        ] = True
+        deltas[is_last_step_for_env] = 0.0
+
+        gae = discounted_reverse_scan(
+            torch.from_numpy(deltas),
+            torch.full_like(torch.from_numpy(deltas), tau * gamma),
+        ).numpy()
+
+        new_returns = (gae + padded_values)[valid]
+        # If the step isn't stale or we don't have a return
+        # calculate, use the newly calculated return value,
+        # otherwise keep the current one
+        use_new_value = is_not_stale[:, 0] | np.logical_not(
+            np.isfinite(returns[:, 0])
+        )
+        returns[use_new_value, 0] = new_returns[use_new_value]
+        returns[is_last_step_for_env[valid], 0] = float("nan")
 
     def data_generator(
         self,
@@ -21,6 +21,7 @@ from habitat_baselines.common.env_spec import EnvironmentSpec
 from habitat_baselines.rl.ddppo.ddp_utils import (
     EXIT,
     add_signal_handlers,
+    flush_checkpoints,
     get_distrib_size,
     get_free_port_distributed,
     get_main_addr,
@@ -244,6 +245,7 @@ class VERTrainer(PPOTrainer):
             "action_space": self._env_spec.action_space,
             "actor_critic": self._agent.actor_critic,
             "observation_space": rollouts_obs_space,
+            "returns_engine": ppo_cfg.returns_engine,
         }
 
         def create_ver_rollouts_fn(
@@ -487,6 +489,7 @@ class VERTrainer(PPOTrainer):
                 save_resume_state(
                     resume_state,
                     self.config,
+                    async_write=self._async_checkpoint_writes,
                 )
 
             if EXIT.is_set():
@@ -575,6 +578,7 @@ class VERTrainer(PPOTrainer):
 
         [w.close() for w in self._all_workers]
         [w.join() for w in self._all_workers]
+        flush_checkpoints()
 
         if self._is_distributed:
             torch.distributed.barrier()
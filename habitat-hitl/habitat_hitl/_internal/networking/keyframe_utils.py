@@ -4,9 +4,41 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+from typing import Any, Dict, List, Optional
+
 from habitat_hitl.core.types import Keyframe
 
 
+def _ensure_list(keyframe: Keyframe, key: str) -> None:
+    if key not in keyframe:
+        keyframe[key] = []
+
+
+def _ensure_dict(keyframe: Keyframe, key: str) -> None:
+    if key not in keyframe:
+        keyframe[key] = {}
+
+
+def _merge_keyed_updates(
+    con_updates: List[Dict[str, Any]],
+    inc_updates: List[Dict[str, Any]],
+    key_field: str,
+    value_field: str,
+) -> None:
+    """
+    Add or update the entries of con_updates based on their key_field. The
+    index is built once per call so merging is linear in the number of entries.
+    """
+    index = {entry[key_field]: entry for entry in con_updates}
+    for inc_update in inc_updates:
+        con_update = index.get(inc_update[key_field], None)
+        if con_update is not None:
+            con_update[value_field] = inc_update[value_field]
+        else:
+            con_updates.append(inc_update)
+            index[inc_update[key_field]] = inc_update
+
+
 def update_consolidated_keyframe(
     consolidated_keyframe: Keyframe, inc_keyframe: Keyframe
 ) -> None:
@@ -16,79 +48,70 @@ def update_consolidated_keyframe(
     Note the simplification logic here: if an instance is created and then
     later deleted, the latest consolidated keyframe won't have either the
     creation, update, or deletion.
+
+    This works on plain keyframes and is used to merge small batches of
+    incremental keyframes. For a long-lived consolidated keyframe, use
+    ConsolidatedKeyframe which keeps its entries indexed between updates.
     """
     assert consolidated_keyframe is not None
     assert inc_keyframe is not None
 
-    def ensure_list(keyframe, key):
-        if key not in keyframe:
-            keyframe[key] = []
-
-    def ensure_dict(keyframe, key):
-        if key not in keyframe:
-            keyframe[key] = {}
-
     # append loads
     if "loads" in inc_keyframe:
-        ensure_list(consolidated_keyframe, "loads")
+        _ensure_list(consolidated_keyframe, "loads")
         consolidated_keyframe["loads"] += inc_keyframe["loads"]
 
     # add or update stateUpdates based on instanceKey
     if "stateUpdates" in inc_keyframe:
-        ensure_list(consolidated_keyframe, "stateUpdates")
-        for state_update in inc_keyframe["stateUpdates"]:
-            key = state_update["instanceKey"]
-            state = state_update["state"]
-            found = False
-            for con_state_update in consolidated_keyframe["stateUpdates"]:
-                if con_state_update["instanceKey"] == key:
-                    con_state_update["state"] = state
-                    found = True
-            if not found:
-                consolidated_keyframe["stateUpdates"].append(state_update)
+        _ensure_list(consolidated_keyframe, "stateUpdates")
+        _merge_keyed_updates(
+            consolidated_keyframe["stateUpdates"],
+            inc_keyframe["stateUpdates"],
+            "instanceKey",
+            "state",
+        )
 
     # add or update rigUpdates
     if "rigUpdates" in inc_keyframe:
-        for rig_update in inc_keyframe["rigUpdates"]:
-            key = rig_update["id"]
-            pose = rig_update["pose"]
-            found = False
-            for con_rig_update in consolidated_keyframe["rigUpdates"]:
-                if con_rig_update["id"] == key:
-                    con_rig_update["pose"] = pose
-                    found = True
-            if not found:
-                consolidated_keyframe["rigUpdates"].append(rig_update)
+        _ensure_list(consolidated_keyframe, "rigUpdates")
+        _merge_keyed_updates(
+            consolidated_keyframe["rigUpdates"],
+            inc_keyframe["rigUpdates"],
+            "id",
+            "pose",
+        )
 
     # append creations
     if "creations" in inc_keyframe:
-        ensure_list(consolidated_keyframe, "creations")
+        _ensure_list(consolidated_keyframe, "creations")
         consolidated_keyframe["creations"] += inc_keyframe["creations"]
 
     # append rigCreations if skinning transmission is enabled
     if "rigCreations" in inc_keyframe:
-        ensure_list(consolidated_keyframe, "rigCreations")
+        _ensure_list(consolidated_keyframe, "rigCreations")
         consolidated_keyframe["rigCreations"] += inc_keyframe["rigCreations"]
 
     # for a deletion, just remove all references to this instanceKey
     if "deletions" in inc_keyframe:
-        inc_deletions = inc_keyframe["deletions"]
-        for key in inc_deletions:
-            # If we find a corresponding creation in the con keyframe, we can remove
-            # the creation and otherwise skip this deletion. This logic ensures
-            # consolidated keyframes don't get bloated as many items are added
-            # and removed over time.
-            con_creations = consolidated_keyframe["creations"]
-            found = False
-            for entry in con_creations:
-                if entry["instanceKey"] == key:
-                    con_creations.remove(entry)
-                    found = True
-                    break
-            if not found:
+        inc_deletions = set(inc_keyframe["deletions"])
+        _ensure_list(consolidated_keyframe, "creations")
+        con_creations = consolidated_keyframe["creations"]
+        created_keys = {entry["instanceKey"] for entry in con_creations}
+        # If we find a corresponding creation in the con keyframe, we can remove
+        # the creation and otherwise skip this deletion. This logic ensures
+        # consolidated keyframes don't get bloated as many items are added
+        # and removed over time.
+        for key in inc_keyframe["deletions"]:
+            if key not in created_keys:
                 # if we didn't find the creation, then we should still include the deletion
-                ensure_list(consolidated_keyframe, "deletions")
+                _ensure_list(consolidated_keyframe, "deletions")
                 consolidated_keyframe["deletions"].append(key)
+        if not inc_deletions.isdisjoint(created_keys):
+            consolidated_keyframe["creations"] = [
+                entry
+                for entry in con_creations
+                if entry["instanceKey"] not in inc_deletions
+            ]
 
         # remove stateUpdates for the deleted keys
         if "stateUpdates" in consolidated_keyframe:
@@ -102,7 +125,7 @@ def update_consolidated_keyframe(
         inc_message = inc_keyframe["message"]
         # add/update all messages
         for message_key in inc_message:
-            ensure_dict(consolidated_keyframe, "message")
+            _ensure_dict(consolidated_keyframe, "message")
             consolidated_keyframe["message"][message_key] = inc_message[
                 message_key
             ]
@@ -110,6 +133,86 @@ def update_consolidated_keyframe(
     # todo: lights, userTransforms
 
 
+class ConsolidatedKeyframe:
+    """
+    The consolidation of all the incremental keyframes since the server
+    started, see update_consolidated_keyframe for the merging rules.
+
+    Creations and stateUpdates are stored in dicts keyed by instanceKey and
+    rigUpdates in a dict keyed by rig id, so the cost of an update only
+    depends on the size of the incremental keyframe and not on the length of
+    the session. The usual keyframe format is only built by to_keyframe, when
+    a new client needs the consolidated keyframe.
+    """
+
+    def __init__(self) -> None:
+        self._loads: List[Any] = []
+        self._creations: Dict[Any, Dict[str, Any]] = {}
+        self._rig_creations: List[Any] = []
+        self._state_updates: Dict[Any, Dict[str, Any]] = {}
+        self._rig_updates: Dict[Any, Dict[str, Any]] = {}
+        self._deletions: List[Any] = []
+        self._message: Optional[Dict[str, Any]] = None
+
+    def update(self, inc_keyframe: Keyframe) -> None:
+        assert inc_keyframe is not None
+
+        if "loads" in inc_keyframe:
+            self._loads += inc_keyframe["loads"]
+
+        for state_update in inc_keyframe.get("stateUpdates", []):
+            key = state_update["instanceKey"]
+            con_state_update = self._state_updates.get(key, None)
+            if con_state_update is not None:
+                con_state_update["state"] = state_update["state"]
+            else:
+                self._state_updates[key] = dict(state_update)
+
+        for rig_update in inc_keyframe.get("rigUpdates", []):
+            key = rig_update["id"]
+            con_rig_update = self._rig_updates.get(key, None)
+            if con_rig_update is not None:
+                con_rig_update["pose"] = rig_update["pose"]
+            else:
+                self._rig_updates[key] = dict(rig_update)
+
+        for creation in inc_keyframe.get("creations", []):
+            self._creations[creation["instanceKey"]] = creation
+
+        if "rigCreations" in inc_keyframe:
+            self._rig_creations += inc_keyframe["rigCreations"]
+
+        for key in inc_keyframe.get("deletions", []):
+            # A creation followed by a deletion cancels out. Otherwise the
+            # instance was created before the server started, keep the
+            # deletion.
+            if self._creations.pop(key, None) is None:
+                self._deletions.append(key)
+            self._state_updates.pop(key, None)
+
+        if inc_keyframe.get("message"):
+            if self._message is None:
+                self._message = {}
+            self._message.update(inc_keyframe["message"])
+
+        # todo: lights, userTransforms
+
+    def to_keyframe(self) -> Keyframe:
+        """
+        Build the consolidated keyframe in the usual keyframe format.
+        """
+        keyframe = get_empty_keyframe()
+        keyframe["loads"] = list(self._loads)
+        keyframe["creations"] = list(self._creations.values())
+        keyframe["rigCreations"] = list(self._rig_creations)
+        keyframe["stateUpdates"] = list(self._state_updates.values())
+        keyframe["rigUpdates"] = list(self._rig_updates.values())
+        keyframe["deletions"] = list(self._deletions)
+        if self._message is not None:
+            keyframe["message"] = dict(self._message)
+        return keyframe
+
+
 def get_empty_keyframe() -> Keyframe:
     keyframe: Keyframe = dict()
     keyframe["loads"] = []
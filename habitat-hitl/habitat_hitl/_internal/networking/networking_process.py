@@ -25,10 +25,14 @@ from habitat_hitl._internal.networking.interprocess_record import (
     InterprocessRecord,
 )
 from habitat_hitl._internal.networking.keyframe_utils import (
-    get_empty_keyframe,
+    ConsolidatedKeyframe,
     update_consolidated_keyframe,
 )
-from habitat_hitl.core.types import ClientState, ConnectionRecord, Keyframe
+from habitat_hitl._internal.networking.wire_format import (
+    WireFormat,
+    negotiate_wire_format,
+)
+from habitat_hitl.core.types import ConnectionRecord, Keyframe
 
 # Boolean variable to indicate whether to use SSL
 use_ssl = False
@@ -102,7 +106,10 @@ class NetworkManager:
         max_send_rate = None  # 10  # or set None to not limit
         self._send_frequency_limiter = FrequencyLimiter(max_send_rate)
 
-        self._consolidated_keyframe = get_empty_keyframe()
+        self._consolidated_keyframe = ConsolidatedKeyframe()
+        # Encoding of the messages exchanged with the connected client. Chosen
+        # from its connection record, see wire_format.py.
+        self._wire_format = WireFormat()
         self._waiting_for_client_ready = False
         self._needs_consolidated_keyframe = False
         self._waiting_for_app_ready = False
@@ -110,17 +117,16 @@ class NetworkManager:
 
     def update_consolidated_keyframes(self, keyframes: List[Keyframe]) -> None:
         for inc_keyframe in keyframes:
-            update_consolidated_keyframe(
-                self._consolidated_keyframe, inc_keyframe
-            )
+            self._consolidated_keyframe.update(inc_keyframe)
 
     async def receive_client_states(self, websocket: ClientConnection) -> None:
         connection_id = id(websocket)
         async for message in websocket:
             self._recent_connection_activity_timestamp = datetime.now()
             try:
-                # Parse the received message as a JSON object
-                client_state: ClientState = json.loads(message)
+                # Parse the received message (JSON unless the client
+                # negotiated a binary format)
+                client_state = self._wire_format.decode_client_state(message)
 
                 client_state["connectionId"] = connection_id
 
@@ -176,7 +182,7 @@ class NetworkManager:
                     ):
                         self._waiting_for_app_ready = False
 
-                wrapper_json = None
+                message_to_send = None
                 if self.is_okay_to_send_keyframes():
                     # This client may be joining "late", after we've already simulated
                     # some frames. To handle this case, we send a consolidated keyframe as
@@ -186,15 +192,17 @@ class NetworkManager:
                     if self._needs_consolidated_keyframe:
                         keyframes_to_send = inc_keyframes.copy()
                         keyframes_to_send.insert(
-                            0, self._consolidated_keyframe
+                            0, self._consolidated_keyframe.to_keyframe()
                         )
                         self._needs_consolidated_keyframe = False
 
-                    # Convert keyframes to JSON string
-                    wrapper_obj = {"keyframes": keyframes_to_send}
-                    wrapper_json = json.dumps(wrapper_obj)
+                    # Convert keyframes to the client's wire format (a JSON
+                    # string by default)
+                    message_to_send = self._wire_format.encode_keyframes(
+                        keyframes_to_send
+                    )
 
-                # after we've converted our keyframes to send to json, update
+                # after we've converted our keyframes to send, update
                 # our consolidated keyframe
                 self.update_consolidated_keyframes(inc_keyframes)
 
@@ -204,7 +212,7 @@ class NetworkManager:
                     try:
                         # This will raise an exception if the connection is broken,
                         # e.g. if the server lost its network connection.
-                        await websocket.send(wrapper_json)
+                        await websocket.send(message_to_send)
                         self._recent_connection_activity_timestamp = (
                             datetime.now()
                         )
@@ -232,6 +240,7 @@ class NetworkManager:
         # todo: assert that websocket is actually already closed
         print(f"Closed connection to client  {websocket.remote_address}")
         del self._connected_clients[websocket_id]
+        self._wire_format = WireFormat()
 
     def parse_connection_record(self, message: str) -> ConnectionRecord:
         connection_record: ConnectionRecord
@@ -274,6 +283,7 @@ class NetworkManager:
                     f"unexpected message from client: {message}"
                 )
             print("Client is ready!")
+            self._wire_format = negotiate_wire_format(connection_record)
             connection_record["connectionId"] = connection_id
             self._interprocess_record.send_connection_record_to_main_thread(
                 connection_record
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Encodings of the messages exchanged with a remote client.
+
+The client selects the encoding of its connection with optional keys of its
+connection record (the first message it sends, always JSON):
+
+    "keyframeEncoding": "json" (default) or "msgpack"
+    "keyframeCompression": "none" (default) or "zlib"
+
+With the defaults, keyframes are sent as JSON text messages exactly like older
+servers did, so existing clients are unaffected. Any other combination sends
+binary messages made of a one-byte header followed by the payload. The header
+describes the payload (see the FLAG_ constants), so a client that requested
+msgpack but connected to a server without the msgpack package installed can
+still decode the JSON it gets instead. msgpack floats are packed as 32-bit
+floats. Compression is skipped for payloads too small to benefit from it.
+
+Clients may send their client states either as JSON text messages or as
+binary messages using the same header.
+"""
+
+import json
+import zlib
+from typing import List, Union
+
+from habitat_hitl.core.types import ClientState, ConnectionRecord, Keyframe
+
+try:
+    import msgpack
+
+    msgpack_available = True
+except ImportError:
+    msgpack_available = False
+
+JSON_ENCODING = "json"
+MSGPACK_ENCODING = "msgpack"
+NO_COMPRESSION = "none"
+ZLIB_COMPRESSION = "zlib"
+
+ENCODINGS = (JSON_ENCODING, MSGPACK_ENCODING)
+COMPRESSIONS = (NO_COMPRESSION, ZLIB_COMPRESSION)
+
+# Header flags of binary messages.
+FLAG_COMPRESSED = 0x01
+FLAG_MSGPACK = 0x02
+
+# Payloads smaller than this (in bytes) are never compressed.
+MIN_COMPRESSED_SIZE = 512
+
+Message = Union[str, bytes]
+
+
+class WireFormat:
+    """
+    Encodes keyframes sent to a client and decodes the client states it sends
+    back. See the module docstring for the message layout.
+    """
+
+    def __init__(
+        self,
+        encoding: str = JSON_ENCODING,
+        compression: str = NO_COMPRESSION,
+        compression_level: int = 1,
+    ) -> None:
+        assert encoding in ENCODINGS
+        assert compression in COMPRESSIONS
+        assert encoding != MSGPACK_ENCODING or msgpack_available
+        self.encoding = encoding
+        self.compression = compression
+        self.compression_level = compression_level
+
+    @property
+    def is_legacy(self) -> bool:
+        """
+        Whether messages are plain JSON text, as understood by older clients.
+        """
+        return (
+            self.encoding == JSON_ENCODING
+            and self.compression == NO_COMPRESSION
+        )
+
+    def _encode(self, obj) -> Message:
+        if self.is_legacy:
+            return json.dumps(obj)
+
+        flags = 0
+        if self.encoding == MSGPACK_ENCODING:
+            payload = msgpack.packb(obj, use_single_float=True)
+            flags |= FLAG_MSGPACK
+        else:
+            payload = json.dumps(obj).encode("utf-8")
+
+        if (
+            self.compression == ZLIB_COMPRESSION
+            and len(payload) >= MIN_COMPRESSED_SIZE
+        ):
+            payload = zlib.compress(payload, self.compression_level)
+            flags |= FLAG_COMPRESSED
+
+        return bytes((flags,)) + payload
+
+    @staticmethod
+    def _decode(message: Message):
+        if isinstance(message, str):
+            return json.loads(message)
+
+        flags = message[0]
+        payload = memoryview(message)[1:]
+        if flags & FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+        if flags & FLAG_MSGPACK:
+            if not msgpack_available:
+                raise RuntimeError(
+                    "Received a msgpack message but msgpack is not installed."
+                )
+            return msgpack.unpackb(payload)
+        return json.loads(bytes(payload))
+
+    def encode_keyframes(self, keyframes: List[Keyframe]) -> Message:
+        return self._encode({"keyframes": keyframes})
+
+    def decode_keyframes(self, message: Message) -> List[Keyframe]:
+        return self._decode(message)["keyframes"]
+
+    def encode_client_state(self, client_state: ClientState) -> Message:
+        return self._encode(client_state)
+
+    def decode_client_state(self, message: Message) -> ClientState:
+        return self._decode(message)
+
+
+def negotiate_wire_format(connection_record: ConnectionRecord) -> WireFormat:
+    """
+    Pick the wire format requested by the client in its connection record,
+    falling back to JSON for anything this server doesn't support.
+    """
+    encoding = connection_record.get("keyframeEncoding", JSON_ENCODING)
+    compression = connection_record.get("keyframeCompression", NO_COMPRESSION)
+
+    if encoding not in ENCODINGS:
+        print(
+            f"Unknown keyframe encoding '{encoding}' requested by the client. Falling back to {JSON_ENCODING}."
+        )
+        encoding = JSON_ENCODING
+    elif encoding == MSGPACK_ENCODING and not msgpack_available:
+        print(
+            f"The client requested {MSGPACK_ENCODING} keyframes but msgpack isn't installed. Falling back to {JSON_ENCODING}."
+        )
+        encoding = JSON_ENCODING
+
+    if compression not in COMPRESSIONS:
+        print(
+            f"Unknown keyframe compression '{compression}' requested by the client. Falling back to {NO_COMPRESSION}."
+        )
+        compression = NO_COMPRESSION
+
+    return WireFormat(encoding, compression)
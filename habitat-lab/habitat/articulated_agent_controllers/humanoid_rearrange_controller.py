@@ -4,9 +4,10 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import math
 import os
 import pickle as pkl
+from collections import defaultdict
+from typing import Dict, List, Tuple
 
 import magnum as mn
 import numpy as np
@@ -15,6 +16,7 @@ from habitat.articulated_agent_controllers import (
     HumanoidBaseController,
     Motion,
     Pose,
+    motion_cache,
 )
 
 MIN_ANGLE_TURN = 5  # If we turn less than this amount, we can just rotate the base and keep walking motion the same as if we had not rotated
@@ -25,6 +27,7 @@ THRESHOLD_ROTATE_NOT_MOVE = 20  # The rotation angle above which we should only
 DIST_TO_STOP = (
     1e-9  # If the amount to move is this distance, just stop the character
 )
+WALK_POSE_CACHE_KIND = "walk_pose"
 
 
 class HumanoidRearrangeController(HumanoidBaseController):
@@ -48,27 +51,22 @@ class HumanoidRearrangeController(HumanoidBaseController):
         self.min_angle_turn = MIN_ANGLE_TURN
         self.turning_step_amount = TURNING_STEP_AMOUNT
         self.threshold_rotate_not_move = THRESHOLD_ROTATE_NOT_MOVE
+        self._hand_names = ["left_hand", "right_hand"]
+        self._walk_pose_path = os.path.abspath(walk_pose_path)
 
         if not os.path.isfile(walk_pose_path):
             raise RuntimeError(
                 f"Path does {walk_pose_path} not exist. Reach out to the paper authors to obtain this data."
             )
 
-        with open(walk_pose_path, "rb") as f:
-            walk_data = pkl.load(f)
-        walk_info = walk_data["walk_motion"]
-
-        self.walk_motion = Motion(
-            walk_info["joints_array"],
-            walk_info["transform_array"],
-            walk_info["displacement"],
-            walk_info["fps"],
+        asset = motion_cache.load_motion_asset(
+            walk_pose_path, WALK_POSE_CACHE_KIND
         )
+        if asset is None:
+            asset = self._convert_walk_pose_file(walk_pose_path)
+        arrays, metadata = asset
 
-        self.stop_pose = Pose(
-            walk_data["stop_pose"]["joints"].reshape(-1),
-            mn.Matrix4(walk_data["stop_pose"]["transform"]),
-        )
+        self._init_walk_motion(arrays, metadata)
         self.motion_fps = motion_fps
         self.dist_per_step_size = (
             self.walk_motion.displacement[-1] / self.walk_motion.num_poses
@@ -77,9 +75,57 @@ class HumanoidRearrangeController(HumanoidBaseController):
         self.prev_orientation = None
         self.walk_mocap_frame = 0
 
-        self.hand_processed_data = {}
-        self._hand_names = ["left_hand", "right_hand"]
         ## Load hand data
+        # For each hand, the joints, root rotations and root translations of
+        # the reaching poses (see build_ik_vectors), mapped from the cache.
+        self.hand_processed_data = {}
+        for hand_name in self._hand_names:
+            if hand_name in metadata["hands"]:
+                self.vpose_info = metadata["hands"][hand_name]
+                self.hand_processed_data[hand_name] = (
+                    arrays[f"{hand_name}_joints"],
+                    arrays[f"{hand_name}_rotations"],
+                    arrays[f"{hand_name}_translations"],
+                )
+            else:
+                self.hand_processed_data[hand_name] = None
+
+    def _init_walk_motion(self, arrays, metadata):
+        self.walk_motion = Motion(
+            arrays["walk_joints"],
+            arrays["walk_transforms"],
+            arrays["walk_displacement"],
+            metadata["walk_fps"],
+        )
+
+        self.stop_pose = Pose(
+            arrays["stop_joints"].reshape(-1),
+            mn.Matrix4(arrays["stop_transform"]),
+        )
+
+    def _convert_walk_pose_file(self, walk_pose_path):
+        """
+        Loads the pickled walk pose file and builds the reaching poses of the
+        hands, then saves the resulting arrays to the motion cache.
+        """
+        with open(walk_pose_path, "rb") as f:
+            walk_data = pkl.load(f)
+        walk_info = walk_data["walk_motion"]
+
+        arrays = {
+            "walk_joints": walk_info["joints_array"],
+            "walk_transforms": walk_info["transform_array"],
+            "walk_displacement": walk_info["displacement"],
+            "stop_joints": walk_data["stop_pose"]["joints"],
+            "stop_transform": walk_data["stop_pose"]["transform"],
+        }
+        metadata = {
+            "walk_fps": np.asarray(walk_info["fps"]).item(),
+            "hands": {},
+        }
+        # build_ik_vectors uses the walk motion and the stop pose.
+        self._init_walk_motion(arrays, metadata)
+
         for hand_name in self._hand_names:
             if hand_name in walk_data:
                 # Hand data contains two keys, pose_motion and coord_info
@@ -91,7 +137,6 @@ class HumanoidRearrangeController(HumanoidBaseController):
                 #   to compute the target poses
                 hand_data = walk_data[hand_name]
                 nposes = hand_data["pose_motion"]["transform_array"].shape[0]
-                self.vpose_info = hand_data["coord_info"].item()
                 hand_motion = Motion(
                     hand_data["pose_motion"]["joints_array"].reshape(
                         nposes, -1, 4
@@ -100,11 +145,25 @@ class HumanoidRearrangeController(HumanoidBaseController):
                     None,
                     1,
                 )
-                self.hand_processed_data[hand_name] = self.build_ik_vectors(
+                joints, rotations, translations = self.build_ik_vectors(
                     hand_motion
                 )
-            else:
-                self.hand_processed_data[hand_name] = None
+                arrays[f"{hand_name}_joints"] = np.concatenate(joints)
+                arrays[f"{hand_name}_rotations"] = np.concatenate(rotations)
+                arrays[f"{hand_name}_translations"] = np.concatenate(
+                    translations
+                )
+                metadata["hands"][hand_name] = {
+                    k: np.asarray(v).tolist()
+                    for k, v in hand_data["coord_info"].item().items()
+                }
+
+        cached_asset = motion_cache.save_motion_asset(
+            walk_pose_path, WALK_POSE_CACHE_KIND, arrays, metadata
+        )
+        if cached_asset is None:
+            return arrays, metadata
+        return cached_asset
 
     def set_framerate_for_linspeed(self, lin_speed, ang_speed, ctrl_freq):
         """Set the speed of the humanoid according to the simulator speed"""
@@ -487,113 +546,17 @@ class HumanoidRearrangeController(HumanoidBaseController):
         """
         assert hand_data is not None
 
-        joints, rotations, translations = hand_data
-
-        def find_index_quant(minv, maxv, num_bins, value, interp=False):
-            # Find the quantization bins where a given value falls
-            # E.g. if we have 3 points, min=0, max=1, value=0.75, it
-            # will fall between 1 and 2
-            if interp:
-                value = max(min(value, maxv), 0)
-            else:
-                value = max(min(value, maxv), minv)
-            value = min(value, maxv)
-            value_norm = (value - minv) / (maxv - minv)
-
-            index = value_norm * (num_bins - 1)
-
-            lower = min(math.floor(index), num_bins - 1)
-            upper = max(min(math.ceil(index), num_bins - 1), 0)
-            value_norm_t = index - lower
-            if lower < 0:
-                min_poss_val = 0.0
-                lower = (min_poss_val - minv) * (num_bins - 1) / (maxv - minv)
-                value_norm_t = (index - lower) / -lower
-                lower = -1
-
-            return lower, upper, value_norm_t
-
-        def comp_inter(x_i, y_i, z_i):
-            # Given an integer index from 0 to num_bins - 1
-            # on each dimension, compute the final index
-
-            if y_i < 0 or x_i < 0 or z_i < 0:
-                return -1
-            index = (
-                y_i
-                * self.vpose_info["num_bins"][0]
-                * self.vpose_info["num_bins"][2]
-                + x_i * self.vpose_info["num_bins"][2]
-                + z_i
-            )
-            return index
-
-        def normalize_quat(quat_tens):
-            # The last dimension contains the quaternion
-            return quat_tens / np.linalg.norm(quat_tens, axis=-1)[..., None]
-
-        def inter_data(x_i, y_i, z_i, dat, is_quat=False):
-            """
-            General trilinear interpolation function. Performs trilinear interpolation,
-            normalizing the result if the values are represented as quaternions (is_quat)
-
-            :param x_i, y_i, z_i: For the x,y,z dimensions, specifies the lower, upper, and normalized value
-            so that we can perform interpolation in 3 dimensions
-            :param data: the values we want to interpolate.
-            :param is_quat: used to normalize the value in case we are interpolating quaternions
-
-            """
-            x0, y0, z0 = x_i[0], y_i[0], z_i[0]
-            x1, y1, z1 = x_i[1], y_i[1], z_i[1]
-            xd, yd, zd = x_i[2], y_i[2], z_i[2]
-            c000 = dat[comp_inter(x0, y0, z0)]
-            c001 = dat[comp_inter(x0, y0, z1)]
-            c010 = dat[comp_inter(x0, y1, z0)]
-            c011 = dat[comp_inter(x0, y1, z1)]
-            c100 = dat[comp_inter(x1, y0, z0)]
-            c101 = dat[comp_inter(x1, y0, z1)]
-            c110 = dat[comp_inter(x1, y1, z0)]
-            c111 = dat[comp_inter(x1, y1, z1)]
-
-            c00 = c000 * (1 - xd) + c100 * xd
-            c01 = c001 * (1 - xd) + c101 * xd
-            c10 = c010 * (1 - xd) + c110 * xd
-            c11 = c011 * (1 - xd) + c111 * xd
-
-            c0 = c00 * (1 - yd) + c10 * yd
-            c1 = c01 * (1 - yd) + c11 * yd
-
-            c = c0 * (1 - zd) + c1 * zd
-            if is_quat:
-                c = normalize_quat(c)
-
-            return c
-
-        relative_pos = position
-        x_diff, y_diff, z_diff = relative_pos.x, relative_pos.y, relative_pos.z
-        coord_diff = [x_diff, y_diff, z_diff]
-        coord_data = [
-            (
-                self.vpose_info["min"][ind_diff],
-                self.vpose_info["max"][ind_diff],
-                self.vpose_info["num_bins"][ind_diff],
-                coord_diff[ind_diff],
-            )
-            for ind_diff in range(3)
-        ]
-        # each value contains the lower, upper index and distance
-        interp = [False, False, True]
-        x_ind, y_ind, z_ind = [
-            find_index_quant(*data, interp)
-            for interp, data in zip(interp, coord_data)
-        ]
+        res_joints, res_rots, res_trans = interpolate_reach_poses(
+            np.array([[position.x, position.y, position.z]]),
+            hand_data,
+            self.vpose_info,
+        )
+        return self._reach_pose_to_magnum(
+            res_joints[0], res_rots[0], res_trans[0]
+        )
 
-        data_trans = np.concatenate(translations)
-        data_rot = np.concatenate(rotations)
-        data_joint = np.concatenate(joints)
-        res_joint = inter_data(x_ind, y_ind, z_ind, data_joint, is_quat=True)
-        res_trans = inter_data(x_ind, y_ind, z_ind, data_trans)
-        res_rot = inter_data(x_ind, y_ind, z_ind, data_rot, is_quat=True)
+    @staticmethod
+    def _reach_pose_to_magnum(res_joint, res_rot, res_trans):
         quat_rot = mn.Quaternion(mn.Vector3(res_rot[:3]), res_rot[-1])
         joint_list = list(res_joint.reshape(-1))
         transform = mn.Matrix4.from_(
@@ -601,6 +564,25 @@ class HumanoidRearrangeController(HumanoidBaseController):
         )
         return joint_list, transform
 
+    def _get_relative_reach_position(self, obj_pos: mn.Vector3):
+        # Position of obj_pos in the frame of the reaching poses.
+        root_pos = self.obj_transform_base.translation
+        inv_T = (
+            mn.Matrix4.rotation_y(mn.Rad(-np.pi / 2.0))
+            @ mn.Matrix4.rotation_x(mn.Rad(-np.pi / 2.0))
+            @ self.obj_transform_base.inverted()
+        )
+        return inv_T.transform_vector(obj_pos - root_pos)
+
+    def _set_reach_pose(self, curr_poses, curr_transform):
+        self.obj_transform_offset = (
+            mn.Matrix4.rotation_y(mn.Rad(-np.pi / 2.0))
+            @ mn.Matrix4.rotation_z(mn.Rad(-np.pi / 2.0))
+            @ curr_transform
+        )
+
+        self.joint_pose = curr_poses
+
     def calculate_reach_pose(self, obj_pos: mn.Vector3, index_hand=0):
         """
         Updates the humanoid position to reach position obj_pos with the hand.
@@ -610,24 +592,173 @@ class HumanoidRearrangeController(HumanoidBaseController):
         hand_name = self._hand_names[index_hand]
         assert hand_name in self.hand_processed_data
         hand_data = self.hand_processed_data[hand_name]
-        root_pos = self.obj_transform_base.translation
-        inv_T = (
-            mn.Matrix4.rotation_y(mn.Rad(-np.pi / 2.0))
-            @ mn.Matrix4.rotation_x(mn.Rad(-np.pi / 2.0))
-            @ self.obj_transform_base.inverted()
-        )
-        relative_pos = inv_T.transform_vector(obj_pos - root_pos)
+        relative_pos = self._get_relative_reach_position(obj_pos)
 
         # TODO
         if hand_data is not None:
             curr_poses, curr_transform = self._trilinear_interpolate_pose(
                 mn.Vector3(relative_pos), hand_data
             )
+            self._set_reach_pose(curr_poses, curr_transform)
 
-            self.obj_transform_offset = (
-                mn.Matrix4.rotation_y(mn.Rad(-np.pi / 2.0))
-                @ mn.Matrix4.rotation_z(mn.Rad(-np.pi / 2.0))
-                @ curr_transform
+    @staticmethod
+    def calculate_reach_poses(
+        controllers: List["HumanoidRearrangeController"],
+        obj_positions: List[mn.Vector3],
+        index_hand=0,
+    ):
+        """
+        Same as calling calculate_reach_pose(obj_pos, index_hand) on each
+        controller, but interpolates the poses of all the controllers loaded
+        from the same motion file in one batch. Used to update the humanoids
+        of a multi-agent episode together.
+        """
+        assert len(controllers) == len(obj_positions)
+        assert index_hand < 2
+        groups: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for i, controller in enumerate(controllers):
+            hand_name = controller._hand_names[index_hand]
+            if controller.hand_processed_data[hand_name] is not None:
+                groups[(controller._walk_pose_path, hand_name)].append(i)
+
+        for (_, hand_name), indices in groups.items():
+            first = controllers[indices[0]]
+            relative_positions = np.array(
+                [
+                    list(
+                        controllers[i]._get_relative_reach_position(
+                            obj_positions[i]
+                        )
+                    )
+                    for i in indices
+                ]
             )
+            res_joints, res_rots, res_trans = interpolate_reach_poses(
+                relative_positions,
+                first.hand_processed_data[hand_name],
+                first.vpose_info,
+            )
+            for k, i in enumerate(indices):
+                controllers[i]._set_reach_pose(
+                    *controllers[i]._reach_pose_to_magnum(
+                        res_joints[k], res_rots[k], res_trans[k]
+                    )
+                )
+
+
+def _quantize_reach_coordinate(values, minv, maxv, num_bins, interp):
+    """
+    Finds the quantization bins where each of the values falls. E.g. if we
+    have 3 points, min=0, max=1, value=0.75, it will fall between 1 and 2.
+
+    :return: The lower and upper bin indices and the normalized distance to
+        the lower bin. The lower bin is -1 (the stop pose, at the end of the
+        reaching poses) for values below min when interp is set.
+    """
+    if interp:
+        values = np.maximum(np.minimum(values, maxv), 0)
+    else:
+        values = np.maximum(np.minimum(values, maxv), minv)
+    values = np.minimum(values, maxv)
+    values_norm = (values - minv) / (maxv - minv)
+
+    index = values_norm * (num_bins - 1)
+
+    lower = np.minimum(np.floor(index), num_bins - 1)
+    upper = np.maximum(np.minimum(np.ceil(index), num_bins - 1), 0)
+    values_norm_t = index - lower
+    below = lower < 0
+    if below.any():
+        min_poss_val = 0.0
+        lower_below = (min_poss_val - minv) * (num_bins - 1) / (maxv - minv)
+        values_norm_t = np.where(
+            below, (index - lower_below) / -lower_below, values_norm_t
+        )
+        lower = np.where(below, -1, lower)
+
+    return lower.astype(np.int64), upper.astype(np.int64), values_norm_t
+
 
-            self.joint_pose = curr_poses
+def interpolate_reach_poses(positions, hand_data, coord_info):
+    """
+    Computes, doing trilinear interpolation, the humanoid's joints, root
+    rotations and root translations to reach each of the given positions
+    with a hand.
+
+    :param positions: N x 3 array of target positions, in the frame of the
+        reaching poses.
+    :param hand_data: the joints, rotations and translations of the reaching
+        poses of the hand (HumanoidRearrangeController.hand_processed_data).
+    :param coord_info: dictionary with the bounds (min, max) and number of
+        bins (num_bins) of the grid of reaching poses on each dimension.
+    :return: N x num_joints x 4 joint quaternions, N x 4 root rotation
+        quaternions (x, y, z, w) and N x 3 root translations.
+    """
+    joints, rotations, translations = hand_data
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    num_bins = coord_info["num_bins"]
+
+    # Each value contains the lower, upper index and distance
+    x_ind, y_ind, z_ind = [
+        _quantize_reach_coordinate(
+            positions[:, dim],
+            coord_info["min"][dim],
+            coord_info["max"][dim],
+            num_bins[dim],
+            interp=dim == 2,
+        )
+        for dim in range(3)
+    ]
+
+    def comp_inter(x_i, y_i, z_i):
+        # Given an integer index from 0 to num_bins - 1 on each dimension,
+        # compute the final index. Negative indices select the last pose.
+        index = x_i * num_bins[2] + y_i * num_bins[0] * num_bins[2] + z_i
+        return np.where((x_i < 0) | (y_i < 0) | (z_i < 0), -1, index)
+
+    corner_indices = [
+        comp_inter(x_ind[i], y_ind[j], z_ind[k])
+        for i in range(2)
+        for j in range(2)
+        for k in range(2)
+    ]
+
+    def inter_data(dat, is_quat=False):
+        # Blends the 8 corners of the cell of each position, in the same
+        # order as a scalar trilinear interpolation.
+        dat = np.asarray(dat)
+        c000, c001, c010, c011, c100, c101, c110, c111 = [
+            dat[index] for index in corner_indices
+        ]
+
+        def weights(t):
+            # The weights have the precision of the data, as when blending
+            # arrays with Python floats.
+            shape = (-1,) + (1,) * (dat.ndim - 1)
+            return (
+                (1 - t).astype(dat.dtype).reshape(shape),
+                t.astype(dat.dtype).reshape(shape),
+            )
+
+        (xd0, xd), (yd0, yd), (zd0, zd) = [
+            weights(t) for t in (x_ind[2], y_ind[2], z_ind[2])
+        ]
+        c00 = c000 * xd0 + c100 * xd
+        c01 = c001 * xd0 + c101 * xd
+        c10 = c010 * xd0 + c110 * xd
+        c11 = c011 * xd0 + c111 * xd
+
+        c0 = c00 * yd0 + c10 * yd
+        c1 = c01 * yd0 + c11 * yd
+
+        c = c0 * zd0 + c1 * zd
+        if is_quat:
+            # The last dimension contains the quaternion
+            c = c / np.linalg.norm(c, axis=-1)[..., None]
+        return c
+
+    return (
+        inter_data(joints, is_quat=True),
+        inter_data(rotations, is_quat=True),
+        inter_data(translations),
+    )
@@ -12,8 +12,11 @@ import numpy as np
 from habitat.articulated_agent_controllers import (
     HumanoidBaseController,
     Motion,
+    motion_cache,
 )
 
+SEQ_POSE_CACHE_KIND = "seq_pose"
+
 
 class HumanoidSeqPoseController(HumanoidBaseController):
     """
@@ -37,13 +40,17 @@ class HumanoidSeqPoseController(HumanoidBaseController):
                 f"Path does {motion_pose_path} not exist. Reach out to the paper authors to obtain this data."
             )
 
-        motion_info = np.load(motion_pose_path, allow_pickle=True)
-        motion_info = motion_info["pose_motion"]
+        asset = motion_cache.load_motion_asset(
+            motion_pose_path, SEQ_POSE_CACHE_KIND
+        )
+        if asset is None:
+            asset = self._convert_motion_pose_file(motion_pose_path)
+        arrays, metadata = asset
         self.humanoid_motion = Motion(
-            motion_info["joints_array"],
-            motion_info["transform_array"],
-            motion_info["displacement"],
-            motion_info["fps"],
+            arrays["joints"],
+            arrays["transforms"],
+            arrays["displacement"],
+            metadata["fps"],
         )
         self.motion_frame = 0
         self.ref_pose = mn.Matrix4()
@@ -53,6 +60,23 @@ class HumanoidSeqPoseController(HumanoidBaseController):
         self.step_size = int(self.humanoid_motion.fps / self.motion_fps)
         self.base_transform_offset = mn.Matrix4()
 
+    @staticmethod
+    def _convert_motion_pose_file(motion_pose_path):
+        motion_info = np.load(motion_pose_path, allow_pickle=True)
+        motion_info = motion_info["pose_motion"]
+        arrays = {
+            "joints": motion_info["joints_array"],
+            "transforms": motion_info["transform_array"],
+            "displacement": motion_info["displacement"],
+        }
+        metadata = {"fps": np.asarray(motion_info["fps"]).item()}
+        cached_asset = motion_cache.save_motion_asset(
+            motion_pose_path, SEQ_POSE_CACHE_KIND, arrays, metadata
+        )
+        if cached_asset is None:
+            return arrays, metadata
+        return cached_asset
+
     def reset(self, base_transformation: mn.Matrix4) -> None:
         """Reset the joints on the human. (Put in rest state)"""
         super().reset(base_transformation)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""On-disk cache of the humanoid motion files in a memory-mappable layout.
+
+The humanoid controllers load pickled motion files and post-process them on
+construction, in every environment process. The first controller to load a
+file saves the arrays it needs, already post-processed, as one ``.npy`` file
+per array in a cache directory. The next ones (in any process) map these
+files read-only with :py:`np.load(..., mmap_mode="r")`, so all the processes
+of a node share the same pages of the page cache instead of holding a copy
+each.
+
+The cache of a motion file is in the directory :py:`HABITAT_MOTION_CACHE_DIR`
+if this environment variable is set and in a ``.motion_cache`` directory next
+to the motion file otherwise. Setting :py:`HABITAT_MOTION_CACHE_DIR` to an
+empty string disables the cache. An entry is invalidated when the size or the
+modification time of its motion file changes.
+"""
+
+import hashlib
+import json
+import os
+import os.path as osp
+import shutil
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from habitat.core.logging import logger
+
+MOTION_CACHE_DIR_ENV = "HABITAT_MOTION_CACHE_DIR"
+# Bump when the layout of the cached arrays changes.
+_CACHE_VERSION = 1
+_METADATA_FILE = "metadata.json"
+
+MotionAsset = Tuple[Dict[str, np.ndarray], Dict[str, Any]]
+
+
+def _get_entry_dir(source_path: str, kind: str) -> Optional[str]:
+    cache_dir = os.environ.get(MOTION_CACHE_DIR_ENV, None)
+    if cache_dir is None:
+        cache_dir = osp.join(
+            osp.dirname(osp.abspath(source_path)), ".motion_cache"
+        )
+    elif cache_dir == "":
+        return None
+    stat = os.stat(source_path)
+    digest = hashlib.sha1(
+        f"{osp.abspath(source_path)}|{stat.st_size}|{stat.st_mtime_ns}|"
+        f"{kind}|{_CACHE_VERSION}".encode()
+    ).hexdigest()[:16]
+    return osp.join(cache_dir, f"{osp.basename(source_path)}.{kind}.{digest}")
+
+
+def load_motion_asset(source_path: str, kind: str) -> Optional[MotionAsset]:
+    r"""Maps the cached arrays of the motion file :p:`source_path`.
+
+    :param kind: Identifies how the arrays were derived from the file, as
+        several controllers can cache different data of the same file.
+    :return: The read-only memory-mapped arrays and the metadata saved with
+        :ref:`save_motion_asset`, or :py:`None` if they are not cached.
+    """
+    entry_dir = _get_entry_dir(source_path, kind)
+    if entry_dir is None:
+        return None
+    metadata_path = osp.join(entry_dir, _METADATA_FILE)
+    if not osp.isfile(metadata_path):
+        return None
+    with open(metadata_path, "r") as f:
+        metadata = json.load(f)
+    arrays = {
+        name: np.load(osp.join(entry_dir, f"{name}.npy"), mmap_mode="r")
+        for name in metadata.pop("arrays")
+    }
+    return arrays, metadata
+
+
+def save_motion_asset(
+    source_path: str,
+    kind: str,
+    arrays: Dict[str, np.ndarray],
+    metadata: Dict[str, Any],
+) -> Optional[MotionAsset]:
+    r"""Caches :p:`arrays` and the JSON serializable :p:`metadata` derived
+    from the motion file :p:`source_path`.
+
+    The entry is written to a temporary directory that is renamed once
+    complete, so processes converting the same file concurrently don't see
+    partial entries.
+
+    :return: The cached entry, as returned by :ref:`load_motion_asset`, or
+        :py:`None` if the cache is disabled or can't be written.
+    """
+    entry_dir = _get_entry_dir(source_path, kind)
+    if entry_dir is None:
+        return None
+    try:
+        os.makedirs(osp.dirname(entry_dir), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(
+            prefix=f"{osp.basename(entry_dir)}.", dir=osp.dirname(entry_dir)
+        )
+        for name, array in arrays.items():
+            np.save(
+                osp.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array)
+            )
+        with open(osp.join(tmp_dir, _METADATA_FILE), "w") as f:
+            json.dump({"arrays": sorted(arrays.keys()), **metadata}, f)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another process cached the same file first.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except OSError as e:
+        logger.warn(
+            f"Could not cache the motion file {source_path} to {entry_dir}: "
+            f"{e}. Set {MOTION_CACHE_DIR_ENV} to a writable directory to "
+            "share it between processes."
+        )
+        return None
+    return load_motion_asset(source_path, kind)
@@ -790,6 +790,12 @@ class TopDownMapMeasurementConfig(MeasurementConfig):
     # axes aligned bounding boxes
     draw_goal_aabbs: bool = True
     fog_of_war: FogOfWarConfig = FogOfWarConfig()
+    # Number of top-down maps of the scene floors kept in memory, so that
+    # the episodes of a floor only compute its map once. 0 disables it.
+    map_cache_size: int = 4
+    # If set, the top-down maps are also saved to this directory, which can
+    # be shared by all the environments, and loaded back from it.
+    map_cache_dir: Optional[str] = None
 
 
 @dataclass
@@ -1351,9 +1357,19 @@ class DistanceToGoalMeasurementConfig(MeasurementConfig):
     In Navigation tasks only, measures the geodesic distance to the goal.
 
     :property distance_to: If 'POINT' measures the distance to the closest episode goal. If 'VIEW_POINTS' measures the distance to the episode's goal's viewpoint.
+    :property use_distance_field_cache: If True, the distance is interpolated from a grid of geodesic distances to the goals that is shared by all the episodes with the same goals (same `goals_key` for ObjectNav) instead of being queried on every step. The interpolated distances are off by at most `distance_field_cell_size / sqrt(2)` (0.18m with the default cell size). The first distance of every episode (the shortest path length of SPL), the distance when the agent calls stop (which decides the success) and distances within `distance_field_exact_radius` of the goals are always exact.
+    :property distance_field_cell_size: The size in meters of the cells of the distance grid. The maximum interpolation error is `distance_field_cell_size / sqrt(2)`.
+    :property distance_field_exact_radius: Below this interpolated distance to the goals, the exact geodesic distance is used.
+    :property distance_field_max_scenes: The number of scenes whose distance grids are kept in memory, least recently used scenes are evicted first.
+    :property distance_field_cache_dir: If set, the distance grids of a scene are saved to this directory when the episodes switch to another scene, when the scene is evicted and when the environment is closed, and loaded back from it.
     """
     type: str = "DistanceToGoal"
     distance_to: str = "POINT"
+    use_distance_field_cache: bool = False
+    distance_field_cell_size: float = 0.25
+    distance_field_exact_radius: float = 1.0
+    distance_field_max_scenes: int = 4
+    distance_field_cache_dir: Optional[str] = None
 
 
 @dataclass
@@ -1720,6 +1736,36 @@ class HabitatSimV0Config(HabitatBaseConfig):
     enable_gfx_replay_save: bool = False
 
 
+@dataclass
+class NullSimV0Config(HabitatBaseConfig):
+    r"""
+    Options of the synthetic NullSim-v0 simulator
+    (habitat.sims.null_simulator), which only moves the agents on an empty
+    floor and returns random frames. It measures the overhead of the Python
+    layers on machines without habitat-sim.
+
+    :property step_latency: Seconds each step sleeps for, to emulate the
+        rendering and physics time of a real simulator.
+    :property step_latency_jitter: Each step also sleeps for a time drawn
+        uniformly between 0 and this many seconds, so that the environments of
+        a vectorized environment finish their steps in different orders.
+    :property reset_latency: Seconds each reset sleeps for.
+    :property navigable_extent: Half the side of the square floor, centered on
+        the origin, the agents can move on. They collide with its border.
+    :property geodesic_distance_scale: The geodesic distance is the euclidean
+        distance on the floor multiplied by this factor.
+    :property num_frames: Number of random frames each visual sensor cycles
+        through.
+    """
+
+    step_latency: float = 0.0
+    step_latency_jitter: float = 0.0
+    reset_latency: float = 0.0
+    navigable_extent: float = 10.0
+    geodesic_distance_scale: float = 1.0
+    num_frames: int = 4
+
+
 @dataclass
 class SimulatorConfig(HabitatBaseConfig):
     type: str = "Sim-v0"
@@ -1781,6 +1827,8 @@ class SimulatorConfig(HabitatBaseConfig):
     navmesh_include_static_objects: bool = False
 
     habitat_sim_v0: HabitatSimV0Config = HabitatSimV0Config()
+    # Only used by NullSim-v0:
+    null_sim_v0: NullSimV0Config = NullSimV0Config()
     # ep_info is added to the config in some rearrange tasks inside
     # merge_sim_episode_with_object_config
     ep_info: Optional[Any] = None
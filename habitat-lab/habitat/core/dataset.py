@@ -24,12 +24,14 @@ from typing import (
     Sequence,
     TypeVar,
     Union,
+    cast,
 )
 
 import attr
 import numpy as np
 from numpy import ndarray
 
+from habitat.core.episode_store import LazyEpisodes, LazyEpisodesIterator
 from habitat.core.utils import DatasetJSONEncoder, not_none_validator
 
 if TYPE_CHECKING:
@@ -142,12 +144,24 @@ class Dataset(Generic[T]):
         r"""Returns a filter function that takes an episode and returns True if that
         episode is valid under the content_scenes feild of the provided config
         """
-        scenes_to_load = set(config.content_scenes)
+        scene_id_filter = cls.build_content_scene_ids_filter(config)
 
         def _filter(ep: T) -> bool:
+            return scene_id_filter(ep.scene_id)
+
+        return _filter
+
+    @classmethod
+    def build_content_scene_ids_filter(cls, config) -> Callable[[str], bool]:
+        r"""Same as :ref:`build_content_scenes_filter` but the filter function
+        takes the scene id of the episode instead of the episode.
+        """
+        scenes_to_load = set(config.content_scenes)
+
+        def _filter(scene_id: str) -> bool:
             return (
                 ALL_SCENES_MASK in scenes_to_load
-                or cls.scene_from_scene_path(ep.scene_id) in scenes_to_load
+                or cls.scene_from_scene_path(scene_id) in scenes_to_load
             )
 
         return _filter
@@ -160,6 +174,8 @@ class Dataset(Generic[T]):
     @property
     def scene_ids(self) -> List[str]:
         r"""unique scene ids present in the dataset."""
+        if isinstance(self.episodes, LazyEpisodes):
+            return self.episodes.scene_ids()
         return sorted({episode.scene_id for episode in self.episodes})
 
     def get_scene_episodes(self, scene_id: str) -> List[T]:
@@ -168,6 +184,10 @@ class Dataset(Generic[T]):
         :param scene_id: id of scene in scene dataset.
         :return: list of episodes for the :p:`scene_id`.
         """
+        if isinstance(self.episodes, LazyEpisodes):
+            return list(
+                self.episodes.filter_by_scene_id(lambda s: s == scene_id)
+            )
         return list(
             filter(lambda x: x.scene_id == scene_id, iter(self.episodes))
         )
@@ -299,15 +319,26 @@ class Dataset(Generic[T]):
         rand_items = np.random.choice(
             self.num_episodes, num_episodes, replace=False
         ).tolist()
+        is_lazy = isinstance(self.episodes, LazyEpisodes)
         if collate_scene_ids:
             scene_ids: Dict[str, List[int]] = {}
             for rand_ind in rand_items:
-                scene = self.episodes[rand_ind].scene_id
+                if is_lazy:
+                    scene = self.episodes.scene_id_at(rand_ind)  # type: ignore[attr-defined]
+                else:
+                    scene = self.episodes[rand_ind].scene_id
                 if scene not in scene_ids:
                     scene_ids[scene] = []
                 scene_ids[scene].append(rand_ind)
             rand_items = []
             list(map(rand_items.extend, scene_ids.values()))
+        if is_lazy:
+            return self._get_lazy_splits(
+                rand_items,
+                split_lengths,
+                sort_by_episode_id,
+                remove_unused_episodes,
+            )
         ep_ind = 0
         new_episodes = []
         for nn in range(num_splits):
@@ -324,6 +355,35 @@ class Dataset(Generic[T]):
             self.episodes = new_episodes
         return new_datasets
 
+    def _get_lazy_splits(
+        self,
+        rand_items: List[int],
+        split_lengths: List[int],
+        sort_by_episode_id: bool,
+        remove_unused_episodes: bool,
+    ) -> List["Dataset"]:
+        r"""Same as the end of :ref:`get_splits` for datasets whose episodes
+        are :ref:`LazyEpisodes`, the splits share the same backing stores.
+        """
+        episodes = cast(LazyEpisodes, self.episodes)
+        new_datasets = []
+        ep_ind = 0
+        for split_length in split_lengths:
+            split_episodes = episodes.subset(
+                rand_items[ep_ind : ep_ind + split_length]
+            )
+            ep_ind += split_length
+            if sort_by_episode_id:
+                split_episodes = split_episodes.sorted_by(
+                    lambda ep: ep.episode_id
+                )
+            new_dataset = copy.copy(self)  # Creates a shallow copy
+            new_dataset.episodes = split_episodes  # type: ignore[assignment]
+            new_datasets.append(new_dataset)
+        if remove_unused_episodes:
+            self.episodes = episodes.subset(rand_items[:ep_ind])  # type: ignore[assignment]
+        return new_datasets
+
 
 class EpisodeIterator(Iterator[T]):
     r"""Episode Iterator class that gives options for how a list of episodes
@@ -392,11 +452,20 @@ class EpisodeIterator(Iterator[T]):
 
         # sample episodes
         if num_episode_sample >= 0:
-            episodes = np.random.choice(  # type: ignore[assignment]
-                episodes, num_episode_sample, replace=False  # type: ignore[arg-type]
-            )
+            if isinstance(episodes, LazyEpisodes):
+                episodes = episodes.subset(
+                    np.random.choice(
+                        len(episodes), num_episode_sample, replace=False
+                    )
+                )
+            else:
+                episodes = np.random.choice(  # type: ignore[assignment]
+                    episodes, num_episode_sample, replace=False  # type: ignore[arg-type]
+                )
 
-        if not isinstance(episodes, list):
+        # Lazy episodes are kept as is so that they are only materialized
+        # when they are returned by the iterator.
+        if not isinstance(episodes, (list, LazyEpisodes)):
             episodes = list(episodes)
 
         self.episodes = episodes
@@ -405,7 +474,10 @@ class EpisodeIterator(Iterator[T]):
         self.shuffle = shuffle
 
         if shuffle:
-            random.shuffle(self.episodes)
+            if isinstance(self.episodes, LazyEpisodes):
+                self.episodes = self.episodes.shuffled()
+            else:
+                random.shuffle(self.episodes)
 
         if group_by_scene:
             self.episodes = self._group_scenes(self.episodes)
@@ -467,6 +539,12 @@ class EpisodeIterator(Iterator[T]):
         r"""Internal method to switch the scene. Moves remaining episodes
         from current scene to the end and switch to next scene episodes.
         """
+        if isinstance(self._iterator, LazyEpisodesIterator):
+            self._iterator = iter(
+                self._iterator.remaining().with_first_scene_last()
+            )
+            return
+
         grouped_episodes = [
             list(g)
             for k, g in groupby(self._iterator, key=lambda x: x.scene_id)
@@ -483,6 +561,13 @@ class EpisodeIterator(Iterator[T]):
         If self.group_by_scene is true, then shuffle groups of scenes.
         """
         assert self.shuffle
+        if isinstance(self._iterator, LazyEpisodesIterator):
+            lazy_episodes = self._iterator.remaining().shuffled()
+            if self.group_by_scene:
+                lazy_episodes = lazy_episodes.grouped_by_scene()
+            self._iterator = iter(lazy_episodes)
+            return
+
         episodes = list(self._iterator)
 
         random.shuffle(episodes)
@@ -504,6 +589,9 @@ class EpisodeIterator(Iterator[T]):
         """
         assert self.group_by_scene
 
+        if isinstance(episodes, LazyEpisodes):
+            return episodes.grouped_by_scene()  # type: ignore[return-value]
+
         scene_sort_keys: Dict[str, int] = {}
         for e in episodes:
             if e.scene_id not in scene_sort_keys:
@@ -125,6 +125,11 @@ class Measure:
         """
         return self._metric
 
+    def close(self) -> None:
+        r"""Called from :ref:`env.Env` when it is closed, to release or save
+        what the measure holds.
+        """
+
 
 class Metrics(dict):
     r"""Dictionary containing measurements."""
@@ -172,6 +177,10 @@ class Measurements:
             measure_name = measure._get_uuid(*args, task=task, **kwargs)
             task.add_perf_timing(f"measures.{measure_name}", t_start)
 
+    def close(self) -> None:
+        for measure in self.measures.values():
+            measure.close()
+
     def get_metrics(self) -> Metrics:
         r"""Collects measurement from all :ref:`Measure`\ s and returns it
         packaged inside :ref:`Metrics`.
@@ -402,3 +411,6 @@ class EmbodiedTask:
 
     def seed(self, seed: int) -> None:
         return
+
+    def close(self) -> None:
+        self.measurements.close()
@@ -26,6 +26,7 @@ from gym import spaces
 from habitat.config import read_write
 from habitat.core.dataset import BaseEpisode, Dataset, Episode, EpisodeIterator
 from habitat.core.embodied_task import EmbodiedTask, Metrics
+from habitat.core.episode_store import LazyEpisodes
 from habitat.core.simulator import Observations, Simulator
 from habitat.datasets import make_dataset
 from habitat.sims import make_sim
@@ -66,6 +67,8 @@ class Env:
     _episode_over: bool
     _episode_from_iter_on_reset: bool
     _episode_force_changed: bool
+    _scheduled_episode: Optional[Episode]
+    _episode_index_by_key: Optional[Dict[Tuple[str, str], int]]
 
     def __init__(
         self, config: "DictConfig", dataset: Optional[Dataset[Episode]] = None
@@ -93,6 +96,8 @@ class Env:
         self._episode_iterator = None
         self._episode_from_iter_on_reset = True
         self._episode_force_changed = False
+        self._scheduled_episode = None
+        self._episode_index_by_key = None
 
         # load the first scene if dataset is present
         if self._dataset:
@@ -190,6 +195,49 @@ class Env:
         self._dataset.episodes = episodes
         self._setup_episode_iterator()
         self._current_episode = None
+        self._scheduled_episode = None
+        self._episode_index_by_key = None
+        self._episode_force_changed = True
+        self._episode_from_iter_on_reset = True
+
+    def _get_episode_index_by_key(self) -> Dict[Tuple[str, str], int]:
+        if self._episode_index_by_key is None:
+            if isinstance(self.episodes, LazyEpisodes):
+                # Read the ids without materializing all the episodes.
+                keys = self.episodes.episode_keys()
+            else:
+                keys = [
+                    (episode.scene_id, episode.episode_id)
+                    for episode in self.episodes
+                ]
+            self._episode_index_by_key = {key: i for i, key in enumerate(keys)}
+        return self._episode_index_by_key
+
+    @property
+    def episode_keys(self) -> List[Tuple[str, str]]:
+        r"""The :py:`(scene_id, episode_id)` of the episodes of the
+        environment, in order. See :ref:`schedule_next_episode`.
+        """
+        return list(self._get_episode_index_by_key().keys())
+
+    def schedule_next_episode(self, scene_id: str, episode_id: str) -> None:
+        r"""Makes the next :ref:`reset` start the episode :p:`episode_id` of
+        the scene :p:`scene_id` instead of the episode it would otherwise
+        start. Unlike setting :ref:`current_episode`, the current episode can
+        still be stepped until that reset, so the next episode can be chosen
+        before the current one ends.
+        """
+        index = self._get_episode_index_by_key()[(scene_id, episode_id)]
+        self._scheduled_episode = self.episodes[index]
+
+    def reset_episode_iterator(self) -> None:
+        r"""Restarts the episode iterator, so that the next :ref:`reset`
+        starts the first episode again, as after the construction of the
+        environment. Used to run the same episodes again without rebuilding
+        the environment.
+        """
+        self._setup_episode_iterator()
+        self._scheduled_episode = None
         self._episode_force_changed = True
         self._episode_from_iter_on_reset = True
 
@@ -246,7 +294,10 @@ class Env:
         if self._current_episode is not None:
             self._current_episode._shortest_path_cache = None
 
-        if (
+        if self._scheduled_episode is not None:
+            self._current_episode = self._scheduled_episode
+            self._scheduled_episode = None
+        elif (
             self._episode_iterator is not None
             and self._episode_from_iter_on_reset
         ):
@@ -346,6 +397,7 @@ class Env:
         return self._sim.render(mode)
 
     def close(self) -> None:
+        self._task.close()
         self._sim.close()
 
     def __enter__(self):
@@ -402,6 +454,16 @@ class RLEnv(gym.Env):
     def episodes(self, episodes: List[Episode]) -> None:
         self._env.episodes = episodes
 
+    @property
+    def episode_keys(self) -> List[Tuple[str, str]]:
+        return self._env.episode_keys
+
+    def schedule_next_episode(self, scene_id: str, episode_id: str) -> None:
+        self._env.schedule_next_episode(scene_id, episode_id)
+
+    def reset_episode_iterator(self) -> None:
+        self._env.reset_episode_iterator()
+
     def current_episode(self, all_info: bool = False) -> BaseEpisode:
         r"""Returns the current episode of the environment.
 
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Compact binary episode store with lazy, memory-mapped episode loading.
+
+An episode store file contains the episodes of a dataset file in a columnar
+layout:
+
+* the numeric fields shared by most episodes (start positions, start
+  rotations and simple navigation goals) are stored as arrays,
+* the episode ids, scene ids and scene dataset configs are interned in a
+  string table,
+* the remaining, dataset specific, fields of every episode are kept as a
+  compact JSON blob that is only parsed when the episode is materialized.
+
+The arrays are memory-mapped, so opening a store is instantaneous and all
+the workers reading the same file share the same pages. Episodes are only
+turned into :ref:`Episode` objects when they are first accessed, through
+:ref:`LazyEpisodes`.
+
+File layout::
+
+    MAGIC | header length (uint64) | JSON header | padding | columns
+
+Use :py:`python -m habitat.datasets.convert_to_episode_store` to convert
+existing :py:`.json.gz` dataset files.
+"""
+
+import json
+import os
+import random
+import struct
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import attr
+import numpy as np
+
+if TYPE_CHECKING:
+    from habitat.core.dataset import Episode
+
+
+EPISODE_STORE_EXTENSION = ".habeps"
+EPISODE_STORE_VERSION = 1
+
+_MAGIC = b"HABEPS\x00\x00"
+_ALIGNMENT = 64
+_NO_STRING = -1
+
+# Columns and the sentinel used for episodes that do not store the field in
+# the column (in which case the field is kept in the JSON blob).
+_STRING_FIELDS = ("episode_id", "scene_id", "scene_dataset_config")
+_VECTOR_FIELDS = {"start_position": 3, "start_rotation": 4}
+_GOAL_KEYS = {"position", "radius"}
+
+
+def _is_number(x: Any) -> bool:
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+
+def _is_vector(x: Any, size: int) -> bool:
+    return (
+        isinstance(x, (list, tuple))
+        and len(x) == size
+        and all(_is_number(v) for v in x)
+    )
+
+
+def _is_simple_goal(goal: Any) -> bool:
+    return (
+        isinstance(goal, dict)
+        and set(goal.keys()) <= _GOAL_KEYS
+        and _is_vector(goal.get("position", None), 3)
+        and (goal.get("radius", None) is None or _is_number(goal["radius"]))
+    )
+
+
+def _align(n: int) -> int:
+    return (n + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def write_episode_store(
+    path: str,
+    episodes: Sequence[Dict[str, Any]],
+    dataset_fields: Optional[Dict[str, Any]] = None,
+) -> None:
+    r"""Writes :p:`episodes`, the deserialized JSON dictionaries of the
+    episodes of a dataset file, to an episode store at :p:`path`.
+
+    :param path: output file, usually ending with
+        :ref:`EPISODE_STORE_EXTENSION`.
+    :param episodes: the episode dictionaries, as they appear in the
+        :py:`"episodes"` list of the JSON dataset file.
+    :param dataset_fields: the other, dataset-level, fields of the JSON
+        dataset file.
+    """
+    num_episodes = len(episodes)
+    strings: List[str] = []
+    string_to_idx: Dict[str, int] = {}
+
+    def intern(s: str) -> int:
+        if s not in string_to_idx:
+            string_to_idx[s] = len(strings)
+            strings.append(s)
+        return string_to_idx[s]
+
+    columns: Dict[str, np.ndarray] = {
+        k: np.full((num_episodes,), _NO_STRING, dtype=np.int32)
+        for k in _STRING_FIELDS
+    }
+    for k, size in _VECTOR_FIELDS.items():
+        columns[k] = np.full((num_episodes, size), np.nan, dtype=np.float64)
+    has_goals = np.zeros((num_episodes,), dtype=np.uint8)
+    goal_offsets = np.zeros((num_episodes + 1,), dtype=np.int64)
+    goal_positions: List[List[float]] = []
+    goal_radii: List[float] = []
+    blob_offsets = np.zeros((num_episodes + 1,), dtype=np.int64)
+    blobs: List[bytes] = []
+
+    for i, episode in enumerate(episodes):
+        rest = dict(episode)
+        if not isinstance(rest.get("scene_id", None), str):
+            raise ValueError(f"Episode {i} does not have a scene_id")
+        for k in _STRING_FIELDS:
+            if isinstance(rest.get(k, None), str):
+                columns[k][i] = intern(rest.pop(k))
+        for k, size in _VECTOR_FIELDS.items():
+            if _is_vector(rest.get(k, None), size):
+                columns[k][i] = rest.pop(k)
+
+        goals = rest.get("goals", None)
+        if isinstance(goals, list) and all(_is_simple_goal(g) for g in goals):
+            del rest["goals"]
+            has_goals[i] = 1
+            for g in goals:
+                goal_positions.append(g["position"])
+                radius = g.get("radius", None)
+                goal_radii.append(np.nan if radius is None else radius)
+        goal_offsets[i + 1] = len(goal_positions)
+
+        blob = json.dumps(rest, separators=(",", ":")).encode("utf-8")
+        blobs.append(blob)
+        blob_offsets[i + 1] = blob_offsets[i] + len(blob)
+
+    columns["has_goals"] = has_goals
+    columns["goal_offsets"] = goal_offsets
+    columns["goal_positions"] = np.array(
+        goal_positions, dtype=np.float64
+    ).reshape(-1, 3)
+    columns["goal_radii"] = np.array(goal_radii, dtype=np.float64)
+    columns["blob_offsets"] = blob_offsets
+    columns["blobs"] = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+
+    column_specs: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, arr in columns.items():
+        column_specs[name] = {
+            "dtype": arr.dtype.str,
+            "shape": list(arr.shape),
+            "offset": offset,
+        }
+        offset = _align(offset + arr.nbytes)
+
+    header = json.dumps(
+        {
+            "version": EPISODE_STORE_VERSION,
+            "num_episodes": num_episodes,
+            "strings": strings,
+            "dataset": dataset_fields if dataset_fields is not None else {},
+            "columns": column_specs,
+        }
+    ).encode("utf-8")
+    data_start = _align(len(_MAGIC) + 8 + len(header))
+
+    # Write to a temporary file and rename it so that readers never see a
+    # partially written store.
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, arr in columns.items():
+            f.seek(data_start + column_specs[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+class EpisodeStore:
+    r"""Read-only, memory-mapped view of an episode store file written by
+    :ref:`write_episode_store`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            magic = f.read(len(_MAGIC))
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not an episode store file")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        if header["version"] != EPISODE_STORE_VERSION:
+            raise ValueError(
+                f"Unsupported episode store version {header['version']} in "
+                f"{path}, expected {EPISODE_STORE_VERSION}"
+            )
+
+        self.num_episodes: int = header["num_episodes"]
+        self.strings: List[str] = header["strings"]
+        self.dataset_fields: Dict[str, Any] = header["dataset"]
+
+        data_start = _align(len(_MAGIC) + 8 + header_len)
+        self._columns: Dict[str, np.ndarray] = {}
+        for name, spec in header["columns"].items():
+            shape = tuple(spec["shape"])
+            if int(np.prod(shape)) == 0:
+                # np.memmap cannot map empty arrays.
+                self._columns[name] = np.zeros(shape, dtype=spec["dtype"])
+            else:
+                self._columns[name] = np.memmap(
+                    path,
+                    dtype=np.dtype(spec["dtype"]),
+                    mode="r",
+                    offset=data_start + spec["offset"],
+                    shape=shape,
+                )
+
+    def __len__(self) -> int:
+        return self.num_episodes
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def episode_dict(self, index: int) -> Dict[str, Any]:
+        r"""Returns the deserialized JSON dictionary of episode :p:`index`,
+        as it appeared in the original dataset file.
+        """
+        c = self._columns
+        start, end = c["blob_offsets"][index], c["blob_offsets"][index + 1]
+        episode = json.loads(c["blobs"][start:end].tobytes().decode("utf-8"))
+
+        for k in _STRING_FIELDS:
+            string_idx = int(c[k][index])
+            if string_idx != _NO_STRING:
+                episode[k] = self.strings[string_idx]
+        for k in _VECTOR_FIELDS:
+            vec = c[k][index]
+            if not np.isnan(vec[0]):
+                episode[k] = vec.tolist()
+
+        if c["has_goals"][index]:
+            g_start = c["goal_offsets"][index]
+            g_end = c["goal_offsets"][index + 1]
+            episode["goals"] = [
+                {
+                    "position": c["goal_positions"][gi].tolist(),
+                    "radius": None
+                    if np.isnan(c["goal_radii"][gi])
+                    else float(c["goal_radii"][gi]),
+                }
+                for gi in range(g_start, g_end)
+            ]
+
+        return episode
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+
+@attr.s(auto_attribs=True)
+class EpisodeSource:
+    r"""An episode store and how to turn its entries into episodes.
+
+    :property store: the episode store.
+    :property deserialize: builds the :ref:`Episode` out of the episode
+        dictionary and its index in the store.
+    :property resolve_scene_id: maps the scene id stored in the file to the
+        scene id of the materialized episode.
+    :property resolve_episode_id: maps the episode id stored in the file
+        (:py:`None` if it is not a string) and the index of the episode to
+        the episode id of the materialized episode.
+
+    The materialized episodes are kept, so that the changes made to an
+    episode are seen through all the :ref:`LazyEpisodes` sharing the source,
+    as with a list of episodes.
+    """
+    store: EpisodeStore
+    deserialize: Callable[[Dict[str, Any], int], "Episode"]
+    resolve_scene_id: Callable[[str], str]
+    resolve_episode_id: Callable[[Optional[str], int], Optional[str]]
+    _episodes: Dict[int, "Episode"] = attr.ib(
+        factory=dict, init=False, repr=False
+    )
+
+    def materialize(self, index: int) -> "Episode":
+        episode = self._episodes.get(index, None)
+        if episode is None:
+            episode = self.deserialize(self.store.episode_dict(index), index)
+            self._episodes[index] = episode
+        return episode
+
+    def episode_key(self, index: int) -> Tuple[str, Optional[str]]:
+        r"""The :py:`(scene_id, episode_id)` of episode :p:`index`, read from
+        the string table unless the episode is already materialized or its
+        id is not a string.
+        """
+        episode = self._episodes.get(index, None)
+        if episode is not None:
+            return episode.scene_id, episode.episode_id
+        strings = self.store.strings
+        episode_idx = int(self.store.column("episode_id")[index])
+        episode_id = self.resolve_episode_id(
+            strings[episode_idx] if episode_idx != _NO_STRING else None, index
+        )
+        if episode_id is None:
+            # The id is only in the JSON blob.
+            episode = self.materialize(index)
+            return episode.scene_id, episode.episode_id
+        scene_idx = int(self.store.column("scene_id")[index])
+        return self.resolve_scene_id(strings[scene_idx]), episode_id
+
+
+class LazyEpisodes(Sequence["Episode"]):
+    r"""A sequence of episodes backed by one or more :ref:`EpisodeSource`.
+    Episodes are materialized the first time they are accessed and are then
+    kept by their source. Until then, only the index arrays and scene ids are
+    kept in memory.
+
+    The operations used to split, filter, shuffle and group the episodes
+    (:ref:`subset`, :ref:`filter_by_scene_id`, :ref:`shuffled`,
+    :ref:`grouped_by_scene`) work on these arrays and never materialize
+    episodes.
+    """
+
+    def __init__(
+        self,
+        sources: List[EpisodeSource],
+        source_idx: np.ndarray,
+        local_idx: np.ndarray,
+        scene_codes: Optional[np.ndarray] = None,
+        scene_names: Optional[List[str]] = None,
+    ) -> None:
+        self._sources = sources
+        self._source_idx = np.asarray(source_idx, dtype=np.int64)
+        self._local_idx = np.asarray(local_idx, dtype=np.int64)
+        if scene_codes is None or scene_names is None:
+            scene_codes, scene_names = self._compute_scene_codes()
+        self._scene_codes = scene_codes
+        self._scene_names = scene_names
+
+    @classmethod
+    def from_source(cls, source: EpisodeSource) -> "LazyEpisodes":
+        n = len(source.store)
+        return cls(
+            [source],
+            np.zeros((n,), dtype=np.int64),
+            np.arange(n, dtype=np.int64),
+        )
+
+    def _compute_scene_codes(self):
+        scene_names: List[str] = []
+        name_to_code: Dict[str, int] = {}
+        scene_codes = np.zeros((len(self._local_idx),), dtype=np.int64)
+        for s_idx, source in enumerate(self._sources):
+            mask = self._source_idx == s_idx
+            if not mask.any():
+                continue
+            strings = source.store.strings
+            lut = np.full((max(len(strings), 1),), -1, dtype=np.int64)
+            scene_col = np.asarray(source.store.column("scene_id"))
+            for string_idx in np.unique(scene_col[self._local_idx[mask]]):
+                name = source.resolve_scene_id(strings[string_idx])
+                if name not in name_to_code:
+                    name_to_code[name] = len(scene_names)
+                    scene_names.append(name)
+                lut[string_idx] = name_to_code[name]
+            scene_codes[mask] = lut[scene_col[self._local_idx[mask]]]
+        return scene_codes, scene_names
+
+    def __len__(self) -> int:
+        return len(self._local_idx)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return self.subset(np.arange(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("episode index out of range")
+        source = self._sources[self._source_idx[index]]
+        return source.materialize(int(self._local_idx[index]))
+
+    def __iter__(self) -> "LazyEpisodesIterator":
+        return LazyEpisodesIterator(self)
+
+    def scene_id_at(self, index: int) -> str:
+        return self._scene_names[self._scene_codes[index]]
+
+    def episode_keys(self) -> List[Tuple[str, Optional[str]]]:
+        r"""The :py:`(scene_id, episode_id)` of the episodes, in order. Only
+        the string tables of the stores are read, the episodes are not
+        materialized.
+        """
+        return [
+            self._sources[s_idx].episode_key(local_idx)
+            for s_idx, local_idx in zip(
+                self._source_idx.tolist(), self._local_idx.tolist()
+            )
+        ]
+
+    def scene_ids(self) -> List[str]:
+        r"""The unique scene ids of the episodes."""
+        return sorted(
+            self._scene_names[c] for c in np.unique(self._scene_codes)
+        )
+
+    def subset(
+        self, indices: Union[Sequence[int], np.ndarray]
+    ) -> "LazyEpisodes":
+        r"""Returns the episodes at :p:`indices`, in that order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return LazyEpisodes(
+            self._sources,
+            self._source_idx[indices],
+            self._local_idx[indices],
+            self._scene_codes[indices],
+            self._scene_names,
+        )
+
+    def concat(self, other: "LazyEpisodes") -> "LazyEpisodes":
+        r"""Appends the episodes of :p:`other`. The scene codes of both are
+        kept, only those of :p:`other` are mapped to the merged scene ids,
+        so loading the sources one at a time never scans them again.
+        """
+        scene_names = list(self._scene_names)
+        name_to_code = {name: code for code, name in enumerate(scene_names)}
+        code_map = np.zeros((max(len(other._scene_names), 1),), np.int64)
+        for other_code, name in enumerate(other._scene_names):
+            if name not in name_to_code:
+                name_to_code[name] = len(scene_names)
+                scene_names.append(name)
+            code_map[other_code] = name_to_code[name]
+        scene_codes = np.concatenate(
+            [self._scene_codes, code_map[other._scene_codes]]
+        )
+
+        if other._sources is self._sources:
+            sources = self._sources
+            other_source_idx = other._source_idx
+        else:
+            sources = self._sources + other._sources
+            other_source_idx = other._source_idx + len(self._sources)
+        return LazyEpisodes(
+            sources,
+            np.concatenate([self._source_idx, other_source_idx]),
+            np.concatenate([self._local_idx, other._local_idx]),
+            scene_codes,
+            scene_names,
+        )
+
+    def filter_by_scene_id(
+        self, scene_id_filter: Callable[[str], bool]
+    ) -> "LazyEpisodes":
+        r"""Keeps the episodes whose scene id passes :p:`scene_id_filter`.
+        The filter is evaluated once per unique scene id.
+        """
+        keep_codes = np.array(
+            [scene_id_filter(name) for name in self._scene_names], dtype=bool
+        )
+        if len(keep_codes) == 0:
+            return self
+        return self.subset(np.nonzero(keep_codes[self._scene_codes])[0])
+
+    def shuffled(self) -> "LazyEpisodes":
+        r"""Returns a shuffled copy, using :py:`random.shuffle` like
+        shuffling a list of episodes would.
+        """
+        order = list(range(len(self)))
+        random.shuffle(order)
+        return self.subset(order)
+
+    def grouped_by_scene(self) -> "LazyEpisodes":
+        r"""Groups episodes by scene, ordering the groups by the first
+        occurrence of their scene. The order within a group is preserved.
+        """
+        if len(self) == 0:
+            return self
+        _, first_idx, inverse = np.unique(
+            self._scene_codes, return_index=True, return_inverse=True
+        )
+        group_rank = np.argsort(np.argsort(first_idx))
+        return self.subset(np.argsort(group_rank[inverse], kind="stable"))
+
+    def with_first_scene_last(self) -> "LazyEpisodes":
+        r"""Moves the first run of consecutive episodes sharing a scene to
+        the end.
+        """
+        if len(self) == 0:
+            return self
+        changes = np.nonzero(self._scene_codes != self._scene_codes[0])[0]
+        if len(changes) == 0:
+            return self
+        split = int(changes[0])
+        order = np.concatenate(
+            [np.arange(split, len(self)), np.arange(0, split)]
+        )
+        return self.subset(order)
+
+    def sorted_by(self, key: Callable[["Episode"], Any]) -> "LazyEpisodes":
+        r"""Sorts the episodes by :p:`key`. This materializes every episode
+        once to compute the keys.
+        """
+        keys = [key(ep) for ep in self]
+        return self.subset(sorted(range(len(self)), key=keys.__getitem__))
+
+
+class LazyEpisodesIterator(Iterator["Episode"]):
+    r"""Iterator over :ref:`LazyEpisodes` that can return the episodes it
+    has not yielded yet without materializing them.
+    """
+
+    def __init__(self, episodes: LazyEpisodes, start: int = 0) -> None:
+        self._episodes = episodes
+        self._pos = start
+
+    def __iter__(self) -> "LazyEpisodesIterator":
+        return self
+
+    def __next__(self) -> "Episode":
+        if self._pos >= len(self._episodes):
+            raise StopIteration
+        episode = self._episodes[self._pos]
+        self._pos += 1
+        return episode
+
+    def remaining(self) -> LazyEpisodes:
+        return self._episodes.subset(np.arange(self._pos, len(self._episodes)))
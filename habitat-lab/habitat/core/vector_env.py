@@ -5,8 +5,10 @@
 # LICENSE file in the root directory of this source tree.
 
 import signal
+import time
 import warnings
 from multiprocessing.connection import Connection
+from multiprocessing.connection import wait as wait_for_connections
 from multiprocessing.context import BaseContext
 from queue import Queue
 from threading import Thread
@@ -43,6 +45,11 @@ from habitat.utils.pickle5_multiprocessing import (
     CloudpickleWrapper,
     ConnectionWrapper,
 )
+from habitat.utils.shared_memory_observations import (
+    SharedMemoryObservationSlabs,
+    SharedMemoryObservationWriter,
+    maybe_encode,
+)
 
 try:
     # Use torch.multiprocessing if we can.
@@ -65,6 +72,7 @@ RENDER_COMMAND = "render"
 CLOSE_COMMAND = "close"
 CALL_COMMAND = "call"
 COUNT_EPISODES_COMMAND = "count_episodes"
+SETUP_SHARED_MEMORY_COMMAND = "setup_shared_memory"
 
 EPISODE_OVER_NAME = "episode_over"
 GET_METRICS_NAME = "get_metrics"
@@ -100,6 +108,14 @@ class _ReadWrapper:
     read_fn: Callable[[], Any]
     rank: int
     is_waiting: bool = False
+    # Returns if the next read wouldn't block.
+    poll_fn: Optional[Callable[[], bool]] = None
+    # Object that can be passed to `multiprocessing.connection.wait` to wait
+    # for the next read, if any.
+    waitable: Any = None
+
+    def poll(self) -> bool:
+        return self.is_waiting and (self.poll_fn is None or self.poll_fn())
 
     def __call__(self) -> Any:
         if not self.is_waiting:
@@ -151,6 +167,7 @@ class VectorEnv:
     _connection_read_fns: List[_ReadWrapper]
     _connection_write_fns: List[_WriteWrapper]
     _batch_renderer: Optional[EnvBatchRenderer] = None
+    _shared_memory_slabs: List[SharedMemoryObservationSlabs]
 
     def __init__(
         self,
@@ -159,6 +176,7 @@ class VectorEnv:
         auto_reset_done: bool = True,
         multiprocessing_start_method: str = "forkserver",
         workers_ignore_signals: bool = False,
+        use_shared_memory_observations: bool = False,
     ) -> None:
         """..
 
@@ -176,8 +194,14 @@ class VectorEnv:
             used, the subproccess  must be started before any other GPU usage.
         :param workers_ignore_signals: Whether or not workers will ignore SIGINT and SIGTERM
             and instead will only exit when :ref:`close` is called
+        :param use_shared_memory_observations: Whether or not workers write
+            fixed-size :py:`spaces.Box` observations into preallocated shared
+            memory instead of pickling them through the pipe. The returned
+            observations are then views on the shared memory that are only
+            valid until the next step or reset of the same environment.
         """
         self._is_closed = True
+        self._shared_memory_slabs = []
 
         assert (
             env_fn_args is not None and len(env_fn_args) > 0
@@ -226,6 +250,9 @@ class VectorEnv:
         ]
         self._paused: List[Tuple] = []
 
+        if use_shared_memory_observations:
+            self._setup_shared_memory_observations()
+
     @property
     def num_envs(self):
         r"""number of individual environments."""
@@ -253,6 +280,7 @@ class VectorEnv:
         env = EnvCountEpisodeWrapper(EnvObsDictWrapper(env_fn(*env_fn_args)))
         if parent_pipe is not None:
             parent_pipe.close()
+        shm_writer: Optional[SharedMemoryObservationWriter] = None
         try:
             command, data = connection_read_fn()
             while command != CLOSE_COMMAND:
@@ -262,11 +290,18 @@ class VectorEnv:
                     if auto_reset_done and done:
                         observations = env.reset()
 
-                    connection_write_fn((observations, reward, done, info))
+                    connection_write_fn(
+                        (
+                            maybe_encode(shm_writer, observations),
+                            reward,
+                            done,
+                            info,
+                        )
+                    )
 
                 elif command == RESET_COMMAND:
                     observations = env.reset()
-                    connection_write_fn(observations)
+                    connection_write_fn(maybe_encode(shm_writer, observations))
 
                 elif command == RENDER_COMMAND:
                     connection_write_fn(env.render(*data[0], **data[1]))
@@ -288,6 +323,12 @@ class VectorEnv:
                 elif command == COUNT_EPISODES_COMMAND:
                     connection_write_fn(len(env.episodes))
 
+                elif command == SETUP_SHARED_MEMORY_COMMAND:
+                    if shm_writer is not None:
+                        shm_writer.close()
+                    shm_writer = SharedMemoryObservationWriter(data)
+                    connection_write_fn(None)
+
                 else:
                     raise NotImplementedError(f"Unknown command {command}")
 
@@ -298,6 +339,8 @@ class VectorEnv:
         finally:
             if child_pipe is not None:
                 child_pipe.close()
+            if shm_writer is not None:
+                shm_writer.close()
             env.close()
 
     def _spawn_workers(
@@ -335,7 +378,7 @@ class VectorEnv:
             worker_conn.close()
 
         read_fns = [
-            _ReadWrapper(p.recv, rank)
+            _ReadWrapper(p.recv, rank, poll_fn=p.poll, waitable=p.conn)
             for rank, p in enumerate(parent_connections)
         ]
         write_fns = [
@@ -345,6 +388,26 @@ class VectorEnv:
 
         return read_fns, write_fns
 
+    def _setup_shared_memory_observations(self) -> None:
+        r"""Allocates the shared memory observation slabs of every worker
+        from its observation space and hands them over to the worker. Reads
+        from the worker then transparently turn the headers sent by the
+        worker back into observation dictionaries.
+        """
+        self._shared_memory_slabs = [
+            SharedMemoryObservationSlabs(obs_space)
+            for obs_space in self.observation_spaces
+        ]
+        for write_fn, slabs in zip(
+            self._connection_write_fns, self._shared_memory_slabs
+        ):
+            write_fn((SETUP_SHARED_MEMORY_COMMAND, slabs.specs))
+        for read_fn, slabs in zip(
+            self._connection_read_fns, self._shared_memory_slabs
+        ):
+            read_fn()
+            read_fn.read_fn = slabs.wrap_read_fn(read_fn.read_fn)
+
     def current_episodes(self):
         for write_fn in self._connection_write_fns:
             write_fn((CALL_COMMAND, (CURRENT_EPISODE_NAME, None)))
@@ -419,17 +482,57 @@ class VectorEnv:
         self.async_step_at(index_env, action)
         return self.wait_step_at(index_env)
 
-    def async_step(self, data: Sequence[Union[int, np.ndarray]]) -> None:
+    def async_step(
+        self,
+        data: Sequence[Union[int, np.ndarray]],
+        index_envs: Optional[Sequence[int]] = None,
+    ) -> None:
         r"""Asynchronously step in the environments.
 
         :param data: list of size _num_envs containing keyword arguments to
             pass to :ref:`step` method for each Environment. For example,
             :py:`[1, 3 ,5 , ...]`.
+        :param index_envs: If set, only steps these environments, with the
+            corresponding actions of :p:`data`.
         """
+        if index_envs is None:
+            index_envs = range(len(data))
+        assert len(index_envs) == len(data)
 
-        for index_env, act in enumerate(data):
+        for index_env, act in zip(index_envs, data):
             self.async_step_at(index_env, act)
 
+    def poll_step_at(self, index_env: int) -> bool:
+        r"""Whether the result of the last :ref:`async_step_at` of
+        :p:`index_env` is available, so :ref:`wait_step_at` won't block.
+        """
+        return self._connection_read_fns[index_env].poll()
+
+    @profiling_wrapper.RangeContext("wait_any_step")
+    def wait_any_step(self, index_envs: Sequence[int]) -> List[int]:
+        r"""Waits until the step of at least one of :p:`index_envs` is done.
+
+        :param index_envs: Environments that were stepped asynchronously
+            and whose results haven't been read yet.
+        :return: The environments of :p:`index_envs` whose results can be
+            read without blocking, in the order of :p:`index_envs`.
+        """
+        read_fns = [self._connection_read_fns[i] for i in index_envs]
+        assert all(read_fn.is_waiting for read_fn in read_fns)
+        waitables = [read_fn.waitable for read_fn in read_fns]
+        while True:
+            ready = [
+                index_env
+                for index_env, read_fn in zip(index_envs, read_fns)
+                if read_fn.poll()
+            ]
+            if len(ready) > 0:
+                return ready
+            if all(waitable is not None for waitable in waitables):
+                wait_for_connections(waitables)
+            else:
+                time.sleep(1e-4)
+
     @profiling_wrapper.RangeContext("wait_step")
     def wait_step(self) -> List[Any]:
         r"""Wait until all the asynchronous environments have synchronized."""
@@ -478,6 +581,10 @@ class VectorEnv:
         for _, _, _, process in self._paused:
             process.join()
 
+        for slabs in self._shared_memory_slabs:
+            slabs.close()
+        self._shared_memory_slabs = []
+
         self._is_closed = True
 
         if self._batch_renderer != None:
@@ -660,7 +767,7 @@ class ThreadedVectorEnv(VectorEnv):
             thread.start()
 
         read_fns = [
-            _ReadWrapper(q.get, rank)
+            _ReadWrapper(q.get, rank, poll_fn=lambda q=q: not q.empty())
             for rank, q in enumerate(parent_read_queues)
         ]
         write_fns = [
@@ -668,3 +775,10 @@ class ThreadedVectorEnv(VectorEnv):
             for q, read_wrapper in zip(parent_write_queues, read_fns)
         ]
         return read_fns, write_fns
+
+    def _setup_shared_memory_observations(self) -> None:
+        # Threads already share their observations with the main thread
+        # without any copy.
+        logger.warn(
+            "Shared memory observations have no effect with ThreadedVectorEnv."
+        )
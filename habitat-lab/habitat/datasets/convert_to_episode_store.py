@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Script to convert `.json.gz` dataset files to the binary episode store format
+(see `habitat/core/episode_store.py`). The per-scene `content/{scene}.json.gz`
+files next to the dataset file are converted as well. For example:
+```
+python -m habitat.datasets.convert_to_episode_store --type ObjectNav-v1 data/datasets/objectnav/hm3d/v1/val/val.json.gz
+```
+writes `val.habeps` and `content/{scene}.habeps`. Point
+`habitat.dataset.data_path` to the `.habeps` file to use it.
+"""
+
+import argparse
+import gzip
+import json
+import os
+from typing import Any, Dict, Optional, Type
+
+from habitat.core.dataset import Dataset
+from habitat.core.episode_store import (
+    EPISODE_STORE_EXTENSION,
+    write_episode_store,
+)
+from habitat.core.registry import registry
+from habitat.datasets.pointnav.pointnav_dataset import (
+    CONTENT_SCENES_PATH_FIELD,
+)
+
+JSON_GZ_EXTENSION = ".json.gz"
+
+
+def _store_path(json_path: str) -> str:
+    assert json_path.endswith(JSON_GZ_EXTENSION), json_path
+    return json_path[: -len(JSON_GZ_EXTENSION)] + EPISODE_STORE_EXTENSION
+
+
+def _read_json_gz(json_path: str) -> Dict[str, Any]:
+    with gzip.open(json_path, "rt") as f:
+        return json.loads(f.read())
+
+
+def convert_file(
+    json_path: str,
+    dataset_cls: Type[Dataset],
+    content_scenes_path: Optional[str] = None,
+    deserialized: Optional[Dict[str, Any]] = None,
+) -> str:
+    r"""Converts a single `.json.gz` dataset file and returns the path of the
+    written episode store.
+    """
+    if deserialized is None:
+        deserialized = _read_json_gz(json_path)
+
+    preprocess = getattr(dataset_cls, "preprocess_deserialized", None)
+    if preprocess is not None:
+        deserialized = preprocess(deserialized)
+
+    episodes = deserialized.pop("episodes")
+    if content_scenes_path is not None:
+        deserialized[CONTENT_SCENES_PATH_FIELD] = content_scenes_path
+
+    out_path = _store_path(json_path)
+    write_episode_store(out_path, episodes, dataset_fields=deserialized)
+    print(f"Wrote {len(episodes)} episodes to {out_path}")
+    return out_path
+
+
+def convert_dataset(json_path: str, dataset_type: str) -> None:
+    dataset_cls = registry.get_dataset(dataset_type)
+    assert dataset_cls is not None, f"Could not find dataset {dataset_type}"
+
+    deserialized = _read_json_gz(json_path)
+    default_content_path: str = deserialized.get(
+        CONTENT_SCENES_PATH_FIELD,
+        getattr(
+            dataset_cls,
+            "content_scenes_path",
+            "{data_path}/content/{scene}" + JSON_GZ_EXTENSION,
+        ),
+    )
+    content_prefix, content_ext = default_content_path.split("{scene}")
+    content_dir = content_prefix.format(data_path=os.path.dirname(json_path))
+
+    content_scenes_path = None
+    if os.path.isdir(content_dir) and content_ext == JSON_GZ_EXTENSION:
+        content_scenes_path = (
+            default_content_path[: -len(JSON_GZ_EXTENSION)]
+            + EPISODE_STORE_EXTENSION
+        )
+        for filename in sorted(os.listdir(content_dir)):
+            if filename.endswith(JSON_GZ_EXTENSION):
+                convert_file(os.path.join(content_dir, filename), dataset_cls)
+
+    convert_file(json_path, dataset_cls, content_scenes_path, deserialized)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--type",
+        required=True,
+        help="Registered name of the dataset, for instance PointNav-v1.",
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="The `.json.gz` dataset files to convert."
+    )
+    args = parser.parse_args()
+
+    for path in args.paths:
+        convert_dataset(path, args.type)
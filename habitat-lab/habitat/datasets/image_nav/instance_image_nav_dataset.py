@@ -5,16 +5,12 @@
 # LICENSE file in the root directory of this source tree.
 
 import json
-import os
 from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from habitat.core.registry import registry
 from habitat.core.simulator import AgentState
 from habitat.core.utils import DatasetFloatJSONEncoder
-from habitat.datasets.pointnav.pointnav_dataset import (
-    DEFAULT_SCENE_PATH_PREFIX,
-    PointNavDatasetV1,
-)
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
 from habitat.tasks.nav.instance_image_nav_task import (
     InstanceImageGoal,
     InstanceImageGoalNavEpisode,
@@ -64,6 +60,21 @@ class InstanceImageNavDatasetV1(PointNavDatasetV1):
 
         return g
 
+    def _load_dataset_fields(self, deserialized: Dict[str, Any]) -> None:
+        for k, g in deserialized.get("goals", {}).items():
+            self.goals[k] = self._deserialize_goal(g)
+
+    def _deserialize_episode(
+        self,
+        episode: Dict[str, Any],
+        index: int,
+        scenes_dir: Optional[str] = None,
+    ) -> InstanceImageGoalNavEpisode:
+        episode = InstanceImageGoalNavEpisode(**episode)
+        episode.scene_id = self._resolve_scene_id(episode.scene_id, scenes_dir)
+        episode.goals = [self.goals[episode.goal_key]]
+        return episode
+
     def from_json(
         self, json_str: str, scenes_dir: Optional[str] = None
     ) -> None:
@@ -73,20 +84,9 @@ class InstanceImageNavDatasetV1(PointNavDatasetV1):
             return
 
         assert "goals" in deserialized
+        self._load_dataset_fields(deserialized)
 
-        for k, g in deserialized["goals"].items():
-            self.goals[k] = self._deserialize_goal(g)
-
-        for episode in deserialized["episodes"]:
-            episode = InstanceImageGoalNavEpisode(**episode)
-
-            if scenes_dir is not None:
-                if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
-                    episode.scene_id = episode.scene_id[
-                        len(DEFAULT_SCENE_PATH_PREFIX) :
-                    ]
-
-                episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
-
-            episode.goals = [self.goals[episode.goal_key]]
-            self.episodes.append(episode)  # type: ignore[attr-defined]
+        for i, episode in enumerate(deserialized["episodes"]):
+            self.episodes.append(  # type: ignore[attr-defined]
+                self._deserialize_episode(episode, i, scenes_dir)
+            )
@@ -4,16 +4,14 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import json
-import os
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
 
+from habitat.core.episode_store import LazyEpisodes
 from habitat.core.registry import registry
 from habitat.core.simulator import AgentState, ShortestPathPoint
 from habitat.core.utils import DatasetFloatJSONEncoder
 from habitat.datasets.pointnav.pointnav_dataset import (
     CONTENT_SCENES_PATH_FIELD,
-    DEFAULT_SCENE_PATH_PREFIX,
     PointNavDatasetV1,
 )
 from habitat.tasks.nav.object_nav_task import (
@@ -71,10 +69,22 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
 
         return result
 
+    @staticmethod
+    def preprocess_deserialized(
+        deserialized: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        if (
+            len(deserialized["episodes"]) > 0
+            and "goals_by_category" not in deserialized
+        ):
+            deserialized = ObjectNavDatasetV1.dedup_goals(deserialized)
+        return deserialized
+
     def __init__(self, config: Optional["DictConfig"] = None) -> None:
         self.goals_by_category = {}
         super().__init__(config)
-        self.episodes = list(self.episodes)
+        if not isinstance(self.episodes, LazyEpisodes):
+            self.episodes = list(self.episodes)
 
     @staticmethod
     def __deserialize_goal(serialized_goal: Dict[str, Any]) -> ObjectGoal:
@@ -87,10 +97,7 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
 
         return g
 
-    def from_json(
-        self, json_str: str, scenes_dir: Optional[str] = None
-    ) -> None:
-        deserialized = json.loads(json_str)
+    def _load_dataset_fields(self, deserialized: Dict[str, Any]) -> None:
         if CONTENT_SCENES_PATH_FIELD in deserialized:
             self.content_scenes_path = deserialized[CONTENT_SCENES_PATH_FIELD]
 
@@ -117,39 +124,38 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
             self.category_to_scene_annotation_category_id.keys()
         ), "category_to_task and category_to_mp3d must have the same keys"
 
-        if len(deserialized["episodes"]) == 0:
-            return
-
-        if "goals_by_category" not in deserialized:
-            deserialized = self.dedup_goals(deserialized)
-
-        for k, v in deserialized["goals_by_category"].items():
+        for k, v in deserialized.get("goals_by_category", {}).items():
             self.goals_by_category[k] = [self.__deserialize_goal(g) for g in v]
 
-        for i, episode in enumerate(deserialized["episodes"]):
-            episode = ObjectGoalNavEpisode(**episode)
-            episode.episode_id = str(i)
-
-            if scenes_dir is not None:
-                if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
-                    episode.scene_id = episode.scene_id[
-                        len(DEFAULT_SCENE_PATH_PREFIX) :
-                    ]
-
-                episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
+    def _resolve_episode_id(
+        self, episode_id: Optional[str], index: int
+    ) -> str:
+        return str(index)
+
+    def _deserialize_episode(
+        self,
+        episode: Dict[str, Any],
+        index: int,
+        scenes_dir: Optional[str] = None,
+    ) -> ObjectGoalNavEpisode:
+        episode = ObjectGoalNavEpisode(**episode)
+        episode.episode_id = self._resolve_episode_id(
+            episode.episode_id, index
+        )
+        episode.scene_id = self._resolve_scene_id(episode.scene_id, scenes_dir)
 
-            episode.goals = self.goals_by_category[episode.goals_key]
+        episode.goals = self.goals_by_category[episode.goals_key]
 
-            if episode.shortest_paths is not None:
-                for path in episode.shortest_paths:
-                    for p_index, point in enumerate(path):
-                        if point is None or isinstance(point, (int, str)):
-                            point = {
-                                "action": point,
-                                "rotation": None,
-                                "position": None,
-                            }
+        if episode.shortest_paths is not None:
+            for path in episode.shortest_paths:
+                for p_index, point in enumerate(path):
+                    if point is None or isinstance(point, (int, str)):
+                        point = {
+                            "action": point,
+                            "rotation": None,
+                            "position": None,
+                        }
 
-                        path[p_index] = ShortestPathPoint(**point)
+                    path[p_index] = ShortestPathPoint(**point)
 
-            self.episodes.append(episode)  # type: ignore [attr-defined]
+        return episode
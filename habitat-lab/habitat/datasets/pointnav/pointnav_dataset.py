@@ -8,10 +8,17 @@ import gzip
 import json
 import os
 import pickle
+from functools import partial
 from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from habitat.config import read_write
 from habitat.core.dataset import ALL_SCENES_MASK, Dataset
+from habitat.core.episode_store import (
+    EPISODE_STORE_EXTENSION,
+    EpisodeSource,
+    EpisodeStore,
+    LazyEpisodes,
+)
 from habitat.core.registry import registry
 from habitat.tasks.nav.nav import (
     NavigationEpisode,
@@ -93,11 +100,13 @@ class PointNavDatasetV1(Dataset):
 
     def _load_from_file(self, fname: str, scenes_dir: str) -> None:
         """
-        Load the data from a file into `self.episodes`. This can load `.pickle`
-        or `.json.gz` file formats.
+        Load the data from a file into `self.episodes`. This can load `.pickle`,
+        `.json.gz` or episode store (`.habeps`) file formats.
         """
 
-        if fname.endswith(".pickle"):
+        if fname.endswith(EPISODE_STORE_EXTENSION):
+            self._load_from_episode_store(fname, scenes_dir=scenes_dir)
+        elif fname.endswith(".pickle"):
             # NOTE: not implemented for pointnav
             with open(fname, "rb") as f:
                 self.from_binary(pickle.load(f), scenes_dir=scenes_dir)
@@ -137,6 +146,10 @@ class PointNavDatasetV1(Dataset):
 
                 self._load_from_file(scene_filename, config.scenes_dir)
 
+        elif isinstance(self.episodes, LazyEpisodes):
+            self.episodes = self.episodes.filter_by_scene_id(
+                self.build_content_scene_ids_filter(config)
+            )
         else:
             self.episodes = list(
                 filter(self.build_content_scenes_filter(config), self.episodes)
@@ -150,28 +163,97 @@ class PointNavDatasetV1(Dataset):
     ) -> None:
         raise NotImplementedError()
 
-    def from_json(
-        self, json_str: str, scenes_dir: Optional[str] = None
+    def _load_from_episode_store(
+        self, fname: str, scenes_dir: Optional[str] = None
     ) -> None:
-        deserialized = json.loads(json_str)
+        r"""Loads the episode store at :p:`fname`. Only the dataset-level
+        fields are deserialized, the episodes are materialized on demand by
+        :ref:`LazyEpisodes`.
+        """
+        store = EpisodeStore(fname)
+        self._load_dataset_fields(store.dataset_fields)
+        if len(store) == 0:
+            return
+
+        episodes = LazyEpisodes.from_source(
+            EpisodeSource(
+                store=store,
+                deserialize=partial(
+                    self._deserialize_episode, scenes_dir=scenes_dir
+                ),
+                resolve_scene_id=partial(
+                    self._resolve_scene_id, scenes_dir=scenes_dir
+                ),
+                resolve_episode_id=self._resolve_episode_id,
+            )
+        )
+        if isinstance(self.episodes, LazyEpisodes):
+            self.episodes = self.episodes.concat(episodes)
+        elif len(self.episodes) == 0:
+            self.episodes = episodes  # type: ignore[assignment]
+        else:
+            self.episodes.extend(episodes)
+
+    @staticmethod
+    def preprocess_deserialized(
+        deserialized: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        r"""Normalizes the deserialized JSON dataset file before its
+        episodes are deserialized. Also applied before writing an episode
+        store.
+        """
+        return deserialized
+
+    def _load_dataset_fields(self, deserialized: Dict[str, Any]) -> None:
+        r"""Loads the dataset-level fields of a deserialized dataset file."""
         if CONTENT_SCENES_PATH_FIELD in deserialized:
             self.content_scenes_path = deserialized[CONTENT_SCENES_PATH_FIELD]
 
-        for episode in deserialized["episodes"]:
-            episode = NavigationEpisode(**episode)
+    def _resolve_scene_id(
+        self, scene_id: str, scenes_dir: Optional[str] = None
+    ) -> str:
+        if scenes_dir is not None:
+            if scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
+                scene_id = scene_id[len(DEFAULT_SCENE_PATH_PREFIX) :]
+
+            scene_id = os.path.join(scenes_dir, scene_id)
+        return scene_id
 
-            if scenes_dir is not None:
-                if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
-                    episode.scene_id = episode.scene_id[
-                        len(DEFAULT_SCENE_PATH_PREFIX) :
-                    ]
+    def _resolve_episode_id(
+        self, episode_id: Optional[str], index: int
+    ) -> Optional[str]:
+        r"""The id of the episode at position :p:`index` of its dataset file,
+        whose stored id is :p:`episode_id`.
+        """
+        return episode_id
+
+    def _deserialize_episode(
+        self,
+        episode: Dict[str, Any],
+        index: int,
+        scenes_dir: Optional[str] = None,
+    ) -> NavigationEpisode:
+        r"""Builds the episode at position :p:`index` of its dataset file out
+        of its deserialized JSON dictionary.
+        """
+        episode = NavigationEpisode(**episode)
+        episode.scene_id = self._resolve_scene_id(episode.scene_id, scenes_dir)
 
-                episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
+        for g_index, goal in enumerate(episode.goals):
+            episode.goals[g_index] = NavigationGoal(**goal)
+        if episode.shortest_paths is not None:
+            for path in episode.shortest_paths:
+                for p_index, point in enumerate(path):
+                    path[p_index] = ShortestPathPoint(**point)
+        return episode
 
-            for g_index, goal in enumerate(episode.goals):
-                episode.goals[g_index] = NavigationGoal(**goal)
-            if episode.shortest_paths is not None:
-                for path in episode.shortest_paths:
-                    for p_index, point in enumerate(path):
-                        path[p_index] = ShortestPathPoint(**point)
-            self.episodes.append(episode)
+    def from_json(
+        self, json_str: str, scenes_dir: Optional[str] = None
+    ) -> None:
+        deserialized = self.preprocess_deserialized(json.loads(json_str))
+        self._load_dataset_fields(deserialized)
+
+        for i, episode in enumerate(deserialized["episodes"]):
+            self.episodes.append(
+                self._deserialize_episode(episode, i, scenes_dir)
+            )
@@ -4,34 +4,113 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+"""
+Fills the cache of the articulated agent starts of a rearrange dataset (see
+`ArticulatedAgentStartCache`), so that the environments don't sample them on
+their first reset of every episode. The episodes are split between
+`--num-workers` processes. The episodes whose starts are already cached are
+skipped, so the script can be run again to resume or to complete a cache,
+including from several nodes at the same time with `--worker-offset` and
+`--total-workers`.
+"""
+
 import argparse
+import multiprocessing
+from typing import List, Optional
 
 from tqdm import tqdm
 
 import habitat
 
 
-def generate_inits(cfg_path, opts):
+def generate_inits(
+    cfg_path: str,
+    opts: Optional[List[str]],
+    worker_idx: int = 0,
+    num_workers: int = 1,
+) -> int:
+    """
+    Resets to every `num_workers`-th episode of the dataset, starting at
+    `worker_idx`, whose starts are not cached yet.
+
+    :return: The number of episodes reset.
+    """
+    opts = list(opts or []) + ["habitat.task.should_save_to_cache=True"]
     config = habitat.get_config(cfg_path, opts)
+    num_reset = 0
     with habitat.Env(config=config) as env:
-        for i in tqdm(range(env.number_of_episodes)):
+        episodes = env.episodes[worker_idx::num_workers]
+        episodes = [
+            episode
+            for episode in episodes
+            if not env.task.is_articulated_agent_start_cached(
+                episode.episode_id
+            )
+        ]
+        for i, episode in enumerate(
+            tqdm(episodes, disable=worker_idx != 0, position=0)
+        ):
             if i % 100 == 0:
                 # Print the dataset we are generating initializations for. This
                 # is useful when this script runs for a long time and we don't
                 # know which dataset the job is for.
                 print(cfg_path, config.habitat.dataset.data_path)
+            env.current_episode = episode
             env.reset()
+            num_reset += 1
+    return num_reset
+
+
+def _generate_inits_worker(args) -> int:
+    return generate_inits(*args)
+
 
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cfg-path", type=str, required=True)
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=1,
+        help="Number of processes generating the starts on this node.",
+    )
+    parser.add_argument(
+        "--worker-offset",
+        type=int,
+        default=0,
+        help="Index of the first worker of this node, to split the dataset "
+        "between several nodes.",
+    )
+    parser.add_argument(
+        "--total-workers",
+        type=int,
+        default=None,
+        help="Number of workers over all the nodes. Defaults to "
+        "--num-workers.",
+    )
+    parser.add_argument(
+        "opts",
+        default=None,
+        nargs=argparse.REMAINDER,
+        help="Modify config options from command line",
+    )
+    args = parser.parse_args()
+    total_workers = args.total_workers or args.num_workers
+    assert args.worker_offset + args.num_workers <= total_workers
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--cfg-path", type=str, required=True)
-parser.add_argument(
-    "opts",
-    default=None,
-    nargs=argparse.REMAINDER,
-    help="Modify config options from command line",
-)
-args = parser.parse_args()
+    worker_args = [
+        (args.cfg_path, args.opts, args.worker_offset + i, total_workers)
+        for i in range(args.num_workers)
+    ]
+    if args.num_workers == 1:
+        num_reset = [_generate_inits_worker(worker_args[0])]
+    else:
+        with multiprocessing.get_context("spawn").Pool(
+            args.num_workers
+        ) as pool:
+            num_reset = pool.map(_generate_inits_worker, worker_args)
+    print(f"Generated the starts of {sum(num_reset)} episodes.")
 
 
-generate_inits(args.cfg_path, args.opts)
+if __name__ == "__main__":
+    main()
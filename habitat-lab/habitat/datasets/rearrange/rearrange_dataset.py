@@ -73,16 +73,38 @@ class RearrangeDatasetV0(PointNavDatasetV1):
 
         super().__init__(config)
 
+    def _resolve_scene_id(
+        self, scene_id: str, scenes_dir: Optional[str] = None
+    ) -> str:
+        # Rearrange scene ids are not relative to the scenes directory.
+        return scene_id
+
+    def _resolve_episode_id(
+        self, episode_id: Optional[str], index: int
+    ) -> str:
+        return str(index)
+
+    def _deserialize_episode(
+        self,
+        episode: Dict[str, Any],
+        index: int,
+        scenes_dir: Optional[str] = None,
+    ) -> RearrangeEpisode:
+        rearrangement_episode = RearrangeEpisode(**episode)
+        rearrangement_episode.episode_id = self._resolve_episode_id(
+            rearrangement_episode.episode_id, index
+        )
+        return rearrangement_episode
+
     def from_json(
         self, json_str: str, scenes_dir: Optional[str] = None
     ) -> None:
         deserialized = json.loads(json_str)
 
         for i, episode in enumerate(deserialized["episodes"]):
-            rearrangement_episode = RearrangeEpisode(**episode)
-            rearrangement_episode.episode_id = str(i)
-
-            self.episodes.append(rearrangement_episode)
+            self.episodes.append(
+                self._deserialize_episode(episode, i, scenes_dir)
+            )
 
     def to_binary(self) -> Dict[str, Any]:
         """
@@ -482,6 +482,28 @@ class RearrangeEpisodeGenerator:
 
         return generated_episodes
 
+    def get_scenes(self) -> List[str]:
+        """
+        Get the handles of all the scenes which the configured scene sampler can sample.
+        """
+        return self._scene_sampler.get_scenes()
+
+    def generate_scene_episodes(
+        self, scene: str, num_episodes: int = 1, verbose: bool = False
+    ) -> List[RearrangeEpisode]:
+        """
+        Generate a fixed number of episodes in a single scene, regardless of the configured scene sampler.
+        Used to split the generation of a dataset by scene.
+
+        :param scene: The handle of the scene, as returned by :ref:`get_scenes`.
+        """
+        scene_sampler = self._scene_sampler
+        self._scene_sampler = samplers.SingleSceneSampler(scene)
+        try:
+            return self.generate_episodes(num_episodes, verbose)
+        finally:
+            self._scene_sampler = scene_sampler
+
     def generate_single_episode(self) -> Optional[RearrangeEpisode]:
         """
         Generate a single episode, sampling the scene.
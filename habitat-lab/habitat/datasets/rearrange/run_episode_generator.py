@@ -4,16 +4,24 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import functools
+import gzip
+import json
+import multiprocessing
 import os
 import os.path as osp
 import random
-from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, List
+import sys
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import numpy as np
 from omegaconf import OmegaConf
 
 from habitat.core.logging import logger
+from habitat.datasets.rearrange.combine_datasets import combine_datasets
 from habitat.datasets.rearrange.rearrange_dataset import RearrangeDatasetV0
 from habitat.datasets.rearrange.rearrange_generator import (
     RearrangeEpisodeGenerator,
@@ -285,6 +293,217 @@ def print_metadata_mediator(ep_gen):
     logger.info("==================================")
 
 
+@dataclass
+class GenerationShard:
+    """
+    A chunk of the episodes of a scene, generated by one worker of :ref:`run_sharded_generation`.
+    """
+
+    scene: str
+    # Name of the scene in the dataset, used to name the content file of the scene.
+    scene_name: str
+    chunk: int
+    num_episodes: int
+    seed: int
+    # Id of the first episode of the shard, the ids of the episodes of the dataset are unique across shards.
+    first_episode_id: int = 0
+
+    @property
+    def file_name(self) -> str:
+        return f"{self.scene_name}.{self.chunk:04d}.json.gz"
+
+
+def plan_shards(
+    scenes: List[str],
+    num_episodes: int,
+    episodes_per_shard: Optional[int] = None,
+    seed: int = 0,
+) -> List[GenerationShard]:
+    """
+    Split the generation of num_episodes episodes evenly between the scenes, and the episodes of each scene into chunks of at most episodes_per_shard episodes.
+    The seed of a shard only depends on seed, its scene and its chunk, so that the episodes don't depend on the number of workers.
+    The shards are numbered with consecutive ranges of episode ids, in the order of the sorted scenes.
+    """
+    shards = []
+    first_episode_id = 0
+    scenes = sorted(scenes)
+    for scene_index, scene in enumerate(scenes):
+        num_scene_episodes = num_episodes // len(scenes) + int(
+            scene_index < num_episodes % len(scenes)
+        )
+        shard_size = episodes_per_shard or max(num_scene_episodes, 1)
+        scene_name = RearrangeDatasetV0.scene_from_scene_path(scene)
+        for chunk, start in enumerate(
+            range(0, num_scene_episodes, shard_size)
+        ):
+            shard_num_episodes = min(shard_size, num_scene_episodes - start)
+            shards.append(
+                GenerationShard(
+                    scene=scene,
+                    scene_name=scene_name,
+                    chunk=chunk,
+                    num_episodes=shard_num_episodes,
+                    seed=zlib.crc32(f"{seed}|{scene}|{chunk}".encode()),
+                    first_episode_id=first_episode_id,
+                )
+            )
+            first_episode_id += shard_num_episodes
+    return shards
+
+
+# The episode generator of a worker process of run_sharded_generation, created once by _init_shard_worker.
+_worker_ep_gen: Optional[RearrangeEpisodeGenerator] = None
+
+
+def _init_shard_worker(
+    cfg: "DictConfig", limit_scene_set: Optional[str], num_episodes: int
+) -> None:
+    global _worker_ep_gen
+    _worker_ep_gen = RearrangeEpisodeGenerator(
+        cfg=cfg, limit_scene_set=limit_scene_set, num_episodes=num_episodes
+    )
+
+
+def _generate_shard(
+    shard: GenerationShard, shards_dir: str
+) -> Tuple[GenerationShard, Optional[float]]:
+    """
+    Generates the episodes of a shard and writes them to shards_dir. The file is only renamed to its final name once complete, so that an interrupted run can be resumed.
+
+    :return: The shard and the time it took, or None if the generation failed.
+    """
+    start_time = time.time()
+    random.seed(shard.seed)
+    np.random.seed(shard.seed)
+    try:
+        dataset = RearrangeDatasetV0()
+        dataset.episodes += _worker_ep_gen.generate_scene_episodes(
+            shard.scene, shard.num_episodes
+        )
+        # The counter of the generator depends on the shards the worker generated before, number the episodes from the plan instead.
+        for i, episode in enumerate(dataset.episodes):
+            episode.episode_id = str(shard.first_episode_id + i)
+        shard_path = osp.join(shards_dir, shard.file_name)
+        tmp_path = f"{shard_path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt") as f:
+            f.write(dataset.to_json())
+        os.replace(tmp_path, shard_path)
+    except Exception:
+        logger.exception(
+            f"Generation of shard {shard.file_name} failed, re-run to retry it."
+        )
+        return shard, None
+    return shard, time.time() - start_time
+
+
+def run_sharded_generation(
+    cfg: "DictConfig",
+    output_path: str,
+    num_episodes: int,
+    num_workers: int,
+    episodes_per_shard: Optional[int] = None,
+    limit_scene_set: Optional[str] = None,
+    seed: int = 0,
+) -> bool:
+    """
+    Generate a dataset in num_workers processes, split by scene into shards.
+
+    Each worker holds its own RearrangeEpisodeGenerator. Completed shards are written to a shards/ directory next to output_path and skipped when the generation is run again with the same arguments. Once all the shards are complete, the shards of each scene are combined into content/{scene}.json.gz, which RearrangeDatasetV0 loads through its content_scenes_path, and output_path is written without any episode.
+
+    :return: Whether all the shards are complete.
+    """
+    # Resolve the scenes of the scene sampler.
+    with RearrangeEpisodeGenerator(
+        cfg=cfg, limit_scene_set=limit_scene_set, num_episodes=num_episodes
+    ) as ep_gen:
+        scenes = ep_gen.get_scenes()
+    shards = plan_shards(scenes, num_episodes, episodes_per_shard, seed)
+
+    dataset_dir = osp.dirname(osp.abspath(output_path))
+    shards_dir = osp.join(dataset_dir, "shards")
+    os.makedirs(shards_dir, exist_ok=True)
+    plan_path = osp.join(shards_dir, "plan.json")
+    plan = [asdict(shard) for shard in shards]
+    if osp.exists(plan_path):
+        with open(plan_path, "r") as f:
+            if json.load(f) != plan:
+                raise RuntimeError(
+                    f"{shards_dir} holds the shards of a different generation (scenes, number of episodes, shard size or seed), remove it or use another output path."
+                )
+    else:
+        with open(plan_path, "w") as f:
+            json.dump(plan, f, indent=2)
+
+    todo = [
+        shard
+        for shard in shards
+        if not osp.exists(osp.join(shards_dir, shard.file_name))
+    ]
+    logger.info(
+        f"Generating {len(todo)}/{len(shards)} shards of {len(scenes)} scenes with {num_workers} workers."
+    )
+
+    start_time = time.time()
+    num_generated = 0
+    num_failed = 0
+    with multiprocessing.get_context("spawn").Pool(
+        num_workers,
+        initializer=_init_shard_worker,
+        initargs=(cfg, limit_scene_set, num_episodes),
+    ) as pool:
+        for shard, shard_time in pool.imap_unordered(
+            functools.partial(_generate_shard, shards_dir=shards_dir), todo
+        ):
+            if shard_time is None:
+                num_failed += 1
+                continue
+            num_generated += shard.num_episodes
+            logger.info(
+                f"Shard {shard.file_name}: {shard.num_episodes} episodes in {shard_time:.0f} seconds."
+            )
+    elapsed = time.time() - start_time
+    logger.info(
+        f"Generated {num_generated} episodes in {elapsed:.0f} seconds with {num_workers} workers: {3600 * num_generated / max(elapsed, 1e-6):.1f} episodes/hour."
+    )
+    if num_failed > 0:
+        logger.error(
+            f"{num_failed} shards failed, re-run the same command to generate them."
+        )
+        return False
+
+    # Combine the shards of each scene into its content file.
+    content_dir = osp.join(dataset_dir, "content")
+    os.makedirs(content_dir, exist_ok=True)
+    scene_shards: Dict[str, List[str]] = {}
+    for shard in shards:
+        scene_shards.setdefault(shard.scene_name, []).append(
+            osp.join(shards_dir, shard.file_name)
+        )
+    for scene_name, shard_paths in scene_shards.items():
+        combine_datasets(
+            shard_paths, osp.join(content_dir, f"{scene_name}.json.gz")
+        )
+    with gzip.open(output_path, "wt") as f:
+        f.write(RearrangeDatasetV0().to_json())
+    return True
+
+
+def get_output_path(out: Optional[str]) -> str:
+    """
+    Resolve the path of the generated dataset from the --out argument.
+    """
+    if out is None:
+        # default
+        return "rearrange_ep_dataset.json.gz"
+    elif osp.isdir(out) or out.endswith("/"):
+        # append a default filename
+        return osp.abspath(out) + "/rearrange_ep_dataset.json.gz"
+    elif not out.endswith(".json.gz"):
+        # filename
+        return out + ".json.gz"
+    return out
+
+
 def get_arg_parser():
     import argparse
 
@@ -346,6 +565,18 @@ def get_arg_parser():
         help="The number of episodes to generate.",
     )
     parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=0,
+        help="Generate the episodes in this many processes, split by scene into shards which are kept when the generation is interrupted and skipped when it is resumed. The episodes of each scene are written to content/{scene}.json.gz next to the output file.",
+    )
+    parser.add_argument(
+        "--episodes-per-shard",
+        type=int,
+        default=None,
+        help="With --num-workers, the maximum number of episodes of a shard. Defaults to all the episodes of a scene.",
+    )
     return parser
 
 
@@ -369,6 +600,18 @@ if __name__ == "__main__":
 
     logger.info(f"\n\nModified Config:\n{cfg}\n\n")
 
+    if args.num_workers > 0 and not args.list:
+        complete = run_sharded_generation(
+            cfg,
+            get_output_path(args.out),
+            args.num_episodes,
+            args.num_workers,
+            episodes_per_shard=args.episodes_per_shard,
+            limit_scene_set=args.limit_scene_set,
+            seed=args.seed if args.seed is not None else 0,
+        )
+        sys.exit(0 if complete else 1)
+
     dataset = RearrangeDatasetV0()
     with RearrangeEpisodeGenerator(
         cfg=cfg,
@@ -391,19 +634,7 @@ if __name__ == "__main__":
             dataset.episodes += ep_gen.generate_episodes(
                 args.num_episodes, args.verbose
             )
-            output_path = args.out
-            if output_path is None:
-                # default
-                output_path = "rearrange_ep_dataset.json.gz"
-            elif osp.isdir(output_path) or output_path.endswith("/"):
-                # append a default filename
-                output_path = (
-                    osp.abspath(output_path) + "/rearrange_ep_dataset.json.gz"
-                )
-            else:
-                # filename
-                if not output_path.endswith(".json.gz"):
-                    output_path += ".json.gz"
+            output_path = get_output_path(args.out)
 
             if (
                 not osp.exists(osp.dirname(output_path))
@@ -25,6 +25,12 @@ class SceneSampler(ABC):
         Sample a scene.
         """
 
+    @abstractmethod
+    def get_scenes(self) -> List[str]:
+        """
+        Get all the scenes which can be sampled.
+        """
+
     def set_cur_episode(self, cur_episode: int) -> None:
         """
         Set the current episode index. Used by some sampler implementations which pivot on the total number of successful episodes generated thus far.
@@ -42,6 +48,9 @@ class SingleSceneSampler(SceneSampler):
     def sample(self) -> str:
         return self.scene
 
+    def get_scenes(self) -> List[str]:
+        return [self.scene]
+
     def num_scenes(self) -> int:
         """
         Get the number of scenes available from this sampler.
@@ -66,6 +75,9 @@ class MultiSceneSampler(SceneSampler):
         """
         return self.scenes[random.randrange(0, len(self.scenes))]
 
+    def get_scenes(self) -> List[str]:
+        return sorted(self.scenes)
+
     def num_scenes(self) -> int:
         """
         Get the number of scenes available from this sampler.
@@ -102,6 +114,9 @@ class BalancedSceneSampler(SceneSampler):
         """
         return self.scenes[int(self.cur_episode / self.num_ep_per_scene)]
 
+    def get_scenes(self) -> List[str]:
+        return list(self.scenes)
+
     def num_scenes(self) -> int:
         """
         Get the number of scenes available from this sampler.
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+
+def _try_register_null_sim():
+    # The null simulator has no dependencies beyond habitat-lab's own, it is
+    # always registered.
+    from habitat.sims.null_simulator.null_simulator import (  # noqa: F401
+        NullSimulator,
+    )
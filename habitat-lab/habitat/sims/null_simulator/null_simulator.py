@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""A simulator that does not render or simulate anything.
+
+:ref:`NullSimulator` implements the :ref:`Simulator` interface without
+habitat-sim: the agents move on an infinitely thin, empty floor bounded by a
+square, the geodesic distance is the euclidean distance on the floor and the
+visual sensors cycle through a few random frames. It is meant to measure the
+overhead of the Python layers of Habitat-Lab and Habitat-Baselines on
+machines without a GPU build of habitat-sim. The time a real simulator
+spends rendering can be emulated with
+:ref:`habitat.simulator.null_sim_v0.step_latency` and
+:ref:`habitat.simulator.null_sim_v0.step_latency_jitter`.
+
+The visual sensors of the agent configs are emulated based on their type:
+any sensor type containing ``Depth``, ``Semantic`` or ``RGB`` (for instance
+``HabitatSimDepthSensor``) is replaced by a synthetic sensor with the same
+uuid and observation space.
+"""
+
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import quaternion
+from gym import spaces
+
+from habitat.core.dataset import Episode
+from habitat.core.registry import registry
+from habitat.core.simulator import (
+    AgentState,
+    DepthSensor,
+    Observations,
+    RGBSensor,
+    SemanticSensor,
+    Sensor,
+    SensorSuite,
+    Simulator,
+    VisualObservation,
+)
+from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat.utils.geometry_utils import (
+    quaternion_from_coeff,
+    quaternion_rotate_vector,
+)
+
+if TYPE_CHECKING:
+    from omegaconf import DictConfig
+
+
+class NullSimSensor:
+    r"""Mixin of the synthetic sensors, which return one of
+    :py:`num_frames` random frames generated when the sensor is created.
+    """
+
+    _frames: np.ndarray
+
+    def _generate_frames(
+        self, rng: np.random.RandomState, num_frames: int
+    ) -> np.ndarray:
+        raise NotImplementedError
+
+    def get_observation(
+        self, sim_obs: Dict[str, Any], *args: Any, **kwargs: Any
+    ) -> VisualObservation:
+        # Real sensors return a new array on every step.
+        return self._frames[sim_obs["frame"] % len(self._frames)].copy()
+
+
+class NullSimRGBSensor(NullSimSensor, RGBSensor):
+    RGBSENSOR_DIMENSION = 3
+
+    def __init__(
+        self, config: "DictConfig", rng: np.random.RandomState, num_frames: int
+    ) -> None:
+        super().__init__(config=config)
+        self._frames = self._generate_frames(rng, num_frames)
+
+    def _get_observation_space(self, *args: Any, **kwargs: Any) -> spaces.Box:
+        return spaces.Box(
+            low=0,
+            high=255,
+            shape=(
+                self.config.height,
+                self.config.width,
+                self.RGBSENSOR_DIMENSION,
+            ),
+            dtype=np.uint8,
+        )
+
+    def _generate_frames(
+        self, rng: np.random.RandomState, num_frames: int
+    ) -> np.ndarray:
+        return rng.randint(
+            0,
+            256,
+            size=(num_frames, *self.observation_space.shape),
+            dtype=np.uint8,
+        )
+
+
+class NullSimDepthSensor(NullSimSensor, DepthSensor):
+    min_depth_value: float
+    max_depth_value: float
+
+    def __init__(
+        self, config: "DictConfig", rng: np.random.RandomState, num_frames: int
+    ) -> None:
+        if config.get("normalize_depth", True):
+            self.min_depth_value = 0
+            self.max_depth_value = 1
+        else:
+            self.min_depth_value = config.min_depth
+            self.max_depth_value = config.max_depth
+
+        super().__init__(config=config)
+        self._frames = self._generate_frames(rng, num_frames)
+
+    def _get_observation_space(self, *args: Any, **kwargs: Any) -> spaces.Box:
+        return spaces.Box(
+            low=self.min_depth_value,
+            high=self.max_depth_value,
+            shape=(self.config.height, self.config.width, 1),
+            dtype=np.float32,
+        )
+
+    def _generate_frames(
+        self, rng: np.random.RandomState, num_frames: int
+    ) -> np.ndarray:
+        return rng.uniform(
+            self.min_depth_value,
+            self.max_depth_value,
+            size=(num_frames, *self.observation_space.shape),
+        ).astype(np.float32)
+
+
+class NullSimSemanticSensor(NullSimSensor, SemanticSensor):
+    # Number of distinct object ids in the synthetic frames.
+    NUM_OBJECTS = 64
+
+    def __init__(
+        self, config: "DictConfig", rng: np.random.RandomState, num_frames: int
+    ) -> None:
+        super().__init__(config=config)
+        self._frames = self._generate_frames(rng, num_frames)
+
+    def _get_observation_space(self, *args: Any, **kwargs: Any) -> spaces.Box:
+        return spaces.Box(
+            low=np.iinfo(np.uint32).min,
+            high=np.iinfo(np.uint32).max,
+            shape=(self.config.height, self.config.width, 1),
+            dtype=np.int32,
+        )
+
+    def _generate_frames(
+        self, rng: np.random.RandomState, num_frames: int
+    ) -> np.ndarray:
+        return rng.randint(
+            0,
+            self.NUM_OBJECTS,
+            size=(num_frames, *self.observation_space.shape),
+        ).astype(np.int32)
+
+
+# Checked in order, the first substring found in the sensor type wins.
+_NULL_SENSOR_TYPES = (
+    ("Depth", NullSimDepthSensor),
+    ("Semantic", NullSimSemanticSensor),
+    ("RGB", NullSimRGBSensor),
+)
+
+
+def _make_null_sensor(
+    sensor_cfg: "DictConfig", rng: np.random.RandomState, num_frames: int
+) -> Sensor:
+    for type_substring, sensor_type in _NULL_SENSOR_TYPES:
+        if type_substring in sensor_cfg.type:
+            return sensor_type(sensor_cfg, rng, num_frames)
+    raise ValueError(
+        f"NullSim-v0 cannot emulate sensors of type {sensor_cfg.type}."
+    )
+
+
+@registry.register_simulator(name="NullSim-v0")
+class NullSimulator(Simulator):
+    r"""Simulator of agents moving on an empty floor, see the module
+    documentation.
+
+    Only the :py:`stop`, :py:`move_forward`, :py:`turn_left` and
+    :py:`turn_right` discrete actions are supported. Only the default agent
+    moves.
+
+    :param config: configuration of the simulator. Its
+        :py:`null_sim_v0` node holds the options specific to this simulator.
+    """
+
+    def __init__(self, config: "DictConfig") -> None:
+        self.habitat_config = config
+        self._null_config = config.null_sim_v0
+        self._rng = np.random.RandomState(config.seed)
+
+        sim_sensors = []
+        for agent_config in config.agents.values():
+            for sensor_cfg in agent_config.sim_sensors.values():
+                sim_sensors.append(
+                    _make_null_sensor(
+                        sensor_cfg, self._rng, self._null_config.num_frames
+                    )
+                )
+        self._sensor_suite = SensorSuite(sim_sensors)
+        self._action_space = spaces.Discrete(4)
+
+        num_agents = len(config.agents_order)
+        self._positions: List[np.ndarray] = [
+            np.zeros(3, dtype=np.float32) for _ in range(num_agents)
+        ]
+        self._rotations: List[quaternion.quaternion] = [
+            quaternion.quaternion(1, 0, 0, 0) for _ in range(num_agents)
+        ]
+        self._frame = 0
+        self._collided = False
+
+    @property
+    def sensor_suite(self) -> SensorSuite:
+        return self._sensor_suite
+
+    @property
+    def action_space(self) -> spaces.Space:
+        return self._action_space
+
+    @property
+    def up_vector(self) -> np.ndarray:
+        return np.array([0.0, 1.0, 0.0])
+
+    @property
+    def forward_vector(self) -> np.ndarray:
+        return np.array([0.0, 0.0, -1.0])
+
+    def seed(self, seed: int) -> None:
+        self._rng = np.random.RandomState(seed)
+
+    def _get_observations(self) -> Observations:
+        return self._sensor_suite.get_observations({"frame": self._frame})
+
+    def _update_agents_state(self) -> None:
+        for agent_id, agent_name in enumerate(
+            self.habitat_config.agents_order
+        ):
+            agent_cfg = self.habitat_config.agents[agent_name]
+            if agent_cfg.is_set_start_state:
+                self.set_agent_state(
+                    [float(k) for k in agent_cfg.start_position],
+                    [float(k) for k in agent_cfg.start_rotation],
+                    agent_id,
+                )
+
+    def reset(self) -> Observations:
+        if self._null_config.reset_latency > 0:
+            time.sleep(self._null_config.reset_latency)
+        self._update_agents_state()
+        self._collided = False
+        self._frame += 1
+        return self._get_observations()
+
+    def reconfigure(
+        self,
+        config: "DictConfig",
+        episode: Optional[Episode] = None,
+        should_close_on_new_scene: bool = True,
+    ) -> None:
+        self.habitat_config = config
+        self._null_config = config.null_sim_v0
+        self._update_agents_state()
+
+    def _move_agent(self, agent_id: int, distance: float) -> None:
+        forward = quaternion_rotate_vector(
+            self._rotations[agent_id], self.forward_vector
+        )
+        position = self._positions[agent_id] + distance * forward
+        # The agent slides along the border of the floor.
+        extent = self._null_config.navigable_extent
+        clipped = np.clip(position, -extent, extent)
+        clipped[1] = position[1]
+        self._collided = not np.array_equal(clipped, position)
+        self._positions[agent_id] = clipped.astype(np.float32)
+
+    def _turn_agent(self, agent_id: int, angle: float) -> None:
+        turn = quaternion.from_rotation_vector(self.up_vector * angle)
+        self._rotations[agent_id] = turn * self._rotations[agent_id]
+        self._collided = False
+
+    def step(
+        self, action: Optional[Union[str, np.ndarray, int]], *args, **kwargs
+    ) -> Observations:
+        latency = self._null_config.step_latency
+        if self._null_config.step_latency_jitter > 0:
+            latency += self._rng.uniform(
+                0.0, self._null_config.step_latency_jitter
+            )
+        if latency > 0:
+            time.sleep(latency)
+
+        agent_id = self.habitat_config.default_agent_id
+        if isinstance(action, str):
+            action = HabitatSimActions[action]
+        if action == HabitatSimActions.move_forward:
+            self._move_agent(agent_id, self.habitat_config.forward_step_size)
+        elif action == HabitatSimActions.turn_left:
+            self._turn_agent(
+                agent_id, np.deg2rad(self.habitat_config.turn_angle)
+            )
+        elif action == HabitatSimActions.turn_right:
+            self._turn_agent(
+                agent_id, -np.deg2rad(self.habitat_config.turn_angle)
+            )
+        elif action is not None and action != HabitatSimActions.stop:
+            raise ValueError(f"NullSim-v0 does not support action {action}.")
+        else:
+            self._collided = False
+
+        self._frame += 1
+        return self._get_observations()
+
+    def step_physics(self, dt: float) -> None:
+        pass
+
+    def render(self, mode: str = "rgb") -> Any:
+        output = self._get_observations().get(mode)
+        assert output is not None, "mode {} sensor is not active".format(mode)
+        return output
+
+    def geodesic_distance(
+        self,
+        position_a: Union[Sequence[float], np.ndarray],
+        position_b: Union[
+            Sequence[float], Sequence[Sequence[float]], np.ndarray
+        ],
+        episode: Optional[Episode] = None,
+    ) -> float:
+        # Distance on the floor plane to the closest of the points.
+        position_a = np.asarray(position_a, dtype=np.float32)
+        points = np.asarray(position_b, dtype=np.float32).reshape(-1, 3)
+        offsets = points[:, [0, 2]] - position_a[[0, 2]]
+        distance = float(np.linalg.norm(offsets, axis=-1).min())
+        return distance * self._null_config.geodesic_distance_scale
+
+    def get_agent_state(self, agent_id: int = 0) -> AgentState:
+        return AgentState(
+            self._positions[agent_id].copy(), self._rotations[agent_id]
+        )
+
+    def set_agent_state(
+        self,
+        position: List[float],
+        rotation: Union[List[float], quaternion.quaternion],
+        agent_id: int = 0,
+        reset_sensors: bool = True,
+    ) -> bool:
+        if not isinstance(rotation, quaternion.quaternion):
+            rotation = quaternion_from_coeff(rotation)
+        self._positions[agent_id] = np.array(position, dtype=np.float32)
+        self._rotations[agent_id] = rotation
+        return True
+
+    def get_observations_at(
+        self,
+        position: Optional[List[float]] = None,
+        rotation: Optional[List[float]] = None,
+        keep_agent_at_new_pose: bool = False,
+    ) -> Optional[Observations]:
+        current_state = self.get_agent_state()
+        if position is not None and rotation is not None:
+            self.set_agent_state(position, rotation)
+        observations = self._get_observations()
+        if not keep_agent_at_new_pose:
+            self.set_agent_state(
+                current_state.position, current_state.rotation
+            )
+        return observations
+
+    def sample_navigable_point(self) -> List[float]:
+        extent = self._null_config.navigable_extent
+        x, z = self._rng.uniform(-extent, extent, size=2)
+        return [float(x), 0.0, float(z)]
+
+    def is_navigable(self, point: List[float]) -> bool:
+        extent = self._null_config.navigable_extent
+        return abs(point[0]) <= extent and abs(point[2]) <= extent
+
+    def get_straight_shortest_path_points(
+        self, position_a: List[float], position_b: List[float]
+    ) -> List[List[float]]:
+        return [list(position_a), list(position_b)]
+
+    @property
+    def previous_step_collided(self) -> bool:
+        return self._collided
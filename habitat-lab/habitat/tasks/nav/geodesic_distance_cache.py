@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Cached geodesic distance fields used by :ref:`DistanceToGoal`.
+
+A :ref:`GeodesicDistanceField` stores the geodesic distance to a fixed set of
+goals at the corners of a regular grid laid over the navmesh. Corners are
+computed lazily the first time the agent gets close to them, after which the
+distance at any position is a bilinear interpolation of the four surrounding
+corners of its floor. Fields are shared by all the episodes with the same
+goals (for ObjectNav, the same :py:`goals_key`) and kept in a
+:ref:`GeodesicDistanceFieldCache` that evicts whole scenes in LRU order and
+can persist the fields to disk.
+
+Geodesic distance is 1-Lipschitz, so the four corners of a cell that does not
+straddle an obstacle differ by at most the diagonal of the cell, and the
+interpolation is off by at most :py:`cell_size / sqrt(2)` (the distance from
+the center of the cell to its corners, see
+:ref:`GeodesicDistanceField.max_interpolation_error`). Cells that violate this
+bound, cells with a non-navigable corner (at an infinite distance) and
+positions close to the goals are answered with an exact
+:py:`geodesic_distance` query instead.
+"""
+
+import hashlib
+import math
+import os
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from habitat.core.logging import logger
+
+if TYPE_CHECKING:
+    from habitat.tasks.nav.nav import NavigationEpisode
+
+
+CellIndex = Tuple[int, int, int]
+
+# The cells are bucketed vertically by this much, it only needs to be small
+# enough to separate two floors of a building.
+DEFAULT_HEIGHT_CELL_SIZE = 0.5
+
+
+def goals_cache_key(
+    episode: "NavigationEpisode",
+    goal_positions: Sequence[Sequence[float]],
+    distance_to: str,
+) -> str:
+    r"""The key under which the distance field of :p:`episode` is cached.
+
+    Uses :py:`episode.goals_key` when the episode defines one, so that all the
+    ObjectNav episodes looking for the same category in a scene share their
+    field, and a digest of the goal positions otherwise.
+    """
+    goals_key = getattr(episode, "goals_key", None)
+    if goals_key is None:
+        goals_key = hashlib.sha1(
+            np.ascontiguousarray(goal_positions, dtype=np.float32).tobytes()
+        ).hexdigest()
+    return f"{distance_to}:{goals_key}"
+
+
+class GeodesicDistanceField:
+    r"""Lazily filled grid of geodesic distances to a fixed set of goals.
+
+    :param cell_size: Horizontal size of the grid cells, in meters.
+    :param height_cell_size: Vertical size of the grid cells, in meters.
+    """
+
+    def __init__(
+        self,
+        cell_size: float,
+        height_cell_size: float = DEFAULT_HEIGHT_CELL_SIZE,
+    ):
+        self.cell_size = cell_size
+        self.height_cell_size = height_cell_size
+        self._corners: Dict[CellIndex, float] = {}
+        # Whether corners were added since the field was loaded or saved.
+        self.is_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._corners)
+
+    @property
+    def max_interpolation_error(self) -> float:
+        r"""Bound of the error of :ref:`lookup` in the cells without
+        obstacles: the interpolation weights the corners by their bilinear
+        coefficients, whose mean squared distance to the position is at most
+        :py:`cell_size ** 2 / 2`.
+        """
+        return self.cell_size / math.sqrt(2)
+
+    def _corner_distance(
+        self,
+        corner: CellIndex,
+        compute_distance: Callable[[np.ndarray], float],
+    ) -> float:
+        distance = self._corners.get(corner, None)
+        if distance is None:
+            position = np.array(
+                [
+                    corner[0] * self.cell_size,
+                    corner[1] * self.height_cell_size,
+                    corner[2] * self.cell_size,
+                ],
+                dtype=np.float32,
+            )
+            distance = float(compute_distance(position))
+            self._corners[corner] = distance
+            self.is_dirty = True
+        return distance
+
+    def lookup(
+        self,
+        position: Sequence[float],
+        compute_distance: Callable[[np.ndarray], float],
+    ) -> Optional[float]:
+        r"""Interpolates the distance at :p:`position`.
+
+        :param compute_distance: Computes the exact geodesic distance from a
+            position to the goals, used to fill missing corners. Must return
+            :py:`inf` for the positions that are not navigable.
+        :return: The interpolated distance or :py:`None` if the cell of
+            :p:`position` cannot be interpolated reliably.
+        """
+        fx = position[0] / self.cell_size
+        fz = position[2] / self.cell_size
+        ix, iz = math.floor(fx), math.floor(fz)
+        iy = round(position[1] / self.height_cell_size)
+        tx, tz = fx - ix, fz - iz
+
+        d00 = self._corner_distance((ix, iy, iz), compute_distance)
+        d10 = self._corner_distance((ix + 1, iy, iz), compute_distance)
+        d01 = self._corner_distance((ix, iy, iz + 1), compute_distance)
+        d11 = self._corner_distance((ix + 1, iy, iz + 1), compute_distance)
+
+        corners = (d00, d10, d01, d11)
+        if not all(math.isfinite(d) for d in corners):
+            return None
+        if max(corners) - min(corners) > self.cell_size * math.sqrt(2) + 1e-3:
+            # The cell straddles an obstacle, the corners do not describe
+            # the same side of it.
+            return None
+
+        return (1 - tz) * ((1 - tx) * d00 + tx * d10) + tz * (
+            (1 - tx) * d01 + tx * d11
+        )
+
+    def save(self, path: str) -> None:
+        if len(self._corners) == 0:
+            return
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            cell_size=np.float64(self.cell_size),
+            height_cell_size=np.float64(self.height_cell_size),
+            corners=np.array(list(self._corners.keys()), dtype=np.int32),
+            distances=np.array(list(self._corners.values()), dtype=np.float32),
+        )
+        os.replace(tmp_path, path)
+        self.is_dirty = False
+
+    def load(self, path: str) -> bool:
+        r"""Merges the corners saved at :p:`path` into the field. Returns
+        :py:`False` if the file was written with a different grid.
+        """
+        with np.load(path) as data:
+            if not (
+                np.isclose(float(data["cell_size"]), self.cell_size)
+                and np.isclose(
+                    float(data["height_cell_size"]), self.height_cell_size
+                )
+            ):
+                return False
+            for corner, distance in zip(
+                data["corners"].tolist(), data["distances"].tolist()
+            ):
+                self._corners.setdefault(tuple(corner), distance)
+        return True
+
+
+class GeodesicDistanceFieldCache:
+    r"""Holds the :ref:`GeodesicDistanceField` of the most recently used
+    scenes.
+
+    :param cell_size: Horizontal size of the grid cells of the fields.
+    :param max_scenes: Number of scenes whose fields are kept in memory. The
+        least recently used scene is evicted when a new one is added.
+    :param cache_dir: If set, fields are saved in this directory when their
+        scene is evicted or on :ref:`flush` and loaded back from it on first
+        use.
+    """
+
+    def __init__(
+        self,
+        cell_size: float,
+        max_scenes: int,
+        cache_dir: Optional[str] = None,
+        height_cell_size: float = DEFAULT_HEIGHT_CELL_SIZE,
+    ):
+        assert max_scenes > 0
+        self.cell_size = cell_size
+        self.height_cell_size = height_cell_size
+        self.max_scenes = max_scenes
+        self.cache_dir = cache_dir
+        self._scenes: "OrderedDict[str, Dict[str, GeodesicDistanceField]]" = (
+            OrderedDict()
+        )
+
+    def __contains__(self, scene_id: str) -> bool:
+        return scene_id in self._scenes
+
+    def _field_path(self, scene_id: str, key: str) -> str:
+        assert self.cache_dir is not None
+        digest = hashlib.sha1(f"{scene_id}|{key}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npz")
+
+    def get(self, scene_id: str, key: str) -> GeodesicDistanceField:
+        r"""Returns the field of the goals :p:`key` in :p:`scene_id`,
+        creating (or loading) it if needed.
+        """
+        fields = self._scenes.get(scene_id, None)
+        if fields is None:
+            fields = {}
+            self._scenes[scene_id] = fields
+            while len(self._scenes) > self.max_scenes:
+                self._evict(*self._scenes.popitem(last=False))
+        else:
+            self._scenes.move_to_end(scene_id)
+
+        field = fields.get(key, None)
+        if field is None:
+            field = GeodesicDistanceField(
+                self.cell_size, self.height_cell_size
+            )
+            if self.cache_dir is not None:
+                path = self._field_path(scene_id, key)
+                if os.path.exists(path) and not field.load(path):
+                    logger.warn(
+                        f"Ignoring distance field {path} computed with a "
+                        "different cell size."
+                    )
+            fields[key] = field
+        return field
+
+    def _evict(
+        self, scene_id: str, fields: Dict[str, GeodesicDistanceField]
+    ) -> None:
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for key, field in fields.items():
+            if field.is_dirty:
+                field.save(self._field_path(scene_id, key))
+
+    def flush(self) -> None:
+        r"""Saves all the fields in memory to :py:`cache_dir`."""
+        for scene_id, fields in self._scenes.items():
+            self._evict(scene_id, fields)
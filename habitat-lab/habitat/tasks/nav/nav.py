@@ -34,6 +34,11 @@ from habitat.core.simulator import (
 from habitat.core.spaces import ActionSpace
 from habitat.core.utils import not_none_validator, try_cv2_import
 from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat.tasks.nav.geodesic_distance_cache import (
+    GeodesicDistanceField,
+    GeodesicDistanceFieldCache,
+    goals_cache_key,
+)
 from habitat.tasks.utils import cartesian_to_polar
 from habitat.utils.geometry_utils import (
     quaternion_from_coeff,
@@ -700,6 +705,12 @@ class TopDownMap(Measure):
         self._previous_xy_location: List[Optional[Tuple[int, int]]] = None
         self._top_down_map: Optional[np.ndarray] = None
         self._shortest_path_points: Optional[List[Tuple[int, int]]] = None
+        self._map_cache: Optional[maps.TopDownMapCache] = None
+        if config.map_cache_size > 0:
+            self._map_cache = maps.TopDownMapCache(
+                max_maps=config.map_cache_size,
+                cache_dir=config.map_cache_dir,
+            )
         self.line_thickness = int(
             np.round(self._map_resolution * 2 / MAP_THICKNESS_SCALAR)
         )
@@ -712,11 +723,20 @@ class TopDownMap(Measure):
         return "top_down_map"
 
     def get_original_map(self):
-        top_down_map = maps.get_topdown_map_from_sim(
-            self._sim,
-            map_resolution=self._map_resolution,
-            draw_border=self._config.draw_border,
-        )
+        if self._map_cache is not None:
+            top_down_map = self._map_cache.get(
+                self._sim.pathfinder,
+                self._sim.habitat_config.scene,
+                self._sim.get_agent(0).state.position[1],
+                map_resolution=self._map_resolution,
+                draw_border=self._config.draw_border,
+            )
+        else:
+            top_down_map = maps.get_topdown_map_from_sim(
+                self._sim,
+                map_resolution=self._map_resolution,
+                draw_border=self._config.draw_border,
+            )
 
         if self._config.fog_of_war.draw:
             self._fog_of_war_mask = np.zeros_like(top_down_map)
@@ -954,6 +974,17 @@ class DistanceToGoal(Measure):
         ] = None
         self._distance_to = self._config.distance_to
 
+        self._distance_field_cache: Optional[GeodesicDistanceFieldCache] = None
+        self._distance_field: Optional[GeodesicDistanceField] = None
+        self._distance_field_scene_id: Optional[str] = None
+        self._is_metric_interpolated = False
+        if self._config.use_distance_field_cache:
+            self._distance_field_cache = GeodesicDistanceFieldCache(
+                cell_size=self._config.distance_field_cell_size,
+                max_scenes=self._config.distance_field_max_scenes,
+                cache_dir=self._config.distance_field_cache_dir,
+            )
+
         super().__init__(**kwargs)
 
     def _get_uuid(self, *args: Any, **kwargs: Any) -> str:
@@ -961,35 +992,100 @@ class DistanceToGoal(Measure):
 
     def reset_metric(self, episode, *args: Any, **kwargs: Any):
         self._previous_position = None
+        self._is_metric_interpolated = False
         if self._distance_to == "VIEW_POINTS":
             self._episode_view_points = [
                 view_point.agent_state.position
                 for goal in episode.goals
                 for view_point in goal.view_points
             ]
+        if self._distance_field_cache is not None:
+            if episode.scene_id != self._distance_field_scene_id:
+                # Save the fields of the previous scene, the cache only
+                # saves them by itself when it evicts the scene.
+                self._distance_field_cache.flush()
+                self._distance_field_scene_id = episode.scene_id
+            self._distance_field = self._distance_field_cache.get(
+                episode.scene_id,
+                goals_cache_key(
+                    episode, self._goal_positions(episode), self._distance_to
+                ),
+            )
         self.update_metric(episode=episode, *args, **kwargs)  # type: ignore
 
+    def close(self) -> None:
+        if self._distance_field_cache is not None:
+            self._distance_field_cache.flush()
+
+    def _goal_positions(self, episode: NavigationEpisode):
+        if self._distance_to == "POINT":
+            return [goal.position for goal in episode.goals]
+        elif self._distance_to == "VIEW_POINTS":
+            return self._episode_view_points
+        else:
+            logger.error(
+                f"Non valid distance_to parameter was provided: {self._distance_to }"
+            )
+            return None
+
+    def _cached_distance(
+        self, current_position, goal_positions, episode: NavigationEpisode
+    ) -> Optional[float]:
+        # The first distance of an episode is always exact since SPL uses
+        # it as the length of the shortest path.
+        if self._distance_field is None or self._previous_position is None:
+            return None
+
+        def corner_distance(position):
+            # The distance from a corner off the navmesh would be the one
+            # of the point it snaps to, don't interpolate with it.
+            if not self._sim.is_navigable(position):
+                return float("inf")
+            return self._sim.geodesic_distance(
+                position, goal_positions, episode
+            )
+
+        distance = self._distance_field.lookup(
+            current_position, corner_distance
+        )
+        # Near the goals the distance decides the success of the episode,
+        # don't approximate it there.
+        if (
+            distance is None
+            or distance < self._config.distance_field_exact_radius
+        ):
+            return None
+        return distance
+
     def update_metric(
         self, episode: NavigationEpisode, *args: Any, **kwargs: Any
     ):
         current_position = self._sim.get_agent_state().position
+        # The distance when the agent stops decides the success of the
+        # episode and its SPL, it is recomputed exactly even if the agent
+        # did not move.
+        is_stop_called = getattr(kwargs.get("task"), "is_stop_called", False)
 
-        if self._previous_position is None or not np.allclose(
-            self._previous_position, current_position, atol=1e-4
+        if (
+            self._previous_position is None
+            or not np.allclose(
+                self._previous_position, current_position, atol=1e-4
+            )
+            or (is_stop_called and self._is_metric_interpolated)
         ):
-            if self._distance_to == "POINT":
-                distance_to_target = self._sim.geodesic_distance(
-                    current_position,
-                    [goal.position for goal in episode.goals],
-                    episode,
+            goal_positions = self._goal_positions(episode)
+            if goal_positions is None:
+                return
+
+            distance_to_target = None
+            if not is_stop_called:
+                distance_to_target = self._cached_distance(
+                    current_position, goal_positions, episode
                 )
-            elif self._distance_to == "VIEW_POINTS":
+            self._is_metric_interpolated = distance_to_target is not None
+            if distance_to_target is None:
                 distance_to_target = self._sim.geodesic_distance(
-                    current_position, self._episode_view_points, episode
-                )
-            else:
-                logger.error(
-                    f"Non valid distance_to parameter was provided: {self._distance_to }"
+                    current_position, goal_positions, episode
                 )
 
             self._previous_position = (
@@ -5,6 +5,9 @@ from habitat.core.embodied_task import Measure
 from habitat.core.registry import registry
 from habitat.core.simulator import Sensor, SensorTypes
 from habitat.tasks.rearrange.multi_task.pddl_sensors import PddlSubgoalReward
+from habitat.tasks.rearrange.multi_task.pddl_sim_snapshot import (
+    BatchedPredicateEvaluator,
+)
 from habitat.tasks.rearrange.utils import (
     UsesArticulatedAgentInterface,
     coll_name_matches,
@@ -125,6 +128,7 @@ class MultiAgentGlobalPredicatesSensor(UsesArticulatedAgentInterface, Sensor):
         self._task = task
         self._sim = sim
         self._predicates_list = None
+        self._predicates_evaluator = None
         super().__init__(config=config)
 
     def _get_uuid(self, *args, **kwargs):
@@ -147,9 +151,14 @@ class MultiAgentGlobalPredicatesSensor(UsesArticulatedAgentInterface, Sensor):
         )
 
     def get_observation(self, observations, episode, *args, **kwargs):
-        sim_info = self._task.pddl_problem.sim_info
-        truth_values = [p.is_true(sim_info) for p in self.predicates_list]
-        return np.array(truth_values, dtype=np.float32)
+        if self._predicates_evaluator is None:
+            self._predicates_evaluator = BatchedPredicateEvaluator(
+                self.predicates_list
+            )
+        truth_values = self._predicates_evaluator(
+            self._task.pddl_problem.sim_info
+        )
+        return truth_values.astype(np.float32)
 
 
 @registry.register_sensor
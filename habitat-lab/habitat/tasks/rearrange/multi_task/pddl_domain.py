@@ -4,7 +4,6 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import itertools
 import os.path as osp
 import time
 from typing import (
@@ -16,7 +15,6 @@ from typing import (
     Optional,
     Tuple,
     Union,
-    cast,
 )
 
 import yaml  # type: ignore[import]
@@ -25,6 +23,10 @@ from habitat.config.default import get_full_habitat_config_path
 from habitat.core.dataset import Episode
 from habitat.datasets.rearrange.rearrange_dataset import RearrangeDatasetV0
 from habitat.tasks.rearrange.multi_task.pddl_action import PddlAction
+from habitat.tasks.rearrange.multi_task.pddl_grounding import (
+    PddlGroundingIndex,
+    entity_key,
+)
 from habitat.tasks.rearrange.multi_task.pddl_logical_expr import (
     LogicalExpr,
     LogicalExprType,
@@ -70,6 +72,7 @@ class PddlDomain:
         self._sim_info: Optional[PddlSimInfo] = None
         self._config = cur_task_config
         self._orig_actions: Dict[str, PddlAction] = {}
+        self._grounding_index: Optional[PddlGroundingIndex] = None
 
         if read_config:
             # Setup config properties
@@ -111,6 +114,7 @@ class PddlDomain:
     def set_actions(self, actions: Dict[str, PddlAction]) -> None:
         self._orig_actions = actions
         self._actions = dict(actions)
+        self._grounding_index = None
 
     def _parse_actions(self, domain_def) -> None:
         """
@@ -211,12 +215,14 @@ class PddlDomain:
         Add a type to `self.expr_types`. Clears every episode
         """
         self._added_expr_types[expr_type.name] = expr_type
+        self._grounding_index = None
 
     def register_episode_entity(self, pddl_entity: PddlEntity) -> None:
         """
         Add an entity to appear in `self.all_entities`. Clears every episode.
         """
         self._added_entities[pddl_entity.name] = pddl_entity
+        self._grounding_index = None
 
     def _parse_expr_types(self, domain_def):
         """
@@ -348,6 +354,7 @@ class PddlDomain:
 
         self._added_entities = {}
         self._added_expr_types = {}
+        self._grounding_index = None
 
         id_to_name = {}
         for k, i in sim.handle_to_object_id.items():
@@ -400,6 +407,22 @@ class PddlDomain:
                 new_ac.set_post_cond_search(assigns)
 
             self._actions[k] = new_ac
+        self._grounding_index = None
+
+    @property
+    def grounding_index(self) -> PddlGroundingIndex:
+        """
+        Groundings of the predicates and actions for the current entities.
+        Built on first use after the entities, types or actions change.
+        """
+        if self._grounding_index is None:
+            self._grounding_index = PddlGroundingIndex(
+                list(self.all_entities.values()),
+                self.predicates,
+                self.actions,
+                self.expr_types,
+            )
+        return self._grounding_index
 
     @property
     def sim_info(self) -> PddlSimInfo:
@@ -429,23 +452,16 @@ class PddlDomain:
     def get_true_predicates(self) -> List[Predicate]:
         """
         Get all the predicates that are true in the current simulator state.
+        The returned predicates are shared with the grounding index and must
+        not be modified.
         """
 
-        all_entities = self.all_entities.values()
-        true_preds: List[Predicate] = []
-        for pred in self.predicates.values():
-            for entity_input in itertools.permutations(
-                all_entities, pred.n_args
-            ):
-                if not pred.are_args_compatible(list(entity_input)):
-                    continue
-
-                use_pred = pred.clone()
-                use_pred.set_param_values(entity_input)
-
-                if use_pred.is_true(self.sim_info):
-                    true_preds.append(use_pred)
-        return true_preds
+        sim_info = self.sim_info
+        return [
+            pred
+            for pred in self.grounding_index.predicate_groundings
+            if pred.is_true(sim_info)
+        ]
 
     def get_possible_predicates(self) -> List[Predicate]:
         """
@@ -454,20 +470,7 @@ class PddlDomain:
         arguments. The same ordering of predicates is returned every time.
         """
 
-        all_entities = self.all_entities.values()
-        poss_preds: List[Predicate] = []
-        for pred in self.predicates.values():
-            for entity_input in itertools.combinations(
-                all_entities, pred.n_args
-            ):
-                if not pred.are_args_compatible(entity_input):
-                    continue
-
-                use_pred = pred.clone()
-                use_pred.set_param_values(entity_input)
-                if use_pred.are_types_compatible(self.expr_types):
-                    poss_preds.append(use_pred)
-        return sorted(poss_preds, key=lambda pred: pred.compact_str)
+        return list(self.grounding_index.possible_predicates)
 
     def get_possible_actions(
         self,
@@ -477,7 +480,8 @@ class PddlDomain:
         true_preds: Optional[List[Predicate]] = None,
     ) -> List[PddlAction]:
         """
-        Get all actions that can be applied.
+        Get all actions that can be applied. The returned actions are shared
+        with the grounding index and must not be modified.
         :param filter_entities: ONLY actions with entities that contain all
             entities in `filter_entities` are allowed.
         :param allowed_action_names: ONLY action names allowed.
@@ -488,7 +492,7 @@ class PddlDomain:
         if restricted_action_names is None:
             restricted_action_names = []
 
-        all_entities = list(self.all_entities.values())
+        filter_keys = [entity_key(e) for e in filter_entities]
         matching_actions = []
         for action in self.actions.values():
             if (
@@ -500,31 +504,19 @@ class PddlDomain:
             if action.name in restricted_action_names:
                 continue
 
-            for entity_input in itertools.combinations(
-                all_entities, action.n_args
-            ):
-                # Check that all the filter_entities are in entity_input
-                matches_filter = all(
-                    filter_entity in entity_input
-                    for filter_entity in filter_entities
-                )
-                if not matches_filter:
+            groundings = self.grounding_index.action_groundings(action.name)
+            for entity_keys, new_action in groundings:
+                # Check that all the filter_entities are in the arguments
+                if not all(k in entity_keys for k in filter_keys):
                     continue
-
-                for entity_input_perm in itertools.permutations(entity_input):
-                    entity_inputs = cast(List[PddlEntity], entity_input_perm)
-                    if not action.are_args_compatible(entity_inputs):
-                        continue
-                    new_action = action.clone()
-                    new_action.set_param_values(entity_inputs)
-                    if (
-                        true_preds is not None
-                        and not new_action.is_precond_satisfied_from_predicates(
-                            true_preds
-                        )
-                    ):
-                        continue
-                    matching_actions.append(new_action)
+                if (
+                    true_preds is not None
+                    and not new_action.is_precond_satisfied_from_predicates(
+                        true_preds
+                    )
+                ):
+                    continue
+                matching_actions.append(new_action)
         return matching_actions
 
     def get_ordered_actions(self) -> List[PddlAction]:
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import itertools
+from typing import Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple
+
+from habitat.tasks.rearrange.multi_task.pddl_action import PddlAction
+from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
+from habitat.tasks.rearrange.multi_task.rearrange_pddl import (
+    ExprType,
+    PddlEntity,
+)
+
+# Identifies an entity the same way `PddlEntity.__eq__` does.
+EntityKey = Tuple[str, str]
+
+
+def entity_key(entity: PddlEntity) -> EntityKey:
+    return (entity.name, entity.expr_type.name)
+
+
+class PddlGroundingIndex:
+    """
+    All the groundings of the predicates and actions of a `PddlDomain` for a
+    fixed set of entities.
+
+    Entities are bucketed by the argument types they are compatible with, so
+    only the groundings with compatible arguments are ever enumerated. The
+    grounded predicates and actions are created once, on first use, and are
+    then shared by all the queries. They must not be modified by the callers.
+    The groundings are listed in the same order as an enumeration of all the
+    entity tuples would produce.
+
+    The index is only valid for the entities, types, predicates and actions it
+    was built with. `PddlDomain` rebuilds it whenever any of them changes.
+    """
+
+    def __init__(
+        self,
+        entities: Sequence[PddlEntity],
+        predicates: Dict[str, Predicate],
+        actions: Dict[str, PddlAction],
+        expr_types: Dict[str, ExprType],
+    ):
+        self._entities = list(entities)
+        self._predicates = predicates
+        self._actions = actions
+        self._expr_types = expr_types
+
+        # Type name -> sorted indices of the entities of a sub-type.
+        self._type_buckets: Dict[str, List[int]] = {}
+
+        self._predicate_groundings: Optional[List[Predicate]] = None
+        self._possible_predicates: Optional[List[Predicate]] = None
+        self._action_groundings: Optional[
+            Dict[str, List[Tuple[FrozenSet[EntityKey], PddlAction]]]
+        ] = None
+
+    def entities_of_type(self, expr_type: ExprType) -> List[int]:
+        """
+        Sorted indices of the entities that can be used for an argument of
+        type `expr_type`.
+        """
+        bucket = self._type_buckets.get(expr_type.name, None)
+        if bucket is None:
+            bucket = [
+                i
+                for i, entity in enumerate(self._entities)
+                if entity.expr_type.is_subtype_of(expr_type)
+            ]
+            self._type_buckets[expr_type.name] = bucket
+        return bucket
+
+    def _groundings(
+        self, args: Sequence[PddlEntity], increasing: bool = False
+    ) -> Iterator[Tuple[int, ...]]:
+        """
+        Enumerates the tuples of distinct entity indices compatible with
+        `args`, in lexicographic order. If `increasing`, only the tuples with
+        increasing indices are listed.
+        """
+        buckets = [self.entities_of_type(arg.expr_type) for arg in args]
+        for idxs in itertools.product(*buckets):
+            if increasing:
+                if any(a >= b for a, b in zip(idxs, idxs[1:])):
+                    continue
+            elif len(set(idxs)) != len(idxs):
+                continue
+            yield idxs
+
+    def _bind_predicate(
+        self, pred: Predicate, idxs: Tuple[int, ...]
+    ) -> Predicate:
+        use_pred = pred.clone()
+        use_pred.set_param_values([self._entities[i] for i in idxs])
+        return use_pred
+
+    @property
+    def predicate_groundings(self) -> List[Predicate]:
+        """
+        Every predicate bound to every ordered tuple of distinct compatible
+        entities.
+        """
+        if self._predicate_groundings is None:
+            self._predicate_groundings = [
+                self._bind_predicate(pred, idxs)
+                for pred in self._predicates.values()
+                for idxs in self._groundings(pred.args)
+            ]
+        return self._predicate_groundings
+
+    @property
+    def possible_predicates(self) -> List[Predicate]:
+        """
+        See `PddlDomain.get_possible_predicates`.
+        """
+        if self._possible_predicates is None:
+            poss_preds = []
+            for pred in self._predicates.values():
+                for idxs in self._groundings(pred.args, increasing=True):
+                    use_pred = self._bind_predicate(pred, idxs)
+                    if use_pred.are_types_compatible(self._expr_types):
+                        poss_preds.append(use_pred)
+            self._possible_predicates = sorted(
+                poss_preds, key=lambda pred: pred.compact_str
+            )
+        return self._possible_predicates
+
+    def _build_action_groundings(
+        self, action: PddlAction
+    ) -> List[Tuple[FrozenSet[EntityKey], PddlAction]]:
+        # Candidate argument lists are enumerated as sets of entities
+        # (combinations) and then as orderings of each set, which is the
+        # order `PddlDomain.get_possible_actions` has always returned.
+        compatible = [
+            set(self.entities_of_type(param.expr_type))
+            for param in action.params
+        ]
+        relevant = sorted(set().union(*compatible)) if compatible else []
+
+        groundings = []
+        for combination in itertools.combinations(relevant, action.n_args):
+            entity_keys = frozenset(
+                entity_key(self._entities[i]) for i in combination
+            )
+            for perm in itertools.permutations(combination):
+                if not all(i in compat for i, compat in zip(perm, compatible)):
+                    continue
+                new_action = action.clone()
+                new_action.set_param_values([self._entities[i] for i in perm])
+                groundings.append((entity_keys, new_action))
+        return groundings
+
+    def action_groundings(
+        self, action_name: str
+    ) -> List[Tuple[FrozenSet[EntityKey], PddlAction]]:
+        """
+        The groundings of the action `action_name` along with the keys of the
+        entities they use.
+        """
+        if self._action_groundings is None:
+            self._action_groundings = {}
+        groundings = self._action_groundings.get(action_name, None)
+        if groundings is None:
+            groundings = self._build_action_groundings(
+                self._actions[action_name]
+            )
+            self._action_groundings[action_name] = groundings
+        return groundings
@@ -5,6 +5,9 @@
 
 from typing import Dict, List, Optional
 
+from habitat.tasks.rearrange.multi_task.pddl_sim_snapshot import (
+    PddlSimSnapshot,
+)
 from habitat.tasks.rearrange.multi_task.pddl_sim_state import PddlSimState
 from habitat.tasks.rearrange.multi_task.rearrange_pddl import (
     ExprType,
@@ -68,10 +71,18 @@ class Predicate:
     def n_args(self):
         return len(self._args)
 
+    @property
+    def args(self) -> List[PddlEntity]:
+        return self._args
+
     @property
     def name(self):
         return self._name
 
+    @property
+    def pddl_sim_state(self) -> Optional[PddlSimState]:
+        return self._pddl_sim_state
+
     def sub_in(self, sub_dict: Dict[PddlEntity, PddlEntity]) -> "Predicate":
         self._arg_values = [
             sub_dict.get(entity, entity) for entity in self._arg_values
@@ -92,11 +103,17 @@ class Predicate:
             )
         return p
 
-    def is_true(self, sim_info: PddlSimInfo) -> bool:
+    def is_true(
+        self,
+        sim_info: PddlSimInfo,
+        snapshot: Optional[PddlSimSnapshot] = None,
+    ) -> bool:
         """
         Returns if the predicate is satisfied in the current simulator state.
         Potentially returns the cached truth value of the predicate depending
         on `sim_info`.
+
+        :param snapshot: The simulator state to read from, see `PddlSimState.is_true`.
         """
         self_repr = repr(self)
         if (
@@ -106,8 +123,11 @@ class Predicate:
             # Return the cached value.
             return sim_info.pred_truth_cache[self_repr]
 
-        # Recompute and potentially cache the result.
-        result = self._pddl_sim_state.is_true(sim_info)
+        # Recompute and potentially cache the result. Without simulator
+        # conditions, the predicate is always true.
+        result = self._pddl_sim_state is None or self._pddl_sim_state.is_true(
+            sim_info, snapshot
+        )
         if sim_info.pred_truth_cache is not None:
             sim_info.pred_truth_cache[self_repr] = result
         return result
@@ -13,6 +13,9 @@ from gym import spaces
 from habitat.core.embodied_task import Measure
 from habitat.core.registry import registry
 from habitat.core.simulator import Sensor, SensorTypes
+from habitat.tasks.rearrange.multi_task.pddl_sim_snapshot import (
+    BatchedPredicateEvaluator,
+)
 from habitat.tasks.rearrange.multi_task.pddl_task import PddlTask
 from habitat.tasks.rearrange.rearrange_sensors import (
     DoesWantTerminate,
@@ -28,6 +31,7 @@ class GlobalPredicatesSensor(Sensor):
         self._task = task
         self._sim = sim
         self._predicates_list = None
+        self._predicates_evaluator = None
         assert isinstance(task, PddlTask)
         super().__init__(config=config)
 
@@ -51,9 +55,14 @@ class GlobalPredicatesSensor(Sensor):
         )
 
     def get_observation(self, observations, episode, *args, **kwargs):
-        sim_info = self._task.pddl_problem.sim_info
-        truth_values = [p.is_true(sim_info) for p in self.predicates_list]
-        return np.array(truth_values, dtype=np.float32)
+        if self._predicates_evaluator is None:
+            self._predicates_evaluator = BatchedPredicateEvaluator(
+                self.predicates_list
+            )
+        truth_values = self._predicates_evaluator(
+            self._task.pddl_problem.sim_info
+        )
+        return truth_values.astype(np.float32)
 
 
 @registry.register_measure
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Evaluation of many grounded PDDL simulator states in the same simulator state.
+
+Evaluating the predicates one at a time queries the simulator for the same
+object positions, receptacle bounding boxes and robot transforms over and
+over. Instead, `PddlSimState.is_true` reads the simulator state through a
+`PddlSimSnapshot`, which queries each of them once and is shared by all the
+predicates evaluated in the same step.
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import magnum as mn
+import numpy as np
+
+import habitat_sim
+from habitat.sims.habitat_simulator.sim_utilities import get_ao_global_bb
+from habitat.tasks.rearrange.marker_info import MarkerInfo
+from habitat.tasks.rearrange.multi_task.rearrange_pddl import (
+    PddlEntity,
+    PddlSimInfo,
+)
+
+if TYPE_CHECKING:
+    from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
+
+
+class PddlSimSnapshot:
+    """
+    The simulator state read by the PDDL predicates. Each value is queried
+    from the simulator the first time it is read and then returned as is, so
+    a snapshot is only valid until the simulator changes. A new one must be
+    taken after every step.
+    """
+
+    def __init__(self, sim_info: PddlSimInfo):
+        self.sim_info = sim_info
+
+        self._entity_pos: Dict[PddlEntity, Any] = {}
+        self._targets: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._link_bbs: Dict[Tuple[int, int], mn.Range3D] = {}
+        self._ao_bbs: Dict[int, mn.Range3D] = {}
+        self._joint_positions: Dict[int, List[float]] = {}
+        self._robot_inv_transforms: Dict[int, mn.Matrix4] = {}
+        self._robot_snap_idxs: Dict[int, Optional[int]] = {}
+
+    def get_entity_pos(self, entity: PddlEntity) -> Any:
+        """
+        Same as `PddlSimInfo.get_entity_pos`.
+        """
+        if entity not in self._entity_pos:
+            self._entity_pos[entity] = self.sim_info.get_entity_pos(entity)
+        return self._entity_pos[entity]
+
+    def get_targets(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Same as `RearrangeSim.get_targets`.
+        """
+        if self._targets is None:
+            self._targets = self.sim_info.sim.get_targets()
+        return self._targets
+
+    def get_link_bb(self, marker: MarkerInfo) -> mn.Range3D:
+        """
+        Global bounding box of the link of `marker`.
+        """
+        key = (marker.ao_parent.object_id, marker.link_id)
+        if key not in self._link_bbs:
+            self._link_bbs[key] = habitat_sim.geo.get_transformed_bb(
+                marker.link_node.cumulative_bb, marker.link_node.transformation
+            )
+        return self._link_bbs[key]
+
+    def get_ao_bb(self, marker: MarkerInfo) -> mn.Range3D:
+        """
+        Global bounding box of the articulated object of `marker`.
+        """
+        ao_id = marker.ao_parent.object_id
+        if ao_id not in self._ao_bbs:
+            self._ao_bbs[ao_id] = get_ao_global_bb(marker.ao_parent)
+        return self._ao_bbs[ao_id]
+
+    def get_targ_js(self, marker: MarkerInfo) -> float:
+        """
+        Same as `MarkerInfo.get_targ_js`. The joint positions of an
+        articulated object are only read once, even if it has several markers.
+        """
+        ao_id = marker.ao_parent.object_id
+        if ao_id not in self._joint_positions:
+            self._joint_positions[ao_id] = marker.ao_parent.joint_positions
+        return self._joint_positions[ao_id][marker.joint_idx]
+
+    def get_robot_inv_transform(self, robot_id: int) -> mn.Matrix4:
+        """
+        The world to robot base frame transform of a robot.
+        """
+        if robot_id not in self._robot_inv_transforms:
+            robot = self.sim_info.sim.get_agent_data(
+                robot_id
+            ).articulated_agent
+            self._robot_inv_transforms[
+                robot_id
+            ] = robot.base_transformation.inverted()
+        return self._robot_inv_transforms[robot_id]
+
+    def get_snap_idx(self, robot_id: int) -> Optional[int]:
+        """
+        The id of the object held by a robot or None.
+        """
+        if robot_id not in self._robot_snap_idxs:
+            self._robot_snap_idxs[robot_id] = self.sim_info.sim.get_agent_data(
+                robot_id
+            ).grasp_mgr.snap_idx
+        return self._robot_snap_idxs[robot_id]
+
+
+class BatchedPredicateEvaluator:
+    """
+    Evaluates a fixed list of grounded predicates in the current simulator
+    state, reading the simulator through a single `PddlSimSnapshot`. The
+    truth values go through the `pred_truth_cache` of the `PddlSimInfo` like
+    `Predicate.is_true`.
+    """
+
+    def __init__(self, predicates: List["Predicate"]):
+        self._predicates = predicates
+
+    def __call__(self, sim_info: PddlSimInfo) -> np.ndarray:
+        """
+        The truth value of each predicate in the current simulator state.
+        """
+        snapshot = PddlSimSnapshot(sim_info)
+        return np.array(
+            [p.is_true(sim_info, snapshot) for p in self._predicates],
+            dtype=bool,
+        )
@@ -10,9 +10,10 @@ from typing import Any, Dict, Optional, cast
 import magnum as mn
 import numpy as np
 
-import habitat_sim
-from habitat.sims.habitat_simulator.sim_utilities import get_ao_global_bb
 from habitat.tasks.rearrange.marker_info import MarkerInfo
+from habitat.tasks.rearrange.multi_task.pddl_sim_snapshot import (
+    PddlSimSnapshot,
+)
 from habitat.tasks.rearrange.multi_task.rearrange_pddl import (
     PddlEntity,
     PddlSimInfo,
@@ -121,15 +122,24 @@ class PddlRobotState:
         """
         return replace(self)
 
-    def is_true(self, sim_info: PddlSimInfo, robot_entity: PddlEntity) -> bool:
+    def is_true(
+        self,
+        sim_info: PddlSimInfo,
+        robot_entity: PddlEntity,
+        snapshot: Optional[PddlSimSnapshot] = None,
+    ) -> bool:
         """
         Returns if the desired robot state is currently true in the simulator state.
+
+        :param snapshot: The simulator state to read from, shared by the states evaluated in the same step. If None, the simulator is queried directly.
         """
+        if snapshot is None:
+            snapshot = PddlSimSnapshot(sim_info)
         robot_id = cast(
             int,
             sim_info.search_for_entity(robot_entity),
         )
-        grasp_mgr = sim_info.sim.get_agent_data(robot_id).grasp_mgr
+        snap_idx = snapshot.get_snap_idx(robot_id)
 
         assert not (self.holding is not None and self.should_drop)
 
@@ -137,19 +147,18 @@ class PddlRobotState:
             # Robot must be holding desired object.
             obj_idx = cast(int, sim_info.search_for_entity(self.holding))
             abs_obj_id = sim_info.sim.scene_obj_ids[obj_idx]
-            if grasp_mgr.snap_idx != abs_obj_id:
+            if snap_idx != abs_obj_id:
                 return False
-        elif self.should_drop and grasp_mgr.snap_idx != None:
+        elif self.should_drop and snap_idx != None:
             return False
 
         if isinstance(self.pos, PddlEntity):
-            targ_pos = sim_info.get_entity_pos(self.pos)
-            robot = sim_info.sim.get_agent_data(robot_id).articulated_agent
+            targ_pos = snapshot.get_entity_pos(self.pos)
 
-            # Get the base transformation
-            T = robot.base_transformation
-            # Do transformation
-            pos = T.inverted().transform_point(targ_pos)
+            # Transform to the robot base frame
+            pos = snapshot.get_robot_inv_transform(robot_id).transform_point(
+                targ_pos
+            )
             # Project to 2D plane (x,y,z=0)
             pos[2] = 0.0
 
@@ -261,6 +270,18 @@ class PddlSimState:
     def __repr__(self):
         return f"{self._art_states}, {self._obj_states}, {self._robot_states}"
 
+    @property
+    def art_states(self) -> Dict[PddlEntity, ArtSampler]:
+        return self._art_states
+
+    @property
+    def obj_states(self) -> Dict[PddlEntity, PddlEntity]:
+        return self._obj_states
+
+    @property
+    def robot_states(self) -> Dict[PddlEntity, PddlRobotState]:
+        return self._robot_states
+
     def clone(self) -> "PddlSimState":
         return PddlSimState(
             self._art_states,
@@ -340,29 +361,34 @@ class PddlSimState:
     def is_true(
         self,
         sim_info: PddlSimInfo,
+        snapshot: Optional[PddlSimSnapshot] = None,
     ) -> bool:
         """
         Returns True if the grounded state is present in the current simulator state.
         Throws exception if the arguments are not compatible.
+
+        :param snapshot: The simulator state to read from, shared by the states evaluated in the same step. If None, the simulator is queried directly.
         """
+        if snapshot is None:
+            snapshot = PddlSimSnapshot(sim_info)
 
         # Check object states are true.
         if not all(
-            _is_obj_state_true(entity, target, sim_info)
+            _is_obj_state_true(entity, target, sim_info, snapshot)
             for entity, target in self._obj_states.items()
         ):
             return False
 
         # Check articulated object states are true.
         if not all(
-            _is_art_state_true(art_entity, set_art, sim_info)
+            _is_art_state_true(art_entity, set_art, sim_info, snapshot)
             for art_entity, set_art in self._art_states.items()
         ):
             return False
 
         # Check robot states are true.
         if not all(
-            robot_state.is_true(sim_info, robot_entity)
+            robot_state.is_true(sim_info, robot_entity, snapshot)
             for robot_entity, robot_state in self._robot_states.items()
         ):
             return False
@@ -430,38 +456,41 @@ class PddlSimState:
 
 
 def _is_object_inside(
-    entity: PddlEntity, target: PddlEntity, sim_info: PddlSimInfo
+    entity: PddlEntity,
+    target: PddlEntity,
+    sim_info: PddlSimInfo,
+    snapshot: PddlSimSnapshot,
 ) -> bool:
     """
     Returns if `entity` is inside of `target` in the CURRENT simulator state, NOT at the start of the episode.
     """
-    entity_pos = sim_info.get_entity_pos(entity)
+    entity_pos = snapshot.get_entity_pos(entity)
     check_marker = cast(
         MarkerInfo,
         sim_info.search_for_entity(target),
     )
     if sim_info.check_type_matches(target, FRIDGE_TYPE):
-        global_bb = get_ao_global_bb(check_marker.ao_parent)
+        global_bb = snapshot.get_ao_bb(check_marker)
     else:
-        bb = check_marker.link_node.cumulative_bb
-        global_bb = habitat_sim.geo.get_transformed_bb(
-            bb, check_marker.link_node.transformation
-        )
+        global_bb = snapshot.get_link_bb(check_marker)
 
     return global_bb.contains(entity_pos)
 
 
 def _is_obj_state_true(
-    entity: PddlEntity, target: PddlEntity, sim_info: PddlSimInfo
+    entity: PddlEntity,
+    target: PddlEntity,
+    sim_info: PddlSimInfo,
+    snapshot: PddlSimSnapshot,
 ) -> bool:
-    entity_pos = sim_info.get_entity_pos(entity)
+    entity_pos = snapshot.get_entity_pos(entity)
 
     if sim_info.check_type_matches(
         target, SimulatorObjectType.ARTICULATED_RECEPTACLE_ENTITY.value
     ):
         # object is rigid and target is receptacle, we are checking if
         # an object is inside of a receptacle.
-        if not _is_object_inside(entity, target, sim_info):
+        if not _is_object_inside(entity, target, sim_info, snapshot):
             return False
     elif sim_info.check_type_matches(
         target, SimulatorObjectType.GOAL_ENTITY.value
@@ -470,7 +499,7 @@ def _is_obj_state_true(
             int,
             sim_info.search_for_entity(target),
         )
-        idxs, pos_targs = sim_info.sim.get_targets()
+        idxs, pos_targs = snapshot.get_targets()
         targ_pos = pos_targs[list(idxs).index(targ_idx)]
 
         dist = np.linalg.norm(entity_pos - targ_pos)
@@ -493,7 +522,10 @@ def _is_obj_state_true(
 
 
 def _is_art_state_true(
-    art_entity: PddlEntity, set_art: ArtSampler, sim_info: PddlSimInfo
+    art_entity: PddlEntity,
+    set_art: ArtSampler,
+    sim_info: PddlSimInfo,
+    snapshot: PddlSimSnapshot,
 ) -> bool:
     """
     Checks if an articulated object entity matches a condition specified by
@@ -512,7 +544,7 @@ def _is_art_state_true(
             art_entity,
         ),
     )
-    prev_art_pos = marker.get_targ_js()
+    prev_art_pos = snapshot.get_targ_js(marker)
     if not set_art.is_satisfied(prev_art_pos, sim_info.art_thresh):
         return False
     return True
@@ -8,6 +8,7 @@ import os
 import os.path as osp
 import time
 from collections import defaultdict
+from dataclasses import dataclass
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -63,6 +64,44 @@ if TYPE_CHECKING:
     from omegaconf import DictConfig
 
 
+def _matrices_to_array(matrices: List[mn.Matrix4]) -> np.ndarray:
+    # Row-major N x 4 x 4 array, like the transforms of the episodes.
+    return np.array(matrices, dtype=np.float32).reshape(-1, 4, 4)
+
+
+def _array_to_matrix(transform: np.ndarray) -> mn.Matrix4:
+    # The arrays are row-major while the matrices are built from columns.
+    return mn.Matrix4(transform.T.tolist())
+
+
+@dataclass
+class RearrangeSimSnapshot:
+    """
+    Array-backed snapshot of the dynamic state of a RearrangeSim, see
+    RearrangeSim.capture_snapshot. Only valid while the simulator keeps the
+    same scene and set of objects.
+    """
+
+    # The ids of the scene rigid objects, in the order of scene_obj_ids.
+    rigid_obj_ids: np.ndarray
+    # N x 4 x 4 transforms of the rigid objects.
+    rigid_T: np.ndarray
+    # N x 2 x 3 linear and angular velocities of the rigid objects.
+    rigid_V: np.ndarray
+    # M x 4 x 4 transforms of the articulated objects.
+    art_T: np.ndarray
+    # Joint positions of all the articulated objects, concatenated. Those of
+    # object i are art_pos[art_pos_offsets[i]:art_pos_offsets[i + 1]].
+    art_pos: np.ndarray
+    art_pos_offsets: np.ndarray
+    # A x 4 x 4 base transforms of the articulated agents.
+    articulated_agent_T: np.ndarray
+    # The object id held by each grasp manager.
+    obj_hold: List[Optional[int]]
+    # A x num_joints joint positions of the articulated agents, if captured.
+    articulated_agent_js: Optional[List[np.ndarray]] = None
+
+
 @registry.register_simulator(name="RearrangeSim-v0")
 class RearrangeSim(HabitatSim):
     def __init__(self, config: "DictConfig"):
@@ -101,6 +140,9 @@ class RearrangeSim(HabitatSim):
         ] = {}
         self._prev_obj_names: Optional[List[str]] = None
         self._scene_obj_ids: List[int] = []
+        # The managed objects of `self._scene_obj_ids`, to access their state
+        # without looking them up in the rigid object manager.
+        self._scene_objs: List[habitat_sim.physics.ManagedRigidObject] = []
         # The receptacle information cached between all scenes.
         self._receptacles_cache: Dict[str, Dict[str, mn.Range3D]] = {}
         # The per episode receptacle information.
@@ -506,6 +548,7 @@ class RearrangeSim(HabitatSim):
                     continue
                 rom.remove_object_by_id(scene_obj_id)
             self._scene_obj_ids = []
+            self._scene_objs = []
 
         # Reset all marker visualization points
         for obj_id in self.viz_ids.values():
@@ -592,6 +635,7 @@ class RearrangeSim(HabitatSim):
         self._handle_to_object_id = {}
         if should_add_objects:
             self._scene_obj_ids = []
+            self._scene_objs = []
 
         # Get Object template manager
         otm = self.get_object_template_manager()
@@ -615,17 +659,12 @@ class RearrangeSim(HabitatSim):
 
                 # Get rigid object from the path
                 ro = rom.add_object_by_template_handle(object_path)
+                self._scene_obj_ids.append(ro.object_id)
+                self._scene_objs.append(ro)
             else:
-                ro = rom.get_object_by_id(self._scene_obj_ids[i])
+                ro = self._scene_objs[i]
             self.add_perf_timing("create_asset", t_start)
 
-            # The saved matrices need to be flipped when reloading.
-            ro.transformation = mn.Matrix4(
-                [[transform[j][i] for j in range(4)] for i in range(4)]
-            )
-            ro.angular_velocity = mn.Vector3.zero_init()
-            ro.linear_velocity = mn.Vector3.zero_init()
-
             other_obj_handle = (
                 obj_handle.split(".")[0] + f"_:{obj_counts[obj_handle]:04d}"
             )
@@ -633,9 +672,8 @@ class RearrangeSim(HabitatSim):
                 ro.motion_type = habitat_sim.physics.MotionType.KINEMATIC
                 ro.collidable = False
 
-            if should_add_objects:
-                self._scene_obj_ids.append(ro.object_id)
-            rel_idx = self._scene_obj_ids.index(ro.object_id)
+            # The objects are in the order of the episode.
+            rel_idx = i
             self._handle_to_object_id[other_obj_handle] = rel_idx
 
             if other_obj_handle in self._handle_to_goal_name:
@@ -644,6 +682,14 @@ class RearrangeSim(HabitatSim):
 
             obj_counts[obj_handle] += 1
 
+        # The saved matrices are row-major, like the snapshot arrays.
+        self.set_scene_obj_states(
+            np.array(
+                [transform for _, transform in ep_info.rigid_objs],
+                dtype=np.float32,
+            ).reshape(-1, 4, 4)
+        )
+
         if new_scene:
             self._receptacles = self._create_recep_info(
                 ep_info.scene_id, list(self._handle_to_object_id.keys())
@@ -759,11 +805,9 @@ class RearrangeSim(HabitatSim):
             for articulated_agent in self.agents_mgr.articulated_agents_iter
         ]
         art_T = [ao.transformation for ao in self.art_objs]
-        rom = self.get_rigid_object_manager()
 
         rigid_T, rigid_V = [], []
-        for i in self._scene_obj_ids:
-            obj_i = rom.get_object_by_id(i)
+        for obj_i in self._scene_objs:
             rigid_T.append(obj_i.transformation)
             rigid_V.append((obj_i.linear_velocity, obj_i.angular_velocity))
 
@@ -797,8 +841,6 @@ class RearrangeSim(HabitatSim):
           TODO: This should probably be True by default, but I am not sure the effect
           it will have.
         """
-        rom = self.get_rigid_object_manager()
-
         if state["articulated_agent_T"] is not None:
             for articulated_agent_T, robot in zip(
                 state["articulated_agent_T"],
@@ -819,11 +861,10 @@ class RearrangeSim(HabitatSim):
         for T, ao in zip(state["art_T"], self.art_objs):
             ao.transformation = T
 
-        for T, V, i in zip(
-            state["rigid_T"], state["rigid_V"], self._scene_obj_ids
+        for T, V, obj in zip(
+            state["rigid_T"], state["rigid_V"], self._scene_objs
         ):
             # reset object transform
-            obj = rom.get_object_by_id(i)
             obj.transformation = T
             obj.linear_velocity = V[0]
             obj.angular_velocity = V[1]
@@ -842,6 +883,130 @@ class RearrangeSim(HabitatSim):
                 for grasp_mgr in self.agents_mgr.grasp_iter:
                     grasp_mgr.desnap(True)
 
+    def get_scene_obj_states(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the transforms (N x 4 x 4, row-major) and the linear and angular
+        velocities (N x 2 x 3) of the scene rigid objects, in the order of
+        `self._scene_obj_ids`.
+        """
+        rigid_T = _matrices_to_array(
+            [obj.transformation for obj in self._scene_objs]
+        )
+        rigid_V = np.array(
+            [
+                (obj.linear_velocity, obj.angular_velocity)
+                for obj in self._scene_objs
+            ],
+            dtype=np.float32,
+        ).reshape(-1, 2, 3)
+        return rigid_T, rigid_V
+
+    def set_scene_obj_states(
+        self, rigid_T: np.ndarray, rigid_V: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Set the transforms and the velocities of the scene rigid objects, as
+        returned by `get_scene_obj_states`. The velocities are set to zero if
+        `rigid_V` is None.
+        """
+        assert len(rigid_T) == len(self._scene_objs)
+        zero = mn.Vector3.zero_init()
+        for i, obj in enumerate(self._scene_objs):
+            obj.transformation = _array_to_matrix(rigid_T[i])
+            if rigid_V is None:
+                obj.linear_velocity = zero
+                obj.angular_velocity = zero
+            else:
+                obj.linear_velocity = mn.Vector3(rigid_V[i, 0])
+                obj.angular_velocity = mn.Vector3(rigid_V[i, 1])
+
+    def capture_snapshot(
+        self, with_articulated_agent_js: bool = False
+    ) -> RearrangeSimSnapshot:
+        """
+        Same as `capture_state`, in an array-backed snapshot that is cheap to
+        store and to restore with `restore_snapshot`.
+        """
+        rigid_T, rigid_V = self.get_scene_obj_states()
+        art_pos = [
+            np.asarray(ao.joint_positions, dtype=np.float32)
+            for ao in self.art_objs
+        ]
+        articulated_agents = list(self.agents_mgr.articulated_agents_iter)
+        return RearrangeSimSnapshot(
+            rigid_obj_ids=np.array(self._scene_obj_ids, dtype=np.int64),
+            rigid_T=rigid_T,
+            rigid_V=rigid_V,
+            art_T=_matrices_to_array(
+                [ao.transformation for ao in self.art_objs]
+            ),
+            art_pos=np.concatenate(art_pos)
+            if len(art_pos) > 0
+            else np.zeros(0, dtype=np.float32),
+            art_pos_offsets=np.cumsum([0] + [len(p) for p in art_pos]),
+            articulated_agent_T=_matrices_to_array(
+                [agent.sim_obj.transformation for agent in articulated_agents]
+            ),
+            obj_hold=[
+                grasp_mgr.snap_idx for grasp_mgr in self.agents_mgr.grasp_iter
+            ],
+            articulated_agent_js=[
+                np.array(agent.sim_obj.joint_positions, dtype=np.float32)
+                for agent in articulated_agents
+            ]
+            if with_articulated_agent_js
+            else None,
+        )
+
+    def restore_snapshot(
+        self, snapshot: RearrangeSimSnapshot, set_hold: bool = False
+    ) -> None:
+        """
+        Restores a snapshot taken with `capture_snapshot` since the objects
+        were last added, like `set_state`.
+
+        :param set_hold: If true, also restores the objects held by the grasp
+            managers.
+        """
+        assert np.array_equal(
+            snapshot.rigid_obj_ids, self._scene_obj_ids
+        ), "The scene objects changed since the snapshot was captured."
+
+        for T, robot in zip(
+            snapshot.articulated_agent_T,
+            self.agents_mgr.articulated_agents_iter,
+        ):
+            robot.sim_obj.transformation = _array_to_matrix(T)
+            n_dof = len(robot.sim_obj.joint_forces)
+            robot.sim_obj.joint_forces = np.zeros(n_dof)
+            robot.sim_obj.joint_velocities = np.zeros(n_dof)
+
+        if snapshot.articulated_agent_js is not None:
+            for js, robot in zip(
+                snapshot.articulated_agent_js,
+                self.agents_mgr.articulated_agents_iter,
+            ):
+                robot.sim_obj.joint_positions = js
+
+        for T, ao in zip(snapshot.art_T, self.art_objs):
+            ao.transformation = _array_to_matrix(T)
+
+        self.set_scene_obj_states(snapshot.rigid_T, snapshot.rigid_V)
+
+        offsets = snapshot.art_pos_offsets
+        for i, ao in enumerate(self.art_objs):
+            ao.joint_positions = snapshot.art_pos[offsets[i] : offsets[i + 1]]
+
+        if set_hold:
+            for obj_hold, grasp_mgr in zip(
+                snapshot.obj_hold, self.agents_mgr.grasp_iter
+            ):
+                if obj_hold is None:
+                    grasp_mgr.desnap(True)
+                else:
+                    self.internal_step(-1)
+                    grasp_mgr.snap_to_obj(obj_hold)
+
     def get_agent_state(self, agent_id: int = 0) -> habitat_sim.AgentState:
         articulated_agent = self.get_agent_data(agent_id).articulated_agent
         rotation = mn.Quaternion.rotation(
@@ -1025,13 +1190,7 @@ class RearrangeSim(HabitatSim):
 
     def get_scene_pos(self) -> np.ndarray:
         """Get the positions of all clutter RigidObjects in the scene as a numpy array."""
-        rom = self.get_rigid_object_manager()
-        return np.array(
-            [
-                rom.get_object_by_id(idx).translation
-                for idx in self._scene_obj_ids
-            ]
-        )
+        return np.array([obj.translation for obj in self._scene_objs])
 
     def add_perf_timing(self, desc: str, t_start: float) -> None:
         """
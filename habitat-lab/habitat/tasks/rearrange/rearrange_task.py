@@ -7,7 +7,7 @@
 import copy
 import os.path as osp
 from collections import OrderedDict
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, List, Optional, Union
 
 import numpy as np
 from gym import spaces
@@ -21,7 +21,7 @@ from habitat.tasks.rearrange.rearrange_sim import (
     add_perf_timing_func,
 )
 from habitat.tasks.rearrange.utils import (
-    CacheHelper,
+    ArticulatedAgentStartCache,
     CollisionDetails,
     UsesArticulatedAgentInterface,
     rearrange_collision,
@@ -37,7 +37,7 @@ class RearrangeTask(NavigationTask):
     """
 
     _cur_episode_step: int
-    _articulated_agent_pos_start: Dict[str, Tuple[np.ndarray, float]]
+    _articulated_agent_start_cache: Optional[ArticulatedAgentStartCache]
 
     def _duplicate_sensor_suite(self, sensor_suite: SensorSuite) -> None:
         """
@@ -111,21 +111,22 @@ class RearrangeTask(NavigationTask):
         data_path = dataset.config.data_path.format(split=dataset.config.split)
         fname = data_path.split("/")[-1].split(".")[0]
         cache_path = osp.join(
-            osp.dirname(data_path),
-            f"{fname}_{self._config.type}_robot_start.pickle",
+            osp.dirname(data_path), f"{fname}_{self._config.type}_robot_start"
         )
+        # The starts used to be cached in a single pickle file, which is
+        # still read if present.
+        legacy_cache_path = f"{cache_path}.pickle"
 
-        if self._config.should_save_to_cache or osp.exists(cache_path):
-            self._articulated_agent_init_cache = CacheHelper(
-                cache_path,
-                def_val={},
-                verbose=False,
-            )
-            self._articulated_agent_pos_start = (
-                self._articulated_agent_init_cache.load()
+        if (
+            self._config.should_save_to_cache
+            or osp.exists(cache_path)
+            or osp.exists(legacy_cache_path)
+        ):
+            self._articulated_agent_start_cache = ArticulatedAgentStartCache(
+                cache_path, legacy_cache_file=legacy_cache_path
             )
         else:
-            self._articulated_agent_pos_start = None
+            self._articulated_agent_start_cache = None
 
         if len(self._sim.agents_mgr) > 1:
             # Duplicate sensors that handle articulated agents. One for each articulated agent.
@@ -155,28 +156,43 @@ class RearrangeTask(NavigationTask):
         self._sim_reset = sim_reset
 
     def _get_cached_articulated_agent_start(self, agent_idx: int = 0):
-        start_ident = self._get_ep_init_ident(agent_idx)
         if (
-            self._articulated_agent_pos_start is None
-            or start_ident not in self._articulated_agent_pos_start
+            self._articulated_agent_start_cache is None
             or self._force_regenerate
         ):
             return None
-        else:
-            return self._articulated_agent_pos_start[start_ident]
+        return self._articulated_agent_start_cache.get(
+            self._get_ep_init_ident(agent_idx)
+        )
+
+    def _get_ep_init_ident(self, agent_idx, episode_id=None):
+        if episode_id is None:
+            episode_id = self._episode_id
+        return f"{episode_id}_{agent_idx}"
 
-    def _get_ep_init_ident(self, agent_idx):
-        return f"{self._episode_id}_{agent_idx}"
+    def is_articulated_agent_start_cached(self, episode_id: str) -> bool:
+        """
+        Whether the starts of all the articulated agents of the episode
+        `episode_id` are cached, so that resetting to it doesn't sample them.
+        """
+        if (
+            self._articulated_agent_start_cache is None
+            or self._force_regenerate
+        ):
+            return False
+        return all(
+            self._get_ep_init_ident(agent_idx, episode_id)
+            in self._articulated_agent_start_cache
+            for agent_idx in range(self._sim.num_articulated_agents)
+        )
 
     def _cache_articulated_agent_start(self, cache_data, agent_idx: int = 0):
         if (
-            self._articulated_agent_pos_start is not None
+            self._articulated_agent_start_cache is not None
             and self._should_save_to_cache
         ):
-            start_ident = self._get_ep_init_ident(agent_idx)
-            self._articulated_agent_pos_start[start_ident] = cache_data
-            self._articulated_agent_init_cache.save(
-                self._articulated_agent_pos_start
+            self._articulated_agent_start_cache.put(
+                self._get_ep_init_ident(agent_idx), cache_data
             )
 
     def _set_articulated_agent_start(self, agent_idx: int) -> None:
@@ -4,13 +4,16 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import hashlib
+import json
 import logging
 import os
 import os.path as osp
 import pickle
+import tempfile
 import time
 from functools import wraps
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import attr
 import magnum as mn
@@ -309,6 +312,102 @@ class CacheHelper:
             pickle.dump(val, f)
 
 
+class ArticulatedAgentStartCache:
+    """
+    Cache of the start positions of the articulated agents, keyed by episode
+    and agent. Each record is a small file written to a temporary file then
+    renamed, so any number of processes, on any number of nodes sharing the
+    cache directory, can fill the cache concurrently while others read it.
+    The records are read lazily, on the first query of their key.
+
+    The records are sharded in 256 subdirectories by the hash of their key.
+    A legacy pickled dict of starts (see :ref:`CacheHelper`) can be given as
+    a read-only fallback.
+
+    :param cache_dir: Directory of the records.
+    :param legacy_cache_file: Pickled dict of starts checked for the keys
+        without a record.
+    """
+
+    def __init__(
+        self, cache_dir: str, legacy_cache_file: Optional[str] = None
+    ):
+        self.cache_dir = cache_dir
+        self._legacy_cache_file = legacy_cache_file
+        self._legacy_starts: Optional[
+            Dict[str, Tuple[np.ndarray, float]]
+        ] = None
+        self._starts: Dict[str, Tuple[np.ndarray, float]] = {}
+
+    def _record_path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return osp.join(self.cache_dir, digest[:2], f"{digest}.json")
+
+    def _load_legacy(self) -> Dict[str, Tuple[np.ndarray, float]]:
+        if self._legacy_starts is None:
+            self._legacy_starts = {}
+            if self._legacy_cache_file is not None and osp.exists(
+                self._legacy_cache_file
+            ):
+                self._legacy_starts = CacheHelper(
+                    self._legacy_cache_file, def_val={}
+                ).load()
+        return self._legacy_starts
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Returns the cached (position, rotation) start of `key`, or None.
+        """
+        if key in self._starts:
+            return self._starts[key]
+        try:
+            with open(self._record_path(key), "r") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return self._load_legacy().get(key, None)
+        except ValueError:
+            # Only possible if the file was written by other means.
+            rearrange_logger.warning(
+                f"Ignoring corrupted start record {self._record_path(key)}"
+            )
+            return None
+        start = (np.array(record["pos"], dtype=np.float32), record["rot"])
+        self._starts[key] = start
+        return start
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def put(self, key: str, start: Tuple[np.ndarray, float]) -> None:
+        """
+        Atomically writes the (position, rotation) start of `key`, replacing
+        any previous record.
+        """
+        pos, rot = start
+        record_path = self._record_path(key)
+        record_dir = osp.dirname(record_path)
+        os.makedirs(record_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f".{osp.basename(record_path)}.", dir=record_dir
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {
+                        "key": key,
+                        "pos": np.asarray(pos, dtype=np.float64).tolist(),
+                        "rot": float(rot),
+                    },
+                    f,
+                )
+            os.replace(tmp_path, record_path)
+        except BaseException:
+            if osp.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._starts[key] = (np.array(pos, dtype=np.float32), float(rot))
+
+
 def batch_transform_point(
     points: np.ndarray, transform_matrix: mn.Matrix4, dtype=np.float32
 ) -> np.ndarray:
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Shared-memory transport for observations returned by :ref:`VectorEnv`
+workers.
+
+The parent process allocates one slab of shared memory per fixed-size
+:py:`spaces.Box` observation of every worker. Workers copy their observations
+into these slabs and only send a small :ref:`SharedMemoryObservations` header
+through the pipe. The parent then rebuilds the observation dictionary out of
+numpy views on the slabs, so no pickling of image data takes place.
+
+The views returned to the parent are only valid until the next
+:py:`step`/:py:`reset` of the same environment since the worker will write
+the next observations in place. Consumers such as :ref:`batch_obs` copy the
+data out immediately, callers that want to keep observations around need to
+copy them.
+"""
+
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import attr
+import numpy as np
+from gym import spaces
+
+from habitat.core.logging import logger
+
+
+@attr.s(auto_attribs=True, frozen=True, slots=True)
+class SharedMemorySlabSpec:
+    r"""Describes where a single observation lives in shared memory."""
+    key: str
+    shm_name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            int(np.prod(self.shape, dtype=np.int64))
+            * np.dtype(self.dtype).itemsize
+        )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class SharedMemoryObservations:
+    r"""The header sent through the pipe in place of an observation
+    dictionary.
+
+    :property keys: all the keys of the observation dictionary, in order.
+    :property shared_keys: the keys whose value was written to shared memory.
+    :property others: the values that did not fit in shared memory and were
+        sent through the pipe instead.
+    """
+    keys: Tuple[str, ...]
+    shared_keys: Tuple[str, ...]
+    others: Dict[str, Any]
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Workers are started by the parent's multiprocessing context and
+    # therefore share its resource tracker. Registering the segment again
+    # from the worker is a no-op, the parent unlinks it in :ref:`close`.
+    return shared_memory.SharedMemory(name=name, create=False)
+
+
+def _slab_view(
+    shm: shared_memory.SharedMemory, spec: SharedMemorySlabSpec
+) -> np.ndarray:
+    return np.ndarray(spec.shape, dtype=np.dtype(spec.dtype), buffer=shm.buf)
+
+
+def create_slab_specs(
+    observation_space: spaces.Space,
+) -> List[Tuple[str, Tuple[int, ...], str]]:
+    r"""Lists the observations of :p:`observation_space` that can be
+    transported through shared memory, as :py:`(key, shape, dtype)` tuples.
+    Only fixed-size :py:`spaces.Box` observations are eligible, anything else
+    keeps going through the pipe.
+    """
+    if not isinstance(observation_space, spaces.Dict):
+        return []
+
+    specs = []
+    for key, space in observation_space.spaces.items():
+        if not isinstance(space, spaces.Box) or space.shape is None:
+            continue
+        if len(space.shape) == 0 or np.prod(space.shape) == 0:
+            continue
+        specs.append((key, tuple(space.shape), np.dtype(space.dtype).str))
+    return specs
+
+
+class SharedMemoryObservationSlabs:
+    r"""Owner of the shared memory slabs of a single worker. Lives in the
+    parent process.
+    """
+
+    def __init__(self, observation_space: spaces.Space):
+        self._shms: List[shared_memory.SharedMemory] = []
+        self.specs: List[SharedMemorySlabSpec] = []
+        for key, shape, dtype in create_slab_specs(observation_space):
+            nbytes = (
+                int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+            )
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._shms.append(shm)
+            self.specs.append(
+                SharedMemorySlabSpec(
+                    key=key, shm_name=shm.name, shape=shape, dtype=dtype
+                )
+            )
+
+        self._views: Dict[str, np.ndarray] = {
+            spec.key: _slab_view(shm, spec)
+            for shm, spec in zip(self._shms, self.specs)
+        }
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def decode(self, header: SharedMemoryObservations) -> Dict[str, Any]:
+        r"""Rebuilds the observation dictionary from :p:`header`. The shared
+        values are zero-copy views on the slabs.
+        """
+        observations: Dict[str, Any] = OrderedDict()
+        for k in header.keys:
+            if k in header.others:
+                observations[k] = header.others[k]
+            else:
+                observations[k] = self._views[k]
+        return observations
+
+    def wrap_read_fn(self, read_fn: Callable[[], Any]) -> Callable[[], Any]:
+        r"""Returns a version of :p:`read_fn` that transparently decodes the
+        observations in the results of the :py:`step` and :py:`reset`
+        commands.
+        """
+
+        def _read():
+            result = read_fn()
+            if isinstance(result, SharedMemoryObservations):
+                return self.decode(result)
+            if (
+                isinstance(result, tuple)
+                and len(result) > 0
+                and isinstance(result[0], SharedMemoryObservations)
+            ):
+                return (self.decode(result[0]), *result[1:])
+            return result
+
+        return _read
+
+    def close(self) -> None:
+        self._views = {}
+        for shm in self._shms:
+            try:
+                shm.close()
+            except BufferError:
+                # Views handed out to the user are still alive, the memory
+                # will be released once they are garbage collected.
+                pass
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shms = []
+
+
+class SharedMemoryObservationWriter:
+    r"""Writes the observations of a worker into the slabs allocated by
+    :ref:`SharedMemoryObservationSlabs`. Lives in the worker process.
+    """
+
+    def __init__(self, specs: List[SharedMemorySlabSpec]):
+        self._shms: List[shared_memory.SharedMemory] = []
+        self._views: Dict[str, np.ndarray] = {}
+        for spec in specs:
+            shm = _attach(spec.shm_name)
+            self._shms.append(shm)
+            self._views[spec.key] = _slab_view(shm, spec)
+        self._warned_keys: set = set()
+
+    def encode(self, observations: Any) -> Any:
+        r"""Copies the eligible observations into shared memory and returns
+        the header to send through the pipe instead of :p:`observations`.
+        Observations whose shape or dtype does not match their slab are sent
+        through the pipe as usual.
+        """
+        if not isinstance(observations, dict):
+            return observations
+
+        shared_keys = []
+        others = {}
+        for k, v in observations.items():
+            view = self._views.get(k, None)
+            if (
+                view is not None
+                and isinstance(v, np.ndarray)
+                and v.shape == view.shape
+                and v.dtype == view.dtype
+            ):
+                np.copyto(view, v)
+                shared_keys.append(k)
+            else:
+                if view is not None and k not in self._warned_keys:
+                    self._warned_keys.add(k)
+                    logger.warn(
+                        f"Observation '{k}' does not match its observation "
+                        "space, sending it through the pipe instead of "
+                        "shared memory."
+                    )
+                others[k] = v
+
+        return SharedMemoryObservations(
+            keys=tuple(observations.keys()),
+            shared_keys=tuple(shared_keys),
+            others=others,
+        )
+
+    def close(self) -> None:
+        self._views = {}
+        for shm in self._shms:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+        self._shms = []
+
+
+def maybe_encode(
+    writer: Optional[SharedMemoryObservationWriter], observations: Any
+) -> Any:
+    if writer is None:
+        return observations
+    return writer.encode(observations)
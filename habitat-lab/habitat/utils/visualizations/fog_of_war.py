@@ -4,6 +4,9 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import functools
+from typing import NamedTuple
+
 import numba
 import numpy as np
 
@@ -97,26 +100,73 @@ def draw_fog_of_war_line(top_down_map, fog_of_war_mask, pt1, pt2):
         fog_of_war_mask[x, y] = 1
 
 
+class _RayTable(NamedTuple):
+    # Angle between two consecutive rays, in radians.
+    angle_step: float
+    # The grid offsets of the cells covered by each ray, in order, padded to
+    # the length of the longest ray.
+    offsets: np.ndarray
+    # The number of cells covered by each ray.
+    lengths: np.ndarray
+
+
+@functools.lru_cache(maxsize=16)
+def _get_ray_table(max_line_len: float) -> _RayTable:
+    r"""Precomputes the rays revealing the fog-of-war around a point in
+    every direction. The cells covered by a ray only depend on its angle and
+    length since the rays start at the center of a cell, so the table is
+    shared by all the positions of the agent.
+    """
+    # Set the angle step to a value such that delta_angle * max_line_len <= 1
+    num_rays = int(np.ceil(2 * np.pi * max_line_len))
+    angle_step = 2 * np.pi / num_rays
+    origin = np.zeros(2, dtype=np.int64)
+    angles = np.arange(num_rays) * angle_step
+    rays = [
+        np.array(
+            bresenham_supercover_line(
+                origin,
+                max_line_len * np.array([np.cos(angle), np.sin(angle)]),
+            ),
+            dtype=np.int32,
+        )
+        for angle in angles
+    ]
+    lengths = np.array([len(ray) for ray in rays], dtype=np.int32)
+    offsets = np.zeros((num_rays, lengths.max(), 2), dtype=np.int32)
+    for ray_index, ray in enumerate(rays):
+        offsets[ray_index, : len(ray)] = ray
+    return _RayTable(angle_step, offsets, lengths)
+
+
 @numba.jit(nopython=True)
-def _draw_loop(
+def _cast_rays(
     top_down_map,
     fog_of_war_mask,
     current_point,
-    current_angle,
-    max_line_len,
-    angles,
+    offsets,
+    lengths,
+    first_ray,
+    num_rays,
 ):
-    for angle in angles:
-        draw_fog_of_war_line(
-            top_down_map,
-            fog_of_war_mask,
-            current_point,
-            current_point
-            + max_line_len
-            * np.array(
-                [np.cos(current_angle + angle), np.sin(current_angle + angle)]
-            ),
-        )
+    total_rays = offsets.shape[0]
+    x0, y0 = current_point[0], current_point[1]
+    for i in range(num_rays):
+        ray = (first_ray + i) % total_rays
+        for j in range(lengths[ray]):
+            x = x0 + offsets[ray, j, 0]
+            y = y0 + offsets[ray, j, 1]
+
+            if x < 0 or x >= fog_of_war_mask.shape[0]:
+                break
+
+            if y < 0 or y >= fog_of_war_mask.shape[1]:
+                break
+
+            if top_down_map[x, y] == maps.MAP_INVALID_POINT:
+                break
+
+            fog_of_war_mask[x, y] = 1
 
 
 def reveal_fog_of_war(
@@ -130,7 +180,8 @@ def reveal_fog_of_war(
     r"""Reveals the fog-of-war at the current location
 
     This works by simply drawing lines from the agents current location
-    and stopping once a wall is hit
+    and stopping once a wall is hit. The lines are taken from a table of
+    rays precomputed once per :p:`max_line_len`.
 
     Args:
         top_down_map: The current top down map.  Used for respecting walls when revealing
@@ -144,20 +195,22 @@ def reveal_fog_of_war(
         The updated fog_of_war_mask
     """
     fov = np.deg2rad(fov)
+    ray_table = _get_ray_table(float(max_line_len))
 
-    # Set the angle step to a value such that delta_angle * max_line_len = 1
-    angles = np.arange(
-        -fov / 2, fov / 2, step=1.0 / max_line_len, dtype=np.float32
-    )
+    # The rays within the field of view are consecutive in the table.
+    total_rays = len(ray_table.lengths)
+    first_ray = int(np.ceil((current_angle - fov / 2) / ray_table.angle_step))
+    num_rays = min(int(np.ceil(fov / ray_table.angle_step)), total_rays)
 
     fog_of_war_mask = current_fog_of_war_mask.copy()
-    _draw_loop(
+    _cast_rays(
         top_down_map,
         fog_of_war_mask,
-        current_point,
-        current_angle,
-        max_line_len,
-        angles,
+        np.asarray(current_point, dtype=np.int64),
+        ray_table.offsets,
+        ray_table.lengths,
+        first_ray % total_rays,
+        num_rays,
     )
 
     return fog_of_war_mask
@@ -4,7 +4,9 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import hashlib
 import os
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import imageio
@@ -346,6 +348,111 @@ def get_topdown_map_from_sim(
     )
 
 
+def _navmesh_fingerprint(pathfinder) -> str:
+    r"""Identifies the navmesh of :p:`pathfinder` without reading its
+    polygons. Recomputing the navmesh with other settings changes its
+    navigable area.
+    """
+    lower_bound, upper_bound = pathfinder.get_bounds()
+    return ",".join(
+        f"{v:.4f}"
+        for v in (
+            *lower_bound,
+            *upper_bound,
+            getattr(pathfinder, "navigable_area", 0.0),
+        )
+    )
+
+
+class TopDownMapCache:
+    r"""LRU cache of the maps returned by :ref:`get_topdown_map`.
+
+    Maps are keyed by the scene, the navmesh, the floor height (quantized to
+    :p:`height_resolution`), the resolution and :p:`draw_border`, so that the
+    episodes of a scene only rasterize the navmesh once per floor.
+
+    :param max_maps: Number of maps kept in memory.
+    :param cache_dir: If set, maps are also saved to this directory, which
+        can be shared by several processes, and loaded back from it.
+    :param height_resolution: Floor heights that round to the same multiple
+        of this share their map. It only needs to be small enough to separate
+        two floors.
+    """
+
+    def __init__(
+        self,
+        max_maps: int,
+        cache_dir: Optional[str] = None,
+        height_resolution: float = 0.1,
+    ):
+        assert max_maps > 0
+        self.max_maps = max_maps
+        self.cache_dir = cache_dir
+        self.height_resolution = height_resolution
+        self._maps: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._maps)
+
+    def _map_path(self, key: Tuple) -> str:
+        assert self.cache_dir is not None
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npz")
+
+    def get(
+        self,
+        pathfinder,
+        scene_id: str,
+        height: float,
+        map_resolution: int = 1024,
+        draw_border: bool = True,
+        meters_per_pixel: Optional[float] = None,
+    ) -> np.ndarray:
+        r"""Returns a copy of the top-down map of :p:`scene_id` at
+        :p:`height`, computing it with :ref:`get_topdown_map` if it is
+        neither in memory nor in :py:`cache_dir`.
+        """
+        if meters_per_pixel is None:
+            meters_per_pixel = calculate_meters_per_pixel(
+                map_resolution, pathfinder=pathfinder
+            )
+        key = (
+            scene_id,
+            _navmesh_fingerprint(pathfinder),
+            int(round(height / self.height_resolution)),
+            f"{meters_per_pixel:.6f}",
+            draw_border,
+        )
+
+        top_down_map = self._maps.get(key, None)
+        if top_down_map is not None:
+            self._maps.move_to_end(key)
+            return top_down_map.copy()
+
+        path = self._map_path(key) if self.cache_dir is not None else None
+        if path is not None and os.path.exists(path):
+            with np.load(path) as data:
+                top_down_map = data["map"]
+        else:
+            top_down_map = get_topdown_map(
+                pathfinder,
+                height,
+                map_resolution,
+                draw_border,
+                meters_per_pixel,
+            )
+            if path is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+                np.savez_compressed(tmp_path, map=top_down_map)
+                os.replace(tmp_path, path)
+
+        self._maps[key] = top_down_map
+        while len(self._maps) > self.max_maps:
+            self._maps.popitem(last=False)
+        return top_down_map.copy()
+
+
 def colorize_topdown_map(
     top_down_map: np.ndarray,
     fog_of_war_mask: Optional[np.ndarray] = None,
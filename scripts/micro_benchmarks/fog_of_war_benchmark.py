@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Times ``reveal_fog_of_war``, as called by ``TopDownMap`` on every step,
+against the previous implementation that builds every line with
+``bresenham_supercover_line`` for each angle of the field of view.
+
+The map is a synthetic floor with rectangular obstacles and the agent does a
+random walk on it. Reports the per-step cost of both implementations, the
+one-off cost of the ray table and the agreement of the revealed masks (the
+rays of the table are aligned on a fixed angular grid instead of starting at
+the heading of the agent, so a few cells on the edges of the field of view
+can differ).
+"""
+
+import argparse
+import time
+
+import numba
+import numpy as np
+
+from habitat.utils.visualizations import maps
+from habitat.utils.visualizations.fog_of_war import (
+    _get_ray_table,
+    draw_fog_of_war_line,
+    reveal_fog_of_war,
+)
+
+
+@numba.jit(nopython=True)
+def _reference_draw_loop(
+    top_down_map,
+    fog_of_war_mask,
+    current_point,
+    current_angle,
+    max_line_len,
+    angles,
+):
+    for angle in angles:
+        draw_fog_of_war_line(
+            top_down_map,
+            fog_of_war_mask,
+            current_point,
+            current_point
+            + max_line_len
+            * np.array(
+                [np.cos(current_angle + angle), np.sin(current_angle + angle)]
+            ),
+        )
+
+
+def _reference_reveal_fog_of_war(
+    top_down_map,
+    fog_of_war_mask,
+    current_point,
+    current_angle,
+    fov,
+    max_line_len,
+):
+    fov = np.deg2rad(fov)
+    angles = np.arange(
+        -fov / 2, fov / 2, step=1.0 / max_line_len, dtype=np.float32
+    )
+    fog_of_war_mask = fog_of_war_mask.copy()
+    _reference_draw_loop(
+        top_down_map,
+        fog_of_war_mask,
+        current_point,
+        current_angle,
+        max_line_len,
+        angles,
+    )
+    return fog_of_war_mask
+
+
+def _make_map(size: int, num_obstacles: int, rng) -> np.ndarray:
+    top_down_map = np.full((size, size), maps.MAP_VALID_POINT, np.uint8)
+    top_down_map[:8] = top_down_map[-8:] = maps.MAP_INVALID_POINT
+    top_down_map[:, :8] = top_down_map[:, -8:] = maps.MAP_INVALID_POINT
+    for _ in range(num_obstacles):
+        x, y = rng.randint(0, size, size=2)
+        w, h = rng.randint(4, size // 16, size=2)
+        top_down_map[x : x + w, y : y + h] = maps.MAP_INVALID_POINT
+    return top_down_map
+
+
+def _random_walk(top_down_map, num_steps: int, rng):
+    size = top_down_map.shape[0]
+    point = np.array([size // 2, size // 2])
+    angle = 0.0
+    steps = []
+    for _ in range(num_steps):
+        angle += rng.choice([-0.17, 0.0, 0.0, 0.17])
+        new_point = point + np.round(
+            5 * np.array([np.cos(angle), np.sin(angle)])
+        ).astype(np.int64)
+        if (
+            (new_point >= 0).all()
+            and (new_point < size).all()
+            and top_down_map[new_point[0], new_point[1]]
+            != maps.MAP_INVALID_POINT
+        ):
+            point = new_point
+        else:
+            angle += np.pi / 2
+        steps.append((point.copy(), angle))
+    return steps
+
+
+def _time_episode(reveal, top_down_map, steps, fov, max_line_len):
+    fog_of_war_mask = np.zeros_like(top_down_map)
+    start = time.perf_counter()
+    for point, angle in steps:
+        fog_of_war_mask = reveal(
+            top_down_map, fog_of_war_mask, point, angle, fov, max_line_len
+        )
+    return time.perf_counter() - start, fog_of_war_mask
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--map-size", type=int, default=1024)
+    parser.add_argument("--num-obstacles", type=int, default=200)
+    parser.add_argument("--num-steps", type=int, default=500)
+    parser.add_argument("--fov", type=float, default=90)
+    parser.add_argument(
+        "--max-line-len",
+        type=float,
+        nargs="+",
+        # visibility_dist=5m on maps of 0.02m and 0.05m per pixel.
+        default=[250.0, 100.0],
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    top_down_map = _make_map(args.map_size, args.num_obstacles, rng)
+    steps = _random_walk(top_down_map, args.num_steps, rng)
+
+    for max_line_len in args.max_line_len:
+        # Compile the numba functions outside of the timings.
+        _time_episode(
+            _reference_reveal_fog_of_war,
+            top_down_map,
+            steps[:1],
+            args.fov,
+            max_line_len,
+        )
+        start = time.perf_counter()
+        _get_ray_table(float(max_line_len))
+        table_time = time.perf_counter() - start
+        _time_episode(
+            reveal_fog_of_war, top_down_map, steps[:1], args.fov, max_line_len
+        )
+
+        reference_time, reference_mask = _time_episode(
+            _reference_reveal_fog_of_war,
+            top_down_map,
+            steps,
+            args.fov,
+            max_line_len,
+        )
+        table_time_steps, mask = _time_episode(
+            reveal_fog_of_war, top_down_map, steps, args.fov, max_line_len
+        )
+
+        revealed = reference_mask.astype(bool)
+        revealed_table = mask.astype(bool)
+        iou = (revealed & revealed_table).sum() / max(
+            (revealed | revealed_table).sum(), 1
+        )
+        print(
+            f"map={args.map_size}x{args.map_size} "
+            f"max_line_len={max_line_len:g} fov={args.fov:g}"
+        )
+        print(
+            f"  reference:  {1e6 * reference_time / len(steps):9.1f} us/step"
+        )
+        print(
+            f"  ray table:  {1e6 * table_time_steps / len(steps):9.1f} us/step"
+            f" (table built once in {1e3 * table_time:.1f} ms)"
+        )
+        print(f"  speedup:    {reference_time / table_time_steps:9.2f}x")
+        print(f"  mask IoU:   {iou:9.4f}")
+
+
+if __name__ == "__main__":
+    main()
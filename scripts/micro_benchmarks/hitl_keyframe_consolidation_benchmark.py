@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Replays a HITL session through the keyframe consolidation of the
+networking process and reports the per-frame cost over the session.
+
+The keyframes are read from a ``.gfx_replay.json.gz`` file saved with
+``habitat_hitl.data_collection.save_gfx_replay_keyframes`` or, without
+``--replay-file``, generated to mimic a long session: a fixed set of
+instances and rigs updated every frame and objects being created and deleted
+throughout.
+
+Both the indexed ``ConsolidatedKeyframe`` used by ``NetworkManager`` and the
+list-based ``update_consolidated_keyframe`` are timed, and their consolidated
+keyframes are checked to match.
+"""
+
+import argparse
+import copy
+import gzip
+import json
+import random
+import time
+from typing import List
+
+from habitat_hitl._internal.networking.keyframe_utils import (
+    ConsolidatedKeyframe,
+    get_empty_keyframe,
+    update_consolidated_keyframe,
+)
+from habitat_hitl.core.types import Keyframe
+
+
+def load_replay(path: str) -> List[Keyframe]:
+    open_fn = gzip.open if path.endswith(".gz") else open
+    with open_fn(path, "rt") as f:
+        return json.load(f)["keyframes"]
+
+
+def synthesize_session(
+    num_frames: int,
+    num_instances: int,
+    num_rigs: int,
+    moving: int,
+    churn: int,
+    num_rig_bones: int = 20,
+    seed: int = 0,
+) -> List[Keyframe]:
+    """
+    Generate keyframes resembling a HITL session. Also used by
+    hitl_wire_format_benchmark.py.
+    """
+    rng = random.Random(seed)
+
+    def _state():
+        return {
+            "absTransform": {
+                "translation": [rng.uniform(-5, 5) for _ in range(3)],
+                "rotation": [rng.uniform(-1, 1) for _ in range(4)],
+            }
+        }
+
+    next_key = 0
+    live_keys: List[int] = []
+    keyframes: List[Keyframe] = []
+    for frame_idx in range(num_frames):
+        keyframe: Keyframe = {"stateUpdates": [], "rigUpdates": []}
+        creations = []
+        num_new = num_instances if frame_idx == 0 else churn
+        for _ in range(num_new):
+            creations.append(
+                {
+                    "instanceKey": next_key,
+                    "creation": {"filepath": f"object_{next_key % 50}.glb"},
+                }
+            )
+            keyframe["stateUpdates"].append(
+                {"instanceKey": next_key, "state": _state()}
+            )
+            live_keys.append(next_key)
+            next_key += 1
+        keyframe["creations"] = creations
+
+        if frame_idx > 0 and len(live_keys) > num_instances:
+            deletions = [
+                live_keys.pop(rng.randrange(len(live_keys)))
+                for _ in range(churn)
+            ]
+            keyframe["deletions"] = deletions
+
+        for key in rng.sample(live_keys, min(moving, len(live_keys))):
+            keyframe["stateUpdates"].append(
+                {"instanceKey": key, "state": _state()}
+            )
+        for rig_id in range(num_rigs):
+            keyframe["rigUpdates"].append(
+                {
+                    "id": rig_id,
+                    "pose": [
+                        rng.uniform(-1, 1) for _ in range(7 * num_rig_bones)
+                    ],
+                }
+            )
+        keyframe["message"] = {"frame": frame_idx}
+        keyframes.append(keyframe)
+    return keyframes
+
+
+def _time_per_frame(update_fn, keyframes: List[Keyframe]) -> List[float]:
+    times = []
+    for keyframe in keyframes:
+        start = time.perf_counter()
+        update_fn(keyframe)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _report(name: str, times: List[float], num_windows: int) -> None:
+    window = max(len(times) // num_windows, 1)
+    means = [
+        1e6 * sum(times[i : i + window]) / len(times[i : i + window])
+        for i in range(0, len(times), window)
+    ]
+    print(
+        f"{name:>22}: total {sum(times) * 1e3:9.2f} ms, "
+        f"us/frame per window: "
+        + " ".join(f"{m:7.1f}" for m in means[:num_windows])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--replay-file",
+        type=str,
+        default=None,
+        help="A .gfx_replay.json.gz file saved by a HITL session.",
+    )
+    parser.add_argument("--num-frames", type=int, default=5000)
+    parser.add_argument("--num-instances", type=int, default=300)
+    parser.add_argument("--num-rigs", type=int, default=2)
+    parser.add_argument("--moving", type=int, default=30)
+    parser.add_argument("--churn", type=int, default=2)
+    parser.add_argument("--windows", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.replay_file is not None:
+        keyframes = load_replay(args.replay_file)
+    else:
+        keyframes = synthesize_session(
+            args.num_frames,
+            args.num_instances,
+            args.num_rigs,
+            args.moving,
+            args.churn,
+            seed=args.seed,
+        )
+    print(f"Replaying {len(keyframes)} keyframes")
+
+    # Both implementations may keep references to the incremental keyframes,
+    # give each its own copy.
+    indexed = ConsolidatedKeyframe()
+    indexed_times = _time_per_frame(indexed.update, copy.deepcopy(keyframes))
+
+    list_based = get_empty_keyframe()
+    list_times = _time_per_frame(
+        lambda inc: update_consolidated_keyframe(list_based, inc),
+        copy.deepcopy(keyframes),
+    )
+
+    _report("ConsolidatedKeyframe", indexed_times, args.windows)
+    _report("list consolidation", list_times, args.windows)
+
+    start = time.perf_counter()
+    consolidated = indexed.to_keyframe()
+    print(
+        f"to_keyframe for a joining client: "
+        f"{(time.perf_counter() - start) * 1e3:.2f} ms"
+    )
+
+    for key in (
+        "loads",
+        "creations",
+        "rigCreations",
+        "stateUpdates",
+        "rigUpdates",
+        "deletions",
+    ):
+        assert consolidated[key] == list_based[key], key
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Streams HITL keyframes over a local websocket with every wire format of
+``habitat_hitl/_internal/networking/wire_format.py`` and reports the encode
+time, the decode time and the number of bytes per frame.
+
+The keyframes mimic the ``rearrange_v2`` and ``pick_throw_vr`` example apps
+(see ``--app``) or are read from a ``.gfx_replay.json.gz`` file saved by one
+of these apps with ``habitat_hitl.data_collection.save_gfx_replay_keyframes``.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import websockets
+from hitl_keyframe_consolidation_benchmark import (
+    load_replay,
+    synthesize_session,
+)
+
+from habitat_hitl._internal.networking.wire_format import (
+    JSON_ENCODING,
+    MSGPACK_ENCODING,
+    NO_COMPRESSION,
+    ZLIB_COMPRESSION,
+    Message,
+    WireFormat,
+    msgpack_available,
+)
+from habitat_hitl.core.types import Keyframe
+
+# Rough shape of the keyframes of the example apps: rearrange_v2 streams two
+# skinned avatars in a furnished scene, pick_throw_vr disables skinning (see
+# its config) and has fewer objects.
+APP_PROFILES: Dict[str, Dict[str, int]] = {
+    "rearrange_v2": dict(
+        num_instances=600, num_rigs=2, num_rig_bones=54, moving=40, churn=0
+    ),
+    "pick_throw_vr": dict(num_instances=300, num_rigs=0, moving=20, churn=1),
+}
+
+
+async def _loopback(messages: List[Message], wire_format: WireFormat) -> float:
+    async def _serve(websocket, *args):
+        for message in messages:
+            await websocket.send(message)
+
+    async with websockets.serve(_serve, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        start = time.perf_counter()
+        async with websockets.connect(
+            f"ws://127.0.0.1:{port}", max_size=None
+        ) as websocket:
+            for _ in range(len(messages)):
+                wire_format.decode_keyframes(await websocket.recv())
+        return time.perf_counter() - start
+
+
+def _benchmark(keyframes: List[Keyframe], wire_format: WireFormat) -> None:
+    start = time.perf_counter()
+    messages = [wire_format.encode_keyframes([kf]) for kf in keyframes]
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for message in messages:
+        wire_format.decode_keyframes(message)
+    decode_time = time.perf_counter() - start
+
+    loopback_time = asyncio.run(_loopback(messages, wire_format))
+
+    num_bytes = sum(
+        len(m.encode("utf-8")) if isinstance(m, str) else len(m)
+        for m in messages
+    )
+    n = len(keyframes)
+    print(
+        f"  {wire_format.encoding:>7}/{wire_format.compression:<4}: "
+        f"{num_bytes / n:10.0f} B/frame, "
+        f"encode {encode_time / n * 1e6:8.1f} us/frame, "
+        f"decode {decode_time / n * 1e6:8.1f} us/frame, "
+        f"loopback {n / loopback_time:8.0f} frames/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--app",
+        choices=sorted(APP_PROFILES.keys()),
+        nargs="+",
+        default=sorted(APP_PROFILES.keys()),
+    )
+    parser.add_argument(
+        "--replay-file",
+        type=str,
+        default=None,
+        help="A .gfx_replay.json.gz file saved by a HITL session, used "
+        "instead of the synthetic app keyframes.",
+    )
+    parser.add_argument("--num-frames", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.replay_file is not None:
+        sessions = {args.replay_file: load_replay(args.replay_file)}
+    else:
+        sessions = {
+            app: synthesize_session(
+                args.num_frames, seed=args.seed, **APP_PROFILES[app]
+            )
+            for app in args.app
+        }
+
+    encodings = [JSON_ENCODING]
+    if msgpack_available:
+        encodings.append(MSGPACK_ENCODING)
+    else:
+        print("msgpack is not installed, skipping it.")
+
+    for name, keyframes in sessions.items():
+        print(f"{name} ({len(keyframes)} frames):")
+        for encoding in encodings:
+            for compression in (NO_COMPRESSION, ZLIB_COMPRESSION):
+                _benchmark(keyframes, WireFormat(encoding, compression))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Times one low-level step of ``HierarchicalPolicy`` (grouping the
+environments per running skill, running the skills and writing their actions
+and hidden states back) with the batching of
+``habitat_baselines.rl.hrl.skill_executor``, with and without CUDA streams,
+against the previous per-skill list indexing.
+
+The skills are synthetic recurrent networks with the sizes of the neural
+skills of the rearrange HRL configs; the defaults match the number of skills
+and environments of the social rearrangement configs. Reports the time per
+step and checks that all the versions give the same actions and hidden
+states.
+"""
+
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from habitat_baselines.common.tensor_dict import TensorDict
+from habitat_baselines.rl.hrl.skill_executor import (
+    BatchIndex,
+    SkillStreams,
+    gather_batch,
+    group_batch_by_skill,
+)
+
+
+class _Skill(nn.Module):
+    def __init__(self, obs_keys, obs_dim, hidden_size, num_actions):
+        super().__init__()
+        self.obs_keys = obs_keys
+        self.encoder = nn.Sequential(
+            nn.Linear(obs_dim * len(obs_keys), hidden_size),
+            nn.ReLU(),
+            nn.Linear(hidden_size, hidden_size),
+            nn.ReLU(),
+        )
+        self.rnn = nn.GRUCell(hidden_size, hidden_size)
+        self.action_head = nn.Linear(hidden_size, num_actions)
+
+    def act(self, observations, rnn_hidden_states, masks):
+        x = self.encoder(
+            torch.cat([observations[k] for k in self.obs_keys], dim=-1)
+        )
+        hidden = self.rnn(x, rnn_hidden_states[:, 0] * masks)
+        return self.action_head(hidden), hidden.unsqueeze(1)
+
+
+def _reference_step(skills, skill_ids, observations, hidden, masks, actions):
+    skill_to_batch = defaultdict(list)
+    for i, skill_id in enumerate(skill_ids):
+        skill_to_batch[skill_id].append(i)
+    for skill_id, batch_ids in skill_to_batch.items():
+        skill = skills[skill_id]
+        skill_actions, skill_hidden = skill.act(
+            observations.slice_keys(*skill.obs_keys)[batch_ids],
+            hidden[batch_ids],
+            masks[batch_ids],
+        )
+        actions[batch_ids] += skill_actions
+        hidden[batch_ids] = skill_hidden
+
+
+def _grouped_step(
+    skills, skill_ids, observations, hidden, masks, actions, streams
+):
+    batch_idxs, groups = group_batch_by_skill(skill_ids)
+    index = BatchIndex(batch_idxs)
+    sorted_obs = gather_batch(
+        observations.slice_keys(
+            {k for skill_id, _ in groups for k in skills[skill_id].obs_keys}
+        ),
+        index,
+    )
+    sorted_hidden = gather_batch(hidden, index)
+    sorted_masks = gather_batch(masks, index)
+
+    def skill_act(skill_id, batch_slice):
+        skill = skills[skill_id]
+        return lambda: skill.act(
+            sorted_obs.slice_keys(*skill.obs_keys)[batch_slice],
+            sorted_hidden[batch_slice],
+            sorted_masks[batch_slice],
+        )
+
+    act_fns = [
+        skill_act(skill_id, batch_slice) for skill_id, batch_slice in groups
+    ]
+    if streams is not None:
+        outputs = streams.run(act_fns, actions.device, lambda out: out)
+    else:
+        outputs = [act_fn() for act_fn in act_fns]
+    device_index = index.on(actions.device)
+    actions.index_add_(0, device_index, torch.cat([a for a, _ in outputs]))
+    hidden[device_index] = torch.cat([h for _, h in outputs])
+
+
+def _time(step_fn, args, device, inputs):
+    results = None
+    for i in range(args.num_warmup + args.num_steps):
+        if i == args.num_warmup:
+            if device.type == "cuda":
+                torch.cuda.synchronize(device)
+            start = time.perf_counter()
+        skill_ids, observations, hidden, masks = inputs[i % len(inputs)]
+        hidden = hidden.clone()
+        actions = torch.zeros((args.num_envs, args.num_actions), device=device)
+        step_fn(skill_ids, observations, hidden, masks, actions)
+        results = (actions, hidden)
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    return (time.perf_counter() - start) / args.num_steps, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-envs", type=int, default=32)
+    parser.add_argument("--num-skills", type=int, default=8)
+    parser.add_argument("--hidden-size", type=int, default=512)
+    parser.add_argument("--obs-dim", type=int, default=64)
+    parser.add_argument("--num-actions", type=int, default=20)
+    parser.add_argument("--num-steps", type=int, default=200)
+    parser.add_argument("--num-warmup", type=int, default=20)
+    parser.add_argument(
+        "--device",
+        type=str,
+        default="cuda" if torch.cuda.is_available() else "cpu",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    rng = np.random.RandomState(args.seed)
+    torch.manual_seed(args.seed)
+    obs_keys = [f"sensor_{i}" for i in range(args.num_skills + 2)]
+    skills = {
+        skill_id: _Skill(
+            # Each skill reads a shared sensor and one of its own.
+            [obs_keys[0], obs_keys[skill_id + 1]],
+            args.obs_dim,
+            args.hidden_size,
+            args.num_actions,
+        )
+        .to(device)
+        .eval()
+        for skill_id in range(args.num_skills)
+    }
+    inputs = []
+    for _ in range(8):
+        skill_ids = rng.randint(args.num_skills, size=args.num_envs)
+        observations = TensorDict(
+            {
+                k: torch.randn(args.num_envs, args.obs_dim, device=device)
+                for k in obs_keys
+            }
+        )
+        hidden = torch.randn(args.num_envs, 1, args.hidden_size, device=device)
+        masks = torch.ones(args.num_envs, 1, device=device)
+        inputs.append((skill_ids, observations, hidden, masks))
+
+    print(
+        f"{args.num_envs} envs, {args.num_skills} skills, "
+        f"hidden size {args.hidden_size}, {device}"
+    )
+    versions = {
+        "reference": lambda *a: _reference_step(skills, *a),
+        "grouped": lambda *a: _grouped_step(skills, *a, streams=None),
+    }
+    if device.type == "cuda":
+        streams = SkillStreams()
+        versions["grouped+streams"] = lambda *a: _grouped_step(
+            skills, *a, streams=streams
+        )
+
+    with torch.inference_mode():
+        reference_time, reference = _time(
+            versions.pop("reference"), args, device, inputs
+        )
+        print(f"  {'reference':<16} {1e3 * reference_time:8.3f} ms/step")
+        for name, step_fn in versions.items():
+            step_time, results = _time(step_fn, args, device, inputs)
+            max_diff = max(
+                float((r - ref).abs().max())
+                for r, ref in zip(results, reference)
+            )
+            print(
+                f"  {name:<16} {1e3 * step_time:8.3f} ms/step "
+                f"(speedup {reference_time / step_time:5.2f}x, "
+                f"max diff {max_diff:.2e})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Measures the construction time and the memory of
+``HumanoidRearrangeController`` in several processes, as in the environment
+workers of a vectorized environment, with and without the memory-mapped
+motion cache (``habitat.articulated_agent_controllers.motion_cache``).
+
+Uses a synthetic motion file with the layout of the SMPL-X motion files
+(``--motion-path`` to time a real one instead). Each process constructs one
+controller, then all the processes report their memory while they hold
+their controller. The proportional set size (PSS) splits the shared pages
+between the processes that map them, so it is the measure of the memory
+actually used per process.
+"""
+
+import argparse
+import multiprocessing
+import os
+import os.path as osp
+import pickle
+import tempfile
+import time
+
+import numpy as np
+
+NUM_JOINTS = 54
+
+
+def _make_motion_file(path: str, num_walk_poses: int, num_bins: int) -> None:
+    def motion(num_poses):
+        joints = np.zeros((num_poses, NUM_JOINTS, 4), dtype=np.float32)
+        joints[..., 3] = 1.0
+        transforms = np.tile(np.eye(4), (num_poses, 1, 1))
+        transforms[:, 2, 3] = np.linspace(0.0, 1.0, num_poses)
+        return joints, transforms
+
+    walk_joints, walk_transforms = motion(num_walk_poses)
+    walk_data = {
+        "walk_motion": {
+            "joints_array": walk_joints,
+            "transform_array": walk_transforms,
+            "displacement": np.linspace(0.0, 1.0, num_walk_poses),
+            "fps": 30,
+        },
+        "stop_pose": {
+            "joints": walk_joints[0].reshape(-1),
+            "transform": walk_transforms[0],
+        },
+    }
+    num_reach_poses = num_bins**3
+    for hand_name in ["left_hand", "right_hand"]:
+        reach_joints, reach_transforms = motion(num_reach_poses)
+        walk_data[hand_name] = {
+            "pose_motion": {
+                "joints_array": reach_joints.reshape(-1, 4),
+                "transform_array": reach_transforms,
+            },
+            "coord_info": np.array(
+                {
+                    "min": [-0.5, 0.0, 0.0],
+                    "max": [0.5, 1.5, 1.0],
+                    "num_bins": [num_bins] * 3,
+                }
+            ),
+        }
+    with open(path, "wb") as f:
+        pickle.dump(walk_data, f)
+
+
+def _read_memory_kb():
+    memory = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss"):
+                    memory[key] = int(value.split()[0])
+    except OSError:
+        import resource
+
+        memory["Rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return memory
+
+
+def _worker(motion_path, cache_dir, barrier, results):
+    os.environ["HABITAT_MOTION_CACHE_DIR"] = cache_dir
+    from habitat.articulated_agent_controllers import (
+        HumanoidRearrangeController,
+    )
+
+    memory_before = _read_memory_kb()
+    start = time.perf_counter()
+    controller = HumanoidRearrangeController(motion_path)
+    construction_time = time.perf_counter() - start
+    # Touch the reaching poses, as the first reaching action would.
+    for hand_data in controller.hand_processed_data.values():
+        if hand_data is not None:
+            sum(float(np.asarray(d).sum()) for d in hand_data)
+    # Measure while all the processes hold their controller.
+    barrier.wait()
+    memory_after = _read_memory_kb()
+    results.put(
+        (
+            construction_time,
+            {k: memory_after[k] - memory_before[k] for k in memory_after},
+        )
+    )
+    barrier.wait()
+
+
+def _run(motion_path, cache_dir, num_processes):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(num_processes)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(
+            target=_worker, args=(motion_path, cache_dir, barrier, results)
+        )
+        for _ in range(num_processes)
+    ]
+    for p in processes:
+        p.start()
+    stats = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    times = [t for t, _ in stats]
+    memory = {k: np.mean([m[k] for _, m in stats]) / 1024 for k in stats[0][1]}
+    return np.mean(times), memory
+
+
+def _report(name, construction_time, memory):
+    memory_str = " ".join(
+        f"{k}={v:8.1f} MB" for k, v in sorted(memory.items())
+    )
+    print(
+        f"  {name:<16} construction={1e3 * construction_time:9.1f} ms "
+        f"{memory_str}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--motion-path",
+        type=str,
+        default=None,
+        help="Motion file to load, a synthetic one is used if not given.",
+    )
+    parser.add_argument("--num-processes", type=int, default=8)
+    parser.add_argument("--num-walk-poses", type=int, default=1000)
+    parser.add_argument(
+        "--num-bins",
+        type=int,
+        default=20,
+        help="Bins per axis of the synthetic reaching poses.",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        motion_path = args.motion_path
+        if motion_path is None:
+            motion_path = osp.join(tmp_dir, "synthetic_motion_data.pkl")
+            _make_motion_file(motion_path, args.num_walk_poses, args.num_bins)
+        cache_dir = osp.join(tmp_dir, "motion_cache")
+        print(
+            f"{motion_path} ({osp.getsize(motion_path) / 2**20:.1f} MB), "
+            f"{args.num_processes} processes"
+        )
+
+        _report("no cache", *_run(motion_path, "", args.num_processes))
+        _report("cache, cold", *_run(motion_path, cache_dir, 1))
+        _report(
+            "cache, warm", *_run(motion_path, cache_dir, args.num_processes)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Times the trilinear interpolation of the humanoid reaching poses
+(``interpolate_reach_poses``, used by
+``HumanoidRearrangeController.calculate_reach_pose``) for batches of target
+positions, against the previous implementation that interpolates one target
+at a time with scalar indexing.
+
+The reaching poses are a synthetic grid with the layout of the SMPL-X motion
+files. Reports the cost per query and the largest difference between the
+poses of both implementations.
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from habitat.articulated_agent_controllers.humanoid_rearrange_controller import (
+    interpolate_reach_poses,
+)
+
+NUM_JOINTS = 54
+
+
+def _reference_interpolate_pose(position, hand_data, vpose_info):
+    joints, rotations, translations = hand_data
+
+    def find_index_quant(minv, maxv, num_bins, value, interp=False):
+        if interp:
+            value = max(min(value, maxv), 0)
+        else:
+            value = max(min(value, maxv), minv)
+        value = min(value, maxv)
+        value_norm = (value - minv) / (maxv - minv)
+
+        index = value_norm * (num_bins - 1)
+
+        lower = min(math.floor(index), num_bins - 1)
+        upper = max(min(math.ceil(index), num_bins - 1), 0)
+        value_norm_t = index - lower
+        if lower < 0:
+            min_poss_val = 0.0
+            lower = (min_poss_val - minv) * (num_bins - 1) / (maxv - minv)
+            value_norm_t = (index - lower) / -lower
+            lower = -1
+
+        return lower, upper, value_norm_t
+
+    def comp_inter(x_i, y_i, z_i):
+        if y_i < 0 or x_i < 0 or z_i < 0:
+            return -1
+        return (
+            y_i * vpose_info["num_bins"][0] * vpose_info["num_bins"][2]
+            + x_i * vpose_info["num_bins"][2]
+            + z_i
+        )
+
+    def inter_data(x_i, y_i, z_i, dat, is_quat=False):
+        x0, y0, z0 = x_i[0], y_i[0], z_i[0]
+        x1, y1, z1 = x_i[1], y_i[1], z_i[1]
+        xd, yd, zd = x_i[2], y_i[2], z_i[2]
+        c000 = dat[comp_inter(x0, y0, z0)]
+        c001 = dat[comp_inter(x0, y0, z1)]
+        c010 = dat[comp_inter(x0, y1, z0)]
+        c011 = dat[comp_inter(x0, y1, z1)]
+        c100 = dat[comp_inter(x1, y0, z0)]
+        c101 = dat[comp_inter(x1, y0, z1)]
+        c110 = dat[comp_inter(x1, y1, z0)]
+        c111 = dat[comp_inter(x1, y1, z1)]
+
+        c00 = c000 * (1 - xd) + c100 * xd
+        c01 = c001 * (1 - xd) + c101 * xd
+        c10 = c010 * (1 - xd) + c110 * xd
+        c11 = c011 * (1 - xd) + c111 * xd
+
+        c0 = c00 * (1 - yd) + c10 * yd
+        c1 = c01 * (1 - yd) + c11 * yd
+
+        c = c0 * (1 - zd) + c1 * zd
+        if is_quat:
+            c = c / np.linalg.norm(c, axis=-1)[..., None]
+        return c
+
+    x_ind, y_ind, z_ind = [
+        find_index_quant(
+            vpose_info["min"][dim],
+            vpose_info["max"][dim],
+            vpose_info["num_bins"][dim],
+            float(position[dim]),
+            dim == 2,
+        )
+        for dim in range(3)
+    ]
+    return (
+        inter_data(x_ind, y_ind, z_ind, joints, is_quat=True),
+        inter_data(x_ind, y_ind, z_ind, rotations, is_quat=True),
+        inter_data(x_ind, y_ind, z_ind, translations),
+    )
+
+
+def _make_hand_data(num_bins: int, rng):
+    # The grid poses, followed by the stop pose.
+    num_poses = num_bins**3 + 1
+    joints = rng.randn(num_poses, NUM_JOINTS, 4).astype(np.float32)
+    joints /= np.linalg.norm(joints, axis=-1, keepdims=True)
+    rotations = rng.randn(num_poses, 4)
+    rotations /= np.linalg.norm(rotations, axis=-1, keepdims=True)
+    translations = rng.randn(num_poses, 3)
+    vpose_info = {
+        "min": [-0.5, 0.2, 0.1],
+        "max": [0.5, 1.5, 1.0],
+        "num_bins": [num_bins] * 3,
+    }
+    return (joints, rotations, translations), vpose_info
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-bins", type=int, default=20)
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 8, 64, 512]
+    )
+    parser.add_argument("--num-queries", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    hand_data, vpose_info = _make_hand_data(args.num_bins, rng)
+    # Include targets out of the grid, which are clamped to its bounds.
+    positions = rng.uniform(
+        [-0.7, 0.0, -0.2], [0.7, 1.7, 1.2], size=(args.num_queries, 3)
+    )
+
+    start = time.perf_counter()
+    reference = [
+        _reference_interpolate_pose(p, hand_data, vpose_info)
+        for p in positions
+    ]
+    reference_time = time.perf_counter() - start
+    print(
+        f"grid={args.num_bins}^3 poses, {NUM_JOINTS} joints, "
+        f"{args.num_queries} queries"
+    )
+    print(
+        f"  reference:      {1e6 * reference_time / len(positions):9.1f} "
+        "us/query"
+    )
+
+    for batch_size in args.batch_sizes:
+        results = []
+        start = time.perf_counter()
+        for i in range(0, len(positions), batch_size):
+            results.append(
+                interpolate_reach_poses(
+                    positions[i : i + batch_size], hand_data, vpose_info
+                )
+            )
+        batch_time = time.perf_counter() - start
+
+        max_diff = 0.0
+        for k, ref in enumerate(zip(*reference)):
+            res = np.concatenate([r[k] for r in results])
+            max_diff = max(max_diff, float(np.abs(res - np.stack(ref)).max()))
+        print(
+            f"  batch {batch_size:>5}:    "
+            f"{1e6 * batch_time / len(positions):9.1f} us/query "
+            f"(speedup {reference_time / batch_time:6.2f}x, "
+            f"max diff {max_diff:.2e})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Times the PDDL queries issued by the hierarchical policy and the predicate
+sensors with the grounding index of ``PddlDomain`` against the previous
+enumeration of every tuple of entities.
+
+For each multi-agent task spec, reports:
+
+- ``get_possible_actions`` as called by ``HighLevelPolicy`` for each agent.
+- ``get_possible_predicates`` as called by ``GlobalPredicatesSensor``.
+- The enumeration part of ``get_true_predicates``, i.e. the number of
+  grounded predicates to evaluate and the time to produce them. Evaluating
+  them needs a simulator and is not timed here.
+
+The first call with the index includes building it, which happens once per
+episode.
+"""
+
+import argparse
+import itertools
+import time
+from typing import Callable, List, Tuple
+
+from habitat.tasks.rearrange.multi_task.pddl_domain import PddlProblem
+
+TASK_SPECS = [
+    ("fp", "benchmark/multi_agent/pddl/multi_agent_tidy_house.yaml"),
+    ("fp", "benchmark/multi_agent/pddl/multi_agent_social_nav.yaml"),
+]
+
+
+def _enumerate_possible_actions(pddl, filter_entities) -> List:
+    all_entities = list(pddl.all_entities.values())
+    matching_actions = []
+    for action in pddl.actions.values():
+        for entity_input in itertools.combinations(
+            all_entities, action.n_args
+        ):
+            if not all(e in entity_input for e in filter_entities):
+                continue
+            for perm in itertools.permutations(entity_input):
+                if not action.are_args_compatible(list(perm)):
+                    continue
+                new_action = action.clone()
+                new_action.set_param_values(list(perm))
+                matching_actions.append(new_action)
+    return matching_actions
+
+
+def _enumerate_possible_predicates(pddl) -> List:
+    all_entities = pddl.all_entities.values()
+    poss_preds = []
+    for pred in pddl.predicates.values():
+        for entity_input in itertools.combinations(all_entities, pred.n_args):
+            if not pred.are_args_compatible(entity_input):
+                continue
+            use_pred = pred.clone()
+            use_pred.set_param_values(entity_input)
+            if use_pred.are_types_compatible(pddl.expr_types):
+                poss_preds.append(use_pred)
+    return sorted(poss_preds, key=lambda pred: pred.compact_str)
+
+
+def _enumerate_predicate_groundings(pddl) -> List:
+    all_entities = pddl.all_entities.values()
+    groundings = []
+    for pred in pddl.predicates.values():
+        for entity_input in itertools.permutations(all_entities, pred.n_args):
+            if not pred.are_args_compatible(list(entity_input)):
+                continue
+            use_pred = pred.clone()
+            use_pred.set_param_values(entity_input)
+            groundings.append(use_pred)
+    return groundings
+
+
+def _time(fn: Callable[[], List], iters: int) -> Tuple[float, float, int]:
+    start = time.perf_counter()
+    result = fn()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iters):
+        fn()
+    return first, (time.perf_counter() - start) / iters, len(result)
+
+
+def _report(name, enumerate_fn, index_fn, reset_index, iters):
+    enum_first, enum_avg, enum_n = _time(enumerate_fn, iters)
+    reset_index()
+    idx_first, idx_avg, idx_n = _time(index_fn, iters)
+    assert enum_n == idx_n, (name, enum_n, idx_n)
+    print(
+        f"  {name:<32} n={idx_n:5d}  enumerate {enum_avg * 1e3:8.2f} ms  "
+        f"index {idx_avg * 1e3:8.3f} ms (first call {idx_first * 1e3:.2f} "
+        f"ms)  speedup {enum_avg / idx_avg:7.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iters", type=int, default=20)
+    args = parser.parse_args()
+
+    for domain_path, problem_path in TASK_SPECS:
+        pddl = PddlProblem(domain_path, problem_path, read_config=False)
+        print(
+            f"{problem_path} ({len(pddl.all_entities)} entities, "
+            f"{len(pddl.predicates)} predicates, {len(pddl.actions)} actions)"
+        )
+
+        def _reset_index():
+            pddl._grounding_index = None
+
+        robots = [
+            e for name, e in pddl.all_entities.items() if "robot" in name
+        ]
+        for robot in robots:
+            _report(
+                f"get_possible_actions({robot.name})",
+                lambda: _enumerate_possible_actions(pddl, [robot]),
+                lambda: pddl.get_possible_actions(filter_entities=[robot]),
+                _reset_index,
+                args.iters,
+            )
+        _report(
+            "get_possible_predicates",
+            lambda: _enumerate_possible_predicates(pddl),
+            pddl.get_possible_predicates,
+            _reset_index,
+            args.iters,
+        )
+        _report(
+            "true predicate candidates",
+            lambda: _enumerate_predicate_groundings(pddl),
+            lambda: pddl.grounding_index.predicate_groundings,
+            _reset_index,
+            args.iters,
+        )
+
+
+if __name__ == "__main__":
+    main()
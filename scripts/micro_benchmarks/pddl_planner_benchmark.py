@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Times the replanning of ``PlannerHighLevelPolicy`` with the bitset
+planner (``habitat_baselines.rl.hrl.hl.pddl_planner.BitsetPlanner``), with
+and without its plan cache, against the previous breadth-first search over
+lists of predicates.
+
+The planning problems are the stage goals and the final goal of the
+multi-agent tidy house task spec for ``robot_0``, from the initial state and
+from states reached by a few random actions. Reports the time per plan and
+checks that both planners find plans of the same length.
+"""
+
+import argparse
+import random
+import time
+from collections import deque
+
+import torch
+
+from habitat.tasks.rearrange.multi_task.pddl_domain import PddlProblem
+from habitat_baselines.rl.hrl.hl.pddl_planner import BitsetPlanner
+
+TASK_SPEC = ("fp", "benchmark/multi_agent/pddl/multi_agent_tidy_house.yaml")
+
+
+def _apply_action(action, preds):
+    pred_set = list(preds)
+    if "nav" in action.name:
+        robot_to_nav = action._param_values[-1]
+        pred_set = [
+            pred
+            for pred in pred_set
+            if not (
+                pred.name == "robot_at"
+                and pred._arg_values[-1] == robot_to_nav
+            )
+        ]
+    for p in action.post_cond:
+        if p.name == "holding":
+            pred_set = [
+                other_p
+                for other_p in pred_set
+                if not (
+                    other_p.name == "not_holding"
+                    and other_p._arg_values[0] == p._arg_values[1]
+                )
+            ]
+        if p.name == "not_holding":
+            pred_set = [
+                other_p
+                for other_p in pred_set
+                if not (
+                    other_p.name == "holding"
+                    and p._arg_values[0] == other_p._arg_values[1]
+                )
+            ]
+        if p not in pred_set:
+            pred_set.append(p)
+    return pred_set
+
+
+def _reference_plan(start_preds, actions, goal, max_search_depth):
+    def _get_pred_hash(preds):
+        return ",".join(sorted([p.compact_str for p in preds]))
+
+    # (predicates, parent, depth, action)
+    stack = deque([(start_preds, None, 0, None)])
+    visited = {_get_pred_hash(start_preds)}
+    sol_nodes = []
+    shuffled_actions = list(actions)
+    random.shuffle(shuffled_actions)
+    while len(stack) != 0:
+        cur_node = stack.popleft()
+        if cur_node[2] > max_search_depth:
+            break
+        for action in shuffled_actions:
+            if not action.is_precond_satisfied_from_predicates(cur_node[0]):
+                continue
+            pred_set = _apply_action(action, cur_node[0])
+            pred_hash = _get_pred_hash(pred_set)
+            if pred_hash not in visited:
+                visited.add(pred_hash)
+                add_node = (pred_set, cur_node, cur_node[2] + 1, action)
+                if goal.is_true_from_predicates(pred_set):
+                    sol_nodes.append(add_node)
+                else:
+                    stack.append(add_node)
+
+    plans = []
+    for node in sol_nodes:
+        plan = []
+        while node[1] is not None:
+            plan.append(node[3])
+            node = node[1]
+        plans.append(plan[::-1])
+    return sorted(plans, key=len)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-search-depth", type=int, default=8)
+    parser.add_argument("--num-starts", type=int, default=8)
+    parser.add_argument("--max-random-actions", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    pddl = PddlProblem(*TASK_SPEC, read_config=False)
+    predicates = pddl.get_possible_predicates()
+    actions = pddl.get_possible_actions(
+        filter_entities=[pddl.get_entity("robot_0")]
+    )
+    goals = [
+        pddl.stage_goals["stage_1_2"],
+        pddl.stage_goals["stage_2_2"],
+        pddl.goal,
+    ]
+    init_preds = list(pddl.init) + [
+        p for p in predicates if p.name == "not_holding"
+    ]
+
+    # Random starting states, as met when replanning during an episode.
+    starts = []
+    for _ in range(args.num_starts):
+        preds = list(init_preds)
+        for _ in range(random.randint(0, args.max_random_actions)):
+            valid_actions = [
+                action
+                for action in actions
+                if action.is_precond_satisfied_from_predicates(preds)
+            ]
+            preds = _apply_action(random.choice(valid_actions), preds)
+        pred_strs = {p.compact_str for p in preds}
+        starts.append(
+            (
+                preds,
+                torch.tensor(
+                    [float(p.compact_str in pred_strs) for p in predicates]
+                ),
+            )
+        )
+    queries = [(start, goal) for start in starts for goal in goals]
+    print(
+        f"{TASK_SPEC[1]}: {len(predicates)} predicates, {len(actions)} "
+        f"actions, {len(queries)} plans"
+    )
+
+    start_time = time.perf_counter()
+    reference_plans = [
+        _reference_plan(preds, actions, goal, args.max_search_depth)
+        for (preds, _), goal in queries
+    ]
+    reference_time = (time.perf_counter() - start_time) / len(queries)
+    print(f"  {'reference':<16} {1e3 * reference_time:10.3f} ms/plan")
+
+    for name, cache_size, num_rounds in [
+        ("bitset", 0, 1),
+        ("bitset, cached", len(queries), 2),
+    ]:
+        planner = BitsetPlanner(
+            predicates, actions, args.max_search_depth, cache_size
+        )
+        for _ in range(num_rounds):
+            # With the cache, the last round is timed with all the plans
+            # already searched.
+            start_time = time.perf_counter()
+            plans = [
+                planner.get_plan(pred_vals, goal)
+                for (_, pred_vals), goal in queries
+            ]
+            plan_time = (time.perf_counter() - start_time) / len(queries)
+        assert [len(p) for p in plans] == [
+            len(p) for p in reference_plans
+        ], name
+        print(
+            f"  {name:<16} {1e3 * plan_time:10.3f} ms/plan "
+            f"(speedup {reference_time / plan_time:8.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Compares the "loop" and "scan" returns engines of
+:ref:`RolloutStorage.compute_returns`: checks that both give the same returns
+and reports the average time per call of each.
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+import gym
+import numpy as np
+import torch
+
+from habitat_baselines.common.discounted_returns import RETURNS_ENGINES
+from habitat_baselines.common.rollout_storage import RolloutStorage
+
+
+def _make_storage(args, returns_engine, device):
+    obs_space = gym.spaces.Dict(
+        {
+            "pos": gym.spaces.Box(
+                low=-1.0, high=1.0, shape=(2,), dtype=np.float32
+            )
+        }
+    )
+    rollouts = RolloutStorage(
+        args.num_steps,
+        args.num_envs,
+        obs_space,
+        gym.spaces.Discrete(4),
+        SimpleNamespace(num_recurrent_layers=1, recurrent_hidden_size=4),
+        returns_engine=returns_engine,
+    )
+    rollouts.to(device)
+
+    generator = torch.Generator().manual_seed(args.seed)
+    shape = (args.num_steps + 1, args.num_envs, 1)
+    rollouts.buffers["rewards"].copy_(torch.randn(shape, generator=generator))
+    rollouts.buffers["value_preds"].copy_(
+        torch.randn(shape, generator=generator)
+    )
+    rollouts.buffers["masks"].copy_(
+        torch.rand(shape, generator=generator) > args.done_prob
+    )
+    for _ in range(args.num_steps):
+        rollouts.advance_rollout()
+    return rollouts
+
+
+def _time(rollouts, next_value, args, device):
+    def _run():
+        rollouts.compute_returns(
+            next_value, not args.no_gae, args.gamma, args.tau
+        )
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+
+    for _ in range(args.warmup):
+        _run()
+    start = time.perf_counter()
+    for _ in range(args.iters):
+        _run()
+    return (time.perf_counter() - start) / args.iters
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-steps", type=int, default=128)
+    parser.add_argument("--num-envs", type=int, default=32)
+    parser.add_argument("--gamma", type=float, default=0.99)
+    parser.add_argument("--tau", type=float, default=0.95)
+    parser.add_argument("--done-prob", type=float, default=0.01)
+    parser.add_argument("--no-gae", action="store_true")
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--iters", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    next_value = torch.randn(
+        (args.num_envs, 1),
+        generator=torch.Generator().manual_seed(args.seed + 1),
+    ).to(device)
+
+    timings = {}
+    returns = {}
+    for returns_engine in RETURNS_ENGINES:
+        rollouts = _make_storage(args, returns_engine, device)
+        timings[returns_engine] = _time(rollouts, next_value, args, device)
+        returns[returns_engine] = (
+            rollouts.buffers["returns"][: args.num_steps].cpu().clone()
+        )
+
+    max_abs_diff = (returns["loop"] - returns["scan"]).abs().max().item()
+    print(
+        f"num_steps={args.num_steps} num_envs={args.num_envs} "
+        f"gae={not args.no_gae} device={device}"
+    )
+    for returns_engine, t in timings.items():
+        print(f"  {returns_engine:>5}: {t * 1e3:8.3f} ms/call")
+    print(f"  speedup: {timings['loop'] / timings['scan']:.2f}x")
+    print(f"  max abs difference: {max_abs_diff:.3e}")
+    assert torch.allclose(returns["loop"], returns["scan"], atol=1e-4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Throughput of the Python layers of Habitat-Lab and Habitat-Baselines on top of
+the synthetic NullSim-v0 simulator, which needs neither habitat-sim nor a GPU
+nor any scene asset. See README.md in this directory.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import os.path as osp
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import quaternion
+
+import habitat
+from habitat.config import read_write
+from habitat.core.simulator import AgentState
+from habitat.datasets.object_nav.object_nav_dataset import ObjectNavDatasetV1
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
+from habitat.sims import make_sim
+from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat.tasks.nav.nav import NavigationEpisode, NavigationGoal
+from habitat.tasks.nav.object_nav_task import (
+    ObjectGoal,
+    ObjectGoalNavEpisode,
+    ObjectViewLocation,
+)
+from habitat.utils.geometry_utils import quaternion_to_list
+
+TASK_CONFIGS = {
+    "pointnav": "benchmark/nav/pointnav/pointnav_habitat_test.yaml",
+    "objectnav": "benchmark/nav/objectnav/objectnav_hm3d.yaml",
+}
+TRAINER_CONFIGS = {
+    "pointnav": "pointnav/ddppo_pointnav.yaml",
+    "objectnav": "objectnav/ddppo_objectnav.yaml",
+}
+OBJECT_CATEGORIES = ["chair", "bed", "plant", "toilet", "tv_monitor", "sofa"]
+# These actions move the sensors of habitat-sim agents, NullSim-v0 has none.
+UNSUPPORTED_ACTION_TYPES = {"LookUpAction", "LookDownAction"}
+LAYERS = ["sim", "env", "vector_env", "trainer", "eval"]
+# The layers running Habitat-Baselines, which take the trainer overrides.
+BASELINES_LAYERS = ["trainer", "eval"]
+
+
+def write_dataset(args, data_dir: str) -> str:
+    """
+    Write a dataset of random episodes on the NullSim-v0 floor for
+    `args.task`. Returns the `data_path` of the dataset.
+    """
+    rng = np.random.RandomState(args.seed)
+    extent = args.navigable_extent
+    if args.task == "pointnav":
+        dataset = PointNavDatasetV1()
+    else:
+        dataset = ObjectNavDatasetV1()
+        category_ids = {c: i for i, c in enumerate(OBJECT_CATEGORIES)}
+        dataset.category_to_task_category_id = category_ids
+        dataset.category_to_scene_annotation_category_id = category_ids
+
+    for episode_id in range(args.num_episodes):
+        scene_id = f"null_scene_{episode_id % args.num_scenes}.glb"
+        start_position = [float(rng.uniform(-extent, extent)), 0.0, 0.0]
+        start_position[2] = float(rng.uniform(-extent, extent))
+        start_rotation = quaternion_to_list(
+            quaternion.from_rotation_vector(
+                [0.0, rng.uniform(0, 2 * np.pi), 0.0]
+            )
+        )
+        goal_position = [float(rng.uniform(-extent, extent)), 0.0, 0.0]
+        goal_position[2] = float(rng.uniform(-extent, extent))
+        common_args = dict(
+            episode_id=str(episode_id),
+            scene_id=scene_id,
+            start_position=start_position,
+            start_rotation=start_rotation,
+        )
+
+        if args.task == "pointnav":
+            dataset.episodes.append(
+                NavigationEpisode(
+                    goals=[NavigationGoal(position=goal_position, radius=0.2)],
+                    **common_args,
+                )
+            )
+            continue
+
+        category = OBJECT_CATEGORIES[rng.randint(len(OBJECT_CATEGORIES))]
+        episode = ObjectGoalNavEpisode(
+            goals=[], object_category=category, **common_args
+        )
+        if episode.goals_key not in dataset.goals_by_category:
+            dataset.goals_by_category[episode.goals_key] = [
+                ObjectGoal(
+                    object_id=str(episode_id),
+                    object_category=category,
+                    position=goal_position,
+                    view_points=[
+                        ObjectViewLocation(
+                            agent_state=AgentState(
+                                position=goal_position,
+                                rotation=start_rotation,
+                            ),
+                            iou=1.0,
+                        )
+                    ],
+                )
+            ]
+        episode.goals = dataset.goals_by_category[episode.goals_key]
+        dataset.episodes.append(episode)
+
+    data_path = osp.join(data_dir, args.task, "{split}.json.gz")
+    os.makedirs(osp.dirname(data_path), exist_ok=True)
+    with gzip.open(data_path.format(split="train"), "wt") as f:
+        f.write(dataset.to_json())
+    return data_path
+
+
+def patch_config(args, config, data_path: str, data_dir: str) -> None:
+    """
+    Point the `habitat` node of `config` to NullSim-v0 and the synthetic
+    dataset.
+    """
+    with read_write(config):
+        habitat_config = config.habitat
+        habitat_config.simulator.type = "NullSim-v0"
+        null_sim_config = habitat_config.simulator.null_sim_v0
+        null_sim_config.step_latency = args.step_latency
+        null_sim_config.step_latency_jitter = args.step_latency_jitter
+        null_sim_config.navigable_extent = args.navigable_extent
+        for agent_config in habitat_config.simulator.agents.values():
+            for sensor_config in agent_config.sim_sensors.values():
+                sensor_config.width = args.resolution
+                sensor_config.height = args.resolution
+
+        habitat_config.dataset.data_path = data_path
+        habitat_config.dataset.scenes_dir = data_dir
+        habitat_config.dataset.split = "train"
+        habitat_config.task.actions = {
+            name: action_config
+            for name, action_config in habitat_config.task.actions.items()
+            if action_config.type not in UNSUPPORTED_ACTION_TYPES
+        }
+
+
+def random_actions(config, rng: np.random.RandomState) -> Callable[[], str]:
+    # Never stopping keeps the episodes as long as in training.
+    names = [k for k in config.habitat.task.actions.keys() if k != "stop"]
+    return lambda: names[rng.randint(len(names))]
+
+
+class LayerTimer:
+    """
+    Accumulates the time spent in some methods while enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.totals: Dict[str, float] = defaultdict(float)
+
+    def wrap(self, obj: Any, method_name: str, key: str) -> None:
+        method = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return method(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.totals[key] += time.perf_counter() - start
+
+        setattr(obj, method_name, timed)
+
+
+def make_result(
+    num_steps: int, elapsed: float, breakdown: Dict[str, float]
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        "steps_per_sec": num_steps / elapsed,
+        "ms_per_step": 1000 * elapsed / num_steps,
+    }
+    if breakdown:
+        breakdown = dict(breakdown)
+        breakdown["other"] = max(elapsed - sum(breakdown.values()), 0.0)
+        result["breakdown_ms_per_step"] = {
+            k: 1000 * v / num_steps for k, v in breakdown.items()
+        }
+        result["breakdown_fraction"] = {
+            k: v / elapsed for k, v in breakdown.items()
+        }
+    return result
+
+
+def bench_sim(args, config) -> Dict[str, Any]:
+    sim = make_sim(
+        id_sim=config.habitat.simulator.type, config=config.habitat.simulator
+    )
+    next_action = random_actions(config, np.random.RandomState(args.seed))
+    sim.reset()
+    start = time.perf_counter()
+    for _ in range(args.num_steps):
+        sim.step(HabitatSimActions[next_action()])
+    elapsed = time.perf_counter() - start
+    sim.close()
+    return make_result(args.num_steps, elapsed, {})
+
+
+def bench_env(args, config) -> Dict[str, Any]:
+    timer = LayerTimer()
+    next_action = random_actions(config, np.random.RandomState(args.seed))
+    with habitat.Env(config=config) as env:
+        timer.wrap(env.sim, "step", "sim.step")
+        timer.wrap(
+            env.task.sensor_suite, "get_observations", "task.lab_sensors"
+        )
+        timer.wrap(
+            env.task.measurements, "update_measures", "task.measurements"
+        )
+        env.reset()
+        reset_time = 0.0
+        start = time.perf_counter()
+        for _ in range(args.num_steps):
+            if env.episode_over:
+                reset_start = time.perf_counter()
+                env.reset()
+                reset_time += time.perf_counter() - reset_start
+            timer.enabled = True
+            env.step(next_action())
+            timer.enabled = False
+        elapsed = time.perf_counter() - start
+
+    breakdown = dict(timer.totals)
+    breakdown["env.reset"] = reset_time
+    return make_result(args.num_steps, elapsed, breakdown)
+
+
+class BenchmarkRLEnv(habitat.RLEnv):
+    def get_reward_range(self):
+        return [-1.0, 1.0]
+
+    def get_reward(self, observations) -> float:
+        return 0.0
+
+    def get_done(self, observations) -> bool:
+        return self.habitat_env.episode_over
+
+    def get_info(self, observations) -> Dict[str, Any]:
+        return self.habitat_env.get_metrics()
+
+
+def _make_rl_env(config) -> BenchmarkRLEnv:
+    return BenchmarkRLEnv(config=config)
+
+
+def bench_vector_env(args, config) -> Dict[str, Any]:
+    try:
+        from habitat_baselines.common.observation_batcher import (
+            ObservationBatcher,
+        )
+
+        batcher = ObservationBatcher()
+    except ImportError:
+        batcher = None
+
+    configs = []
+    for env_index in range(args.num_envs):
+        env_config = config.copy()
+        with read_write(env_config):
+            env_config.habitat.seed = env_config.habitat.seed + env_index
+        configs.append(env_config)
+
+    rng = np.random.RandomState(args.seed)
+    next_action = random_actions(config, rng)
+    breakdown: Dict[str, float] = defaultdict(float)
+    with habitat.VectorEnv(
+        make_env_fn=_make_rl_env,
+        env_fn_args=tuple((c,) for c in configs),
+    ) as envs:
+        envs.reset()
+        start = time.perf_counter()
+        for _ in range(args.num_steps):
+            step_start = time.perf_counter()
+            outputs = envs.step([next_action() for _ in range(envs.num_envs)])
+            breakdown["vector_env.step"] += time.perf_counter() - step_start
+            if batcher is not None:
+                batch_start = time.perf_counter()
+                batcher([observations for observations, *_ in outputs])
+                breakdown["batch_obs"] += time.perf_counter() - batch_start
+        elapsed = time.perf_counter() - start
+
+    # Every step of the vector env steps all the environments.
+    result = make_result(args.num_steps, elapsed, breakdown)
+    result["steps_per_sec"] *= args.num_envs
+    return result
+
+
+def make_trainer(args, data_path: str, data_dir: str, overrides: List[str]):
+    """
+    Create the trainer of `args.trainer_config` on the synthetic dataset.
+    """
+    from habitat_baselines.common.baseline_registry import baseline_registry
+    from habitat_baselines.config.default import (
+        get_config as get_baselines_config,
+    )
+
+    config = get_baselines_config(
+        args.trainer_config or TRAINER_CONFIGS[args.task],
+        [
+            f"habitat_baselines.num_environments={args.num_envs}",
+            f"habitat_baselines.checkpoint_folder={data_dir}/checkpoints",
+            f"habitat_baselines.tensorboard_dir={data_dir}/tb",
+            f"habitat_baselines.video_dir={data_dir}/videos",
+            *overrides,
+            *args.opts,
+        ],
+    )
+    patch_config(args, config, data_path, data_dir)
+    trainer_init = baseline_registry.get_trainer(
+        config.habitat_baselines.trainer_name
+    )
+    return trainer_init(config)
+
+
+def bench_trainer(args, data_path: str, data_dir: str) -> Dict[str, Any]:
+    from habitat_baselines.utils.timing import g_timer
+
+    trainer = make_trainer(
+        args,
+        data_path,
+        data_dir,
+        [
+            f"habitat_baselines.num_updates={args.num_updates}",
+            "habitat_baselines.total_num_steps=-1",
+            "habitat_baselines.num_checkpoints=1",
+            "habitat_baselines.log_interval=1",
+        ],
+    )
+    start = time.perf_counter()
+    trainer.train()
+    elapsed = time.perf_counter() - start
+
+    result = make_result(trainer.num_steps_done, elapsed, {})
+    # The trainer keeps running means of its timings, in seconds per call.
+    result["timings_ms"] = {k: 1000 * float(v) for k, v in g_timer.items()}
+    return result
+
+
+def bench_eval(args, data_path: str, data_dir: str) -> Dict[str, Any]:
+    # The policy is not trained, a checkpoint would not change the timings.
+    trainer = make_trainer(
+        args,
+        data_path,
+        data_dir,
+        [
+            "habitat_baselines.evaluate=True",
+            "habitat_baselines.eval.should_load_ckpt=False",
+            "habitat_baselines.eval.split=train",
+            f"habitat_baselines.test_episode_count={args.num_eval_episodes}",
+        ],
+    )
+    start = time.perf_counter()
+    trainer.eval()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "episodes_per_sec": args.num_eval_episodes / elapsed,
+        "sec_per_episode": elapsed / args.num_eval_episodes,
+    }
+
+
+def print_result(layer: str, result: Dict[str, Any]) -> None:
+    if "episodes_per_sec" in result:
+        print(
+            f"[{layer}] {result['episodes_per_sec']:.2f} episodes/s"
+            f" ({result['sec_per_episode']:.3f} s/episode)"
+        )
+        return
+    print(
+        f"[{layer}] {result['steps_per_sec']:.1f} steps/s"
+        f" ({result['ms_per_step']:.3f} ms/step)"
+    )
+    fractions = result.get("breakdown_fraction", {})
+    for k, ms in result.get("breakdown_ms_per_step", {}).items():
+        print(f"    {k:<24}{ms:8.3f} ms/step {100 * fractions[k]:6.1f}%")
+    for k, ms in result.get("timings_ms", {}).items():
+        print(f"    {k:<40}{ms:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--task", choices=TASK_CONFIGS, default="pointnav")
+    parser.add_argument(
+        "--layers",
+        default="sim,env,vector_env",
+        help=f"Comma separated subset of {','.join(LAYERS)}. The trainer "
+        "and eval layers need Habitat-Baselines and PyTorch.",
+    )
+    parser.add_argument("--num-steps", type=int, default=1000)
+    parser.add_argument("--num-envs", type=int, default=4)
+    parser.add_argument("--num-episodes", type=int, default=200)
+    parser.add_argument("--num-scenes", type=int, default=8)
+    parser.add_argument("--resolution", type=int, default=256)
+    parser.add_argument(
+        "--step-latency",
+        type=float,
+        default=0.0,
+        help="Emulated simulation time of each step, in seconds.",
+    )
+    parser.add_argument(
+        "--step-latency-jitter",
+        type=float,
+        default=0.0,
+        help="Maximum random extra simulation time of each step, in seconds.",
+    )
+    parser.add_argument("--navigable-extent", type=float, default=10.0)
+    parser.add_argument("--num-updates", type=int, default=10)
+    parser.add_argument("--num-eval-episodes", type=int, default=20)
+    parser.add_argument("--trainer-config", type=str, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--out-file",
+        type=str,
+        default=None,
+        help="Write the results to this JSON file.",
+    )
+    parser.add_argument(
+        "opts",
+        nargs=argparse.REMAINDER,
+        help="Overrides of the habitat-lab (or trainer) config.",
+    )
+    args = parser.parse_args()
+    layers = args.layers.split(",")
+    assert all(layer in LAYERS for layer in layers), layers
+
+    results: Dict[str, Any] = {"args": vars(args)}
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_path = write_dataset(args, data_dir)
+        # Overrides of the trainer config only apply to the trainer and eval
+        # layers.
+        lab_opts = [
+            opt
+            for opt in args.opts
+            if not opt.lstrip("+~").startswith("habitat_baselines.")
+        ]
+        config = habitat.get_config(TASK_CONFIGS[args.task], lab_opts)
+        patch_config(args, config, data_path, data_dir)
+
+        benchmarks = {
+            "sim": bench_sim,
+            "env": bench_env,
+            "vector_env": bench_vector_env,
+        }
+        for layer in layers:
+            if layer in BASELINES_LAYERS:
+                continue
+            results[layer] = benchmarks[layer](args, config)
+            print_result(layer, results[layer])
+
+        baselines_benchmarks = {"trainer": bench_trainer, "eval": bench_eval}
+        for layer in BASELINES_LAYERS:
+            if layer not in layers:
+                continue
+            results[layer] = baselines_benchmarks[layer](
+                args, data_path, data_dir
+            )
+            print_result(layer, results[layer])
+
+    if args.out_file is not None:
+        with open(args.out_file, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import itertools
+import os
+import threading
+from collections import deque
+
+import pytest
+
+try:
+    import torch
+
+    from habitat_baselines.common.checkpoint_manifest import (
+        MANIFEST_NAME,
+        CheckpointWatcher,
+        append_to_manifest,
+        eval_checkpoint_indices,
+    )
+    from habitat_baselines.common.checkpoint_writer import (
+        AsyncCheckpointWriter,
+        snapshot_state,
+        write_checkpoint,
+    )
+    from habitat_baselines.rl.ddppo.ddp_utils import (
+        flush_checkpoints,
+        load_resume_state,
+        save_resume_state,
+    )
+    from habitat_baselines.utils.common import poll_checkpoint_folder
+
+    baseline_installed = True
+except ImportError:
+    baseline_installed = False
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_write_checkpoint(tmp_path):
+    state = {"weights": torch.arange(4.0), "step": 10}
+    for i in range(2):
+        state["step"] = i
+        write_checkpoint(
+            state,
+            str(tmp_path / f"ckpt.{i}.pth"),
+            str(tmp_path / "latest.pth"),
+        )
+
+    # Only the checkpoints and the link to the last one are left.
+    assert sorted(os.listdir(tmp_path)) == [
+        "ckpt.0.pth",
+        "ckpt.1.pth",
+        "latest.pth",
+    ]
+    assert torch.load(str(tmp_path / "latest.pth"))["step"] == 1
+    assert os.path.samefile(tmp_path / "latest.pth", tmp_path / "ckpt.1.pth")
+    assert poll_checkpoint_folder(str(tmp_path), 0) == str(
+        tmp_path / "ckpt.1.pth"
+    )
+    assert poll_checkpoint_folder(str(tmp_path), 1) is None
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_async_checkpoint_writer(tmp_path):
+    shared = torch.zeros(3)
+    state = {"a": shared, "b": [shared, (torch.ones(2), 5)]}
+    snapshot = snapshot_state(state)
+    assert snapshot["b"][1][1] == 5
+    assert snapshot["a"] is snapshot["b"][0]
+    assert snapshot["a"] is not shared
+
+    saved = []
+    writer = AsyncCheckpointWriter(max_pending=1)
+    for i in range(3):
+        shared.fill_(i)
+        writer.save(
+            state,
+            str(tmp_path / f"ckpt.{i}.pth"),
+            str(tmp_path / "latest.pth"),
+            on_saved=lambda i=i: saved.append(i),
+        )
+    # Updating the state after saving it doesn't change the checkpoint.
+    shared.fill_(-1)
+    writer.flush()
+    assert saved == [0, 1, 2]
+    for i in range(3):
+        loaded = torch.load(str(tmp_path / f"ckpt.{i}.pth"))
+        assert torch.all(loaded["a"] == i)
+    assert torch.all(torch.load(str(tmp_path / "latest.pth"))["a"] == 2)
+
+    # The deques of the state (e.g. the window episode stats) are copied, the
+    # trainer keeps appending to them while the save is pending.
+    release_writer = threading.Event()
+    writer._executor.submit(release_writer.wait)
+    window_stats = {"reward": deque([1.0, 2.0], maxlen=4)}
+    writer.save(
+        {"window_episode_stats": window_stats},
+        str(tmp_path / "window_stats.pth"),
+    )
+    for i in range(10):
+        window_stats["reward"].append(float(i))
+    release_writer.set()
+    writer.flush()
+    loaded = torch.load(str(tmp_path / "window_stats.pth"))
+    assert loaded["window_episode_stats"]["reward"] == deque(
+        [1.0, 2.0], maxlen=4
+    )
+
+    # The errors of the background writes are raised.
+    writer.save(state, str(tmp_path / "missing_dir" / "ckpt.pth"))
+    with pytest.raises(OSError):
+        writer.flush()
+    writer.close()
+
+    resume_state_path = str(tmp_path / "resume_state.pth")
+    save_resume_state({"step": 3}, resume_state_path, async_write=True)
+    flush_checkpoints()
+    assert load_resume_state(resume_state_path) == {"step": 3}
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_checkpoint_watcher(tmp_path):
+    assert list(eval_checkpoint_indices(5)) == [0, 1, 2, 3, 4]
+    assert list(eval_checkpoint_indices(5, stride=2)) == [0, 2, 4]
+    assert list(eval_checkpoint_indices(5, indices=[4, 0])) == [4, 0]
+    assert list(
+        itertools.islice(eval_checkpoint_indices(-1, stride=3), 3)
+    ) == [0, 3, 6]
+
+    # Without a manifest, the checkpoints are listed from the folder.
+    write_checkpoint({"step": 0}, str(tmp_path / "ckpt.0.pth"))
+    watcher = CheckpointWatcher(str(tmp_path), poll_interval=0.01)
+    assert watcher.get_checkpoint(0) == str(tmp_path / "ckpt.0.pth")
+    assert watcher.get_checkpoint(1) is None
+
+    for i in [2, 1]:
+        path = str(tmp_path / f"ckpt.{i}.pth")
+        write_checkpoint({"step": i}, path)
+        append_to_manifest(str(tmp_path), i, path, step=10 * i)
+    # An entry being appended is only read once complete.
+    with open(tmp_path / MANIFEST_NAME, "a") as f:
+        f.write('{"index": 3, "pa')
+
+    # The manifest was created with the checkpoint already in the folder.
+    assert watcher.get_checkpoint(0) == str(tmp_path / "ckpt.0.pth")
+    assert watcher.get_checkpoint(2) == str(tmp_path / "ckpt.2.pth")
+    assert watcher.get_entry(1)["step"] == 10
+    assert watcher.get_checkpoint(3) is None
+    assert watcher.wait_for_checkpoint(3, timeout=0.05) is None
+
+    with open(tmp_path / MANIFEST_NAME, "a") as f:
+        f.write('th": "ckpt.3.pth"}\n')
+    assert watcher.wait_for_checkpoint(3, timeout=0.05) == str(
+        tmp_path / "ckpt.3.pth"
+    )
+    watcher.close()
+
+    # The checkpoints missing from a manifest that lists later ones are
+    # found by their file name.
+    folder = tmp_path / "resumed"
+    folder.mkdir()
+    for i in range(3):
+        write_checkpoint({"step": i}, str(folder / f"ckpt.{i}.pth"))
+    with open(folder / MANIFEST_NAME, "w") as f:
+        f.write('{"index": 2, "path": "ckpt.2.pth"}\n')
+    watcher = CheckpointWatcher(str(folder), poll_interval=0.01)
+    assert watcher.get_checkpoint(1) == str(folder / "ckpt.1.pth")
+    assert watcher.get_checkpoint(2) == str(folder / "ckpt.2.pth")
+    assert watcher.wait_for_checkpoint(3, timeout=0.05) is None
+    watcher.close()
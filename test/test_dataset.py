@@ -4,11 +4,18 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import json
 from itertools import groupby, islice
 
 import pytest
 
 from habitat.core.dataset import Dataset, Episode
+from habitat.core.episode_store import (
+    EPISODE_STORE_EXTENSION,
+    LazyEpisodes,
+    write_episode_store,
+)
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
 from habitat.tasks.nav.nav import NavigationEpisode, NavigationGoal
 
 
@@ -376,3 +383,103 @@ def test_reset_goals():
 
     ep.goals = [NavigationGoal(position=[3, 4, 5])]
     assert ep._shortest_path_cache is None
+
+
+def _episode_dicts(num_episodes, num_groups=10):
+    return [
+        {
+            "episode_id": str(i),
+            "scene_id": "scene_id_" + str(i % num_groups),
+            "start_position": [0.5 * i, 0.0, -0.25 * i],
+            "start_rotation": [0, 0, 0, 1],
+            "goals": [{"position": [1.0, 2.0, float(i)], "radius": None}],
+            "info": {"geodesic_distance": float(i)},
+        }
+        for i in range(num_episodes)
+    ]
+
+
+def _construct_stored_dataset(tmp_path, num_episodes, num_groups=10):
+    path = str(tmp_path / f"episodes{EPISODE_STORE_EXTENSION}")
+    write_episode_store(path, _episode_dicts(num_episodes, num_groups))
+    dataset = PointNavDatasetV1()
+    dataset._load_from_file(path, scenes_dir=None)
+    return dataset
+
+
+def test_episode_store_roundtrip(tmp_path):
+    stored_dataset = _construct_stored_dataset(tmp_path, 100)
+    json_dataset = PointNavDatasetV1()
+    json_dataset.from_json(json.dumps({"episodes": _episode_dicts(100)}))
+
+    assert isinstance(stored_dataset.episodes, LazyEpisodes)
+    assert len(stored_dataset.episodes) == 100
+    assert list(stored_dataset.episodes) == json_dataset.episodes
+    assert stored_dataset.scene_ids == json_dataset.scene_ids
+    assert stored_dataset.get_scene_episodes(
+        "scene_id_3"
+    ) == json_dataset.get_scene_episodes("scene_id_3")
+
+
+def test_episode_store_splits_and_iterator(tmp_path):
+    dataset = _construct_stored_dataset(tmp_path, 100)
+    splits = dataset.get_splits(10, sort_by_episode_id=True)
+    assert len(splits) == 10
+    all_episode_ids = set()
+    for split in splits:
+        assert isinstance(split.episodes, LazyEpisodes)
+        assert len(split.episodes) == 10
+        episode_ids = [ep.episode_id for ep in split.episodes]
+        assert episode_ids == sorted(episode_ids)
+        all_episode_ids.update(episode_ids)
+    assert len(all_episode_ids) == 100
+
+    ep_iter = dataset.get_episode_iterator(
+        shuffle=True, max_scene_repeat_episodes=3, cycle=True
+    )
+    episodes = list(islice(ep_iter, 250))
+    assert len(episodes) == 250
+    assert episodes[0].scene_id == episodes[2].scene_id
+    assert episodes[2].scene_id != episodes[3].scene_id
+
+
+def test_episode_store_concat(tmp_path):
+    dataset = PointNavDatasetV1()
+    all_episode_dicts = []
+    for i in range(3):
+        path = str(tmp_path / f"episodes_{i}{EPISODE_STORE_EXTENSION}")
+        # The stores share some of their scenes.
+        episode_dicts = _episode_dicts(20, num_groups=4 + i)
+        write_episode_store(path, episode_dicts)
+        dataset._load_from_file(path, scenes_dir=None)
+        all_episode_dicts.extend(episode_dicts)
+
+    episodes = dataset.episodes
+    assert isinstance(episodes, LazyEpisodes)
+    assert [ep.scene_id for ep in episodes] == [
+        episodes.scene_id_at(i) for i in range(len(episodes))
+    ]
+    assert [ep.scene_id for ep in episodes] == [
+        ep["scene_id"] for ep in all_episode_dicts
+    ]
+    assert episodes.scene_ids() == sorted(
+        {ep["scene_id"] for ep in all_episode_dicts}
+    )
+
+
+def test_episode_store_materialized_episodes(tmp_path):
+    dataset = _construct_stored_dataset(tmp_path, 20)
+    episodes = dataset.episodes
+    assert isinstance(episodes, LazyEpisodes)
+    # The keys are read without materializing the episodes.
+    assert episodes.episode_keys() == [
+        (ep["scene_id"], ep["episode_id"]) for ep in _episode_dicts(20)
+    ]
+    assert len(episodes._sources[0]._episodes) == 0
+
+    # The changes made to an episode are kept, in all the views of it.
+    episodes[3].info["visited"] = True
+    assert episodes[3] is episodes[3]
+    assert episodes.subset([5, 3])[1].info["visited"]
+    episodes[5].episode_id = "renamed"
+    assert episodes.episode_keys()[5] == ("scene_id_5", "renamed")
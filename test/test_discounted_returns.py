@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+habitat_baselines = pytest.importorskip("habitat_baselines")
+
+import gym
+
+from habitat_baselines.common.discounted_returns import discounted_reverse_scan
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.rl.ver.ver_rollout_storage import VERRolloutStorage
+
+_OBS_SPACE = gym.spaces.Dict(
+    {"pos": gym.spaces.Box(low=-1.0, high=1.0, shape=(2,), dtype=np.float32)}
+)
+_ACTION_SPACE = gym.spaces.Discrete(4)
+_ACTOR_CRITIC = SimpleNamespace(
+    num_recurrent_layers=1, recurrent_hidden_size=4
+)
+
+
+@pytest.mark.parametrize("num_steps", [1, 31, 32, 33, 100])
+def test_discounted_reverse_scan(num_steps):
+    torch.manual_seed(num_steps)
+    x = torch.randn(num_steps, 5, 1, dtype=torch.float64)
+    discounts = torch.rand(num_steps, 5, 1, dtype=torch.float64)
+    bootstrap = torch.randn(5, 1, dtype=torch.float64)
+
+    expected = torch.empty_like(x)
+    y = bootstrap
+    for t in reversed(range(num_steps)):
+        y = x[t] + discounts[t] * y
+        expected[t] = y
+
+    assert torch.allclose(
+        discounted_reverse_scan(x, discounts, bootstrap), expected
+    )
+
+
+@pytest.mark.parametrize("use_gae", [True, False])
+def test_rollout_storage_returns_engines(use_gae):
+    num_steps, num_envs = 64, 6
+    torch.manual_seed(0)
+    rewards = torch.randn(num_steps + 1, num_envs, 1)
+    values = torch.randn(num_steps + 1, num_envs, 1)
+    masks = torch.rand(num_steps + 1, num_envs, 1) > 0.1
+    next_value = torch.randn(num_envs, 1)
+
+    all_returns = []
+    for returns_engine in ("loop", "scan"):
+        rollouts = RolloutStorage(
+            num_steps,
+            num_envs,
+            _OBS_SPACE,
+            _ACTION_SPACE,
+            _ACTOR_CRITIC,
+            returns_engine=returns_engine,
+        )
+        rollouts.buffers["rewards"].copy_(rewards)
+        rollouts.buffers["value_preds"].copy_(values)
+        rollouts.buffers["masks"].copy_(masks)
+        for _ in range(num_steps):
+            rollouts.advance_rollout()
+
+        rollouts.compute_returns(next_value, use_gae, 0.99, 0.95)
+        all_returns.append(rollouts.buffers["returns"][:num_steps].clone())
+
+    assert torch.allclose(all_returns[0], all_returns[1], atol=1e-5)
+
+
+def test_ver_rollout_storage_returns_engines():
+    num_steps, num_envs = 32, 4
+    rng = np.random.RandomState(0)
+    dones = rng.rand(num_steps + 1, num_envs) < 0.15
+    dones[0] = True
+    episode_ids = np.cumsum(dones, axis=0)
+    step_ids = np.tile(np.arange(num_steps + 1)[:, None], (1, num_envs))
+    environment_ids = np.tile(np.arange(num_envs)[None], (num_steps + 1, 1))
+    rewards = rng.randn(num_steps + 1, num_envs, 1)
+    values = rng.randn(num_steps + 1, num_envs, 1)
+
+    all_returns = []
+    for returns_engine in ("loop", "scan"):
+        rollouts = VERRolloutStorage(
+            num_steps,
+            num_envs,
+            _OBS_SPACE,
+            _ACTION_SPACE,
+            _ACTOR_CRITIC,
+            variable_experience=False,
+            returns_engine=returns_engine,
+        )
+        buffers = rollouts.buffers
+        buffers["masks"].copy_(torch.from_numpy(~dones[..., None]))
+        buffers["episode_ids"].copy_(torch.from_numpy(episode_ids[..., None]))
+        buffers["step_ids"].copy_(torch.from_numpy(step_ids[..., None]))
+        buffers["environment_ids"].copy_(
+            torch.from_numpy(environment_ids[..., None])
+        )
+        buffers["rewards"].copy_(torch.from_numpy(rewards))
+        buffers["value_preds"].copy_(torch.from_numpy(values))
+        buffers["is_stale"].fill_(False)
+
+        rollouts.compute_returns(True, 0.99, 0.95)
+        all_returns.append(buffers["returns"].clone())
+
+    assert torch.allclose(
+        all_returns[0], all_returns[1], atol=1e-5, equal_nan=True
+    )
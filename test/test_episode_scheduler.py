@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+try:
+    import numpy as np
+    import torch
+    from gym import spaces
+
+    from habitat_baselines.rl.ppo.episode_scheduler import (
+        WorkStealingEpisodeScheduler,
+    )
+    from habitat_baselines.rl.ppo.habitat_evaluator import HabitatEvaluator
+    from habitat_baselines.rl.ppo.policy import PolicyActionData
+
+    baseline_installed = True
+except ImportError:
+    baseline_installed = False
+
+
+class _FakeEnvs:
+    r"""Records the episodes scheduled on each environment, like the
+    environments of a `VectorEnv` do until their next reset.
+    """
+
+    def __init__(self, num_envs):
+        self.scheduled = [None] * num_envs
+
+    @property
+    def num_envs(self):
+        return len(self.scheduled)
+
+    def call_at(self, index, function_name, function_args):
+        assert function_name == "schedule_next_episode"
+        self.scheduled[index] = (
+            function_args["scene_id"],
+            function_args["episode_id"],
+        )
+
+    def reset_at(self, index):
+        episode = self.scheduled[index]
+        self.scheduled[index] = None
+        return episode
+
+    def pause_at(self, index):
+        self.scheduled.pop(index)
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+@pytest.mark.parametrize("num_envs", [1, 3, 8])
+@pytest.mark.parametrize("evals_per_ep", [1, 2])
+def test_work_stealing_scheduler(num_envs, evals_per_ep):
+    episode_keys = [
+        (scene_id, str(episode_id))
+        for scene_id in ["a", "b", "c"]
+        for episode_id in range(2 if scene_id == "a" else 5)
+    ]
+    scheduler = WorkStealingEpisodeScheduler(episode_keys, evals_per_ep)
+    envs = _FakeEnvs(num_envs)
+    envs_to_pause = scheduler.schedule_first_episodes(envs)
+    for i in reversed(envs_to_pause):
+        envs.pause_at(i)
+    scheduler.on_envs_paused(envs_to_pause)
+
+    running = [envs.reset_at(i) for i in range(envs.num_envs)]
+    started = Counter(running)
+    scheduler.on_episodes_started(envs, range(envs.num_envs))
+    step = 0
+    while envs.num_envs > 0:
+        # The environments finish their episodes one after the other.
+        done = step % envs.num_envs
+        step += 1
+        running[done] = envs.reset_at(done)
+        if running[done] is not None:
+            started[running[done]] += 1
+        envs_to_pause = scheduler.on_episodes_started(envs, [done])
+        for i in reversed(envs_to_pause):
+            envs.pause_at(i)
+            running.pop(i)
+        scheduler.on_envs_paused(envs_to_pause)
+
+    assert len(scheduler) == 0
+    assert started == {key: evals_per_ep for key in episode_keys}
+
+
+class _FakeVectorEnv:
+    r"""Environments that all have all the episodes and, like the
+    environments of a `VectorEnv`, reset as soon as an episode ends, into the
+    scheduled episode or else the next episode of their own iterator. Records
+    the episodes that ran to completion.
+    """
+
+    def __init__(self, num_envs, episode_keys):
+        self.episode_keys = list(episode_keys)
+        self.completed = Counter()
+        self._iter_idxs = [0] * num_envs
+        self._scheduled = [None] * num_envs
+        self._current = [None] * num_envs
+        self._steps = [0] * num_envs
+
+    @property
+    def num_envs(self):
+        return len(self._current)
+
+    def call_at(self, index, function_name, function_args=None):
+        if function_name == "episode_keys":
+            return list(self.episode_keys)
+        assert function_name == "schedule_next_episode"
+        self._scheduled[index] = (
+            function_args["scene_id"],
+            function_args["episode_id"],
+        )
+
+    def _reset_at(self, index):
+        if self._scheduled[index] is not None:
+            self._current[index] = self._scheduled[index]
+            self._scheduled[index] = None
+        else:
+            iter_idx = self._iter_idxs[index]
+            self._current[index] = self.episode_keys[iter_idx]
+            self._iter_idxs[index] = (iter_idx + 1) % len(self.episode_keys)
+        self._steps[index] = 0
+        return {"x": np.zeros(1, dtype=np.float32)}
+
+    def reset(self):
+        return [self._reset_at(i) for i in range(self.num_envs)]
+
+    def post_step(self, observations):
+        return observations
+
+    def step(self, actions):
+        outputs = []
+        for i in range(self.num_envs):
+            self._steps[i] += 1
+            # The episodes have different lengths, so that the environments
+            # finish them at different times.
+            done = self._steps[i] > int(self._current[i][1]) % 3
+            if done:
+                self.completed[self._current[i]] += 1
+                obs = self._reset_at(i)
+            else:
+                obs = {"x": np.zeros(1, dtype=np.float32)}
+            outputs.append((obs, 1.0, done, {}))
+        return outputs
+
+    def current_episodes(self):
+        return [
+            SimpleNamespace(scene_id=key[0], episode_id=key[1])
+            for key in self._current
+        ]
+
+    def pause_at(self, index):
+        for state in [
+            self._iter_idxs,
+            self._scheduled,
+            self._current,
+            self._steps,
+        ]:
+            state.pop(index)
+
+
+class _FakeActorCritic:
+    policy_action_space = spaces.Discrete(2)
+    hidden_state_shape = (1, 4)
+    hidden_state_shape_lens = [4]
+    policy_action_space_shape_lens = [1]
+
+    def act(self, batch, rnn_hidden_states, prev_actions, masks, **kwargs):
+        return PolicyActionData(
+            rnn_hidden_states=rnn_hidden_states,
+            actions=torch.zeros_like(prev_actions),
+        )
+
+    def get_extra(self, action_data, infos, dones):
+        return [{} for _ in infos]
+
+    def on_envs_pause(self, envs_to_pause):
+        pass
+
+
+class _FakeWriter:
+    def add_scalar(self, *args):
+        pass
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+@pytest.mark.parametrize("num_envs", [1, 3, 8])
+@pytest.mark.parametrize("evals_per_ep", [1, 2])
+def test_work_stealing_evaluation(num_envs, evals_per_ep):
+    episode_keys = [
+        (scene_id, str(episode_id))
+        for scene_id in ["a", "b", "c"]
+        for episode_id in range(2 if scene_id == "a" else 5)
+    ]
+    test_episode_count = 9
+    config = SimpleNamespace(
+        habitat=SimpleNamespace(simulator=SimpleNamespace(agents=[None])),
+        habitat_baselines=SimpleNamespace(
+            test_episode_count=test_episode_count,
+            eval=SimpleNamespace(
+                evals_per_ep=evals_per_ep,
+                work_stealing=True,
+                video_option=[],
+            ),
+        ),
+    )
+    agent = SimpleNamespace(
+        actor_critic=_FakeActorCritic(), masks_shape=(1,), eval=lambda: None
+    )
+    envs = _FakeVectorEnv(num_envs, episode_keys)
+    HabitatEvaluator().evaluate_agent(
+        agent,
+        envs,
+        config,
+        checkpoint_index=0,
+        step_id=0,
+        writer=_FakeWriter(),
+        device=torch.device("cpu"),
+        obs_transforms=[],
+        env_spec=SimpleNamespace(action_space=spaces.Discrete(2)),
+        rank0_keys=set(),
+    )
+
+    # Only the queued episodes ran, each exactly `evals_per_ep` times.
+    assert envs.completed == {
+        key: evals_per_ep for key in episode_keys[:test_episode_count]
+    }
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import multiprocessing
+from types import SimpleNamespace
+
+import numpy as np
+from omegaconf import OmegaConf
+
+from habitat.config.default_structured_configs import (
+    DistanceToGoalMeasurementConfig,
+)
+from habitat.tasks.nav.geodesic_distance_cache import (
+    GeodesicDistanceField,
+    GeodesicDistanceFieldCache,
+    goals_cache_key,
+)
+from habitat.tasks.nav.nav import (
+    DistanceToGoal,
+    NavigationEpisode,
+    NavigationGoal,
+)
+
+GOAL = np.array([1.3, 0.1, -2.7])
+
+
+class _CountingDistance:
+    def __init__(self):
+        self.num_calls = 0
+
+    def __call__(self, position):
+        self.num_calls += 1
+        # Euclidean distance, which is 1-Lipschitz like geodesic distance.
+        offset = np.asarray(position) - GOAL
+        return float(np.hypot(offset[0], offset[2]))
+
+
+def test_distance_field_interpolation():
+    rng = np.random.RandomState(0)
+    field = GeodesicDistanceField(cell_size=0.25)
+    compute_distance = _CountingDistance()
+
+    for _ in range(200):
+        position = GOAL + rng.uniform(-5, 5, size=3) * [1, 0, 1]
+        expected = compute_distance(position)
+        interpolated = field.lookup(position, compute_distance)
+        assert interpolated is not None
+        assert (
+            abs(interpolated - expected)
+            <= field.max_interpolation_error + 1e-6
+        )
+
+    # Looking up the same positions again doesn't compute any new corner.
+    num_calls = compute_distance.num_calls
+    num_corners = len(field)
+    field.lookup(GOAL + [0.5, 0, 0.5], compute_distance)
+    field.lookup(GOAL + [0.5, 0, 0.5], compute_distance)
+    assert len(field) - num_corners <= 4
+    assert compute_distance.num_calls - num_calls <= 4
+
+
+def test_distance_field_rejects_discontinuities():
+    field = GeodesicDistanceField(cell_size=0.25)
+    assert field.lookup([0.1, 0.0, 0.1], lambda p: float("inf")) is None
+    # A wall between the corners makes the distance jump.
+    assert (
+        field.lookup([10.1, 0.0, 10.1], lambda p: 10.0 * float(p[0] > 10.1))
+        is None
+    )
+
+
+def test_distance_field_cache_lru_and_disk(tmp_path):
+    cache = GeodesicDistanceFieldCache(
+        cell_size=0.25, max_scenes=2, cache_dir=str(tmp_path)
+    )
+    compute_distance = _CountingDistance()
+    field = cache.get("scene_a", "POINT:goal")
+    assert cache.get("scene_a", "POINT:goal") is field
+    field.lookup([0.3, 0.0, 0.3], compute_distance)
+
+    cache.get("scene_b", "POINT:goal")
+    cache.get("scene_a", "POINT:goal")
+    cache.get("scene_c", "POINT:goal")
+    # scene_b was the least recently used scene.
+    assert "scene_b" not in cache
+    assert "scene_a" in cache
+
+    cache.get("scene_d", "POINT:goal")
+    assert "scene_a" not in cache
+    assert len(list(tmp_path.iterdir())) == 1
+
+    reloaded = cache.get("scene_a", "POINT:goal")
+    assert reloaded is not field
+    assert len(reloaded) == len(field)
+    num_calls = compute_distance.num_calls
+    reloaded.lookup([0.3, 0.0, 0.3], compute_distance)
+    assert compute_distance.num_calls == num_calls
+
+
+class _FakeSim:
+    def __init__(self, navigable_max_x=float("inf")):
+        self.position = np.zeros(3)
+        self.navigable_max_x = navigable_max_x
+        self.compute_distance = _CountingDistance()
+
+    def get_agent_state(self):
+        return SimpleNamespace(position=self.position)
+
+    def is_navigable(self, position):
+        return position[0] <= self.navigable_max_x
+
+    def geodesic_distance(self, position, goal_positions, episode):
+        return self.compute_distance(position)
+
+
+def _distance_to_goal(sim, cache_dir=None):
+    config = OmegaConf.structured(
+        DistanceToGoalMeasurementConfig(
+            use_distance_field_cache=True, distance_field_cache_dir=cache_dir
+        )
+    )
+    return DistanceToGoal(sim=sim, config=config)
+
+
+def _episode(scene_id):
+    return NavigationEpisode(
+        episode_id="0",
+        scene_id=scene_id,
+        start_position=[0.0, 0.0, 0.0],
+        start_rotation=[0.0, 0.0, 0.0, 1.0],
+        goals=[NavigationGoal(position=GOAL.tolist())],
+    )
+
+
+_POSITIONS = [GOAL + [3.1 + 0.2 * i, 0.0, 2.05] for i in range(10)]
+
+
+def _walk_episode(cache_dir):
+    sim = _FakeSim()
+    measure = _distance_to_goal(sim, cache_dir)
+    episode = _episode("scene_a")
+    measure.reset_metric(episode=episode)
+    for position in _POSITIONS:
+        sim.position = position
+        measure.update_metric(episode=episode)
+    assert sim.compute_distance.num_calls > 0
+    # Only the closing of the measure saves the field, the scene is never
+    # evicted.
+    measure.close()
+
+
+def _load_saved_field(cache_dir):
+    cache = GeodesicDistanceFieldCache(
+        cell_size=0.25, max_scenes=4, cache_dir=cache_dir
+    )
+    episode = _episode("scene_a")
+    goal_positions = [goal.position for goal in episode.goals]
+    field = cache.get(
+        "scene_a", goals_cache_key(episode, goal_positions, "POINT")
+    )
+    assert len(field) > 0
+    compute_distance = _CountingDistance()
+    for position in _POSITIONS:
+        assert field.lookup(position, compute_distance) is not None
+    assert compute_distance.num_calls == 0
+
+
+def _run_in_process(target, *args):
+    mp_ctx = multiprocessing.get_context("spawn")
+    proc = mp_ctx.Process(target=target, args=args)
+    proc.start()
+    proc.join()
+    assert proc.exitcode == 0
+
+
+def test_distance_to_goal_saves_fields(tmp_path):
+    _run_in_process(_walk_episode, str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    _run_in_process(_load_saved_field, str(tmp_path))
+
+    # Changing scene saves the fields of the previous one.
+    sim = _FakeSim()
+    measure = _distance_to_goal(sim, str(tmp_path / "scenes"))
+    measure.reset_metric(episode=_episode("scene_b"))
+    sim.position = _POSITIONS[0]
+    measure.update_metric(episode=_episode("scene_b"))
+    sim.position = _POSITIONS[1]
+    measure.update_metric(episode=_episode("scene_b"))
+    measure.reset_metric(episode=_episode("scene_c"))
+    assert len(list((tmp_path / "scenes").iterdir())) == 1
+
+
+def test_distance_to_goal_exact_near_non_navigable():
+    position = GOAL + [3.1, 0.0, 2.05]
+    sim = _FakeSim(navigable_max_x=position[0])
+    measure = _distance_to_goal(sim)
+    episode = _episode("scene_a")
+    measure.reset_metric(episode=episode)
+    # The corners on the right of the cell are not navigable.
+    sim.position = position
+    measure.update_metric(episode=episode)
+    assert measure.get_metric() == sim.compute_distance(position)
+
+
+def test_distance_to_goal_exact_on_stop():
+    sim = _FakeSim()
+    measure = _distance_to_goal(sim)
+    episode = _episode("scene_a")
+    task = SimpleNamespace(is_stop_called=False)
+    measure.reset_metric(episode=episode, task=task)
+    # Far from the goal, in the middle of a cell.
+    position = GOAL + [3.125, 0.0, 2.125]
+    sim.position = position
+    measure.update_metric(episode=episode, task=task)
+    exact = sim.compute_distance(position)
+    assert measure.get_metric() != exact
+
+    # Stopping doesn't move the agent but the distance becomes exact.
+    task.is_stop_called = True
+    measure.update_metric(episode=episode, task=task)
+    assert measure.get_metric() == exact
@@ -293,6 +293,78 @@ def test_rl_vectorized_envs(gpu2gpu):
                 ), "dones should be true after max_episode steps"
 
 
+@pytest.mark.parametrize(
+    "multiprocessing_start_method", ["forkserver", "spawn"]
+)
+def test_vectorized_envs_shared_memory_observations(
+    multiprocessing_start_method,
+):
+    configs, datasets = _load_test_data()
+    num_envs = len(configs)
+    env_fn_args = tuple(zip(configs, datasets, range(num_envs)))
+    # Always move forward so that both runs see the same observations.
+    actions = [1] * num_envs
+
+    all_observations = []
+    for use_shared_memory_observations in [False, True]:
+        step_observations = []
+        with habitat.VectorEnv(
+            make_env_fn=_make_dummy_env_func,
+            env_fn_args=env_fn_args,
+            multiprocessing_start_method=multiprocessing_start_method,
+            use_shared_memory_observations=use_shared_memory_observations,
+        ) as envs:
+            # Views on shared memory are only valid until the next step.
+            step_observations.append(
+                [
+                    {k: np.array(v, copy=True) for k, v in obs.items()}
+                    for obs in envs.reset()
+                ]
+            )
+            for _ in range(5):
+                outputs = envs.step(actions)
+                step_observations.append(
+                    [
+                        {k: np.array(v, copy=True) for k, v in obs.items()}
+                        for obs, _, _, _ in outputs
+                    ]
+                )
+        all_observations.append(step_observations)
+
+    for pipe_step, shm_step in zip(*all_observations):
+        for pipe_obs, shm_obs in zip(pipe_step, shm_step):
+            assert list(pipe_obs.keys()) == list(shm_obs.keys())
+            for k in pipe_obs:
+                assert np.array_equal(pipe_obs[k], shm_obs[k])
+
+
+@pytest.mark.parametrize(
+    "vector_env_class", ["VectorEnv", "ThreadedVectorEnv"]
+)
+def test_vectorized_envs_wait_any_step(vector_env_class):
+    configs, datasets = _load_test_data()
+    num_envs = len(configs)
+    env_fn_args = tuple(zip(configs, datasets, range(num_envs)))
+    with getattr(habitat, vector_env_class)(
+        make_env_fn=_make_dummy_env_func, env_fn_args=env_fn_args
+    ) as envs:
+        envs.reset()
+        index_envs = list(range(1, num_envs))
+        envs.async_step([1] * len(index_envs), index_envs=index_envs)
+        assert not envs.poll_step_at(0)
+
+        # Read the results in completion order.
+        pending = index_envs
+        while len(pending) > 0:
+            ready = envs.wait_any_step(pending)
+            assert len(ready) > 0 and set(ready) <= set(pending)
+            for index_env in ready:
+                assert envs.poll_step_at(index_env)
+                observations, _, _, _ = envs.wait_step_at(index_env)
+                assert len(observations) > 0
+            pending = [i for i in pending if i not in ready]
+
+
 @pytest.mark.parametrize("classic_replay_renderer", [False, True])
 @pytest.mark.parametrize("sensor_uuid", ["rgb_sensor", "depth_sensor"])
 @pytest.mark.parametrize("gpu2gpu", [False])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import pytest
+
+try:
+    import numpy as np
+    import torch
+
+    from habitat_baselines.common.tensor_dict import TensorDict
+    from habitat_baselines.rl.hrl.skill_executor import (
+        BatchIndex,
+        SkillStreams,
+        gather_batch,
+        group_batch_by_skill,
+    )
+
+    baseline_installed = True
+except ImportError:
+    baseline_installed = False
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_group_batch_by_skill():
+    skill_ids = np.array([3, 1, 3, 0, 1, 2])
+    batch_idxs, groups = group_batch_by_skill(skill_ids)
+    assert batch_idxs.tolist() == [3, 1, 4, 5, 0, 2]
+    assert [(i, batch_idxs[s].tolist()) for i, s in groups] == [
+        (0, [3]),
+        (1, [1, 4]),
+        (2, [5]),
+        (3, [0, 2]),
+    ]
+
+    # Skill 2 is run by skill 0, and only some environments are grouped.
+    batch_idxs, groups = group_batch_by_skill(
+        skill_ids,
+        should_adds=torch.tensor([True, False, True, True, True, True]),
+        skill_redirects=np.array([0, 1, 0, 3]),
+    )
+    assert [(i, batch_idxs[s].tolist()) for i, s in groups] == [
+        (0, [3, 5]),
+        (1, [4]),
+        (3, [0, 2]),
+    ]
+
+    index = BatchIndex(batch_idxs)
+    obs = TensorDict({"a": torch.arange(6), "b": torch.arange(6) * 10})
+    sorted_obs = gather_batch(obs, index)
+    assert sorted_obs["a"].tolist() == [3, 5, 4, 0, 2]
+    assert sorted_obs["b"].tolist() == [30, 50, 40, 0, 20]
+    assert gather_batch(None, index) is None
+
+    # Without CUDA, the functions run in order on the current stream.
+    outputs = SkillStreams().run(
+        [lambda: 1, lambda: 2], torch.device("cpu"), lambda out: ()
+    )
+    assert outputs == [1, 2]
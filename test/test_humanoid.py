@@ -18,6 +18,10 @@ import habitat_sim.agent
 from habitat.articulated_agent_controllers import (
     HumanoidRearrangeController,
     HumanoidSeqPoseController,
+    motion_cache,
+)
+from habitat.articulated_agent_controllers.humanoid_rearrange_controller import (
+    interpolate_reach_poses,
 )
 
 default_sim_settings = {
@@ -441,3 +445,80 @@ def test_humanoid_seqpose_controller(humanoid_name):
                 "test_humanoid_wrapper",
                 open_vid=True,
             )
+
+
+def test_motion_cache(tmp_path, monkeypatch):
+    source_path = str(tmp_path / "motion.pkl")
+    with open(source_path, "wb") as f:
+        f.write(b"motion")
+    arrays = {"joints": np.random.rand(10, 4), "fps": np.arange(3)}
+    metadata = {"hands": {"left_hand": {"num_bins": [2, 3, 4]}}}
+
+    monkeypatch.setenv(motion_cache.MOTION_CACHE_DIR_ENV, "")
+    assert (
+        motion_cache.save_motion_asset(source_path, "test", arrays, metadata)
+        is None
+    )
+    assert motion_cache.load_motion_asset(source_path, "test") is None
+
+    monkeypatch.setenv(
+        motion_cache.MOTION_CACHE_DIR_ENV, str(tmp_path / "cache")
+    )
+    assert motion_cache.load_motion_asset(source_path, "test") is None
+    motion_cache.save_motion_asset(source_path, "test", arrays, metadata)
+    cached_arrays, cached_metadata = motion_cache.load_motion_asset(
+        source_path, "test"
+    )
+    assert cached_metadata == metadata
+    assert cached_arrays.keys() == arrays.keys()
+    for k, v in arrays.items():
+        assert isinstance(cached_arrays[k], np.memmap)
+        assert not cached_arrays[k].flags.writeable
+        assert np.array_equal(cached_arrays[k], v)
+    assert motion_cache.load_motion_asset(source_path, "other") is None
+
+    # Modifying the motion file invalidates its cache.
+    with open(source_path, "wb") as f:
+        f.write(b"new motion")
+    assert motion_cache.load_motion_asset(source_path, "test") is None
+
+
+def test_interpolate_reach_poses():
+    rng = np.random.RandomState(0)
+    num_bins = [3, 4, 5]
+    # The grid poses, followed by the stop pose.
+    num_poses = np.prod(num_bins) + 1
+    joints = rng.randn(num_poses, 6, 4).astype(np.float32)
+    joints /= np.linalg.norm(joints, axis=-1, keepdims=True)
+    rotations = rng.randn(num_poses, 4)
+    rotations /= np.linalg.norm(rotations, axis=-1, keepdims=True)
+    translations = rng.randn(num_poses, 3)
+    hand_data = (joints, rotations, translations)
+    coord_info = {"min": [-1.0, 0.0, 0.5], "max": [1.0, 2.0, 1.5]}
+    coord_info["num_bins"] = num_bins
+
+    # On the grid, the poses are the grid poses.
+    x, y, z = 2, 1, 3
+    index = y * num_bins[0] * num_bins[2] + x * num_bins[2] + z
+    res_joints, res_rots, res_trans = interpolate_reach_poses(
+        np.array([[1.0, 2.0 / 3.0, 1.25]]), hand_data, coord_info
+    )
+    assert res_joints.shape == (1, 6, 4)
+    assert res_joints.dtype == np.float32
+    assert np.allclose(res_joints[0], joints[index], atol=1e-6)
+    assert np.allclose(res_rots[0], rotations[index])
+    assert np.allclose(res_trans[0], translations[index])
+
+    # Below the grid in z, the poses are blended with the stop pose.
+    _, _, res_trans = interpolate_reach_poses(
+        np.array([[-1.0, 0.0, 0.0]]), hand_data, coord_info
+    )
+    assert np.allclose(res_trans[0], translations[-1])
+
+    # A batch gives the same poses as the queries one at a time.
+    positions = rng.uniform([-1.5, -0.5, 0.0], [1.5, 2.5, 2.0], size=(32, 3))
+    batch_results = interpolate_reach_poses(positions, hand_data, coord_info)
+    for i, position in enumerate(positions):
+        results = interpolate_reach_poses(position, hand_data, coord_info)
+        for batch_res, res in zip(batch_results, results):
+            assert np.array_equal(batch_res[i], res[0])
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import numpy as np
+
+import habitat
+from habitat.config.default import get_config
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
+from habitat.tasks.nav.nav import NavigationEpisode, NavigationGoal
+
+
+def _make_null_sim_env() -> habitat.Env:
+    config = get_config(
+        "benchmark/nav/pointnav/pointnav_habitat_test.yaml",
+        [
+            "habitat.simulator.type=NullSim-v0",
+            "habitat.simulator.null_sim_v0.navigable_extent=2.0",
+        ],
+    )
+    dataset = PointNavDatasetV1()
+    dataset.episodes = [
+        NavigationEpisode(
+            episode_id="0",
+            scene_id="null_scene.glb",
+            start_position=[0.0, 0.0, 0.0],
+            start_rotation=[0.0, 0.0, 0.0, 1.0],
+            goals=[NavigationGoal(position=[0.0, 0.0, -1.5], radius=0.2)],
+        )
+    ]
+    return habitat.Env(config=config, dataset=dataset)
+
+
+def test_null_sim_pointnav():
+    with _make_null_sim_env() as env:
+        observations = env.reset()
+        for uuid, space in env.sim.sensor_suite.observation_spaces.items():
+            assert observations[uuid].shape == space.shape
+            assert observations[uuid].dtype == space.dtype
+        assert np.isclose(env.get_metrics()["distance_to_goal"], 1.5)
+
+        # The agent faces the goal, 0.25m away from it after a step.
+        observations = env.step("move_forward")
+        assert np.isclose(env.get_metrics()["distance_to_goal"], 1.25)
+        assert np.allclose(
+            observations["pointgoal_with_gps_compass"], [1.25, 0.0], atol=1e-5
+        )
+        assert not env.sim.previous_step_collided
+
+        env.step("turn_left")
+        env.step("move_forward")
+        assert env.sim.get_agent_state().position[0] < 0
+
+        # The agent can't leave the floor.
+        for _ in range(10):
+            env.step("move_forward")
+        assert env.sim.previous_step_collided
+        assert np.isclose(env.sim.get_agent_state().position[2], -2.0)
+
+
+def test_null_sim_schedule_next_episode():
+    with _make_null_sim_env() as env:
+        episode = env.episodes[0]
+        env.episodes = [
+            NavigationEpisode(
+                episode_id=str(episode_id),
+                scene_id=episode.scene_id,
+                start_position=episode.start_position,
+                start_rotation=episode.start_rotation,
+                goals=episode.goals,
+            )
+            for episode_id in range(3)
+        ]
+        assert env.episode_keys == [
+            (episode.scene_id, str(episode_id)) for episode_id in range(3)
+        ]
+        env.reset()
+        current_id = env.current_episode.episode_id
+        next_id = "1" if current_id == "2" else "2"
+        env.schedule_next_episode(episode.scene_id, next_id)
+        # The scheduled episode only starts at the next reset.
+        env.step("move_forward")
+        assert env.current_episode.episode_id == current_id
+        env.reset()
+        assert env.current_episode.episode_id == next_id
+
+
+def test_null_sim_reset_episode_iterator():
+    with _make_null_sim_env() as env:
+        episode = env.episodes[0]
+        env.episodes = [
+            NavigationEpisode(
+                episode_id=str(episode_id),
+                scene_id=episode.scene_id,
+                start_position=episode.start_position,
+                start_rotation=episode.start_rotation,
+                goals=episode.goals,
+            )
+            for episode_id in range(4)
+        ]
+        episode_ids = []
+        for _ in range(3):
+            env.reset()
+            episode_ids.append(env.current_episode.episode_id)
+
+        # The same episodes are run again, in the same order.
+        env.reset_episode_iterator()
+        for episode_id in episode_ids:
+            env.reset()
+            assert env.current_episode.episode_id == episode_id
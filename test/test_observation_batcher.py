@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import numpy as np
+import pytest
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+try:
+    from habitat_baselines.common.observation_batcher import ObservationBatcher
+    from habitat_baselines.utils.common import batch_obs
+except ImportError:
+    pass
+
+
+def _random_observations(rng, num_envs):
+    return [
+        {
+            "rgb": rng.randint(0, 256, size=(4, 5, 3), dtype=np.uint8),
+            "gps": rng.randn(2).astype(np.float32),
+            "step": int(rng.randint(10)),
+            "arm": {"joint": torch.randn(7), "holding": np.array([1.0])},
+        }
+        for _ in range(num_envs)
+    ]
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+def test_observation_batcher_matches_batch_obs():
+    rng = np.random.RandomState(0)
+    batcher = ObservationBatcher(num_slots=2)
+    # Batches of different sizes.
+    for num_envs in [3, 2, 3, 1]:
+        observations = _random_observations(rng, num_envs)
+        expected = batch_obs(observations)
+        batch = batcher(observations)
+
+        assert set(batch.keys()) == set(expected.keys())
+        assert set(batch["arm"].keys()) == set(expected["arm"].keys())
+        for k in ["rgb", "gps", "step"]:
+            assert batch[k].dtype == expected[k].dtype
+            assert torch.equal(batch[k], expected[k])
+        for k in ["joint", "holding"]:
+            assert torch.equal(batch["arm"][k], expected["arm"][k])
+
+    # The layout is recompiled when the sensors change.
+    batch = batcher([{"depth": np.zeros((2, 2, 1), dtype=np.float32)}])
+    assert list(batch.keys()) == ["depth"]
+    assert batch["depth"].size() == (1, 2, 2, 1)
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+def test_observation_batcher_cpu_batches_are_not_reused():
+    rng = np.random.RandomState(0)
+    batcher = ObservationBatcher(num_slots=1)
+    observations = _random_observations(rng, 2)
+    batch = batcher(observations)
+    expected = {k: v.clone() for k, v in batch.items() if k != "arm"}
+    batcher(_random_observations(rng, 2))
+    for k, v in expected.items():
+        assert torch.equal(batch[k], v)
+
+    # A change of shape with the same keys recompiles the layout.
+    observations = _random_observations(rng, 2)
+    for obs in observations:
+        obs["gps"] = rng.randn(3).astype(np.float32)
+    assert batcher(observations)["gps"].size() == (2, 3)
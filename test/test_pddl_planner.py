@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import pytest
+
+from habitat.tasks.rearrange.multi_task.pddl_domain import PddlProblem
+
+try:
+    import torch
+
+    from habitat_baselines.rl.hrl.hl.pddl_planner import BitsetPlanner
+
+    baseline_installed = True
+except ImportError:
+    baseline_installed = False
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_bitset_planner():
+    pddl = PddlProblem(
+        "fp",
+        "benchmark/multi_agent/pddl/multi_agent_tidy_house.yaml",
+        read_config=False,
+    )
+    predicates = pddl.get_possible_predicates()
+    actions = pddl.get_possible_actions(
+        filter_entities=[pddl.get_entity("robot_0")]
+    )
+    planner = BitsetPlanner(predicates, actions, max_search_depth=8)
+
+    start_preds = [p for p in predicates if p.name == "not_holding"]
+    pred_vals = torch.tensor([float(p in start_preds) for p in predicates])
+    goal = pddl.stage_goals["stage_1_2"]
+    plan = planner.get_plan(pred_vals, goal)
+    assert [action.name for action in plan] == [
+        "nav_to_goal",
+        "pick",
+        "nav_to_obj",
+        "place",
+    ]
+
+    # Replay the plan on the predicates.
+    preds = list(start_preds)
+    for action in plan:
+        assert action.is_precond_satisfied_from_predicates(preds)
+        if "nav" in action.name:
+            preds = [p for p in preds if p.name != "robot_at"]
+        if action.name == "pick":
+            preds = [p for p in preds if p.name != "not_holding"]
+        if action.name == "place":
+            preds = [p for p in preds if p.name != "holding"]
+        preds.extend(p for p in action.post_cond if p not in preds)
+    assert goal.is_true_from_predicates(preds)
+
+    # Planning again from the same state is a cache lookup.
+    start_state = planner.encode_state(pred_vals)
+    plan_graph = planner.get_plan_graph(start_state, goal)
+    assert planner.get_plan_graph(start_state, goal) is plan_graph
+    assert len(planner.get_plan(pred_vals, goal)) == len(plan)
@@ -4,8 +4,11 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import gzip
+import itertools
 import json
 import os.path as osp
+import pickle
 import time
 from glob import glob
 
@@ -25,7 +28,17 @@ from habitat.config.default import get_config
 from habitat.core.embodied_task import Episode
 from habitat.core.environments import get_env_class
 from habitat.core.logging import logger
-from habitat.datasets.rearrange.rearrange_dataset import RearrangeDatasetV0
+from habitat.datasets.rearrange.combine_datasets import combine_datasets
+from habitat.datasets.rearrange.rearrange_dataset import (
+    RearrangeDatasetV0,
+    RearrangeEpisode,
+)
+from habitat.tasks.rearrange.multi_task.pddl_domain import PddlProblem
+from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
+from habitat.tasks.rearrange.multi_task.pddl_sim_snapshot import (
+    BatchedPredicateEvaluator,
+)
+from habitat.tasks.rearrange.utils import ArticulatedAgentStartCache
 from habitat.utils.geometry_utils import is_point_in_triangle
 
 CFG_TEST = "benchmark/rearrange/skills/pick.yaml"
@@ -146,6 +159,171 @@ def test_pddl():
     )
 
 
+@pytest.mark.parametrize(
+    "domain_path,problem_path",
+    [
+        ("fp", "benchmark/multi_agent/pddl/multi_agent_tidy_house.yaml"),
+        ("fp", "benchmark/multi_agent/pddl/multi_agent_social_nav.yaml"),
+        ("replica_cad", "habitat/task/rearrange/pddl/rearrange_easy.yaml"),
+    ],
+)
+def test_pddl_grounding_index(domain_path, problem_path):
+    pddl = PddlProblem(domain_path, problem_path, read_config=False)
+    all_entities = list(pddl.all_entities.values())
+
+    # Reference: enumerate every tuple of entities.
+    expected_preds = []
+    for pred in pddl.predicates.values():
+        for entity_input in itertools.combinations(all_entities, pred.n_args):
+            if not pred.are_args_compatible(entity_input):
+                continue
+            use_pred = pred.clone()
+            use_pred.set_param_values(entity_input)
+            if use_pred.are_types_compatible(pddl.expr_types):
+                expected_preds.append(use_pred.compact_str)
+    assert [p.compact_str for p in pddl.get_possible_predicates()] == sorted(
+        expected_preds
+    )
+
+    for filter_entities in ([], [pddl.get_entity("robot_0")]):
+        expected_actions = []
+        for action in pddl.actions.values():
+            for entity_input in itertools.combinations(
+                all_entities, action.n_args
+            ):
+                if not all(e in entity_input for e in filter_entities):
+                    continue
+                for perm in itertools.permutations(entity_input):
+                    if action.are_args_compatible(list(perm)):
+                        name = ",".join(e.name for e in perm)
+                        expected_actions.append(f"{action.name}({name})")
+        actions = pddl.get_possible_actions(filter_entities=filter_entities)
+        assert [a.compact_str for a in actions] == expected_actions
+
+    # The index is rebuilt when the entities change.
+    index = pddl.grounding_index
+    assert pddl.grounding_index is index
+    pddl.register_episode_entity(all_entities[0])
+    assert pddl.grounding_index is not index
+
+
+def test_pddl_batched_predicates():
+    config = get_config(
+        "habitat-lab/habitat/config/benchmark/rearrange/multi_task/rearrange_easy.yaml",
+        [
+            "habitat.simulator.concur_render=False",
+            "habitat.dataset.split=val",
+        ],
+    )
+    env_class = get_env_class(config.habitat.env_task)
+    env = habitat.utils.env_utils.make_env_fn(
+        env_class=env_class, config=config
+    )
+    env.reset()
+    pddl = env.env.env._env.task.pddl_problem  # type: ignore
+    sim_info = pddl.sim_info
+    predicates = pddl.get_possible_predicates()
+    evaluator = BatchedPredicateEvaluator(predicates)
+
+    def check_predicates():
+        expected = [p.is_true(sim_info) for p in predicates]
+        assert evaluator(sim_info).tolist() == expected
+
+    check_predicates()
+    poss_actions = pddl.get_possible_actions()
+    ac_strs = [x.compact_str for x in poss_actions]
+    for ac_str in [
+        "nav(goal0|0,robot_0)",
+        "pick(goal0|0,robot_0)",
+        "nav(TARGET_goal0|0,robot_0)",
+        "place(goal0|0,TARGET_goal0|0,robot_0)",
+    ]:
+        assert poss_actions[ac_strs.index(ac_str)].apply_if_true(sim_info)
+        check_predicates()
+
+    # The truth values go through the cache of the task.
+    sim_info.reset_pred_truth_cache()
+    truth_values = evaluator(sim_info)
+    assert [
+        sim_info.pred_truth_cache[repr(p)] for p in predicates
+    ] == truth_values.tolist()
+
+    # A predicate without simulator conditions is always true.
+    assert BatchedPredicateEvaluator([Predicate("always", None, [])])(
+        sim_info
+    ).tolist() == [True]
+
+
+def test_rearrange_sim_snapshot():
+    config = get_config(
+        "habitat-lab/habitat/config/benchmark/rearrange/multi_task/rearrange_easy.yaml",
+        [
+            "habitat.simulator.concur_render=False",
+            "habitat.dataset.split=val",
+        ],
+    )
+    env_class = get_env_class(config.habitat.env_task)
+    env = habitat.utils.env_utils.make_env_fn(
+        env_class=env_class, config=config
+    )
+    env.reset()
+    sim = env.env.env._env.sim  # type: ignore
+    snapshot = sim.capture_snapshot(with_articulated_agent_js=True)
+    scene_pos = sim.get_scene_pos()
+    assert snapshot.rigid_T.shape == (len(sim.scene_obj_ids), 4, 4)
+    assert np.allclose(snapshot.rigid_T[:, :3, 3], scene_pos, atol=1e-5)
+
+    # Move all the objects, then go back to the snapshot.
+    rigid_T, _ = sim.get_scene_obj_states()
+    rigid_T[:, 1, 3] += 1.0
+    sim.set_scene_obj_states(rigid_T)
+    assert np.allclose(sim.get_scene_pos()[:, 1], scene_pos[:, 1] + 1.0)
+    sim.restore_snapshot(snapshot)
+    assert np.allclose(sim.get_scene_pos(), scene_pos, atol=1e-5)
+    restored = sim.capture_snapshot(with_articulated_agent_js=True)
+    assert np.allclose(restored.rigid_T, snapshot.rigid_T, atol=1e-5)
+    assert np.allclose(restored.art_pos, snapshot.art_pos, atol=1e-5)
+
+    # The snapshot gives the same state as the state dict.
+    state = sim.capture_state()
+    assert np.allclose(
+        np.array([T.translation for T in state["rigid_T"]]), scene_pos
+    )
+    env.close()
+
+
+def test_articulated_agent_start_cache(tmp_path):
+    legacy_cache_file = str(tmp_path / "starts.pickle")
+    with open(legacy_cache_file, "wb") as f:
+        pickle.dump({"legacy_0": (np.array([1.0, 0.0, 2.0]), 0.5)}, f)
+
+    cache_dir = str(tmp_path / "starts")
+    writer = ArticulatedAgentStartCache(cache_dir)
+    reader = ArticulatedAgentStartCache(
+        cache_dir, legacy_cache_file=legacy_cache_file
+    )
+    assert reader.get("0_0") is None
+    writer.put("0_0", (np.array([0.5, 0.1, -1.0], dtype=np.float32), 1.5))
+    writer.put("1_0", (np.array([2.0, 0.1, 3.0], dtype=np.float32), -0.5))
+
+    # The records written by another cache are read lazily.
+    pos, rot = reader.get("0_0")
+    assert np.array_equal(pos, np.array([0.5, 0.1, -1.0], dtype=np.float32))
+    assert rot == 1.5
+    assert "1_0" in reader
+    assert "2_0" not in reader
+    pos, rot = reader.get("legacy_0")
+    assert np.allclose(pos, [1.0, 0.0, 2.0]) and rot == 0.5
+
+    # Only the records are left, without temporary files.
+    records = [
+        f
+        for shard in tmp_path.joinpath("starts").iterdir()
+        for f in shard.iterdir()
+    ]
+    assert sorted(f.suffix for f in records) == [".json", ".json"]
+
+
 TEST_CFG_PATHS = list(
     glob(
         "habitat-lab/habitat/config/benchmark/rearrange/**/*.yaml",
@@ -240,6 +418,87 @@ def test_rearrange_episode_generator(
     )
 
 
+def test_rearrange_episode_generator_shards():
+    scenes = [
+        "data/replica_cad/configs/scenes/v3_sc1_staging_00.scene_instance.json",
+        "data/replica_cad/configs/scenes/v3_sc0_staging_00.scene_instance.json",
+    ]
+    shards = rr_gen.plan_shards(scenes, 7, episodes_per_shard=2, seed=1)
+    assert [
+        (shard.scene_name, shard.chunk, shard.num_episodes) for shard in shards
+    ] == [
+        ("v3_sc0_staging_00.scene_instance", 0, 2),
+        ("v3_sc0_staging_00.scene_instance", 1, 2),
+        ("v3_sc1_staging_00.scene_instance", 0, 2),
+        ("v3_sc1_staging_00.scene_instance", 1, 1),
+    ]
+    assert len({shard.seed for shard in shards}) == len(shards)
+    assert len({shard.file_name for shard in shards}) == len(shards)
+    # The shards don't depend on the order of the scenes.
+    assert rr_gen.plan_shards(scenes[::-1], 7, 2, seed=1) == shards
+    assert rr_gen.plan_shards(scenes, 7, 2, seed=2) != shards
+    assert [shard.first_episode_id for shard in shards] == [0, 2, 4, 6]
+
+    # Without a shard size, there is one shard per scene.
+    shards = rr_gen.plan_shards(scenes, 7)
+    assert [shard.num_episodes for shard in shards] == [4, 3]
+
+
+def test_rearrange_episode_generator_shard_ids(tmp_path, monkeypatch):
+    class CountingEpisodeGenerator:
+        """Numbers the episodes with a counter shared by the shards of the worker, like RearrangeEpisodeGenerator."""
+
+        num_ep_generated = 0
+
+        def generate_scene_episodes(self, scene, num_episodes):
+            episodes = []
+            for _ in range(num_episodes):
+                episodes.append(
+                    RearrangeEpisode(
+                        episode_id=str(self.num_ep_generated),
+                        scene_id=scene,
+                        start_position=[0.0, 0.0, 0.0],
+                        start_rotation=[0.0, 0.0, 0.0, 1.0],
+                        ao_states={},
+                        rigid_objs=[],
+                        targets={},
+                    )
+                )
+                self.num_ep_generated += 1
+            return episodes
+
+    scenes = [
+        "data/replica_cad/configs/scenes/v3_sc0_staging_00.scene_instance.json",
+        "data/replica_cad/configs/scenes/v3_sc1_staging_00.scene_instance.json",
+    ]
+    shards = rr_gen.plan_shards(scenes, 7, episodes_per_shard=2, seed=1)
+    # Two workers generating the shards in a different order.
+    for worker_shards in [shards[::2], shards[1::2][::-1]]:
+        monkeypatch.setattr(
+            rr_gen, "_worker_ep_gen", CountingEpisodeGenerator()
+        )
+        for shard in worker_shards:
+            assert rr_gen._generate_shard(shard, str(tmp_path))[1] is not None
+    episode_ids = []
+    for scene_name in {shard.scene_name for shard in shards}:
+        content_path = str(tmp_path / f"{scene_name}.json.gz")
+        combine_datasets(
+            [
+                str(tmp_path / shard.file_name)
+                for shard in shards
+                if shard.scene_name == scene_name
+            ],
+            content_path,
+        )
+        with gzip.open(content_path, "rt") as f:
+            episode_ids += [
+                episode["episode_id"]
+                for episode in json.loads(f.read())["episodes"]
+            ]
+    # The merged content files have unique ids.
+    assert sorted(episode_ids, key=int) == [str(i) for i in range(7)]
+
+
 @pytest.mark.skipif(
     not osp.exists("data/test_assets/"),
     reason="This test requires habitat-sim test assets.",
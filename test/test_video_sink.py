@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import numpy as np
+import pytest
+
+try:
+    import torch
+
+    from habitat.utils.visualizations.utils import (
+        observations_to_image,
+        overlay_frame,
+    )
+    from habitat_baselines.common.video_sink import (
+        VideoFrame,
+        VideoSink,
+        batch_to_video_observations,
+        make_video_frame,
+        render_video_frames,
+    )
+
+    baseline_installed = True
+except ImportError:
+    baseline_installed = False
+
+
+class _FakeWriter:
+    def __init__(self):
+        self.videos = {}
+
+    def add_video_from_np_images(self, video_name, step_idx, images, fps):
+        self.videos[video_name] = images
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_video_sink(num_workers):
+    batch = {
+        "rgb": torch.randint(0, 255, (3, 16, 16, 3), dtype=torch.uint8),
+        "depth": torch.rand(3, 16, 16, 1),
+        "gps": torch.rand(3, 2),
+    }
+    info = {"distance_to_goal": 1.0}
+    writer = _FakeWriter()
+    sink = VideoSink(
+        video_option=["tensorboard"],
+        video_dir=None,
+        tb_writer=writer,
+        num_workers=num_workers,
+        # Forces the videos to be written one after the other.
+        max_inflight_mb=0,
+    )
+    video_obs = batch_to_video_observations(batch)
+    assert len(video_obs) == 3
+    for env_idx, obs in enumerate(video_obs):
+        assert set(obs.keys()) == {"rgb", "depth"}
+        sink.submit(
+            [
+                VideoFrame(obs, {}, overlay=False),
+                VideoFrame(obs, info),
+                VideoFrame(obs, info, blank=True),
+            ],
+            episode_id=env_idx,
+            checkpoint_idx=0,
+            metrics=info,
+        )
+    sink.close()
+
+    assert len(writer.videos) == 3
+    for env_idx in range(3):
+        images = writer.videos[f"episode{env_idx}"]
+        expected = observations_to_image(
+            {k: v[env_idx] for k, v in batch.items()}, info
+        )
+        assert len(images) == 3
+        assert np.array_equal(images[0], expected)
+        assert np.array_equal(images[1], overlay_frame(expected, info))
+        assert images[2].shape == images[1].shape
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_video_sink_compact_frames():
+    obs = {"rgb": np.zeros((16, 16, 3), dtype=np.uint8)}
+    top_down_map = {
+        "map": np.zeros((256, 128), dtype=np.uint8),
+        "fog_of_war_mask": np.ones((256, 128), dtype=np.uint8),
+        "agent_map_coord": [(100, 40)],
+        "agent_angle": [0.5],
+    }
+    info = {
+        "distance_to_goal": 1.0,
+        "success": np.float32(0.0),
+        "collisions": {"is_collision": True, "count": 1},
+        "top_down_map": top_down_map,
+        "ee_pos": np.zeros(3),
+        "debug": {"points": np.zeros((10, 3))},
+    }
+    frame = make_video_frame(obs, info)
+    # Only the values written on the frame are kept.
+    assert frame.info == {
+        "distance_to_goal": 1.0,
+        "success": 0.0,
+        "collisions": {"is_collision": True, "count": 1},
+    }
+    # The smallest side of the map is subsampled down to the height of the
+    # observations.
+    assert frame.top_down_map["map"].shape == (32, 16)
+    assert frame.top_down_map["fog_of_war_mask"].shape == (32, 16)
+    assert frame.top_down_map["agent_map_coord"] == [(12, 5)]
+    (image,) = render_video_frames([frame])
+    expected = observations_to_image(obs, info)
+    assert image.shape[1] == expected.shape[1]
+
+    sink = VideoSink(
+        video_option=["tensorboard"],
+        video_dir=None,
+        tb_writer=_FakeWriter(),
+        num_workers=0,
+    )
+    frames = [sink.record_frame(obs, info) for _ in range(3)]
+    frame_nbytes = 16 * 16 * 3 + 2 * 32 * 16
+    assert sink._recorded_bytes == 3 * frame_nbytes
+    sink.submit(frames[:2], episode_id=0, checkpoint_idx=0, metrics={})
+    assert sink._recorded_bytes == frame_nbytes
+    sink.discard(frames[2:])
+    assert sink._recorded_bytes == 0
+    sink.close()
@@ -6,6 +6,7 @@
 
 import numpy as np
 
+from habitat.utils.visualizations import fog_of_war, maps
 from habitat.utils.visualizations.utils import observations_to_image
 
 
@@ -57,3 +58,96 @@ def test_different_dim_observations_to_image():
         1570,
         3,
     ), "Resulted image resolution doesn't match."
+
+
+class _FakePathFinder:
+    def __init__(self):
+        self.navigable_area = 12.0
+        self.num_topdown_views = 0
+
+    def get_bounds(self):
+        return np.array([-2.0, 0.0, -3.0]), np.array([2.0, 3.0, 3.0])
+
+    def get_topdown_view(self, meters_per_pixel, height):
+        self.num_topdown_views += 1
+        # A navigable floor at the ground level only.
+        top_down_view = np.zeros((int(6 / meters_per_pixel), 100), dtype=bool)
+        top_down_view[10:-10, 10:-10] = height < 1.0
+        return top_down_view
+
+
+def test_top_down_map_cache(tmpdir):
+    pathfinder = _FakePathFinder()
+    cache = maps.TopDownMapCache(max_maps=2, cache_dir=str(tmpdir))
+    expected = maps.get_topdown_map(pathfinder, 0.0, map_resolution=100)
+    pathfinder.num_topdown_views = 0
+
+    top_down_map = cache.get(pathfinder, "a", 0.0, map_resolution=100)
+    assert np.array_equal(top_down_map, expected)
+    # The map is drawn on by the measure, it must be a copy.
+    top_down_map[:] = maps.MAP_SOURCE_POINT_INDICATOR
+    assert np.array_equal(
+        cache.get(pathfinder, "a", 0.02, map_resolution=100), expected
+    )
+    assert pathfinder.num_topdown_views == 1
+
+    # Another floor, then another scene, which evicts the first map.
+    assert not cache.get(pathfinder, "a", 1.5, map_resolution=100).any()
+    cache.get(pathfinder, "b", 0.0, map_resolution=100)
+    assert pathfinder.num_topdown_views == 3
+    assert len(cache) == 2
+
+    # The evicted map is loaded back from the cache directory, as is the map
+    # of another cache sharing the directory.
+    cache.get(pathfinder, "a", 0.0, map_resolution=100)
+    other_cache = maps.TopDownMapCache(max_maps=1, cache_dir=str(tmpdir))
+    assert np.array_equal(
+        other_cache.get(pathfinder, "a", 0.0, map_resolution=100), expected
+    )
+    assert pathfinder.num_topdown_views == 3
+
+    # Recomputing the navmesh invalidates the maps of the scene.
+    pathfinder.navigable_area = 10.0
+    cache.get(pathfinder, "a", 0.0, map_resolution=100)
+    assert pathfinder.num_topdown_views == 4
+
+
+def test_reveal_fog_of_war():
+    top_down_map = np.full((200, 200), maps.MAP_VALID_POINT, dtype=np.uint8)
+    # A wall across the field of view, 20 cells ahead of the agent.
+    top_down_map[120, 60:140] = maps.MAP_INVALID_POINT
+    fog_of_war_mask = np.zeros_like(top_down_map)
+    fog_of_war_mask[0, 0] = 1
+
+    revealed = fog_of_war.reveal_fog_of_war(
+        top_down_map,
+        fog_of_war_mask,
+        np.array([100, 100]),
+        # Looking towards +x.
+        current_angle=0.0,
+        fov=90,
+        max_line_len=50,
+    )
+    # The input mask is not modified and its revealed cells are kept.
+    assert fog_of_war_mask.sum() == 1
+    assert revealed[0, 0] == 1
+    assert revealed[100, 100] == 1
+    assert revealed[119, 100] == 1
+    assert revealed[110, 91] == 1 and revealed[110, 109] == 1
+    # Behind the agent, outside of its field of view and behind the wall.
+    assert revealed[90, 100] == 0
+    assert revealed[105, 120] == 0
+    assert not revealed[120:].any()
+
+    # Looking the other way round.
+    revealed = fog_of_war.reveal_fog_of_war(
+        top_down_map,
+        np.zeros_like(top_down_map),
+        np.array([100, 100]),
+        current_angle=np.pi,
+        fov=90,
+        max_line_len=50,
+    )
+    assert revealed[60, 100] == 1 and revealed[51, 100] == 1
+    assert revealed[49, 100] == 0
+    assert not revealed[101:].any()